@@ -0,0 +1,638 @@
+"""Doluluk analitiği: doktor başına gün/hafta/ay özetleri.
+
+Özetler ``analitik_ozet`` (bos/dolu/kapali slot, iptal, öne alma süresi) ve
+``analitik_saatlik`` (saat dilimi başına randevu ve iptal) tablolarında
+tutulur; okuma dönem başına tek satırdır, geçmiş taranmaz.
+
+Gün satırı her zaman kaynaktan hesaplanır: slot sayıları takvim sorgusuyla
+(bkz. slot_motoru.TAKVIM_SORGUSU), iptaller ``randevu_iptalleri``nden, öne
+alma süresi randevuların ``olusturma_zamani``ndan; hafta ve ay satırlarına
+günün eski ve yeni değerleri arasındaki fark eklenir. Gün satırı
+hesaplamadan önce kilitlendiği için aynı günü eşzamanlı yenileyen işlemler
+birbirinin sonucunu ezmez.
+
+Yazma route'ları özetlere dokunmaz; yazdıkları işlemin içinde yalnızca bir
+işaret ekler: randevu alma, iptal ve tek slot kapatma ``gun_kirlet`` ile o
+günü, bütün günleri etkileyen değişiklikler (çalışma programı, kapalı aralık
+kuralları) ``kirlet`` ile doktoru. Özet okunurken (``donemi_guncelle``)
+dönemin bekleyen işaretleri ve hiç hesaplanmamış günleri orada işlenir;
+okunan özet, hangi sunucuyla başlatılmış olursa olsun yazmaları içerir.
+
+Mutabakat işi (thread ya da ``calistir`` komutu) işaretli günleri ve
+doktorları ``ANALITIK_KIRLI_ARALIGI`` saniyede bir arka planda yeniden
+hesaplar, böylece okumaya iş kalmaz; ayrıca belirli aralıklarla bütün
+doktorların bugün çevresindeki penceresini (``ANALITIK_GERIYE_GUN``,
+``ANALITIK_ILERIYE_GUN``) yeniler. ``dogrula`` özetleri değiştirmeden
+kaynaktan yeniden hesaplar ve farkları raporlar:
+
+    python analitik.py mutabakat [--doktor ID] [--tam]
+    python analitik.py dogrula [--doktor ID]
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from psycopg2.extras import execute_values
+
+import config
+from db import db_baglantisi
+from slot_motoru import TAKVIM_SORGUSU
+
+DONEMLER = ('gun', 'hafta', 'ay')
+SAYACLAR = ('bos', 'dolu', 'kapali', 'iptal', 'bekleme_toplam_dk', 'bekleme_adet')
+_SIFIR = (0,) * len(SAYACLAR)
+
+# Pencere mutabakatını aynı anda tek sürecin yapması için pg_advisory_lock
+# anahtarı; rastgele seçilmiş sabit bir sayı
+_KILIT_ANAHTARI = 727002
+
+_gunluk = logging.getLogger(__name__)
+
+_GUN_SORGUSU = """
+    SELECT t.tarih, t.bos, t.dolu, t.kapali,
+           COALESCE(i.adet, 0), COALESCE(r.bekleme_toplam_dk, 0), COALESCE(r.bekleme_adet, 0)
+    FROM ({takvim}) t
+    LEFT JOIN (
+        SELECT tarih,
+               SUM(GREATEST(EXTRACT(EPOCH FROM (tarih + saat) - olusturma_zamani) / 60, 0)::bigint)
+                   AS bekleme_toplam_dk,
+               COUNT(olusturma_zamani) AS bekleme_adet
+        FROM randevular
+        WHERE doktor_id = %(doktor_id)s AND tarih BETWEEN %(baslangic)s AND %(bitis)s
+        GROUP BY tarih
+    ) r ON r.tarih = t.tarih
+    LEFT JOIN (
+        SELECT tarih, COUNT(*) AS adet
+        FROM randevu_iptalleri
+        WHERE doktor_id = %(doktor_id)s AND tarih BETWEEN %(baslangic)s AND %(bitis)s
+        GROUP BY tarih
+    ) i ON i.tarih = t.tarih
+""".format(takvim=TAKVIM_SORGUSU.format(ek_kolonlar=""))
+
+_SAAT_SORGUSU = """
+    SELECT tarih, saat, SUM(randevu), SUM(iptal)
+    FROM (
+        SELECT tarih, EXTRACT(HOUR FROM saat)::int AS saat, 1 AS randevu, 0 AS iptal
+        FROM randevular
+        WHERE doktor_id = %(doktor_id)s AND tarih BETWEEN %(baslangic)s AND %(bitis)s
+        UNION ALL
+        SELECT tarih, EXTRACT(HOUR FROM saat)::int, 0, 1
+        FROM randevu_iptalleri
+        WHERE doktor_id = %(doktor_id)s AND tarih BETWEEN %(baslangic)s AND %(bitis)s
+    ) x
+    GROUP BY tarih, saat
+"""
+
+
+def donem_baslangici(donem, tarih):
+    if donem == 'hafta':
+        return tarih - timedelta(days=tarih.weekday())
+    if donem == 'ay':
+        return tarih.replace(day=1)
+    return tarih
+
+
+def donem_bitisi(donem, baslangic):
+    if donem == 'hafta':
+        return baslangic + timedelta(days=6)
+    if donem == 'ay':
+        return (baslangic + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return baslangic
+
+
+def _kaynaktan_hesapla(cursor, doktor_id, baslangic, bitis):
+    """({tarih: sayaçlar}, {(tarih, saat): (randevu, iptal)})"""
+    parametreler = {"doktor_id": doktor_id, "baslangic": baslangic, "bitis": bitis}
+    cursor.execute(_GUN_SORGUSU, parametreler)
+    gunler = {satir[0]: tuple(int(d) for d in satir[1:]) for satir in cursor.fetchall()}
+    cursor.execute(_SAAT_SORGUSU, parametreler)
+    saatler = {(t, s): (int(r), int(i)) for t, s, r, i in cursor.fetchall()}
+    return gunler, saatler
+
+
+def _fark(yeni, eski):
+    return tuple(a - b for a, b in zip(yeni, eski))
+
+
+def _yenile(cursor, doktor_id, baslangic, bitis):
+    """Aralıktaki gün satırlarını kaynaktan yeniden hesaplar, hafta ve ay
+    satırlarına farkı ekler; değişen gün sayısını döner.
+
+    Kilit sırası her zaman gün satırları (tarih sırasıyla), sonra hafta/ay
+    satırları (anahtar sırasıyla) olduğundan eşzamanlı güncellemeler
+    birbirini kilitlenmeye sokmaz.
+    """
+    cursor.execute("""
+        INSERT INTO analitik_ozet (doktor_id, donem, baslangic, gun_sayisi)
+        SELECT %(doktor_id)s, 'gun', g::date, 1
+        FROM generate_series(%(baslangic)s::date, %(bitis)s::date, interval '1 day') AS g
+        ON CONFLICT (doktor_id, donem, baslangic) DO NOTHING
+        RETURNING baslangic
+    """, {"doktor_id": doktor_id, "baslangic": baslangic, "bitis": bitis})
+    yeni_gunler = {satir[0] for satir in cursor.fetchall()}
+
+    # Kilit alındıktan sonraki sorgular, bu güne bizden önce yazıp commit
+    # eden işlemleri de görür
+    cursor.execute("""
+        SELECT baslangic, bos, dolu, kapali, iptal, bekleme_toplam_dk, bekleme_adet
+        FROM analitik_ozet
+        WHERE doktor_id = %s AND donem = 'gun' AND baslangic BETWEEN %s AND %s
+        ORDER BY baslangic
+        FOR UPDATE
+    """, (doktor_id, baslangic, bitis))
+    eski = {satir[0]: tuple(satir[1:]) for satir in cursor.fetchall()}
+    cursor.execute("""
+        SELECT baslangic, saat, randevu, iptal FROM analitik_saatlik
+        WHERE doktor_id = %s AND donem = 'gun' AND baslangic BETWEEN %s AND %s
+    """, (doktor_id, baslangic, bitis))
+    eski_saatler = {(t, s): (r, i) for t, s, r, i in cursor.fetchall()}
+
+    yeni, yeni_saatler = _kaynaktan_hesapla(cursor, doktor_id, baslangic, bitis)
+
+    ozet_farki = defaultdict(lambda: [0] * (1 + len(SAYACLAR)))  # (donem, başlangıç) -> gun_sayisi + sayaçlar
+    degisen = []
+    for tarih in sorted(yeni):
+        fark = _fark(yeni[tarih], eski.get(tarih, _SIFIR))
+        if not any(fark) and tarih not in yeni_gunler:
+            continue
+        if any(fark):
+            degisen.append((doktor_id, tarih, *yeni[tarih]))
+        for donem in ('hafta', 'ay'):
+            toplam = ozet_farki[(donem, donem_baslangici(donem, tarih))]
+            toplam[0] += tarih in yeni_gunler
+            for j, d in enumerate(fark, 1):
+                toplam[j] += d
+
+    saat_farki = defaultdict(lambda: [0, 0])  # (donem, başlangıç, saat) -> randevu, iptal
+    degisen_saatler = []
+    for anahtar in sorted(set(yeni_saatler) | set(eski_saatler)):
+        yeni_deger = yeni_saatler.get(anahtar, (0, 0))
+        fark = _fark(yeni_deger, eski_saatler.get(anahtar, (0, 0)))
+        if not any(fark):
+            continue
+        tarih, saat = anahtar
+        degisen_saatler.append((doktor_id, 'gun', tarih, saat, *yeni_deger))
+        for donem in ('hafta', 'ay'):
+            toplam = saat_farki[(donem, donem_baslangici(donem, tarih), saat)]
+            toplam[0] += fark[0]
+            toplam[1] += fark[1]
+
+    if degisen:
+        execute_values(cursor, """
+            UPDATE analitik_ozet o
+            SET bos = v.bos, dolu = v.dolu, kapali = v.kapali, iptal = v.iptal,
+                bekleme_toplam_dk = v.bekleme_toplam_dk, bekleme_adet = v.bekleme_adet,
+                guncelleme_zamani = now()
+            FROM (VALUES %s) AS v (doktor_id, baslangic, bos, dolu, kapali, iptal,
+                                   bekleme_toplam_dk, bekleme_adet)
+            WHERE o.doktor_id = v.doktor_id AND o.donem = 'gun' AND o.baslangic = v.baslangic
+        """, degisen)
+    if ozet_farki:
+        execute_values(cursor, """
+            INSERT INTO analitik_ozet AS o
+                (doktor_id, donem, baslangic, gun_sayisi, bos, dolu, kapali, iptal,
+                 bekleme_toplam_dk, bekleme_adet)
+            VALUES %s
+            ON CONFLICT (doktor_id, donem, baslangic) DO UPDATE SET
+                gun_sayisi = o.gun_sayisi + EXCLUDED.gun_sayisi,
+                bos = o.bos + EXCLUDED.bos,
+                dolu = o.dolu + EXCLUDED.dolu,
+                kapali = o.kapali + EXCLUDED.kapali,
+                iptal = o.iptal + EXCLUDED.iptal,
+                bekleme_toplam_dk = o.bekleme_toplam_dk + EXCLUDED.bekleme_toplam_dk,
+                bekleme_adet = o.bekleme_adet + EXCLUDED.bekleme_adet,
+                guncelleme_zamani = now()
+        """, [(doktor_id, d, b, *f) for (d, b), f in sorted(ozet_farki.items())])
+    if degisen_saatler:
+        execute_values(cursor, """
+            INSERT INTO analitik_saatlik (doktor_id, donem, baslangic, saat, randevu, iptal)
+            VALUES %s
+            ON CONFLICT (doktor_id, donem, baslangic, saat) DO UPDATE SET
+                randevu = EXCLUDED.randevu, iptal = EXCLUDED.iptal
+        """, degisen_saatler)
+    if saat_farki:
+        execute_values(cursor, """
+            INSERT INTO analitik_saatlik AS s (doktor_id, donem, baslangic, saat, randevu, iptal)
+            VALUES %s
+            ON CONFLICT (doktor_id, donem, baslangic, saat) DO UPDATE SET
+                randevu = s.randevu + EXCLUDED.randevu, iptal = s.iptal + EXCLUDED.iptal
+        """, [(doktor_id, d, b, s, *f) for (d, b, s), f in sorted(saat_farki.items())])
+    return len(degisen)
+
+
+def gun_kirlet(cursor, doktor_id, tarih):
+    """Tek günü etkileyen bir yazmada (randevu, iptal, slot kapatma), aynı
+    işlemin içinde çağrılır; gün mutabakat işiyle yenilenir."""
+    cursor.execute(
+        "INSERT INTO analitik_kirli_gunler (doktor_id, tarih) VALUES (%s, %s)", (doktor_id, tarih)
+    )
+
+
+def kirlet(cursor, doktor_id):
+    """Doktorun bütün günleri değişti; özetleri mutabakat işiyle yenilenir."""
+    cursor.execute("""
+        INSERT INTO analitik_kirli (doktor_id) VALUES (%s)
+        ON CONFLICT (doktor_id) DO UPDATE SET isaret_zamani = now()
+    """, (doktor_id,))
+
+
+def _pencere(bugun=None):
+    bugun = bugun or date.today()
+    return (bugun - timedelta(days=config.ANALITIK_GERIYE_GUN),
+            bugun + timedelta(days=config.ANALITIK_ILERIYE_GUN))
+
+
+def _doktor_araligi(cursor, doktor_id, tam=False):
+    """Pencere ile doktorun özeti olan günleri (``tam`` ise randevusu ya da
+    iptali olan bütün günleri de) kapsayan aralık."""
+    baslangic, bitis = _pencere()
+    cursor.execute("""
+        SELECT min(baslangic), max(baslangic) FROM analitik_ozet
+        WHERE doktor_id = %s AND donem = 'gun'
+    """, (doktor_id,))
+    sinirlar = [cursor.fetchone()]
+    if tam:
+        cursor.execute("""
+            SELECT min(tarih), max(tarih) FROM (
+                SELECT tarih FROM randevular WHERE doktor_id = %(d)s
+                UNION ALL
+                SELECT tarih FROM randevu_iptalleri WHERE doktor_id = %(d)s
+            ) x
+        """, {"d": doktor_id})
+        sinirlar.append(cursor.fetchone())
+    for alt, ust in sinirlar:
+        if alt is not None:
+            baslangic, bitis = min(baslangic, alt), max(bitis, ust)
+    return baslangic, bitis
+
+
+def doktoru_yenile(doktor_id, tam=False):
+    """Doktorun aralığını kendi işleminde yeniden hesaplar; düzeltilen gün
+    sayısını döner."""
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        duzeltilen = _yenile(cursor, doktor_id, *_doktor_araligi(cursor, doktor_id, tam))
+        conn.commit()
+    return duzeltilen
+
+
+def kirlileri_isle(adet=10):
+    """İşaretli doktorları (en eskiden) yeniden hesaplar; işlenen doktor
+    sayısını döner. İşaret, hesaplama ile aynı işlemde silinir; hata olursa
+    yerinde kalır."""
+    islenen = 0
+    for _ in range(adet):
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                DELETE FROM analitik_kirli
+                WHERE doktor_id = (
+                    SELECT doktor_id FROM analitik_kirli
+                    ORDER BY isaret_zamani
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING doktor_id
+            """)
+            satir = cursor.fetchone()
+            if satir is None:
+                break
+            _yenile(cursor, satir[0], *_doktor_araligi(cursor, satir[0]))
+            conn.commit()
+        islenen += 1
+    return islenen
+
+
+def kirli_gunleri_isle(adet=None):
+    """En eski işaretleri (en fazla ``adet``) alıp işaretli günleri yeniden
+    hesaplar; işlenen işaret sayısını döner. İşaretler hesaplama ile aynı
+    işlemde silinir; hata olursa yerinde kalır."""
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            DELETE FROM analitik_kirli_gunler
+            WHERE id IN (
+                SELECT id FROM analitik_kirli_gunler
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING doktor_id, tarih
+        """, (adet or config.ANALITIK_KIRLI_PARTI,))
+        isaretler = cursor.fetchall()
+        # Gün satırları sıralı kilitlenir (bkz. _yenile)
+        for doktor_id, tarih in sorted(set(isaretler)):
+            _yenile(cursor, doktor_id, tarih, tarih)
+        conn.commit()
+    return len(isaretler)
+
+
+def mutabakat(doktor_id=None, tam=False):
+    """Doktorların (verilmezse hepsinin) özetlerini kaynaktan yeniler; her
+    doktor ayrı bir işlemdedir. ``tam`` ile pencere dışındaki bütün
+    geçmiş de hesaplanır (ilk kurulumda)."""
+    rapor = {"doktor": 0, "duzeltilen_gun": 0, "hata": 0}
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        if doktor_id is None:
+            cursor.execute("SELECT doktor_id FROM doktorlar ORDER BY doktor_id")
+            doktorlar = [satir[0] for satir in cursor.fetchall()]
+        else:
+            doktorlar = [doktor_id]
+    for d in doktorlar:
+        try:
+            rapor["duzeltilen_gun"] += doktoru_yenile(d, tam)
+        except Exception:
+            _gunluk.exception("Analitik mutabakatı başarısız (doktor %s)", d)
+            rapor["hata"] += 1
+        rapor["doktor"] += 1
+    return rapor
+
+
+def _topla(gunler, saatler):
+    """Gün değerlerinden gün/hafta/ay özetleri, özet tablolarının biçiminde."""
+    ozetler = {}
+    for tarih, sayaclar in gunler.items():
+        for donem in DONEMLER:
+            toplam = ozetler.setdefault((donem, donem_baslangici(donem, tarih)), [0] * (1 + len(SAYACLAR)))
+            toplam[0] += 1
+            for j, d in enumerate(sayaclar, 1):
+                toplam[j] += d
+    saat_ozetleri = defaultdict(lambda: [0, 0])
+    for (tarih, saat), (randevu, iptal) in saatler.items():
+        if tarih not in gunler:
+            continue
+        for donem in DONEMLER:
+            toplam = saat_ozetleri[(donem, donem_baslangici(donem, tarih), saat)]
+            toplam[0] += randevu
+            toplam[1] += iptal
+    return ozetler, saat_ozetleri
+
+
+def dogrula(doktor_id=None, ornek_sayisi=20):
+    """Özetleri değiştirmeden kaynaktan yeniden hesaplar ve karşılaştırır.
+
+    Her doktor, özet ve kaynağın aynı anını görmek için ayrı bir
+    REPEATABLE READ işleminde okunur. ``eksik_gun``, randevusu ya da iptali
+    olup özeti olmayan gün sayısıdır (``mutabakat --tam`` ile giderilir).
+    Henüz işlenmemiş işaretlerin günleri fark olarak görünür; sayıları
+    ``bekleyen_isaret``tedir.
+    """
+    rapor = {"doktor": 0, "gun": 0, "farkli_ozet": 0, "farkli_saat": 0, "eksik_gun": 0,
+             "bekleyen_isaret": 0, "farklar": []}
+
+    def fark_ekle(anahtar, alan, ozet, kaynak):
+        if len(rapor["farklar"]) < ornek_sayisi:
+            rapor["farklar"].append({
+                "doktor_id": anahtar[0], "donem": anahtar[1], "baslangic": anahtar[2].isoformat(),
+                **({"saat": anahtar[3]} if len(anahtar) > 3 else {}),
+                "alan": alan, "ozet": ozet, "kaynak": kaynak,
+            })
+
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        if doktor_id is None:
+            cursor.execute("""
+                SELECT doktor_id FROM analitik_ozet
+                UNION SELECT doktor_id FROM randevular
+                UNION SELECT doktor_id FROM randevu_iptalleri
+                ORDER BY 1
+            """)
+            doktorlar = [satir[0] for satir in cursor.fetchall()]
+        else:
+            doktorlar = [doktor_id]
+        cursor.execute("""
+            SELECT (SELECT count(*) FROM analitik_kirli WHERE %(d)s IS NULL OR doktor_id = %(d)s)
+                 + (SELECT count(*) FROM analitik_kirli_gunler WHERE %(d)s IS NULL OR doktor_id = %(d)s)
+        """, {"d": doktor_id})
+        rapor["bekleyen_isaret"] = cursor.fetchone()[0]
+        conn.rollback()
+
+        for d in doktorlar:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            cursor.execute("""
+                SELECT donem, baslangic, gun_sayisi, bos, dolu, kapali, iptal,
+                       bekleme_toplam_dk, bekleme_adet
+                FROM analitik_ozet WHERE doktor_id = %s
+            """, (d,))
+            kayitli = {(d, satir[0], satir[1]): tuple(satir[2:]) for satir in cursor.fetchall()}
+            cursor.execute("""
+                SELECT donem, baslangic, saat, randevu, iptal
+                FROM analitik_saatlik WHERE doktor_id = %s
+            """, (d,))
+            kayitli_saatler = {(d, *satir[:3]): tuple(satir[3:]) for satir in cursor.fetchall()}
+            cursor.execute("""
+                SELECT count(*) FROM (
+                    SELECT tarih FROM randevular WHERE doktor_id = %(d)s
+                    UNION
+                    SELECT tarih FROM randevu_iptalleri WHERE doktor_id = %(d)s
+                    EXCEPT
+                    SELECT baslangic FROM analitik_ozet WHERE doktor_id = %(d)s AND donem = 'gun'
+                ) x
+            """, {"d": d})
+            rapor["eksik_gun"] += cursor.fetchone()[0]
+
+            gun_tarihleri = sorted(b for (_, donem, b) in kayitli if donem == 'gun')
+            if gun_tarihleri:
+                gunler, saatler = _kaynaktan_hesapla(cursor, d, gun_tarihleri[0], gun_tarihleri[-1])
+                gunler = {t: v for t, v in gunler.items() if (d, 'gun', t) in kayitli}
+            else:
+                gunler, saatler = {}, {}
+            conn.rollback()
+
+            ozetler, saat_ozetleri = _topla(gunler, saatler)
+            rapor["doktor"] += 1
+            rapor["gun"] += len(gunler)
+            for (donem, baslangic) in sorted(set(ozetler) | {k[1:] for k in kayitli}):
+                anahtar = (d, donem, baslangic)
+                ozet = kayitli.get(anahtar, (0,) * (1 + len(SAYACLAR)))
+                kaynak = tuple(ozetler.get((donem, baslangic), (0,) * (1 + len(SAYACLAR))))
+                if ozet != kaynak:
+                    rapor["farkli_ozet"] += 1
+                    for alan, o, k in zip(('gun_sayisi', *SAYACLAR), ozet, kaynak):
+                        if o != k:
+                            fark_ekle(anahtar, alan, o, k)
+            for anahtar in sorted(set(saat_ozetleri) | {k[1:] for k in kayitli_saatler}):
+                ozet = kayitli_saatler.get((d, *anahtar), (0, 0))
+                kaynak = tuple(saat_ozetleri.get(anahtar, (0, 0)))
+                if ozet != kaynak:
+                    rapor["farkli_saat"] += 1
+                    for alan, o, k in zip(('randevu', 'iptal'), ozet, kaynak):
+                        if o != k:
+                            fark_ekle((d, *anahtar), alan, o, k)
+    return rapor
+
+
+# Okumadan önce dönemin bekleyen gün işaretlerini alır (bkz. donemi_guncelle).
+# Kilitler id sırasıyla alınır; mutabakat işinin tuttuğu işaretler için o
+# işlemin commit etmesi beklenir.
+DONEM_ISARETLERI_SORGUSU = """
+    DELETE FROM analitik_kirli_gunler
+    WHERE id IN (
+        SELECT id FROM analitik_kirli_gunler
+        WHERE doktor_id = %(doktor_id)s AND tarih BETWEEN %(baslangic)s AND %(bitis)s
+        ORDER BY id
+        FOR UPDATE
+    )
+    RETURNING tarih
+"""
+
+DONEM_GUN_SAYISI_SORGUSU = """
+    SELECT count(*) FROM analitik_ozet
+    WHERE doktor_id = %(doktor_id)s AND donem = 'gun' AND baslangic BETWEEN %(baslangic)s AND %(bitis)s
+"""
+
+
+def donemi_guncelle(cursor, doktor_id, donem, baslangic):
+    """Dönemin özetini okumadan önce günceller; işlemi çağıran commit eder.
+
+    Özetlerin doğruluğu mutabakat thread'inin çalışmasına bağlı kalmasın diye
+    (``flask run``, testler, başka bir WSGI giriş noktası) okuma bekleyen
+    işleri kendisi yapar: doktorun işareti varsa doktorun aralığı, dönemde
+    işaretli ya da hiç hesaplanmamış bir gün varsa dönem yeniden hesaplanır.
+    İşaretler hesaplama ile aynı işlemde silinir. Thread çalışıyorsa bu
+    genellikle üç indeksli sorgudan ibarettir. Yenilenen gün sayısını döner.
+
+    Kilit sırası mutabakat işiyle aynıdır (gün işaretleri, doktor işareti,
+    gün satırları); eşzamanlı çalışmaları birbirini kilitlemez.
+    """
+    parametreler = {"doktor_id": doktor_id, "baslangic": baslangic,
+                    "bitis": donem_bitisi(donem, baslangic)}
+    cursor.execute(DONEM_ISARETLERI_SORGUSU, parametreler)
+    isaretli = cursor.fetchall()
+
+    yenilenen = 0
+    cursor.execute("DELETE FROM analitik_kirli WHERE doktor_id = %s RETURNING doktor_id", (doktor_id,))
+    if cursor.fetchone():
+        yenilenen += _yenile(cursor, doktor_id, *_doktor_araligi(cursor, doktor_id))
+
+    cursor.execute(DONEM_GUN_SAYISI_SORGUSU, parametreler)
+    eksik = (parametreler["bitis"] - baslangic).days + 1 - cursor.fetchone()[0]
+    if isaretli or eksik:
+        yenilenen += _yenile(cursor, doktor_id, baslangic, parametreler["bitis"])
+    return yenilenen
+
+
+OZET_SORGUSU = """
+    SELECT gun_sayisi, bos, dolu, kapali, iptal, bekleme_toplam_dk, bekleme_adet, guncelleme_zamani
+    FROM analitik_ozet
+    WHERE doktor_id = %(doktor_id)s AND donem = %(donem)s AND baslangic = %(baslangic)s
+"""
+
+SAATLIK_SORGUSU = """
+    SELECT saat, randevu, iptal FROM analitik_saatlik
+    WHERE doktor_id = %(doktor_id)s AND donem = %(donem)s AND baslangic = %(baslangic)s
+      AND (randevu > 0 OR iptal > 0)
+    ORDER BY saat
+"""
+
+
+def ozet_getir(cursor, doktor_id, donem, baslangic):
+    """Bir doktor-dönemin özeti ve saat dilimleri; özet yoksa None."""
+    parametreler = {"doktor_id": doktor_id, "donem": donem, "baslangic": baslangic}
+    cursor.execute(OZET_SORGUSU, parametreler)
+    satir = cursor.fetchone()
+    if satir is None:
+        return None
+    ozet = dict(zip(('gun_sayisi', *SAYACLAR, 'guncelleme_zamani'), satir))
+    cursor.execute(SAATLIK_SORGUSU, parametreler)
+    ozet["saatler"] = cursor.fetchall()
+    return ozet
+
+
+class Mutabakat:
+    """İşaretli gün ve doktorları kısa aralıklarla, bütün doktorların penceresini
+    ``ANALITIK_MUTABAKAT_ARALIGI`` saniyede bir yenileyen thread. Pencere
+    mutabakatı sırasında başka bir süreç sırası gelen mutabakatı atlar."""
+
+    def __init__(self):
+        self._kilit = threading.Lock()
+        self._thread = None
+        self.son_mutabakat = None
+        self.son_rapor = None
+        self.islenen_kirli = 0
+        self.islenen_kirli_gun = 0
+
+    def calistir(self):
+        sonraki = time.monotonic()
+        while True:
+            try:
+                islenen = kirlileri_isle()
+                islenen_gun = kirli_gunleri_isle()
+                with self._kilit:
+                    self.islenen_kirli += islenen
+                    self.islenen_kirli_gun += islenen_gun
+                islenen += islenen_gun
+                if time.monotonic() >= sonraki:
+                    sonraki = time.monotonic() + config.ANALITIK_MUTABAKAT_ARALIGI
+                    self._pencere_mutabakati()
+            except Exception:
+                _gunluk.exception("Analitik mutabakat turu başarısız")
+                islenen = 0
+            if not islenen:
+                time.sleep(config.ANALITIK_KIRLI_ARALIGI)
+
+    def _pencere_mutabakati(self):
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (_KILIT_ANAHTARI,))
+            if not cursor.fetchone()[0]:
+                return
+            try:
+                rapor = mutabakat()
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (_KILIT_ANAHTARI,))
+                conn.commit()
+        with self._kilit:
+            self.son_mutabakat = datetime.now()
+            self.son_rapor = rapor
+
+    def baslat(self):
+        with self._kilit:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.calistir, name="analitik-mutabakat", daemon=True)
+                self._thread.start()
+
+    def istatistikler(self):
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT (SELECT count(*) FROM analitik_kirli),
+                       (SELECT count(*) FROM analitik_kirli_gunler),
+                       LEAST((SELECT min(isaret_zamani) FROM analitik_kirli),
+                             (SELECT min(isaret_zamani) FROM analitik_kirli_gunler))
+            """)
+            kirli, kirli_gun, en_eski = cursor.fetchone()
+        with self._kilit:
+            return {
+                "kirli_doktor": kirli,
+                "kirli_gun_isareti": kirli_gun,
+                "en_eski_isaret": en_eski.isoformat() if en_eski else None,
+                "calisiyor": self._thread is not None,
+                "islenen_kirli": self.islenen_kirli,
+                "islenen_kirli_gun": self.islenen_kirli_gun,
+                "son_mutabakat": self.son_mutabakat.isoformat() if self.son_mutabakat else None,
+                "son_rapor": self.son_rapor,
+            }
+
+
+mutabakatci = Mutabakat()
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Doluluk analitiği özetleri")
+    parser.add_argument('komut', choices=['mutabakat', 'dogrula', 'calistir', 'durum'])
+    parser.add_argument('--doktor', type=int, help="Yalnızca bu doktor")
+    parser.add_argument('--tam', action='store_true',
+                        help="mutabakat: pencere dışındaki bütün geçmişi de hesapla")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.komut == 'mutabakat':
+        print(json.dumps(mutabakat(args.doktor, args.tam), indent=2, ensure_ascii=False))
+    elif args.komut == 'dogrula':
+        rapor = dogrula(args.doktor)
+        print(json.dumps(rapor, indent=2, ensure_ascii=False))
+        raise SystemExit(1 if rapor["farkli_ozet"] or rapor["farkli_saat"] else 0)
+    elif args.komut == 'calistir':
+        mutabakatci.calistir()
+    else:
+        print(json.dumps(mutabakatci.istatistikler(), indent=2, ensure_ascii=False, default=str))
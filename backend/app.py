@@ -1,32 +1,70 @@
-from flask import Flask, request, jsonify, send_from_directory
-import psycopg2
+from flask import Flask, Response, request, jsonify, send_from_directory
+from psycopg2 import sql
 from psycopg2.extras import RealDictCursor
 from flask_cors import CORS
-import bcrypt
 import os
-import base64
+import json
 import traceback
-import uuid
 from werkzeug.utils import secure_filename
 from datetime import datetime, time, timedelta
 from datetime import datetime, date
 
+import analitik
+import belge_isleme
+import blob_deposu
+import calisma_programi
+import config
+import kapali_araliklar
+import metrikler
+from belgeler import BELGE_ALANLARI, BELGE_KOLONLARI, belge_bilgisi, mime_turu
+from db import db_baglantisi, havuz_istatistikleri
+from doktor_dizini import dizin as doktor_dizini
+import randevu_gecmisi
+import slot_yayini
+import surumler
+import yavas_sorgular
+from kismi_guncelleme import degisiklikler, degisen_alanlar, kismi_guncelle
+from sifreleme import SifreHavuzuDolu, sifre_dogrula, sifre_hashle, yeniden_hashlenmeli, havuz as sifre_havuzu
+from route_sorgulari import (
+    DOKTOR_GIRIS_SORGUSU, GUNLUK_RANDEVULAR_SORGUSU, HASTA_GIRIS_SORGUSU,
+    RANDEVU_OLUSTUR_SORGUSU, RANDEVU_SIL_SORGUSU, SIRADAKI_RANDEVU_SORGUSU,
+)
+from slot_motoru import gun_izgarasi, gun_izgaralari, gecersiz_kil, dakika_str, takvim, en_erken_bos_slotlar
+from yuklemeler import YuklemeHatasi, YuklemeOturumlari, dosya_kaydet
 
 app = Flask(__name__)
-CORS(app)
-
-# Veritabanı bağlantı fonksiyonu
-def get_db_connection():
-    return psycopg2.connect(
-        dbname='dis_randevu_sistemi',
-        user='postgres',
-        password='123456',
-        host='localhost',
-        port='5432'
-    )
+CORS(app, expose_headers=['X-Next-Cursor', 'ETag', 'Server-Timing'])
+metrikler.kur(app)
+yavas_sorgular.kur()
+metrikler.gosterge_ekle(
+    'randevu_db_havuzu_baglanti', "Veritabanı bağlantı havuzu", 'durum',
+    lambda: {k: havuz_istatistikleri().get(k, 0) for k in ('toplam', 'bos', 'kullanimda', 'bekleyen')}
+)
+
+# Başka bir worker'ın yazdığı değişiklik sürüm sayacında görülünce bu
+# süreçteki önbellekler temizlenir (bkz. surumler.py)
+surumler.degisince('doktor', lambda doktor_id: gecersiz_kil(doktor_id))
+surumler.degisince('gun', lambda doktor_id, tarih: gecersiz_kil(doktor_id, date.fromisoformat(tarih)))
+surumler.degisince('dizin', lambda doktor_id: doktor_dizini.doktor_guncelle(int(doktor_id)))
+
+
+def arka_plan_islerini_baslat():
+    # Şifre süreç havuzu (bkz. sifreleme.py), belge işleme (bkz.
+    # belge_isleme.py) ve analitik mutabakatı (bkz. analitik.py) thread'leri.
+    # İçe aktarırken değil, sunucunun giriş noktasında (aşağıdaki __main__,
+    # wsgi.py) bir kez çağrılır; app'i içe aktaran betikler (bench/) bu
+    # işleri başlatmaz.
+    sifre_havuzu().baslat()
+    if config.BELGE_ISLEME_ACIK:
+        belge_isleme.isleyici.baslat()
+    if config.ANALITIK_MUTABAKAT_ACIK:
+        analitik.mutabakatci.baslat()
+
 
 BASE_UPLOAD_DIR = os.path.join(os.getcwd(), 'uploads')
 app.config['UPLOAD_FOLDER'] = BASE_UPLOAD_DIR
+# İstek gövdesi üst sınırı (base64 JSON ile iki belge gönderen eski istemcilere yer bırakır)
+app.config['MAX_CONTENT_LENGTH'] = 3 * config.YUKLEME_MAX_BOYUT
 
 # Doktor dizinleri
 DOCTOR_DIR = os.path.join(BASE_UPLOAD_DIR, 'doctor')
@@ -44,26 +82,118 @@ os.makedirs(BELGE_DIR, exist_ok=True)
 os.makedirs(RAPOR_DIR, exist_ok=True)
 os.makedirs(RONTGEN_DIR, exist_ok=True)
 
+# Parça parça yüklemeler tamamlanana kadar burada bekler
+yukleme_oturumlari = YuklemeOturumlari(os.path.join(BASE_UPLOAD_DIR, 'tmp'))
 
-def upload_base64_file(base64_str, save_dir, prefix):
+
+def upload_base64_file(base64_str, save_dir):
     if not base64_str:
         return None
 
-    os.makedirs(save_dir, exist_ok=True)
-    filename = f"{prefix}_{uuid.uuid4().hex}.pdf"
-    filepath = os.path.join(save_dir, filename)
+    with metrikler.olc('base64_dosya'):
+        return blob_deposu.base64_kaydet(base64_str, save_dir)
+
+
+def _istek_verisi():
+    # Kayıt/güncelleme route'ları hem JSON hem multipart form kabul eder
+    if request.mimetype == 'multipart/form-data':
+        return request.form
+    return request.get_json()
+
+
+def belge_kaydet(data, alan, save_dir):
+    # Öncelik: multipart dosya parçası (diske parça parça yazılır), önceden
+    # /api/uploads ile yüklenmiş belge referansı (<alan>_ref), eski istemciler
+    # için base64 metin.
+    dosya = request.files.get(alan) if request.mimetype == 'multipart/form-data' else None
+    if dosya:
+        return dosya_kaydet(dosya.stream, save_dir)
+
+    ref = data.get(f'{alan}_ref')
+    if ref:
+        return yukleme_oturumlari.referansi_al(ref, save_dir)
+
+    return upload_base64_file(data.get(alan), save_dir)
+
+
+def belge_referansi_ekle(cursor, yol):
+    # Referans sayılır ve belge (tür tespiti, küçük resim, sıkıştırma için)
+    # kuyruğa alınır; işleme commit'ten sonra arka planda yapılır.
+    blob_deposu.referans_ekle(cursor, yol)
+    belge_isleme.is_ekle(cursor, yol)
+
+
+def belge_referanslarini_guncelle(cursor, eski, degerler):
+    # Değişen belge kolonları için eski blobun referansı bırakılır, yenisininki
+    # eklenir. Eski değerler kismi_guncelle'de satır kilitliyken okunmuştur.
+    for alan, yeni_yol in degerler.items():
+        if alan in BELGE_KOLONLARI:
+            blob_deposu.referans_birak(cursor, eski.get(alan))
+            belge_referansi_ekle(cursor, yeni_yol)
+
+
+def sifreyi_yenile(tablo, anahtar, sahip_id, eski_hash, sifre):
+    # Maliyet ayarı değiştiyse hash, doğru şifreyle giriş yapıldığı anda yeni
+    # maliyetle yeniden üretilir. Bu arada şifre değiştirilmişse (eski hash
+    # artık yoksa) dokunulmaz. Havuz doluysa yenileme bir sonraki girişe kalır.
+    try:
+        yeni_hash = sifre_hashle(sifre)
+    except SifreHavuzuDolu:
+        return
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            sql.SQL("UPDATE {} SET sifre = %s WHERE {} = %s AND sifre = %s").format(
+                sql.Identifier(tablo), sql.Identifier(anahtar)
+            ),
+            (yeni_hash, sahip_id, eski_hash)
+        )
+        conn.commit()
+
+
+def _gun_surumleri(doktor_id, tarih_str):
+    # Bir doktorun bir günkü slot yanıtlarının dayandığı sürüm sayaçları
+    tarih = datetime.strptime(tarih_str, "%Y-%m-%d").date()
+    return [surumler.doktor(doktor_id), surumler.gun(doktor_id, tarih)]
+
+
+def _toplu_gun_surumleri():
+    tarih = datetime.strptime(request.args.get('date'), "%Y-%m-%d").date()
+    idler = [int(x) for x in request.args.get('ids', '').split(',') if x.strip()]
+    if len(idler) > config.TOPLU_MUSAITLIK_MAX_DOKTOR:
+        raise ValueError
+    return [a for d in idler for a in (surumler.doktor(d), surumler.gun(d, tarih))]
+
+
+def _dizin_surumu():
+    # /api/doctors yanıtının dayandığı il/ilçe grubunun bellekteki sürümü
+    city, district = request.args.get('city'), request.args.get('district')
+    if not city or not district:
+        raise ValueError
+    return {"dizin": doktor_dizini.grup_surumu(city, district)}
+
+
+def _sayfa_boyutu(varsayilan, en_fazla):
+    # ?limit= parametresi. limit de cursor da verilmemişse None: sayfalama
+    # yapılmaz, imleç okumayan eski istemciler tam listeyi alır. Yalnızca
+    # cursor verilmişse varsayılan boyut kullanılır. Geçersizse ValueError.
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return None
+    limit = request.args.get('limit', varsayilan, type=int)
+    if limit is None or not 1 <= limit <= en_fazla:
+        raise ValueError
+    return limit
 
-    with open(filepath, "wb") as f:
-        f.write(base64.b64decode(base64_str))
 
-    return filepath
+@app.errorhandler(YuklemeHatasi)
+def yukleme_hatasi(e):
+    return jsonify({"error": str(e)}), e.durum_kodu
 
 
 #-------------------------------------DOCTOR------------------------------------------------------------------
 # Doktor Kayıt
 @app.route('/doctor_register', methods=['POST'])
 def doctor_register():
-    data = request.json
+    data = _istek_verisi()
 
     try:
         # Adres bilgilerini al
@@ -75,56 +205,59 @@ def doctor_register():
 
         if not (il and ilce and tamadres):
             return jsonify({"error": "Adres bilgileri (il, ilce, tamadres) zorunludur."}), 400
-        
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Adresi adresler tablosuna ekle
-        insert_adres_query = """
-            INSERT INTO adres (il, ilce, tamadres)
-            VALUES (%s, %s, %s)
-            RETURNING adres_id
-        """
-        cursor.execute(insert_adres_query, (il, ilce, tamadres))
-        adres_id = cursor.fetchone()[0]
-
-        # Dosyaları base64'ten kaydet
-        diploma_path = upload_base64_file(data.get('diploma_belgesi'), DIPLOMA_DIR, 'diploma')
-        belge_path = upload_base64_file(data.get('isyeri_belgesi'), BELGE_DIR, 'belge')
-
-        # Şifre hashle
-        hashed_password = bcrypt.hashpw(data.get('sifre').encode('utf-8'), bcrypt.gensalt())
-
-        insert_doktor_query = """
-            INSERT INTO doktorlar (
-                ad, soyad, tc_kimlik_no, brans, dogum_tarihi, cinsiyet,
-                kullanici_adi, sifre, adres_id,
-                diploma_belgesi, isyeri_belgesi
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-
-        values = (
-            data.get('ad'),
-            data.get('soyad'),
-            data.get('tc_kimlik_no'),
-            data.get('brans'),
-            data.get('dogum_tarihi'),
-            data.get('cinsiyet'),
-            data.get('kullanici_adi'),
-            hashed_password.decode('utf-8'),
-            adres_id,
-            diploma_path,
-            belge_path
-        )
+        # Şifre hashle (bağlantı alınmadan önce)
+        hashed_password = sifre_hashle(data.get('sifre'))
 
-        cursor.execute(insert_doktor_query, values)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            # Adresi adresler tablosuna ekle
+            insert_adres_query = """
+                INSERT INTO adres (il, ilce, tamadres)
+                VALUES (%s, %s, %s)
+                RETURNING adres_id
+            """
+            cursor.execute(insert_adres_query, (il, ilce, tamadres))
+            adres_id = cursor.fetchone()[0]
+
+            # Dosyaları kaydet
+            diploma_path = belge_kaydet(data, 'diploma_belgesi', DIPLOMA_DIR)
+            belge_path = belge_kaydet(data, 'isyeri_belgesi', BELGE_DIR)
+
+            insert_doktor_query = """
+                INSERT INTO doktorlar (
+                    ad, soyad, tc_kimlik_no, brans, dogum_tarihi, cinsiyet,
+                    kullanici_adi, sifre, adres_id,
+                    diploma_belgesi, isyeri_belgesi
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING doktor_id
+            """
 
+            values = (
+                data.get('ad'),
+                data.get('soyad'),
+                data.get('tc_kimlik_no'),
+                data.get('brans'),
+                data.get('dogum_tarihi'),
+                data.get('cinsiyet'),
+                data.get('kullanici_adi'),
+                hashed_password,
+                adres_id,
+                diploma_path,
+                belge_path
+            )
+
+            cursor.execute(insert_doktor_query, values)
+            doktor_id = cursor.fetchone()[0]
+            belge_referansi_ekle(cursor, diploma_path)
+            belge_referansi_ekle(cursor, belge_path)
+            surumler.artir(cursor, surumler.dizin(doktor_id))
+            conn.commit()
+
+        doktor_dizini.doktor_guncelle(doktor_id)
         return jsonify({"message": "Doktor başarıyla kaydedildi"}), 200
 
+    except (YuklemeHatasi, SifreHavuzuDolu) as e:
+        return jsonify({"error": str(e)}), e.durum_kodu
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -137,16 +270,13 @@ def doctor_login():
     girilen_sifre = data.get('sifre')
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-        cursor.execute("SELECT * FROM doktorlar WHERE kullanici_adi = %s", (kullanici_adi,))
-        doktor = cursor.fetchone()
+        with db_baglantisi() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(DOKTOR_GIRIS_SORGUSU, {"kullanici_adi": kullanici_adi})
+            doktor = cursor.fetchone()
 
-        cursor.close()
-        conn.close()
-
-        if doktor and bcrypt.checkpw(girilen_sifre.encode('utf-8'), doktor['sifre'].encode('utf-8')):
+        if doktor and sifre_dogrula(girilen_sifre, doktor['sifre']):
+            if yeniden_hashlenmeli(doktor['sifre']):
+                sifreyi_yenile('doktorlar', 'doktor_id', doktor['doktor_id'], doktor['sifre'], girilen_sifre)
             return jsonify({
                 "message": "Giriş başarılı",
                 "doktor_id": doktor['doktor_id'],
@@ -156,36 +286,34 @@ def doctor_login():
         else:
             return jsonify({"error": "Kullanıcı adı veya şifre hatalı"}), 401
 
+    except SifreHavuzuDolu as e:
+        return jsonify({"error": str(e)}), e.durum_kodu
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route('/doctor_profile/<int:doktor_id>', methods=['GET'])
+@surumler.kosullu_get(lambda doktor_id: [surumler.profil(doktor_id), surumler.dizin(doktor_id)])
 def get_doctor_profile(doktor_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-        cursor.execute("""
-            SELECT ad, soyad, tc_kimlik_no, brans, cinsiyet, dogum_tarihi,
-                   diploma_belgesi, isyeri_belgesi, randevu_araligi
-            FROM doktorlar
-            WHERE doktor_id = %s
-        """, (doktor_id,))
-        doktor = cursor.fetchone()
-
-        cursor.close()
-        conn.close()
+        with db_baglantisi() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("""
+                SELECT ad, soyad, tc_kimlik_no, brans, cinsiyet, dogum_tarihi,
+                       diploma_belgesi, isyeri_belgesi, randevu_araligi
+                FROM doktorlar
+                WHERE doktor_id = %s
+            """, (doktor_id,))
+            doktor = cursor.fetchone()
+            varyantlar = belge_isleme.varyantlari_getir(
+                cursor, [doktor['diploma_belgesi'], doktor['isyeri_belgesi']]
+            ) if doktor else {}
 
         if doktor:
-            # Belgeleri base64 formatına çevir
+            # Belgeler meta veri (boyut, tür, indirme adresi) olarak döner;
+            # içerik /api/documents/... adresinden ayrıca indirilir.
             for belge_field in ['diploma_belgesi', 'isyeri_belgesi']:
                 path = doktor.get(belge_field)
-                if path and os.path.exists(path):
-                    with open(path, 'rb') as f:
-                        doktor[belge_field] = base64.b64encode(f.read()).decode('utf-8')
-                else:
-                    doktor[belge_field] = None
+                doktor[belge_field] = belge_bilgisi('doctor', doktor_id, belge_field, path, varyantlar.get(path))
 
             return jsonify(doktor), 200
         else:
@@ -200,20 +328,10 @@ def get_appointments():
     doktor_id = request.args.get('doktor_id')
     tarih = request.args.get('tarih')  # YYYY-MM-DD formatında
 
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-    cursor.execute("""
-        SELECT r.hasta_id, hastalar.ad AS hasta_adi, hastalar.soyad AS hasta_soyadi, hastalar.cinsiyet, r.saat
-        FROM randevular r
-        JOIN hastalar ON hastalar.hasta_id = r.hasta_id
-        WHERE r.doktor_id = %s AND r.tarih = %s
-        ORDER BY r.saat
-    """, (doktor_id, tarih))
+    with db_baglantisi() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(GUNLUK_RANDEVULAR_SORGUSU, {"doktor_id": doktor_id, "tarih": tarih})
 
-    randevular = cursor.fetchall()
-    cursor.close()
-    conn.close()
+        randevular = cursor.fetchall()
 
     # Saatleri string'e çevir
     for r in randevular:
@@ -225,158 +343,109 @@ def get_appointments():
 #Profil düzenle
 @app.route('/doctor_update/<int:doktor_id>', methods=['PUT'])
 def update_doctor_profile(doktor_id):
-    data = request.json
+    data = _istek_verisi()
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Şifre güncelleme
-        if data.get('sifre'):
-            hashed_password = bcrypt.hashpw(data['sifre'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            cursor.execute("UPDATE doktorlar SET sifre = %s WHERE doktor_id = %s", (hashed_password, doktor_id))
-
-        # Temel alanları güncelleme
-        update_fields = ['soyad', 'brans', 'kullanici_adi']
-        for field in update_fields:
-            if data.get(field):
-                cursor.execute(f"UPDATE doktorlar SET {field} = %s WHERE doktor_id = %s", (data[field], doktor_id))
-
-        # Belge güncelleme
-        if data.get('diploma_belgesi'):
-            diploma_path = upload_base64_file(data['diploma_belgesi'], DIPLOMA_DIR, 'diploma')
-            if diploma_path:
-                cursor.execute("UPDATE doktorlar SET diploma_belgesi = %s WHERE doktor_id = %s", (diploma_path, doktor_id))
-
-        if data.get('isyeri_belgesi'):
-            belge_path = upload_base64_file(data['isyeri_belgesi'], BELGE_DIR, 'belge')
-            if belge_path:
-                cursor.execute("UPDATE doktorlar SET isyeri_belgesi = %s WHERE doktor_id = %s", (belge_path, doktor_id))
-
-        # Adres güncelleme
+        doktor_alanlari = degisiklikler(data, ('soyad', 'brans', 'kullanici_adi'))
         adres = data.get('adres')
-        if adres:
-            il = adres.get('il')
-            ilce = adres.get('ilce')
-            tamadres = adres.get('tamadres')
-
-            if il or ilce or tamadres:
-                # Doktorun adres_id'sini al
-                cursor.execute("SELECT adres_id FROM doktorlar WHERE doktor_id = %s", (doktor_id,))
-                adres_result = cursor.fetchone()
-
-                if adres_result and adres_result[0]:
-                    adres_id = adres_result[0]
-                    if il:
-                        cursor.execute("UPDATE adres SET il = %s WHERE adres_id = %s", (il, adres_id))
-                    if ilce:
-                        cursor.execute("UPDATE adres SET ilce = %s WHERE adres_id = %s", (ilce, adres_id))
-                    if tamadres:
-                        cursor.execute("UPDATE adres SET tamadres = %s WHERE adres_id = %s", (tamadres, adres_id))
-
-        conn.commit()
-        cursor.close()
-        conn.close()
-
-        return jsonify({"message": "Profil başarıyla güncellendi"}), 200
-
+        if isinstance(adres, str):
+            # Multipart formda adres, JSON'daki nesnenin metni olarak gelir
+            try:
+                adres = json.loads(adres)
+            except ValueError:
+                adres = None
+            if not isinstance(adres, dict):
+                return jsonify({"error": "adres bir JSON nesnesi olmalı"}), 400
+        adres_alanlari = degisiklikler(adres, ('il', 'ilce', 'tamadres')) if isinstance(adres, dict) else {}
+
+        # Şifre hash'i ve belgeler bağlantı alınmadan önce hazırlanır
+        if data.get('sifre'):
+            doktor_alanlari['sifre'] = sifre_hashle(data['sifre'])
+        for alan, dizin in (('diploma_belgesi', DIPLOMA_DIR), ('isyeri_belgesi', BELGE_DIR)):
+            yol = belge_kaydet(data, alan, dizin)
+            if yol:
+                doktor_alanlari[alan] = yol
+
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            eski = kismi_guncelle(cursor, 'doktorlar', doktor_id, doktor_alanlari,
+                                  getir=('adres_id',) if adres_alanlari else ())
+            if eski is None:
+                conn.rollback()
+                return jsonify({"error": "Doktor bulunamadı"}), 404
+            guncellenen = degisen_alanlar(eski, doktor_alanlari)
+            belge_referanslarini_guncelle(cursor, eski, doktor_alanlari)
+
+            if adres_alanlari and eski.get('adres_id'):
+                eski_adres = kismi_guncelle(cursor, 'adres', eski['adres_id'], adres_alanlari)
+                if eski_adres is not None:
+                    guncellenen += degisen_alanlar(eski_adres, adres_alanlari)
+
+            # Dizin yalnızca listede görünen alanlar değişince yenilenir
+            dizin_degisti = bool(surumler.DIZIN_ALANLARI.intersection(guncellenen))
+            anahtarlar = [surumler.profil(doktor_id)] if guncellenen else []
+            if dizin_degisti:
+                anahtarlar.append(surumler.dizin(doktor_id))
+            surumler.artir(cursor, *anahtarlar)
+            conn.commit()
+
+        if dizin_degisti:
+            doktor_dizini.doktor_guncelle(doktor_id)
+        return jsonify({"message": "Profil başarıyla güncellendi", "guncellenen_alanlar": guncellenen}), 200
+
+    except (YuklemeHatasi, SifreHavuzuDolu) as e:
+        return jsonify({"error": str(e)}), e.durum_kodu
     except Exception as e:
         traceback.print_exc() 
         return jsonify({"error": str(e)}), 500
-    
 
 # 1. Doktor ayarlarını getir
 @app.route('/api/doctor/settings/<int:doctor_id>', methods=['GET'])
+@surumler.kosullu_get(lambda doctor_id: [surumler.doktor(doctor_id)])
 def doktor_ayarlarini_getir(doctor_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT baslangic_saat, baslangic_dakika, bitis_saat, bitis_dakika, randevu_aralik
-        FROM doktor_ayarlar
-        WHERE doktor_id = %s
-    """, (doctor_id,))
-    sonuc = cursor.fetchone()
-    cursor.close()
-    conn.close()
-
-    if sonuc:
-        return jsonify({
-            "start_hour": sonuc[0],
-            "start_minute": sonuc[1],
-            "end_hour": sonuc[2],
-            "end_minute": sonuc[3],
-            "interval_minutes": sonuc[4]
-        })
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        ayarlar = calisma_programi.getir(cursor, doctor_id)
+
+    if ayarlar:
+        return jsonify(ayarlar)
     return jsonify({}), 404
 
 
 # 2. Doktor ayarlarını kaydet
 @app.route('/api/doctor/settings', methods=['POST'])
 def doktor_ayarlarini_kaydet():
-    veri = request.get_json()
+    # start_*/end_*/interval_minutes varsayılan programdır. İsteğe bağlı
+    # "weekdays" ({"1".."7": {...} veya null}) ve "breaks" ([{"start", "end",
+    # "weekdays"}]) verilirse kayıtlı olanların yerini alır.
+    veri = request.get_json(silent=True)
+    try:
+        varsayilan, gunler, molalar = calisma_programi.program_ayristir(veri)
+    except calisma_programi.ProgramHatasi as e:
+        return jsonify({"error": str(e)}), 400
     doctor_id = veri['doctor_id']
-    start_hour = veri['start_hour']
-    start_minute = veri['start_minute']
-    end_hour = veri['end_hour']
-    end_minute = veri['end_minute']
-    interval_minutes = veri['interval_minutes']
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT doktor_id FROM doktor_ayarlar WHERE doktor_id = %s", (doctor_id,))
-    var_mi = cursor.fetchone()
-
-    if var_mi:
-        cursor.execute("""
-            UPDATE doktor_ayarlar SET
-                baslangic_saat = %s,
-                baslangic_dakika = %s,
-                bitis_saat = %s,
-                bitis_dakika = %s,
-                randevu_aralik = %s
-            WHERE doktor_id = %s
-        """, (start_hour, start_minute, end_hour, end_minute, interval_minutes, doctor_id))
-    else:
-        cursor.execute("""
-            INSERT INTO doktor_ayarlar 
-                (doktor_id, baslangic_saat, baslangic_dakika, bitis_saat, bitis_dakika, randevu_aralik)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (doctor_id, start_hour, start_minute, end_hour, end_minute, interval_minutes))
 
-    conn.commit()
-    cursor.close()
-    conn.close()
-    return jsonify({"message": "Ayarlar kaydedildi"})
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        versiyon = calisma_programi.kaydet(cursor, doctor_id, varsayilan, gunler, molalar)
+        surumler.artir(cursor, surumler.doktor(doctor_id))
+        slot_yayini.doktor_yayinla(cursor, doctor_id)
+        analitik.kirlet(cursor, doctor_id)
+        conn.commit()
+
+    gecersiz_kil(doctor_id)
+    return jsonify({"message": "Ayarlar kaydedildi", "version": versiyon})
 
 
 # 3. Belirli gün için kapalı saatleri getir
 @app.route('/api/doctor/closed_slots/<int:doctor_id>', methods=['GET'])
+@surumler.kosullu_get(lambda doctor_id: _gun_surumleri(doctor_id, request.args.get('date')))
 def kapali_saatleri_getir(doctor_id):
     tarih_str = request.args.get('date')  # Flutter "yyyy-MM-dd" formatında gönderiyor
+    if not tarih_str:
+        return jsonify([])
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Doktorun kapattığı saatler
-    cursor.execute("""
-        SELECT saat FROM kapali_randevu_saatleri
-        WHERE doktor_id = %s AND tarih = %s
-    """, (doctor_id, tarih_str))
-    kapali_saatler = [s[0].strftime("%H:%M") for s in cursor.fetchall()]
-
-    # Hastalar tarafından alınmış randevular
-    cursor.execute("""
-        SELECT saat FROM randevular
-        WHERE doktor_id = %s AND tarih = %s
-    """, (doctor_id, tarih_str))
-    alinmis_saatler = [s[0].strftime("%H:%M") for s in cursor.fetchall()]
-
-    cursor.close()
-    conn.close()
-
-    # Tek listede birleştir ve tekrarsız hale getir
-    tum_kapali_saatler = list(set(kapali_saatler + alinmis_saatler))
+    tarih = datetime.strptime(tarih_str, "%Y-%m-%d").date()
+    izgara = gun_izgarasi(doctor_id, tarih)
 
-    return jsonify(tum_kapali_saatler)
+    # Doktorun kapattığı ve hastalar tarafından alınmış saatler, tekrarsız
+    return jsonify([dakika_str(d) for d in izgara.mesgul_saatler()])
 
 
 # 4. Randevu saatini kapatma/açma
@@ -391,81 +460,388 @@ def randevu_saati_guncelle():
     tarih_obj = datetime.strptime(tarih, "%Y-%m-%d").date()
     saat_obj = datetime.strptime(saat, "%H:%M").time()
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    if kapali:
-        cursor.execute("""
-            INSERT INTO kapali_randevu_saatleri (doktor_id, tarih, saat)
-            VALUES (%s, %s, %s)
-            ON CONFLICT DO NOTHING
-        """, (doctor_id, tarih_obj, saat_obj))
-    else:
-        cursor.execute("""
-            DELETE FROM kapali_randevu_saatleri
-            WHERE doktor_id = %s AND tarih = %s AND saat = %s
-        """, (doctor_id, tarih_obj, saat_obj))
-
-    conn.commit()
-    cursor.close()
-    conn.close()
+    # Tek slotluk bir aralık kuralı olarak saklanır (bkz. kapali_araliklar.py)
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        kapali_araliklar.slot_ayarla(cursor, doctor_id, tarih_obj, saat_obj, kapali)
+        surumler.artir(cursor, surumler.gun(doctor_id, tarih_obj))
+        slot_yayini.yayinla(cursor, doctor_id, tarih_obj, saat_obj)
+        analitik.gun_kirlet(cursor, doctor_id, tarih_obj)
+        conn.commit()
+
+    gecersiz_kil(doctor_id, tarih_obj)
     return jsonify({"message": "Saat güncellendi"})
 
 
+# 5. Kapalı aralık kuralları: toplu ekleme/silme ve listeleme
+@app.route('/api/doctor/closures', methods=['POST'])
+def kapali_araliklari_guncelle():
+    veri = request.get_json() or {}
+    doctor_id = veri.get('doctor_id')
+    eklenecek = veri.get('add') or []
+    silinecek = veri.get('remove') or []
+
+    if not doctor_id:
+        return jsonify({"error": "doctor_id gerekli"}), 400
+    if not isinstance(eklenecek, list) or not isinstance(silinecek, list):
+        return jsonify({"error": "add ve remove liste olmalıdır"}), 400
+    if len(eklenecek) + len(silinecek) > config.KAPALI_ARALIK_MAX_KURAL:
+        return jsonify({"error": f"Tek istekte en fazla {config.KAPALI_ARALIK_MAX_KURAL} kural"}), 400
+
+    try:
+        kurallar = [kapali_araliklar.kural_ayristir(k) for k in eklenecek]
+        silinecek = [int(i) for i in silinecek]
+    except (kapali_araliklar.KuralHatasi, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Silme önce yapılır; aynı istekte bir kural değiştirilebilir
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        silinen = kapali_araliklar.kurallari_sil(cursor, doctor_id, silinecek)
+        eklenen = kapali_araliklar.kurallari_ekle(cursor, doctor_id, kurallar)
+        if silinen or eklenen:
+            surumler.artir(cursor, surumler.doktor(doctor_id))
+            slot_yayini.doktor_yayinla(cursor, doctor_id)
+            analitik.kirlet(cursor, doctor_id)
+        conn.commit()
+
+    if silinen or eklenen:
+        gecersiz_kil(doctor_id)
+    return jsonify({"added": eklenen, "removed": silinen})
+
+
+@app.route('/api/doctor/closures/<int:doctor_id>', methods=['GET'])
+def kapali_araliklari_getir(doctor_id):
+    # İsteğe bağlı start/end ("yyyy-MM-dd"): yalnızca bu günlerle kesişen kurallar
+    try:
+        baslangic, bitis = (
+            datetime.strptime(request.args[a], "%Y-%m-%d").date() if request.args.get(a) else None
+            for a in ('start', 'end')
+        )
+    except ValueError:
+        return jsonify({"error": "Tarih formatı YYYY-AA-GG olmalıdır"}), 400
+
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        kurallar = kapali_araliklar.kurallari_getir(cursor, doctor_id, baslangic, bitis)
+    return jsonify(kurallar)
+
+
 @app.route('/available_slots/<int:doktor_id>/<string:tarih>', methods=['GET'])
+@surumler.kosullu_get(_gun_surumleri)
 def get_available_slots(doktor_id, tarih):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Doktorun ayarlarını al
-    cursor.execute("""
-        SELECT baslangic_saat, baslangic_dakika, bitis_saat, bitis_dakika, randevu_aralik
-        FROM doktor_ayarlar
-        WHERE doktor_id = %s
-    """, (doktor_id,))
-    ayar = cursor.fetchone()
-
-    if not ayar:
-        return jsonify({'error': 'Doktor ayarı bulunamadı'}), 404
-
-    # Başlangıç ve bitiş zamanını dakikaya çevir
-    baslangic = int(ayar[0]) * 60 + int(ayar[1])
-    bitis = int(ayar[2]) * 60 + int(ayar[3])
-    aralik = int(ayar[4])
+    izgara = gun_izgarasi(doktor_id, datetime.strptime(tarih, "%Y-%m-%d").date())
 
-    # Mevcut randevuları al
-    cursor.execute("""
-        SELECT saat FROM randevular
-        WHERE doktor_id = %s AND tarih = %s
-    """, (doktor_id, tarih))
-    dolu_saatler = [r[0].strftime('%H:%M') for r in cursor.fetchall()]
+    if not izgara.sablon:
+        return jsonify({'error': 'Doktor ayarı bulunamadı'}), 404
 
-    # Tüm olası saatleri oluştur
     mevcut_saatler = []
-    for dakika in range(baslangic, bitis, aralik):
-        saat_str = f"{dakika // 60:02d}:{dakika % 60:02d}"
+    for dakika in izgara.saatler():
         mevcut_saatler.append({
-            'saat': saat_str,
-            'durum': 'dolu' if saat_str in dolu_saatler else 'bos'
+            'saat': dakika_str(dakika),
+            'durum': 'dolu' if izgara.dolu_mu(dakika) else 'bos'
         })
 
     return jsonify(mevcut_saatler)
 
 # /api/doctor/booked_slots/<doctor_id>?date=...
 @app.route('/api/doctor/booked_slots/<int:doctor_id>', methods=['GET'])
+@surumler.kosullu_get(lambda doctor_id: _gun_surumleri(doctor_id, request.args.get('date')))
 def alinmis_randevu_saatleri(doctor_id):
     tarih_str = request.args.get('date')  # 'YYYY-MM-DD'
+    if not tarih_str:
+        return jsonify([])
+
+    izgara = gun_izgarasi(doctor_id, datetime.strptime(tarih_str, "%Y-%m-%d").date())
+    return jsonify([dakika_str(d) for d in izgara.dolu_saatler()])
+
+
+def _aralik_hatasi(baslangic, bitis):
+    if bitis < baslangic:
+        return "Bitiş tarihi başlangıçtan önce olamaz"
+    if (bitis - baslangic).days + 1 > config.TAKVIM_MAX_GUN:
+        return f"En fazla {config.TAKVIM_MAX_GUN} günlük aralık sorgulanabilir"
+    return None
+
+
+# Aylık takvim: /api/doctor/calendar/<doktor_id>?start=YYYY-MM-DD&end=YYYY-MM-DD[&slots=1]
+@app.route('/api/doctor/calendar/<int:doktor_id>', methods=['GET'])
+def doktor_takvimi(doktor_id):
+    baslangic_str = request.args.get('start')
+    bitis_str = request.args.get('end')
+    if not baslangic_str or not bitis_str:
+        return jsonify({"error": "Başlangıç ve bitiş tarihi gerekli"}), 400
+
+    try:
+        baslangic = datetime.strptime(baslangic_str, "%Y-%m-%d").date()
+        bitis = datetime.strptime(bitis_str, "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Tarih formatı YYYY-MM-DD olmalı"}), 400
+
+    hata = _aralik_hatasi(baslangic, bitis)
+    if hata:
+        return jsonify({"error": hata}), 400
+
+    izgaralar = request.args.get('slots', '').lower() in ('1', 'true')
+    gunler = takvim(doktor_id, baslangic, bitis, izgaralar)
+    if gunler is None:
+        return jsonify({"error": "Doktor ayarları bulunamadı"}), 404
+
+    return jsonify({
+        "doktor_id": doktor_id,
+        "start": baslangic.isoformat(),
+        "end": bitis.isoformat(),
+        "days": gunler
+    })
+
+
+# Doktor panosu: /api/doctor/dashboard/<doktor_id>[?start=YYYY-MM-DD&end=YYYY-MM-DD]
+# Aralık verilmezse bugünden başlayan PANO_VARSAYILAN_GUN gün. Her gün için
+# bos/dolu/kapali sayıları ve randevu listesi (takvim sorgusu), aralığın
+# toplamları ve sıradaki hasta (aralık dışında olsa da); iki sorgu.
+@app.route('/api/doctor/dashboard/<int:doktor_id>', methods=['GET'])
+def doktor_panosu(doktor_id):
+    simdi = datetime.now()
+    try:
+        baslangic_str = request.args.get('start')
+        baslangic = datetime.strptime(baslangic_str, "%Y-%m-%d").date() if baslangic_str else simdi.date()
+        bitis_str = request.args.get('end')
+        bitis = (datetime.strptime(bitis_str, "%Y-%m-%d").date() if bitis_str
+                 else baslangic + timedelta(days=config.PANO_VARSAYILAN_GUN - 1))
+    except ValueError:
+        return jsonify({"error": "Tarih formatı YYYY-MM-DD olmalı"}), 400
+    hata = _aralik_hatasi(baslangic, bitis)
+    if hata:
+        return jsonify({"error": hata}), 400
+
+    gunler = takvim(doktor_id, baslangic, bitis, randevular=True)
+    if gunler is None:
+        return jsonify({"error": "Doktor ayarları bulunamadı"}), 404
+
+    with db_baglantisi() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(SIRADAKI_RANDEVU_SORGUSU,
+                       {"doktor_id": doktor_id, "bugun": simdi.date(), "su_an": simdi.time()})
+        siradaki = cursor.fetchone()
+
+    return jsonify({
+        "doktor_id": doktor_id,
+        "start": baslangic.isoformat(),
+        "end": bitis.isoformat(),
+        "totals": {
+            alan: sum(gun[alan] for gun in gunler) for alan in ("free", "booked", "closed")
+        },
+        "next": siradaki,
+        "days": gunler,
+    })
+
+
+# Doluluk analitiği: /api/analytics/occupancy/<doktor_id>[?period=day|week|month&date=YYYY-MM-DD]
+# Tarihi içeren dönemin özeti (varsayılan: bu hafta). Yazmalar yalnızca işaret
+# bırakır; dönemin bekleyen işaretleri okumadan önce burada işlenir (bkz.
+# analitik.donemi_guncelle), mutabakat thread'i çalışmasa da özet günceldir.
+_ANALITIK_DONEMLERI = {'day': 'gun', 'week': 'hafta', 'month': 'ay'}
+
+
+@app.route('/api/analytics/occupancy/<int:doktor_id>', methods=['GET'])
+def doluluk_analitigi(doktor_id):
+    donem = _ANALITIK_DONEMLERI.get(request.args.get('period', 'week'))
+    if donem is None:
+        return jsonify({"error": "period day, week ya da month olmalı"}), 400
+    try:
+        tarih_str = request.args.get('date')
+        tarih = datetime.strptime(tarih_str, "%Y-%m-%d").date() if tarih_str else date.today()
+    except ValueError:
+        return jsonify({"error": "Tarih formatı YYYY-MM-DD olmalı"}), 400
+
+    baslangic = analitik.donem_baslangici(donem, tarih)
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM doktorlar WHERE doktor_id = %s", (doktor_id,))
+        if cursor.fetchone() is None:
+            return jsonify({"error": "Doktor bulunamadı"}), 404
+        analitik.donemi_guncelle(cursor, doktor_id, donem, baslangic)
+        conn.commit()
+        ozet = analitik.ozet_getir(cursor, doktor_id, donem, baslangic)
+    if ozet is None:
+        return jsonify({"error": "Bu dönem için özet yok"}), 404
+
+    def oran(pay, payda):
+        return round(pay / payda, 4) if payda else None
+
+    saatler = [
+        {"hour": saat, "appointments": randevu, "cancellations": iptal,
+         "cancellation_rate": oran(iptal, randevu + iptal)}
+        for saat, randevu, iptal in ozet["saatler"]
+    ]
+    riskli = sorted(
+        (s for s in saatler if s["appointments"] + s["cancellations"] >= config.ANALITIK_MIN_ORNEK),
+        key=lambda s: (-s["cancellation_rate"], s["hour"]),
+    )
+    return jsonify({
+        "doktor_id": doktor_id,
+        "period": request.args.get('period', 'week'),
+        "start": baslangic.isoformat(),
+        "end": analitik.donem_bitisi(donem, baslangic).isoformat(),
+        "days_covered": ozet["gun_sayisi"],
+        "free": ozet["bos"],
+        "booked": ozet["dolu"],
+        "closed": ozet["kapali"],
+        "occupancy_rate": oran(ozet["dolu"], ozet["dolu"] + ozet["bos"]),
+        "cancellations": ozet["iptal"],
+        "cancellation_rate": oran(ozet["iptal"], ozet["dolu"] + ozet["iptal"]),
+        "lead_time_hours": (round(ozet["bekleme_toplam_dk"] / ozet["bekleme_adet"] / 60, 1)
+                            if ozet["bekleme_adet"] else None),
+        "lead_time_samples": ozet["bekleme_adet"],
+        "hours": saatler,
+        "cancellation_prone_hours": [s["hour"] for s in riskli[:3] if s["cancellations"]],
+        "updated_at": ozet["guncelleme_zamani"].isoformat(timespec='seconds'),
+    })
+
+
+# Belge indirme: /api/documents/<doctor|patient>/<id>/<alan>
+# ETag / Last-Modified, If-None-Match ile 304 ve Range istekleri desteklenir.
+# ?varyant=kucuk_resim küçük resmi (hazır değilse 404), ?varyant=orijinal
+# yüklenen dosyayı olduğu gibi verir. Varsayılan belgenin tamamıdır; kayıpsız
+# sıkıştırılmış sürümü varsa o sunulur (bkz. belge_isleme.py).
+@app.route('/api/documents/<string:sahip_turu>/<int:sahip_id>/<string:alan>', methods=['GET'])
+def belge_indir(sahip_turu, sahip_id, alan):
+    tanim = BELGE_ALANLARI.get(sahip_turu)
+    if not tanim or alan not in tanim[2]:
+        return jsonify({'error': 'Belge bulunamadı'}), 404
+    tablo, anahtar_kolon, _ = tanim
+
+    varyant = request.args.get('varyant')
+    if varyant not in (None, 'orijinal', belge_isleme.KUCUK_RESIM):
+        return jsonify({'error': 'varyant kucuk_resim veya orijinal olmalı'}), 400
+    tur = varyant or belge_isleme.SIKISTIRILMIS
+
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            sql.SQL("""
+                SELECT t.{alan}, v.yol, v.mime
+                FROM {tablo} t
+                LEFT JOIN belge_varyantlari v ON v.kaynak_yol = t.{alan} AND v.tur = %s
+                WHERE t.{anahtar} = %s
+            """).format(
+                alan=sql.Identifier(alan), tablo=sql.Identifier(tablo), anahtar=sql.Identifier(anahtar_kolon)
+            ),
+            (tur, sahip_id)
+        )
+        satir = cursor.fetchone()
+
+    if not satir or not satir[0]:
+        return jsonify({'error': 'Belge bulunamadı'}), 404
+    yol, mime = satir[0], None
+    if varyant == belge_isleme.KUCUK_RESIM or (satir[1] and os.path.isfile(satir[1])):
+        yol, mime = satir[1], satir[2]
+    if not yol or not os.path.isfile(yol):
+        return jsonify({'error': 'Belge bulunamadı'}), 404
+
+    # Yalnızca yükleme dizini altındaki dosyalar sunulur
+    yol = os.path.abspath(yol)
+    if os.path.commonpath([yol, BASE_UPLOAD_DIR]) != BASE_UPLOAD_DIR:
+        return jsonify({'error': 'Belge bulunamadı'}), 404
+
+    yanit = send_from_directory(
+        os.path.dirname(yol),
+        os.path.basename(yol),
+        mimetype=mime or mime_turu(yol),
+        conditional=True,
+        etag=True
+    )
+    # Belge aynı adreste değişebilir: istemci önbelleğe alır ama her seferinde
+    # ETag ile doğrular.
+    yanit.cache_control.private = True
+    yanit.cache_control.no_cache = True
+    return yanit
+
+
+# Akışla dosya yükleme: multipart "dosya" alanı ya da ham istek gövdesi.
+# Dönen belge_ref, kayıt/güncelleme isteklerinde <alan>_ref olarak gönderilir.
+@app.route('/api/uploads', methods=['POST'])
+def dosya_yukle():
+    if request.mimetype == 'multipart/form-data':
+        dosya = request.files.get('dosya')
+        if not dosya:
+            return jsonify({"error": "Dosya bulunamadı"}), 400
+        akis = dosya.stream
+    else:
+        akis = request.stream
+
+    ref = yukleme_oturumlari.tek_seferde(akis)
+    return jsonify({"belge_ref": ref}), 201
+
+
+# Devam ettirilebilir yükleme: oturum aç, parçaları Upload-Offset başlığıyla
+# sırayla gönder, bağlantı koparsa GET ile offset'i öğrenip kaldığın yerden
+# devam et, sonunda complete ile belge referansını al.
+@app.route('/api/uploads/sessions', methods=['POST'])
+def yukleme_oturumu_ac():
+    oturum_id = yukleme_oturumlari.olustur()
+    return jsonify({"oturum_id": oturum_id, "offset": 0}), 201
+
+
+@app.route('/api/uploads/sessions/<string:oturum_id>', methods=['GET'])
+def yukleme_oturumu_durumu(oturum_id):
+    return jsonify({"oturum_id": oturum_id, "offset": yukleme_oturumlari.boyut(oturum_id)})
+
+
+@app.route('/api/uploads/sessions/<string:oturum_id>', methods=['PATCH'])
+def yukleme_parcasi_ekle(oturum_id):
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({"error": "Upload-Offset başlığı gerekli"}), 400
+
+    yeni_offset = yukleme_oturumlari.ekle(oturum_id, offset, request.stream)
+    return jsonify({"oturum_id": oturum_id, "offset": yeni_offset})
+
+
+@app.route('/api/uploads/sessions/<string:oturum_id>/complete', methods=['POST'])
+def yukleme_oturumu_tamamla(oturum_id):
+    ref = yukleme_oturumlari.tamamla(oturum_id)
+    return jsonify({"belge_ref": ref})
+
+
+# Bağlantı havuzu istatistikleri
+@app.route('/api/admin/db_pool', methods=['GET'])
+def db_havuzu_durumu():
+    return jsonify(havuz_istatistikleri())
+
+
+@app.route('/api/admin/sifre_havuzu', methods=['GET'])
+def sifre_havuzu_durumu():
+    return jsonify(sifre_havuzu().istatistikler())
+
+
+# Prometheus metrikleri (bkz. metrikler.py)
+@app.route('/metrics', methods=['GET'])
+def metrikleri_getir():
+    if not config.METRIKLER_ACIK:
+        return jsonify({"error": "Metrikler kapalı"}), 404
+    return metrikler.metin(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+@app.route('/api/admin/belge_isleme', methods=['GET'])
+def belge_isleme_durumu():
+    return jsonify(belge_isleme.isleyici.istatistikler())
+
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT saat FROM randevular
-        WHERE doktor_id = %s AND tarih = %s
-    """, (doctor_id, tarih_str))
-    sonuc = cursor.fetchall()
-    cursor.close()
-    conn.close()
+@app.route('/api/admin/analitik', methods=['GET'])
+def analitik_durumu():
+    return jsonify(analitik.mutabakatci.istatistikler())
 
-    return jsonify([s[0].strftime("%H:%M") for s in sonuc])
+
+@app.route('/api/admin/slot_stream', methods=['GET'])
+def slot_yayini_durumu():
+    return jsonify(slot_yayini.yayin.istatistikler())
+
+
+@app.route('/api/admin/etag', methods=['GET'])
+def etag_istatistikleri():
+    return jsonify(surumler.izleyici.istatistikler())
+
+
+# Eşiği aşan son sorgular (en yenisi önce): ?limit=N
+@app.route('/api/admin/slow_queries', methods=['GET'])
+def yavas_sorgulari_getir():
+    return jsonify(yavas_sorgular.son_kayitlar(request.args.get('limit', type=int)))
 
 
 
@@ -474,45 +850,45 @@ def alinmis_randevu_saatleri(doctor_id):
 # Hasta Kayıt
 @app.route('/patient_register', methods=['POST'])
 def patient_register():
-    data = request.json
+    data = _istek_verisi()
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Yeni fonksiyonla base64 dosyaları kaydet
-        rapor_path = upload_base64_file(data.get('rapor_belgesi'), RAPOR_DIR, 'rapor')
-        rontgen_path = upload_base64_file(data.get('rontgen_belgesi'), RONTGEN_DIR, 'rontgen')
-
-        hashed_password = bcrypt.hashpw(data.get('sifre').encode('utf-8'), bcrypt.gensalt())
-
-        insert_query = """
-            INSERT INTO hastalar (
-                ad, soyad, tc_kimlik_no, dogum_tarihi, cinsiyet,
-                kullanici_adi, sifre, adres,
-                ameliyat_raporu, rontgen
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-
-        values = (
-            data.get('ad'),
-            data.get('soyad'),
-            data.get('tc_kimlik_no'),
-            data.get('dogum_tarihi'),
-            data.get('cinsiyet'),
-            data.get('kullanici_adi'),
-            hashed_password.decode('utf-8'),
-            data.get('adres'),
-            rapor_path,
-            rontgen_path
-        )
+        hashed_password = sifre_hashle(data.get('sifre'))
+
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            # Dosyaları kaydet
+            rapor_path = belge_kaydet(data, 'rapor_belgesi', RAPOR_DIR)
+            rontgen_path = belge_kaydet(data, 'rontgen_belgesi', RONTGEN_DIR)
+
+            insert_query = """
+                INSERT INTO hastalar (
+                    ad, soyad, tc_kimlik_no, dogum_tarihi, cinsiyet,
+                    kullanici_adi, sifre, adres,
+                    ameliyat_raporu, rontgen
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
 
-        cursor.execute(insert_query, values)
-        conn.commit()
-        cursor.close()
-        conn.close()
+            values = (
+                data.get('ad'),
+                data.get('soyad'),
+                data.get('tc_kimlik_no'),
+                data.get('dogum_tarihi'),
+                data.get('cinsiyet'),
+                data.get('kullanici_adi'),
+                hashed_password,
+                data.get('adres'),
+                rapor_path,
+                rontgen_path
+            )
+
+            cursor.execute(insert_query, values)
+            belge_referansi_ekle(cursor, rapor_path)
+            belge_referansi_ekle(cursor, rontgen_path)
+            conn.commit()
 
         return jsonify({"message": "Hasta başarıyla kaydedildi"}), 200
 
+    except (YuklemeHatasi, SifreHavuzuDolu) as e:
+        return jsonify({"error": str(e)}), e.durum_kodu
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -527,46 +903,37 @@ def patient_login():
         return jsonify({'message': 'TC Kimlik No ve şifre gerekli'}), 400
 
 
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute(
-            """
-            SELECT hasta_id, ad, soyad, sifre
-            FROM hastalar
-            WHERE tc_kimlik_no = %s
-            """,
-            (tc,)
-        )
+    with db_baglantisi() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(HASTA_GIRIS_SORGUSU, {"tc": tc})
         hasta = cur.fetchone()
-        if hasta is None:
-            return jsonify({'message': 'Kullanıcı bulunamadı'}), 404
-        if hasta and bcrypt.checkpw(sifre.encode('utf-8'), hasta['sifre'].encode('utf-8')):
-            return jsonify({
-                "message": "Giriş başarılı",
-                'hasta_id': hasta['hasta_id'],
-                'ad': hasta['ad'],
-                'soyad': hasta['soyad']
-            }), 200
 
-        else:
-            return jsonify({"error": "TC kimlik no veya şifre hatalı"}), 401
-        
+    if hasta is None:
+        return jsonify({'message': 'Kullanıcı bulunamadı'}), 404
+    try:
+        dogru = sifre_dogrula(sifre, hasta['sifre'])
+    except SifreHavuzuDolu as e:
+        return jsonify({'message': str(e)}), e.durum_kodu
 
-    finally:
-        cur.close()
-        conn.close()
+    if dogru:
+        if yeniden_hashlenmeli(hasta['sifre']):
+            sifreyi_yenile('hastalar', 'hasta_id', hasta['hasta_id'], hasta['sifre'], sifre)
+        return jsonify({
+            "message": "Giriş başarılı",
+            'hasta_id': hasta['hasta_id'],
+            'ad': hasta['ad'],
+            'soyad': hasta['soyad']
+        }), 200
+
+    else:
+        return jsonify({"error": "TC kimlik no veya şifre hatalı"}), 401
 
 
 @app.route('/get_patient/<int:hasta_id>', methods=['GET'])
 def get_patient(hasta_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT ad FROM hastalar WHERE hasta_id = %s", (hasta_id,))
-        hasta = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT ad FROM hastalar WHERE hasta_id = %s", (hasta_id,))
+            hasta = cursor.fetchone()
 
         if hasta:
             return jsonify({'ad': hasta[0]}), 200
@@ -578,6 +945,7 @@ def get_patient(hasta_id):
 
     
 @app.route('/api/doctors', methods=['GET'])
+@surumler.kosullu_get(yerel=_dizin_surumu)
 def get_doctors_by_city_district():
     city = request.args.get('city')
     district = request.args.get('district')
@@ -585,150 +953,190 @@ def get_doctors_by_city_district():
     if not city or not district:
         return jsonify({'error': 'Şehir ve ilçe gereklidir'}), 400
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    query = """
-        SELECT doktorlar.doktor_id, doktorlar.ad, doktorlar.soyad
-        FROM doktorlar 
-        JOIN adres  ON doktorlar.adres_id = adres.adres_id
-        WHERE adres.il = %s AND adres.ilce = %s
-    """
-    cursor.execute(query, (city, district))
-    rows = cursor.fetchall()
+    # İsteğe bağlı: brans filtresi ve keyset sayfalama (limit + cursor). Yanıt
+    # eskisi gibi düz bir listedir; sonraki sayfa varsa imleci X-Next-Cursor
+    # başlığında döner.
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', type=int)
+    if limit is not None and not 1 <= limit <= config.DIZIN_MAX_SAYFA:
+        return jsonify({'error': f'limit 1 ile {config.DIZIN_MAX_SAYFA} arasında olmalıdır'}), 400
 
-    # Kolon isimlerini al
-    columns = [desc[0] for desc in cursor.description]
-
-    # Her satırı sözlüğe çevir
-    doctors = [dict(zip(columns, row)) for row in rows]
-
-    cursor.close()
-    conn.close()
+    doctors, sonraki = doktor_dizini.ara(
+        city, district, brans=request.args.get('brans'), sonra=cursor, limit=limit
+    )
 
-    return jsonify(doctors)  # Liste formatında JSON döndürülür
+    yanit = jsonify(doctors)  # Liste formatında JSON döndürülür
+    if sonraki is not None:
+        yanit.headers['X-Next-Cursor'] = str(sonraki)
+    return yanit
 
 
 @app.route('/api/doctor/available_slots/<int:doktor_id>', methods=['GET'])
+@surumler.kosullu_get(lambda doktor_id: _gun_surumleri(doktor_id, request.args.get('date')))
 def doktor_musait_saatler(doktor_id):
     tarih_str = request.args.get('date')  # Örn: 2025-05-23
     if not tarih_str:
         return jsonify({"error": "Tarih belirtilmedi"}), 400
 
     tarih = datetime.strptime(tarih_str, "%Y-%m-%d").date()
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # 1. Doktorun saat ayarlarını al
-    cursor.execute("""
-        SELECT baslangic_saat, baslangic_dakika, bitis_saat, bitis_dakika, randevu_aralik
-        FROM doktor_ayarlar WHERE doktor_id = %s
-    """, (doktor_id,))
-    ayarlar = cursor.fetchone()
-    if not ayarlar:
-        cursor.close()
-        conn.close()
+    izgara = gun_izgarasi(doktor_id, tarih)
+    if not izgara.sablon:
         return jsonify({"error": "Doktor ayarları bulunamadı"}), 404
 
-    start_hour, start_minute, end_hour, end_minute, interval_minutes = ayarlar
-    start_time = time(start_hour, start_minute)
-    end_time = time(end_hour, end_minute)
+    return jsonify(musait_saat_listesi(izgara))
+
 
-    # 2. Kapalı saatleri al
-    cursor.execute("""
-        SELECT saat FROM kapali_randevu_saatleri
-        WHERE doktor_id = %s AND tarih = %s
-    """, (doktor_id, tarih))
-    kapali_saatler = {r[0].strftime("%H:%M") for r in cursor.fetchall()}
+# Aynı günün slot değişiklikleri canlı olarak (Server-Sent Events):
+# /api/doctor/available_slots/3/stream?date=2025-05-23
+# İlk "durum" olayı yukarıdaki listeyle aynıdır; sonraki "slot" olayları
+# değişen tek slotu ({"date", "time", "status"}) taşır. Yeniden bağlanırken
+# Last-Event-ID (veya ?lastEventId=) güncel değilse "durum" yeniden gönderilir.
+@app.route('/api/doctor/available_slots/<int:doktor_id>/stream', methods=['GET'])
+def doktor_musait_saat_akisi(doktor_id):
+    try:
+        tarih = datetime.strptime(request.args.get('date', ''), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Tarih formatı YYYY-MM-DD olmalı"}), 400
+
+    def anlik_goruntu():
+        # Sürümler önce okunur; ızgara en az bu sürümler kadar günceldir
+        okunan = surumler.izleyici.oku(_gun_surumleri(doktor_id, tarih.isoformat()))
+        izgara = gun_izgarasi(doktor_id, tarih)
+        return tuple(okunan.values()), {
+            "date": tarih.isoformat(),
+            "slots": musait_saat_listesi(izgara) if izgara.sablon else None
+        }
+
+    son_olay_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    try:
+        olaylar, kapat = slot_yayini.yayin.akis(doktor_id, tarih, son_olay_id, anlik_goruntu)
+    except slot_yayini.AkisSiniri as e:
+        return jsonify({"error": str(e)}), e.durum_kodu, {'Retry-After': '5'}
 
-    # 3. Dolu (alınmış) saatleri al
-    cursor.execute("""
-        SELECT saat FROM randevular
-        WHERE doktor_id = %s AND tarih = %s
-    """, (doktor_id, tarih))
-    dolu_saatler = {r[0].strftime("%H:%M") for r in cursor.fetchall()}
+    yanit = Response(olaylar, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # nginx arkasında olaylar tamponlanmasın
+    })
+    yanit.call_on_close(kapat)
+    return yanit
 
-    cursor.close()
-    conn.close()
 
-    # 4. Tüm saat aralıklarını oluştur
+def musait_saat_listesi(izgara):
+    # Kapalı saat, dolu saatten önceliklidir
     saat_listesi = []
-    simdiki_zaman = datetime.combine(tarih, start_time)
-    bitis_zamani = datetime.combine(tarih, end_time)
-    while simdiki_zaman <= bitis_zamani:
-        saat_str = simdiki_zaman.strftime("%H:%M")
+    for dakika in izgara.saatler():
         durum = "bos"
-        if saat_str in kapali_saatler:
+        if izgara.kapali_mi(dakika):
             durum = "kapali"
-        elif saat_str in dolu_saatler:
+        elif izgara.dolu_mu(dakika):
             durum = "dolu"
         saat_listesi.append({
-            "time": saat_str,
+            "time": dakika_str(dakika),
             "status": durum
         })
-        simdiki_zaman += timedelta(minutes=interval_minutes)
+    return saat_listesi
+
+
+# Birden çok doktorun aynı günkü saatleri tek istekte:
+# /api/doctor/available_slots?date=2025-05-23&ids=3,7,12
+# Her doktorun "slots" listesi tekil uç noktanın yanıtıyla aynıdır; ayarı
+# olmayan doktor için "slots" null'dır. Doktor sayısından bağımsız olarak en
+# fazla bir sorgu çalışır (önbellekte olmayanlar için).
+@app.route('/api/doctor/available_slots', methods=['GET'])
+@surumler.kosullu_get(_toplu_gun_surumleri)
+def toplu_musait_saatler():
+    tarih_str = request.args.get('date')
+    ids_str = request.args.get('ids')
+    if not tarih_str or not ids_str:
+        return jsonify({"error": "Tarih ve doktor id listesi (ids) gerekli"}), 400
 
-    return jsonify(saat_listesi)
+    try:
+        tarih = datetime.strptime(tarih_str, "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Tarih formatı YYYY-MM-DD olmalı"}), 400
+    try:
+        doktor_idler = list(dict.fromkeys(int(x) for x in ids_str.split(',') if x.strip()))
+    except ValueError:
+        return jsonify({"error": "ids virgülle ayrılmış sayılardan oluşmalı"}), 400
+    if len(doktor_idler) > config.TOPLU_MUSAITLIK_MAX_DOKTOR:
+        return jsonify({"error": f"En fazla {config.TOPLU_MUSAITLIK_MAX_DOKTOR} doktor sorgulanabilir"}), 400
+
+    izgaralar = gun_izgaralari(doktor_idler, tarih)
+    return jsonify({
+        "date": tarih.isoformat(),
+        "doctors": [{
+            "doktor_id": doktor_id,
+            "slots": musait_saat_listesi(izgaralar[doktor_id]) if izgaralar[doktor_id].sablon else None
+        } for doktor_id in doktor_idler]
+    })
 
 
 @app.route('/api/appointments/available/<int:doktor_id>', methods=['GET'])
+@surumler.kosullu_get(lambda doktor_id: _gun_surumleri(doktor_id, request.args.get('tarih')))
 def uygun_randevu_saatleri(doktor_id):
     tarih_str = request.args.get('tarih')  # YYYY-MM-DD
     tarih = datetime.strptime(tarih_str, "%Y-%m-%d").date()
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # 1. Doktor ayarlarını al
-    cursor.execute("""
-        SELECT baslangic_saat, baslangic_dakika, bitis_saat, bitis_dakika, randevu_aralik
-        FROM doktor_ayarlar WHERE doktor_id = %s
-    """, (doktor_id,))
-    ayarlar = cursor.fetchone()
-    if not ayarlar:
+    izgara = gun_izgarasi(doktor_id, tarih)
+    if not izgara.sablon:
         return jsonify({"error": "Doktor ayarları bulunamadı"}), 404
 
-    start = time(ayarlar[0], ayarlar[1])
-    end = time(ayarlar[2], ayarlar[3])
-    interval = ayarlar[4]
-
-    # 2. Saat dilimlerini oluştur
-    slots = []
-    current = datetime.combine(tarih, start)
-    end_dt = datetime.combine(tarih, end)
-    while current <= end_dt:
-        slots.append(current.time().strftime("%H:%M"))
-        current += timedelta(minutes=interval)
-
-    # 3. O gün alınan randevuları çek
-    cursor.execute("""
-        SELECT saat FROM randevular
-        WHERE doktor_id = %s AND tarih = %s
-    """, (doktor_id, tarih))
-    dolu_saatler = [s[0].strftime("%H:%M") for s in cursor.fetchall()]
-
-    # 4. Kapalı saatleri çek
-    cursor.execute("""
-        SELECT saat FROM kapali_randevu_saatleri
-        WHERE doktor_id = %s AND tarih = %s
-    """, (doktor_id, tarih))
-    kapali_saatler = [s[0].strftime("%H:%M") for s in cursor.fetchall()]
-
-    # 5. Hepsini birleştir
+    # Dolu saat, kapalı saatten önceliklidir
     sonuc = []
-    for s in slots:
-        if s in dolu_saatler:
+    for dakika in izgara.saatler():
+        if izgara.dolu_mu(dakika):
             durum = "dolu"
-        elif s in kapali_saatler:
+        elif izgara.kapali_mi(dakika):
             durum = "kapali"
         else:
             durum = "bos"
-        sonuc.append({"saat": s, "durum": durum})
+        sonuc.append({"saat": dakika_str(dakika), "durum": durum})
 
-    cursor.close()
-    conn.close()
     return jsonify(sonuc)
 
+# İl/ilçedeki (isteğe bağlı branştaki) tüm doktorlar arasında en erken boş
+# slotlar. Varsayılan aralık bugünden itibaren ERKEN_SLOT_GUN gündür; bugünün
+# geçmiş saatleri atlanır.
+@app.route('/api/appointments/earliest', methods=['GET'])
+def en_erken_randevular():
+    city = request.args.get('city')
+    district = request.args.get('district')
+    if not city or not district:
+        return jsonify({"error": "Şehir ve ilçe gereklidir"}), 400
+
+    simdi = datetime.now()
+    try:
+        baslangic_str = request.args.get('start')
+        bitis_str = request.args.get('end')
+        baslangic = datetime.strptime(baslangic_str, "%Y-%m-%d").date() if baslangic_str else simdi.date()
+        bitis = datetime.strptime(bitis_str, "%Y-%m-%d").date() if bitis_str \
+            else baslangic + timedelta(days=config.ERKEN_SLOT_GUN - 1)
+    except ValueError:
+        return jsonify({"error": "Tarih formatı YYYY-MM-DD olmalı"}), 400
+
+    if bitis < baslangic:
+        return jsonify({"error": "Bitiş tarihi başlangıçtan önce olamaz"}), 400
+    if (bitis - baslangic).days + 1 > config.TAKVIM_MAX_GUN:
+        return jsonify({"error": f"En fazla {config.TAKVIM_MAX_GUN} günlük aralık sorgulanabilir"}), 400
+
+    adet = request.args.get('n', 10, type=int)
+    if not 1 <= adet <= config.ERKEN_SLOT_MAX_ADET:
+        return jsonify({"error": f"n 1 ile {config.ERKEN_SLOT_MAX_ADET} arasında olmalıdır"}), 400
+
+    doktorlar, _ = doktor_dizini.ara(city, district, brans=request.args.get('brans'))
+    bilgiler = {d["doktor_id"]: d for d in doktorlar}
+    slotlar, _ = en_erken_bos_slotlar(bilgiler, baslangic, bitis, adet, simdi=simdi)
+
+    return jsonify([{
+        "doktor_id": doktor_id,
+        "ad": bilgiler[doktor_id]["ad"],
+        "soyad": bilgiler[doktor_id]["soyad"],
+        "brans": bilgiler[doktor_id]["brans"],
+        "tarih": tarih.isoformat(),
+        "saat": dakika_str(dakika),
+    } for tarih, dakika, doktor_id in slotlar])
+
+
 @app.route('/api/appointments/create', methods=['POST'])
 def randevu_olustur():
     veri = request.get_json()
@@ -737,78 +1145,44 @@ def randevu_olustur():
     tarih = datetime.strptime(veri['tarih'], "%Y-%m-%d").date()
     saat = datetime.strptime(veri['saat'], "%H:%M").time()
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Aynı saatte dolu mu?
-    cursor.execute("""
-        SELECT 1 FROM randevular
-        WHERE doktor_id = %s AND tarih = %s AND saat = %s
-    """, (doktor_id, tarih, saat))
-    if cursor.fetchone():
-        cursor.close()
-        conn.close()
-        return jsonify({"error": "Bu saat zaten dolu"}), 400
-
-    # Kapalı mı?
-    cursor.execute("""
-        SELECT 1 FROM kapali_randevu_saatleri
-        WHERE doktor_id = %s AND tarih = %s AND saat = %s
-    """, (doktor_id, tarih, saat))
-    if cursor.fetchone():
-        cursor.close()
-        conn.close()
-        return jsonify({"error": "Bu saat kapalı"}), 400
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute(RANDEVU_OLUSTUR_SORGUSU, {
+            "doktor_id": doktor_id,
+            "hasta_id": hasta_id,
+            "tarih": tarih,
+            "saat": saat
+        })
+        randevu_id, dolu, kapali = cursor.fetchone()
+        if randevu_id is not None:
+            surumler.artir(cursor, surumler.gun(doktor_id, tarih))
+            slot_yayini.yayinla(cursor, doktor_id, tarih, saat)
+            analitik.gun_kirlet(cursor, doktor_id, tarih)
+        conn.commit()
 
-    # Randevuyu kaydet
-    cursor.execute("""
-        INSERT INTO randevular (doktor_id, hasta_id, tarih, saat)
-        VALUES (%s, %s, %s, %s)
-    """, (doktor_id, hasta_id, tarih, saat))
+    if randevu_id is None:
+        # Eşzamanlı bir rezervasyon slotu bizden önce almış olabilir (dolu ve
+        # kapali ikisi de False); bu da "dolu" sayılır.
+        if kapali and not dolu:
+            return jsonify({"error": "Bu saat kapalı"}), 400
+        return jsonify({"error": "Bu saat zaten dolu"}), 400
 
-    conn.commit()
-    cursor.close()
-    conn.close()
-    return jsonify({"message": "Randevu başarıyla oluşturuldu"})
+    gecersiz_kil(doktor_id, tarih)
+    return jsonify({"message": "Randevu başarıyla oluşturuldu", "randevu_id": randevu_id})
 
 
 @app.route('/next_appointment/<int:hasta_id>', methods=['GET'])
 def next_appointment(hasta_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-    # Bugünün tarihi, saat olmadan (YYYY-MM-DD)
-    bugun = datetime.now().date()
-
-    cursor.execute("""
-        SELECT r.randevu_id, r.tarih, r.saat, d.ad AS doktor_adi, d.soyad AS doktor_soyad
-        FROM randevular r
-        JOIN doktorlar d ON d.doktor_id = r.doktor_id
-        WHERE r.hasta_id = %s
-          AND r.tarih >= %s
-        ORDER BY r.tarih, r.saat
-        LIMIT 1
-    """, (hasta_id, bugun))
-
-    randevu = cursor.fetchone()
-    cursor.close()
-    conn.close()
-
-    if randevu is None:
+    # Geçmiş listesinin "gelecek" kapsamındaki ilk satırı
+    satirlar, _ = randevu_gecmisi.randevular(hasta_id, datetime.now(), 'gelecek', limit=1)
+    if not satirlar:
         return jsonify({}), 404  # Randevu bulunamadı
 
-    # Saat alanını string formatına çevir
-    saat = randevu.get('saat')
-    if isinstance(saat, time):
-        saat_str = saat.strftime("%H:%M")
-    else:
-        saat_str = str(saat)
-
+    randevu = satirlar[0]
     return jsonify({
         'randevu_id': randevu['randevu_id'],
         'tarih': randevu['tarih'].strftime('%Y-%m-%d'),
-        'saat': saat_str,
-        'doktor_adi': f"{randevu['doktor_adi']} {randevu['doktor_soyad']}"
+        'saat': randevu['saat'].strftime('%H:%M'),
+        'doktor_adi': f"{randevu['ad']} {randevu['soyad']}"
     })
 
 
@@ -818,32 +1192,26 @@ def next_appointment(hasta_id):
 @app.route('/patient_profile/<int:hasta_id>', methods=['GET'])
 def get_patient_profile(hasta_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-        cursor.execute("""
-            SELECT ad, soyad, tc_kimlik_no, cinsiyet, dogum_tarihi, ameliyat_raporu, rontgen
-            FROM hastalar
-            WHERE hasta_id = %s
-        """, (hasta_id,))
-        hasta = cursor.fetchone()
-
-        cursor.close()
-        conn.close()
+        with db_baglantisi() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("""
+                SELECT ad, soyad, tc_kimlik_no, cinsiyet, dogum_tarihi, ameliyat_raporu, rontgen
+                FROM hastalar
+                WHERE hasta_id = %s
+            """, (hasta_id,))
+            hasta = cursor.fetchone()
+            varyantlar = belge_isleme.varyantlari_getir(
+                cursor, [hasta['ameliyat_raporu'], hasta['rontgen']]
+            ) if hasta else {}
         
         if hasta:
             # dogum_tarihi varsa string olarak formatla
             if 'dogum_tarihi' in hasta and isinstance(hasta['dogum_tarihi'], (datetime, date)):
                 hasta['dogum_tarihi'] = hasta['dogum_tarihi'].strftime("%Y-%m-%d")
 
-            # Belgeleri base64 formatına çevir
+            # Belgeler meta veri olarak döner (bkz. get_doctor_profile)
             for belge_field in ['ameliyat_raporu', 'rontgen']:
                 path = hasta.get(belge_field)
-                if path and os.path.exists(path):
-                    with open(path, 'rb') as f:
-                        hasta[belge_field] = base64.b64encode(f.read()).decode('utf-8')
-                else:
-                    hasta[belge_field] = None
+                hasta[belge_field] = belge_bilgisi('patient', hasta_id, belge_field, path, varyantlar.get(path))
 
             return jsonify(hasta), 200
         else:
@@ -855,156 +1223,130 @@ def get_patient_profile(hasta_id):
 
 @app.route('/update_patient_profile', methods=['POST'])
 def update_patient_profile():
-    data = request.get_json()
+    data = _istek_verisi()
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
         if 'hasta_id' not in data:
             return jsonify({'success': False, 'message': 'Hasta ID eksik'}), 400
 
         hasta_id = data['hasta_id']
-        updated_fields = []
-        values = []
-
-        updated_fields = ['soyad', 'kullanici_adi']
-        for field in updated_fields:
-            if data.get(field):
-                cursor.execute(f"UPDATE hastalar SET {field} = %s WHERE hasta_id = %s", (data[field], hasta_id))
+        hasta_alanlari = degisiklikler(data, ('soyad', 'kullanici_adi'))
 
+        # Şifre hash'i ve belgeler bağlantı alınmadan önce hazırlanır
         if data.get('sifre'):
-            hashed_password = bcrypt.hashpw(data['sifre'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            cursor.execute("UPDATE hastalar SET sifre = %s WHERE hasta_id = %s", (hashed_password, hasta_id))
-
-        # Belge güncelleme
-        if data.get('ameliyat_raporu'):
-            rapor_path = upload_base64_file(data['ameliyat_raporu'], RAPOR_DIR, 'raporlar')
-            if rapor_path:
-                cursor.execute("UPDATE hastalar SET ameliyat_raporu = %s WHERE hasta_id = %s", (rapor_path, hasta_id))
-
-        if data.get('rontgen'):
-            rontgen_path = upload_base64_file(data['rontgen'], RONTGEN_DIR, 'rontgenler')
-            if rontgen_path:
-                cursor.execute("UPDATE hastalar SET rontgen = %s WHERE hasta_id = %s", (rontgen_path, hasta_id))           
-
+            hasta_alanlari['sifre'] = sifre_hashle(data['sifre'])
+        for alan, dizin in (('ameliyat_raporu', RAPOR_DIR), ('rontgen', RONTGEN_DIR)):
+            yol = belge_kaydet(data, alan, dizin)
+            if yol:
+                hasta_alanlari[alan] = yol
+
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            eski = kismi_guncelle(cursor, 'hastalar', hasta_id, hasta_alanlari)
+            if eski is None:
+                conn.rollback()
+                return jsonify({'success': False, 'message': 'Hasta bulunamadı'}), 404
+            belge_referanslarini_guncelle(cursor, eski, hasta_alanlari)
+            conn.commit()
 
-        conn.commit()
-        cursor.close()
-        conn.close()
-
-        return jsonify({'success': True, 'message': 'Profil başarıyla güncellendi'})
+        return jsonify({
+            'success': True,
+            'message': 'Profil başarıyla güncellendi',
+            'guncellenen_alanlar': degisen_alanlar(eski, hasta_alanlari)
+        })
     
+    except (YuklemeHatasi, SifreHavuzuDolu) as e:
+        return jsonify({'success': False, 'message': str(e)}), e.durum_kodu
     except Exception as e:
         return jsonify({'success': False, 'message': f'Veritabanı hatası: {str(e)}'}), 500
-    
 
 @app.route("/api/appointments/hasta", methods=["GET"])
 def hasta_randevulari():
-    hasta_id = request.args.get("hasta_id")
+    hasta_id = request.args.get("hasta_id", type=int)
 
     if not hasta_id:
         return jsonify({"error": "Hasta ID gerekli"}), 400
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT r.randevu_id, r.tarih, r.saat, d.ad, d.soyad
-        FROM randevular r
-        JOIN doktorlar d ON r.doktor_id = d.doktor_id
-        WHERE r.hasta_id = %s
-        ORDER BY r.tarih DESC, r.saat DESC
-    """, (hasta_id,))
-
-    randevular = cursor.fetchall()
-    sonuc = []
-
-    now = datetime.now()
-
-    for r in randevular:
-        randevu_tarihi = r[1]
-        randevu_saati = r[2]
-
-        # timezone varsa sıfırla
-        if hasattr(randevu_tarihi, 'tzinfo') and randevu_tarihi.tzinfo is not None:
-            randevu_tarihi = randevu_tarihi.replace(tzinfo=None)
-        if hasattr(randevu_saati, 'tzinfo') and randevu_saati.tzinfo is not None:
-            randevu_saati = randevu_saati.replace(tzinfo=None)
-
-        randevu_datetime = datetime.combine(randevu_tarihi, randevu_saati)
-        now_naive = now.replace(tzinfo=None)
-
-        durum = "geçmiş" if randevu_datetime < now_naive else "gelecek"
-
-        doktor_adi = f"{r[3]} {r[4]}"
-
-        sonuc.append({
-            "randevu_id": r[0],
-            "doktor_adi": doktor_adi,
-            "tarih": randevu_tarihi.strftime("%Y-%m-%d"),
-            "saat": randevu_saati.strftime("%H:%M"),
-            "durum": durum
-        })
+    # İsteğe bağlı: durum=gecmis|gelecek, limit ve cursor (sonraki sayfanın
+    # imleci X-Next-Cursor başlığında döner; ikisi de yoksa tam liste)
+    kapsam = request.args.get("durum", "tum")
+    if kapsam not in randevu_gecmisi.KAPSAMLAR:
+        return jsonify({"error": "durum tum, gecmis veya gelecek olmalıdır"}), 400
+    try:
+        limit = _sayfa_boyutu(config.GECMIS_SAYFA_BOYUTU, config.GECMIS_MAX_SAYFA)
+    except ValueError:
+        return jsonify({"error": f"limit 1 ile {config.GECMIS_MAX_SAYFA} arasında olmalıdır"}), 400
 
-    cursor.close()
-    conn.close()
+    try:
+        satirlar, sonraki = randevu_gecmisi.randevular(
+            hasta_id, datetime.now(), kapsam, request.args.get("cursor"), limit
+        )
+    except randevu_gecmisi.GecersizImlec as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify(sonuc)
+    yanit = jsonify([{
+        "randevu_id": r["randevu_id"],
+        "doktor_adi": f"{r['ad']} {r['soyad']}",
+        "tarih": r["tarih"].strftime("%Y-%m-%d"),
+        "saat": r["saat"].strftime("%H:%M"),
+        "durum": r["durum"]
+    } for r in satirlar])
+    if sonraki:
+        yanit.headers["X-Next-Cursor"] = sonraki
+    return yanit
 
 
 @app.route('/api/appointments/delete/<int:randevu_id>', methods=['DELETE'])
 def randevu_sil(randevu_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM randevular WHERE randevu_id = %s", (randevu_id,))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute(RANDEVU_SIL_SORGUSU, {"randevu_id": randevu_id})
+        silinen = cursor.fetchone()
+        if silinen:
+            surumler.artir(cursor, surumler.gun(silinen[0], silinen[1]))
+            slot_yayini.yayinla(cursor, *silinen)
+            analitik.gun_kirlet(cursor, silinen[0], silinen[1])
+        conn.commit()
+
+    if silinen:
+        gecersiz_kil(silinen[0], silinen[1])
     return jsonify({"message": "Randevu silindi"}), 200
 
 
 @app.route('/api/appointments/future/<int:hasta_id>', methods=['GET'])
 def get_all_future_appointments(hasta_id):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT r.randevu_id, r.tarih, r.saat, d.ad AS d_adi, d.soyad AS doktor_adi
-            FROM randevular r
-            JOIN doktorlar d ON r.doktor_id = d.doktor_id
-            WHERE r.hasta_id = %s
-              AND (
-                r.tarih > CURRENT_DATE
-                OR (r.tarih = CURRENT_DATE AND r.saat::time > CURRENT_TIME)
-              )
-            ORDER BY r.tarih, r.saat::time
-        """, (hasta_id,))
-
-        rows = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description]
-
-        appointments = []
-        for row in rows:
-            appointment = dict(zip(columns, row))
-            appointment['tarih'] = appointment['tarih'].isoformat()
-            appointment['saat'] = appointment['saat'].strftime('%H:%M')
-            appointments.append(appointment)
-
-        cursor.close()
-        conn.close()
-
-        return jsonify(appointments), 200
+        limit = _sayfa_boyutu(config.GECMIS_SAYFA_BOYUTU, config.GECMIS_MAX_SAYFA)
+    except ValueError:
+        return jsonify({'error': f'limit 1 ile {config.GECMIS_MAX_SAYFA} arasında olmalıdır'}), 400
 
-    except Exception as e:
-        print("Hata:", e)
+    try:
+        satirlar, sonraki = randevu_gecmisi.randevular(
+            hasta_id, datetime.now(), 'gelecek', request.args.get('cursor'), limit
+        )
+    except randevu_gecmisi.GecersizImlec as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception:
+        app.logger.exception("Gelecek randevular alınamadı (hasta_id=%s)", hasta_id)
         return jsonify({'error': 'Veritabanı hatası'}), 500
 
+    yanit = jsonify([{
+        'randevu_id': r['randevu_id'],
+        'tarih': r['tarih'].isoformat(),
+        'saat': r['saat'].strftime('%H:%M'),
+        'd_adi': r['ad'],
+        'doktor_adi': r['soyad']
+    } for r in satirlar])
+    if sonraki:
+        yanit.headers['X-Next-Cursor'] = sonraki
+    return yanit, 200
+
 
 if __name__ == '__main__':
     @app.route('/')
     def home():
        return "Randevu Sistemi API çalışıyor"
 
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # debug'da yeniden yükleyici uygulamayı bir alt süreçte çalıştırır;
+    # işler yalnızca orada başlar
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        arka_plan_islerini_baslat()
+    app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,377 @@
+"""Yüklenen belgelerin arka planda işlenmesi.
+
+Route'lar bir belgeyi depoya yazıp referansını eklerken, aynı işlemde
+``is_ekle`` ile ``belge_isleri`` kuyruğuna bir iş ekler ve hemen döner
+(migrations/008_belge_isleme.sql). Kuyruk veritabanında olduğundan yeniden
+başlatmalarda kaybolmaz ve birden çok worker aynı kuyruktan iş alabilir.
+
+Her iş için:
+
+* gerçek tür içerikten anlaşılır (``belgeler.mime_turu``) ve
+  ``belge_bloblari.mime``'a yazılır,
+* PDF'in ilk sayfasından ya da resmin kendisinden ``KUCUK_RESIM_BOYUTU``
+  piksellik bir küçük resim üretilir,
+* PNG'ler kayıpsız olarak yeniden sıkıştırılır; piksel verisi aynı kalır ve
+  yeterince küçülürse ``sikistirilmis`` varyantı olarak kaydedilir (JPEG
+  kayıpsız yeniden kodlanamadığı için dokunulmaz). Orijinal blob silinmez
+  (``?varyant=orijinal`` ile hâlâ indirilebilir); sıkıştırma diskte yer
+  kazandırmaz, varsayılan indirmede aktarılan veriyi küçültür.
+
+Varyantlar ``belge_varyantlari`` tablosuna yazılır. Resimler için Pillow,
+PDF'ler için PyMuPDF gerekir; kurulu olmayanın işleri yalnızca tür
+tespitiyle tamamlanır, kütüphane sonradan kurulursa ``kuyruga_al --yeniden``
+ile tekrar işlenebilir.
+
+Dönüştürmeler CPU'ya bağlı olduğundan ayrı bir süreç havuzunda çalışır
+(bkz. sifreleme.py; havuz, fork yerine ``config.SUREC_BASLATMA_YONTEMI``
+ile başlatılır); işi alan ve sonucu yazan, uygulama içindeki tek bir
+thread'dir. Ayrı bir süreçte çalıştırmak için backend dizininden:
+
+    python belge_isleme.py calistir            # kuyruğu işle (uygulamada BELGE_ISLEME_ACIK=0 ile)
+    python belge_isleme.py kuyruga_al [--yeniden]  # var olan blobları kuyruğa ekle
+    python belge_isleme.py durum
+"""
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from psycopg2 import extensions, sql
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # isteğe bağlı: yoksa resimlerden varyant üretilmez
+    Image = ImageOps = None
+
+try:
+    import pymupdf
+except ImportError:
+    try:
+        import fitz as pymupdf  # PyMuPDF < 1.24.3
+    except ImportError:  # isteğe bağlı: yoksa PDF'lerden küçük resim üretilmez
+        pymupdf = None
+
+import blob_deposu
+import config
+import surumler
+from belgeler import BELGE_ALANLARI, mime_turu
+from db import db_baglantisi
+
+KUCUK_RESIM = 'kucuk_resim'
+SIKISTIRILMIS = 'sikistirilmis'
+
+_RESIMLER = ('image/png', 'image/jpeg', 'image/gif', 'image/webp')
+
+_gunluk = logging.getLogger(__name__)
+
+
+def is_ekle(cursor, yol):
+    """Blobu çağıranın işlemi içinde kuyruğa ekler; aynı içerik daha önce
+    eklendiyse bir şey yapmaz."""
+    if not yol or not blob_deposu.blob_mu(yol):
+        return
+    cursor.execute(
+        "INSERT INTO belge_isleri (yol) VALUES (%s) ON CONFLICT (yol) DO NOTHING", (yol,)
+    )
+
+
+def varyantlari_getir(cursor, yollar):
+    """{kaynak yol: {tur: {yol, mime, boyut, genislik, yukseklik}}}"""
+    yollar = [y for y in yollar if y]
+    if not yollar:
+        return {}
+    # Çağıranın cursor'ı RealDictCursor olabilir
+    with cursor.connection.cursor(cursor_factory=extensions.cursor) as c:
+        c.execute("""
+            SELECT kaynak_yol, tur, yol, mime, boyut, genislik, yukseklik
+            FROM belge_varyantlari
+            WHERE kaynak_yol = ANY(%s)
+        """, (yollar,))
+        satirlar = c.fetchall()
+    sonuc = {}
+    for kaynak, tur, yol, mime, boyut, genislik, yukseklik in satirlar:
+        sonuc.setdefault(kaynak, {})[tur] = {
+            "yol": yol, "mime": mime, "boyut": boyut, "genislik": genislik, "yukseklik": yukseklik,
+        }
+    return sonuc
+
+
+# --- Dönüştürmeler (süreç havuzunda çalışır) -----------------------------------
+
+def varyant_dizini(yol):
+    # <depo>/ab/cd/<özet> -> <depo>/varyantlar
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(yol))), 'varyantlar')
+
+
+def _varyant(kaynak, tur, veri, mime, boyutlar):
+    return {
+        "tur": tur,
+        "yol": blob_deposu.bytes_kaydet(veri, varyant_dizini(kaynak)),
+        "mime": mime,
+        "boyut": len(veri),
+        "genislik": boyutlar[0],
+        "yukseklik": boyutlar[1],
+    }
+
+
+def _jpeg(resim):
+    if resim.mode not in ('RGB', 'L'):
+        # Saydam alanlar beyaz zemine oturtulur
+        rgba = resim.convert('RGBA')
+        resim = Image.new('RGB', rgba.size, 'white')
+        resim.paste(rgba, mask=rgba.getchannel('A'))
+    tampon = io.BytesIO()
+    resim.save(tampon, 'JPEG', quality=config.KUCUK_RESIM_KALITESI, optimize=True)
+    return tampon.getvalue()
+
+
+def _pdf_kucuk_resim(yol, boyut):
+    with pymupdf.open(yol) as belge:
+        if belge.page_count == 0:
+            return None
+        sayfa = belge[0]
+        olcek = boyut / max(sayfa.rect.width, sayfa.rect.height)
+        pix = sayfa.get_pixmap(matrix=pymupdf.Matrix(olcek, olcek), alpha=False)
+    if Image is None:
+        return _varyant(yol, KUCUK_RESIM, pix.tobytes('png'), 'image/png', (pix.width, pix.height))
+    resim = Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+    return _varyant(yol, KUCUK_RESIM, _jpeg(resim), 'image/jpeg', resim.size)
+
+
+def _resim_kucuk_resim(yol, resim, mime, boyut):
+    kucuk = ImageOps.exif_transpose(resim)
+    tam_boyut = kucuk.size
+    kucuk.thumbnail((boyut, boyut))
+    veri = _jpeg(kucuk)
+    if len(veri) >= os.path.getsize(yol):
+        # Zaten küçük bir resim: küçük resmi kendisidir
+        return {"tur": KUCUK_RESIM, "yol": yol, "mime": mime, "boyut": os.path.getsize(yol),
+                "genislik": tam_boyut[0], "yukseklik": tam_boyut[1]}
+    return _varyant(yol, KUCUK_RESIM, veri, 'image/jpeg', kucuk.size)
+
+
+def _png_sikistir(yol, resim):
+    tampon = io.BytesIO()
+    resim.save(tampon, 'PNG', optimize=True, icc_profile=resim.info.get('icc_profile'))
+    veri = tampon.getvalue()
+    if len(veri) > os.path.getsize(yol) * (1 - config.SIKISTIRMA_MIN_KAZANC):
+        return None
+    # Kayıpsız olduğu doğrulanmadan kaydedilmez
+    with Image.open(io.BytesIO(veri)) as yeni:
+        if yeni.mode != resim.mode or yeni.tobytes() != resim.tobytes():
+            return None
+    return _varyant(yol, SIKISTIRILMIS, veri, 'image/png', resim.size)
+
+
+def isle(yol, kucuk_resim_boyutu):
+    """(mime, [varyant, ...]); varyant dosyaları depoya yazılmış olarak döner."""
+    mime = mime_turu(yol)
+    varyantlar = []
+    if mime == 'application/pdf' and pymupdf is not None:
+        varyantlar.append(_pdf_kucuk_resim(yol, kucuk_resim_boyutu))
+    elif mime in _RESIMLER and Image is not None:
+        with Image.open(yol) as resim:
+            resim.load()
+            varyantlar.append(_resim_kucuk_resim(yol, resim, mime, kucuk_resim_boyutu))
+            if mime == 'image/png':
+                varyantlar.append(_png_sikistir(yol, resim))
+    return mime, [v for v in varyantlar if v]
+
+
+# --- Kuyruk ----------------------------------------------------------------------
+
+def _isleri_al(adet):
+    # Bekleyen ya da süresi aşmış (işçisi ölmüş) işler; diğer worker'ların
+    # aldıkları atlanır.
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE belge_isleri
+            SET durum = 'isleniyor', deneme = deneme + 1, guncelleme_zamani = now()
+            WHERE is_id IN (
+                SELECT is_id FROM belge_isleri
+                WHERE (durum = 'bekliyor' AND sonraki_deneme <= now())
+                   OR (durum = 'isleniyor' AND guncelleme_zamani < now() - make_interval(secs => %s))
+                ORDER BY sonraki_deneme
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING is_id, yol, deneme
+        """, (config.BELGE_ISLEME_ZAMAN_ASIMI, adet))
+        isler = cursor.fetchall()
+        conn.commit()
+    return isler
+
+
+def _tamamla(is_id, yol, mime, varyantlar):
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        for v in varyantlar:
+            cursor.execute("""
+                INSERT INTO belge_varyantlari (kaynak_yol, tur, yol, mime, boyut, genislik, yukseklik)
+                VALUES (%(kaynak)s, %(tur)s, %(yol)s, %(mime)s, %(boyut)s, %(genislik)s, %(yukseklik)s)
+                ON CONFLICT (kaynak_yol, tur) DO UPDATE SET
+                    yol = EXCLUDED.yol, mime = EXCLUDED.mime, boyut = EXCLUDED.boyut,
+                    genislik = EXCLUDED.genislik, yukseklik = EXCLUDED.yukseklik,
+                    olusturma_zamani = now()
+            """, dict(v, kaynak=yol))
+        cursor.execute("UPDATE belge_bloblari SET mime = %s WHERE yol = %s", (mime, yol))
+        cursor.execute("""
+            UPDATE belge_isleri SET durum = 'tamam', hata = NULL, guncelleme_zamani = now()
+            WHERE is_id = %s
+        """, (is_id,))
+
+        # Doktor profili küçük resmi gösterir; ETag'i değişmeli
+        if varyantlar:
+            tablo, anahtar, alanlar = BELGE_ALANLARI['doctor']
+            cursor.execute(
+                sql.SQL("SELECT {} FROM {} WHERE %s IN ({})").format(
+                    sql.Identifier(anahtar), sql.Identifier(tablo),
+                    sql.SQL(', ').join(map(sql.Identifier, alanlar))
+                ),
+                (yol,)
+            )
+            surumler.artir(cursor, *(surumler.profil(d) for (d,) in cursor.fetchall()))
+        conn.commit()
+
+
+def _basarisiz(is_id, deneme, hata):
+    # Üstel geri çekilme; deneme hakkı bitince "hata"da kalır
+    bekleme = min(config.BELGE_ISLEME_ARALIGI * 2 ** deneme, 3600)
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE belge_isleri
+            SET durum = CASE WHEN deneme >= %s THEN 'hata' ELSE 'bekliyor' END,
+                sonraki_deneme = now() + make_interval(secs => %s),
+                hata = %s, guncelleme_zamani = now()
+            WHERE is_id = %s
+        """, (config.BELGE_ISLEME_MAX_DENEME, bekleme, hata[:1000], is_id))
+        conn.commit()
+
+
+class BelgeIsleyici:
+    """Kuyruktan iş alıp süreç havuzunda işleyen thread. ``isci_sayisi`` 0
+    ise işler bu thread'de çalışır."""
+
+    def __init__(self, isci_sayisi):
+        self.isci_sayisi = isci_sayisi
+        self._kilit = threading.Lock()
+        self._executor = None
+        self._thread = None
+        self.islenen = 0
+        self.basarisiz = 0
+
+    def _havuz(self):
+        with self._kilit:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.isci_sayisi,
+                    mp_context=multiprocessing.get_context(config.SUREC_BASLATMA_YONTEMI),
+                )
+            return self._executor
+
+    def bir_tur(self):
+        """En fazla işçi sayısı kadar işi alıp işler; işlenen iş sayısını döner."""
+        isler = _isleri_al(max(self.isci_sayisi, 1))
+        gelecekler = [
+            self._havuz().submit(isle, yol, config.KUCUK_RESIM_BOYUTU)
+            if self.isci_sayisi > 0 and deneme <= config.BELGE_ISLEME_MAX_DENEME else None
+            for _, yol, deneme in isler
+        ]
+        for (is_id, yol, deneme), gelecek in zip(isler, gelecekler):
+            try:
+                if deneme > config.BELGE_ISLEME_MAX_DENEME:
+                    # İşçisini tekrar tekrar düşüren iş (ör. bozuk dosya)
+                    raise RuntimeError("Deneme sınırı aşıldı")
+                if gelecek is None:
+                    mime, varyantlar = isle(yol, config.KUCUK_RESIM_BOYUTU)
+                else:
+                    mime, varyantlar = gelecek.result()
+            except BrokenProcessPool as e:
+                with self._kilit:
+                    self._executor = None
+                self._hata(is_id, yol, deneme, e)
+            except Exception as e:
+                self._hata(is_id, yol, deneme, e)
+            else:
+                _tamamla(is_id, yol, mime, varyantlar)
+                with self._kilit:
+                    self.islenen += 1
+        return len(isler)
+
+    def _hata(self, is_id, yol, deneme, e):
+        _gunluk.warning("Belge işlenemedi (%s, deneme %s): %s", yol, deneme, e)
+        _basarisiz(is_id, deneme, f"{type(e).__name__}: {e}")
+        with self._kilit:
+            self.basarisiz += 1
+
+    def calistir(self):
+        while True:
+            try:
+                islenen = self.bir_tur()
+            except Exception:
+                _gunluk.exception("Belge işleme turu başarısız")
+                islenen = 0
+            if not islenen:
+                time.sleep(config.BELGE_ISLEME_ARALIGI)
+
+    def baslat(self):
+        with self._kilit:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.calistir, name="belge-isleme", daemon=True)
+                self._thread.start()
+
+    def istatistikler(self):
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            cursor.execute("SELECT durum, count(*) FROM belge_isleri GROUP BY durum")
+            kuyruk = dict(cursor.fetchall())
+        with self._kilit:
+            return {
+                "kuyruk": {d: kuyruk.get(d, 0) for d in ('bekliyor', 'isleniyor', 'tamam', 'hata')},
+                "isci_sayisi": self.isci_sayisi,
+                "calisiyor": self._thread is not None,
+                "islenen": self.islenen,
+                "basarisiz": self.basarisiz,
+                "pillow": Image is not None,
+                "pymupdf": pymupdf is not None,
+            }
+
+
+def kuyruga_al(yeniden=False):
+    """Referansı olan bütün blobları kuyruğa ekler; ``yeniden`` ile
+    işlenmiş olanlar da tekrar işlenir. Eklenen/sıfırlanan iş sayısını döner."""
+    cakisma = """
+        UPDATE SET durum = 'bekliyor', deneme = 0, sonraki_deneme = now(),
+                   hata = NULL, guncelleme_zamani = now()
+    """ if yeniden else "NOTHING"
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO belge_isleri (yol)
+            SELECT yol FROM belge_bloblari WHERE ref_sayisi > 0
+            ON CONFLICT (yol) DO """ + cakisma)
+        adet = cursor.rowcount
+        conn.commit()
+    return adet
+
+
+isleyici = BelgeIsleyici(config.BELGE_ISLEME_ISCI)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Belge işleme kuyruğu")
+    parser.add_argument('komut', choices=['calistir', 'kuyruga_al', 'durum'])
+    parser.add_argument('--yeniden', action='store_true', help="kuyruga_al: işlenmişleri de tekrar işle")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.komut == 'calistir':
+        isleyici.calistir()
+    elif args.komut == 'kuyruga_al':
+        print(json.dumps({"kuyruga_alinan": kuyruga_al(args.yeniden)}))
+    else:
+        print(json.dumps(isleyici.istatistikler(), indent=2, ensure_ascii=False))
@@ -0,0 +1,238 @@
+"""Yetim belge temizliği.
+
+Profil güncellemeleri yeni belgeye geçerken eskisinin yalnızca referansını
+bırakır (bkz. blob_deposu.referans_birak); kayıt sırasında dosya yazıldıktan
+sonra hata alan istekler de geride dosya bırakır. Bu iş, yükleme dizinindeki
+dosyaları doktorlar/hastalar belge kolonlarındaki yollarla (ve bu belgelerin
+varyantlarıyla, bkz. belge_isleme.py) karşılaştırıp hiçbir yerden
+gösterilmeyenleri karantinaya taşır ya da siler.
+
+İki taraf da sıralı akış olarak okunur ve birleştirilir (sorted merge):
+dizin ağacı, her dizinin girdileri sıralanarak dolaşılır; referanslı yollar
+``COLLATE "C"`` ile sıralı olarak sunucu taraflı cursor'dan ``--parti``
+satırlık parçalarla gelir. Bellekte yalnızca o anki dizinin girdileri ve
+bir partilik aday tutulur.
+
+Korunanlar:
+
+* son değişikliği ``--bekleme`` saniyeden yeni dosyalar (yazılmış ama
+  işlemi henüz commit edilmemiş yüklemeler; aynı içerik tekrar yüklendiğinde
+  blob_deposu dosyanın zamanını yeniler),
+* ``tmp/`` altındaki yükleme oturumları (son yazmasından bu yana
+  ``--oturum-suresi`` saniye geçenler karantinaya alınmadan silinir; yarım
+  yüklemeler geri getirilecek bir belge değildir) ve yazılmakta olan
+  ``.yukleniyor-*`` geçici dosyaları,
+* silinmeden hemen önce veritabanında tekrar bakıldığında referans almış
+  olan dosyalar.
+
+DB'deki göreli yollar, app.py gibi çalışma dizinine göre çözülür; bu yüzden
+uygulamanın çalıştığı dizinden (backend) çalıştırılmalıdır:
+
+    python belge_temizligi.py --kuru                 # yalnızca rapor
+    python belge_temizligi.py                        # karantinaya taşı
+    python belge_temizligi.py --sil --bekleme 604800 # sil, 7 günden eskiler
+    python belge_temizligi.py --oturum-suresi 3600   # 1 saattir yazılmayan oturumlar
+"""
+import itertools
+import os
+import time
+
+from psycopg2 import sql
+
+import config
+from belgeler import BELGE_ALANLARI
+from db import db_baglantisi
+from yuklemeler import YuklemeOturumlari
+
+_GECICI_ONEK = '.yukleniyor-'
+
+
+def _sirali_dosyalar(kok_dizin, haric):
+    """Dizin ağacındaki dosyalar, tam yollarının sırasıyla.
+
+    Girdiler dizin adına '/' eklenerek sıralanır; böylece derinlik öncelikli
+    dolaşma, tam yolların düz karakter sırasıyla aynı sırayı verir.
+    """
+    try:
+        girdiler = list(os.scandir(kok_dizin))
+    except FileNotFoundError:
+        return
+    anahtarlar = []
+    for girdi in girdiler:
+        if girdi.path in haric or girdi.name.startswith(_GECICI_ONEK):
+            continue
+        if girdi.is_dir(follow_symlinks=False):
+            anahtarlar.append((girdi.name + os.sep, girdi))
+        elif girdi.is_file(follow_symlinks=False):
+            anahtarlar.append((girdi.name, girdi))
+    anahtarlar.sort(key=lambda a: a[0])
+    for _, girdi in anahtarlar:
+        if girdi.is_dir(follow_symlinks=False):
+            yield from _sirali_dosyalar(girdi.path, haric)
+        else:
+            yield girdi
+
+
+def _referans_sorgusu(yollar_icin=False):
+    # Belge kolonlarındaki yollar (göreli olanlar çalışma dizinine göre) ve
+    # bu belgelerin varyantları
+    kolonlar = sql.SQL(" UNION ALL ").join(
+        sql.SQL("SELECT {} AS yol FROM {}").format(sql.Identifier(alan), sql.Identifier(tablo))
+        for tablo, _, alanlar in BELGE_ALANLARI.values()
+        for alan in alanlar
+    )
+    return sql.SQL("""
+        WITH belgeler AS (
+            SELECT yol FROM ({kolonlar}) b WHERE yol IS NOT NULL
+        ), kullanilan AS (
+            SELECT yol FROM belgeler
+            UNION
+            SELECT v.yol FROM belge_varyantlari v JOIN belgeler b ON b.yol = v.kaynak_yol
+        ), mutlak AS (
+            SELECT CASE WHEN yol LIKE '/%%' THEN yol ELSE %(cwd)s || '/' || yol END COLLATE "C" AS yol
+            FROM kullanilan
+        )
+        SELECT DISTINCT yol FROM mutlak {filtre} ORDER BY yol
+    """).format(
+        kolonlar=kolonlar,
+        filtre=sql.SQL("WHERE yol = ANY(%(yollar)s)") if yollar_icin else sql.SQL(""),
+    )
+
+
+def _sirali_referanslar(conn, parti):
+    with conn.cursor(name='belge_temizligi') as cursor:
+        cursor.itersize = parti
+        cursor.execute(_referans_sorgusu(), {"cwd": os.getcwd()})
+        for (yol,) in cursor:
+            yield yol
+
+
+def _partiyi_isle(adaylar, kok_dizin, karantina_dizini, kuru, bekleme_suresi, rapor):
+    """Adayların veritabanında hâlâ referanssız ve yeterince eski olduğu
+    doğrulanıp karantinaya taşınır ya da silinir."""
+    yollar = [yol for yol, _ in adaylar]
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute(_referans_sorgusu(yollar_icin=True), {"cwd": os.getcwd(), "yollar": yollar})
+        simdi_referansli = {yol for (yol,) in cursor.fetchall()}
+
+        islenen = []
+        sinir = time.time() - bekleme_suresi
+        for yol, boyut in adaylar:
+            if yol in simdi_referansli:
+                rapor["yeniden_referans_alan"] += 1
+                continue
+            try:
+                if os.stat(yol).st_mtime > sinir:  # bu arada yeniden yüklendi
+                    rapor["bekleme_suresinde"] += 1
+                    continue
+                if not kuru:
+                    if karantina_dizini:
+                        hedef = os.path.join(karantina_dizini, os.path.relpath(yol, kok_dizin))
+                        os.makedirs(os.path.dirname(hedef), exist_ok=True)
+                        os.replace(yol, hedef)
+                    else:
+                        os.remove(yol)
+            except OSError:
+                rapor["hata"] += 1
+                continue
+            islenen.append(yol)
+            rapor["islenen"] += 1
+            rapor["geri_kazanilan_bayt"] += boyut
+
+        if islenen and not kuru:
+            # Dosyası kalmayan blobların kayıtları ve (kaynak olarak) varyantları
+            cursor.execute("DELETE FROM belge_bloblari WHERE yol = ANY(%s)", (islenen,))
+            cursor.execute("DELETE FROM belge_isleri WHERE yol = ANY(%s)", (islenen,))
+            cursor.execute("DELETE FROM belge_varyantlari WHERE kaynak_yol = ANY(%s)", (islenen,))
+            conn.commit()
+
+
+def temizle(kok_dizin, karantina_dizini=None, kuru=False,
+            bekleme_suresi=None, parti=None, oturum_suresi=None):
+    """Yetim dosyaları karantinaya taşır (``karantina_dizini`` None ise
+    siler) ve süresi dolan yükleme oturumlarını siler; ``kuru`` ile hiçbir
+    şeye dokunmadan yalnızca rapor verir."""
+    kok_dizin = os.path.abspath(kok_dizin)
+    bekleme_suresi = config.YETIM_BELGE_BEKLEME_SURESI if bekleme_suresi is None else bekleme_suresi
+    parti = parti or config.YETIM_BELGE_PARTI
+    oturum_dizini = os.path.join(kok_dizin, 'tmp')  # yükleme oturumları (bkz. yuklemeler.py)
+    haric = {oturum_dizini}
+    if karantina_dizini:
+        karantina_dizini = os.path.abspath(karantina_dizini)
+        haric.add(karantina_dizini)
+
+    rapor = {
+        "kuru": kuru, "islem": "karantina" if karantina_dizini else "sil",
+        "taranan_dosya": 0, "referansli": 0, "yetim": 0, "bekleme_suresinde": 0,
+        "yeniden_referans_alan": 0, "islenen": 0, "geri_kazanilan_bayt": 0,
+        "eksik_dosya": 0, "hata": 0, "suresi_dolan_oturum_dosyasi": 0, "oturum_bayti": 0,
+    }
+    if os.path.isdir(oturum_dizini):
+        rapor["suresi_dolan_oturum_dosyasi"], rapor["oturum_bayti"] = \
+            YuklemeOturumlari(oturum_dizini).suresi_dolanlari_sil(oturum_suresi, kuru)
+    sinir = time.time() - bekleme_suresi
+    adaylar = []
+
+    with db_baglantisi() as conn:
+        referanslar = _sirali_referanslar(conn, parti)
+        referans = next(referanslar, None)
+        for girdi in _sirali_dosyalar(kok_dizin, haric):
+            yol = girdi.path
+            rapor["taranan_dosya"] += 1
+            while referans is not None and referans < yol:
+                if referans.startswith(kok_dizin + os.sep):
+                    rapor["eksik_dosya"] += 1
+                referans = next(referanslar, None)
+            if referans == yol:
+                rapor["referansli"] += 1
+                referans = next(referanslar, None)
+                continue
+
+            rapor["yetim"] += 1
+            try:
+                durum = girdi.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if durum.st_mtime > sinir:
+                rapor["bekleme_suresinde"] += 1
+                continue
+            adaylar.append((yol, durum.st_size))
+            if len(adaylar) >= parti:
+                _partiyi_isle(adaylar, kok_dizin, karantina_dizini, kuru, bekleme_suresi, rapor)
+                adaylar = []
+
+        for referans in itertools.chain([referans], referanslar):
+            if referans is not None and referans.startswith(kok_dizin + os.sep):
+                rapor["eksik_dosya"] += 1
+
+    if adaylar:
+        _partiyi_isle(adaylar, kok_dizin, karantina_dizini, kuru, bekleme_suresi, rapor)
+    return rapor
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Yetim belge temizliği")
+    parser.add_argument('--kok', default='uploads', help="Yükleme dizini (varsayılan: ./uploads)")
+    parser.add_argument('--kuru', action='store_true', help="Değişiklik yapmadan rapor ver")
+    parser.add_argument('--sil', action='store_true', help="Karantinaya taşımak yerine sil")
+    parser.add_argument('--karantina', default=config.YETIM_BELGE_KARANTINA_DIZINI,
+                        help="Karantina dizini")
+    parser.add_argument('--bekleme', type=float, default=config.YETIM_BELGE_BEKLEME_SURESI,
+                        help="Bundan yeni (saniye) dosyalara dokunulmaz")
+    parser.add_argument('--parti', type=int, default=config.YETIM_BELGE_PARTI,
+                        help="Referans okuma ve işleme partisi")
+    parser.add_argument('--oturum-suresi', type=float, default=config.YUKLEME_OTURUM_SURESI,
+                        help="Son yazmasından bu yana bu kadar (saniye) geçen yükleme oturumları silinir")
+    args = parser.parse_args()
+
+    print(json.dumps(temizle(
+        args.kok,
+        karantina_dizini=None if args.sil else args.karantina,
+        kuru=args.kuru,
+        bekleme_suresi=args.bekleme,
+        parti=args.parti,
+        oturum_suresi=args.oturum_suresi,
+    ), indent=2, ensure_ascii=False))
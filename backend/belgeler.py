@@ -0,0 +1,74 @@
+import mimetypes
+import os
+
+
+# Belge indirme uç noktasının erişebileceği tablo/kolonlar (beyaz liste)
+BELGE_ALANLARI = {
+    'doctor': ('doktorlar', 'doktor_id', ('diploma_belgesi', 'isyeri_belgesi')),
+    'patient': ('hastalar', 'hasta_id', ('ameliyat_raporu', 'rontgen')),
+}
+
+# Belge yolu tutan tüm kolon adları
+BELGE_KOLONLARI = frozenset(alan for _, _, alanlar in BELGE_ALANLARI.values() for alan in alanlar)
+
+# Dosya imzası -> MIME türü. Belgeler içerik özetiyle (eski kayıtlar ise
+# uzantısına bakılmaksızın ".pdf" adıyla) saklandığından tür, içeriğin ilk
+# baytlarından anlaşılır.
+_IMZALAR = (
+    (b'%PDF', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def mime_turu(yol):
+    try:
+        with open(yol, 'rb') as f:
+            bas = f.read(8)
+    except OSError:
+        bas = b''
+
+    for imza, mime in _IMZALAR:
+        if bas.startswith(imza):
+            return mime
+    if bas[:4] == b'RIFF' and bas[8:12] == b'WEBP':
+        return 'image/webp'
+
+    return mimetypes.guess_type(yol)[0] or 'application/octet-stream'
+
+
+def belge_url(sahip_turu, sahip_id, alan):
+    return f"/api/documents/{sahip_turu}/{sahip_id}/{alan}"
+
+
+def belge_bilgisi(sahip_turu, sahip_id, alan, yol, varyantlar=None):
+    """Profil yanıtları için belge meta verisi; dosya yoksa None.
+
+    ``varyantlar`` belgenin türetilmiş dosyalarıdır (bkz.
+    belge_isleme.varyantlari_getir). Küçük resim hazırsa "kucuk_resim"
+    altında döner ve profil ekranlarında varsayılan olarak o gösterilir;
+    "url" her zaman belgenin tamamıdır.
+    """
+    if not yol:
+        return None
+    try:
+        boyut = os.path.getsize(yol)
+    except OSError:
+        return None
+
+    kucuk_resim = (varyantlar or {}).get('kucuk_resim')
+    return {
+        "id": f"{sahip_turu}/{sahip_id}/{alan}",
+        "boyut": boyut,
+        "mime": mime_turu(yol),
+        "url": belge_url(sahip_turu, sahip_id, alan),
+        "kucuk_resim": {
+            "url": belge_url(sahip_turu, sahip_id, alan) + "?varyant=kucuk_resim",
+            "mime": kucuk_resim["mime"],
+            "boyut": kucuk_resim["boyut"],
+            "genislik": kucuk_resim["genislik"],
+            "yukseklik": kucuk_resim["yukseklik"],
+        } if kucuk_resim else None,
+    }
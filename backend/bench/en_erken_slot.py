@@ -0,0 +1,156 @@
+"""En erken boş slot araması: tembel birleştirme ve doktor doktor tarama.
+
+backend dizininden, benchmark veritabanında (bkz. bench/ortam.py) çalıştırılır:
+
+    BENCH_DB_NAME=dis_randevu_bench python -m bench.en_erken_slot --doktor 3000 --dolu-gun 3 --adet 10
+
+Aynı ilçede geçici doktorlar oluşturur; her birinin ilk ``--dolu-gun``
+gününü ``--doluluk`` oranında randevu ve kapalı saatle doldurur. Ardından
+aynı aramayı iki yolla, soğuk önbellekle koşturur:
+
+* tembel: en_erken_bos_slotlar; günler tüm doktorlar için toplu okunur,
+  ``--adet`` sonuç bulununca durur.
+* naif: istemcinin bugün yaptığı gibi her doktor için gün gün
+  gun_izgarasi çağrılır, ilk boş slot bulununca sonraki doktora geçilir.
+
+Sonuçlar (süre, sorgu sayısı, iki yolun aynı slotları bulup bulmadığı) JSON
+olarak yazılır. Test verisi sonunda silinir.
+"""
+from bench import ortam  # noqa: F401  (db'den önce: DB_NAME'i ayarlar)
+
+import argparse
+import heapq
+import json
+import time
+from datetime import date, timedelta
+
+from calisma_programi import sablon_dakikalari
+from db import db_baglantisi
+import slot_motoru
+from slot_motoru import en_erken_bos_slotlar, gun_izgarasi
+
+_ISARET = 'ErkenSlotBench'
+
+
+def veri_ekle(doktor_sayisi, dolu_gun, doluluk, baslangic):
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            WITH a AS (
+                INSERT INTO adres (il, ilce, tamadres)
+                SELECT %(isaret)s, %(isaret)s, %(isaret)s FROM generate_series(1, %(doktor)s)
+                RETURNING adres_id
+            )
+            INSERT INTO doktorlar (ad, soyad, brans, adres_id)
+            SELECT 'Bench', %(isaret)s, 'Genel', adres_id FROM a
+            RETURNING doktor_id
+        """, {"doktor": doktor_sayisi, "isaret": _ISARET})
+        idler = [r[0] for r in cursor.fetchall()]
+
+        cursor.execute("""
+            INSERT INTO doktor_ayarlar
+                (doktor_id, baslangic_saat, baslangic_dakika, bitis_saat, bitis_dakika, randevu_aralik)
+            SELECT unnest(%s::int[]), 9, 0, 17, 0, 30
+        """, (idler,))
+        cursor.execute("""
+            INSERT INTO slot_sablonlari (doktor_id, haftanin_gunu, versiyon, dakikalar)
+            SELECT d, g, 1, %s FROM unnest(%s::int[]) AS d, generate_series(1, 7) AS g
+        """, (list(sablon_dakikalari(9 * 60, 17 * 60, 30)), idler))
+
+        # Slotların bir kısmı randevu, bir kısmı kapalı saat olur
+        cursor.execute("""
+            WITH slotlar AS (
+                SELECT d AS doktor_id, %(baslangic)s::date + g AS tarih,
+                       time '09:00' + k * interval '30 minutes' AS saat, random() AS r
+                FROM unnest(%(idler)s::int[]) AS d,
+                     generate_series(0, %(gun)s - 1) AS g,
+                     generate_series(0, 16) AS k
+            ),
+            randevu AS (
+                INSERT INTO randevular (doktor_id, tarih, saat)
+                SELECT doktor_id, tarih, saat FROM slotlar WHERE r < %(doluluk)s * 0.8
+            )
+            INSERT INTO kapali_araliklar (doktor_id, baslangic_tarih, bitis_tarih, baslangic_dk, bitis_dk)
+            SELECT doktor_id, tarih, tarih, dk, dk + 1
+            FROM (SELECT *, (EXTRACT(HOUR FROM saat) * 60 + EXTRACT(MINUTE FROM saat))::int AS dk FROM slotlar) s
+            WHERE r >= %(doluluk)s * 0.8 AND r < %(doluluk)s
+        """, {"idler": idler, "gun": dolu_gun, "doluluk": doluluk, "baslangic": baslangic})
+        conn.commit()
+    return idler
+
+
+def temizle():
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT doktor_id, adres_id FROM doktorlar WHERE soyad = %s", (_ISARET,))
+        satirlar = cursor.fetchall()
+        idler = [r[0] for r in satirlar]
+        cursor.execute("DELETE FROM randevular WHERE doktor_id = ANY(%s)", (idler,))
+        cursor.execute("DELETE FROM kapali_araliklar WHERE doktor_id = ANY(%s)", (idler,))
+        cursor.execute("DELETE FROM slot_sablonlari WHERE doktor_id = ANY(%s)", (idler,))
+        cursor.execute("DELETE FROM doktor_ayarlar WHERE doktor_id = ANY(%s)", (idler,))
+        cursor.execute("DELETE FROM doktorlar WHERE doktor_id = ANY(%s)", (idler,))
+        cursor.execute("DELETE FROM adres WHERE adres_id = ANY(%s)", ([r[1] for r in satirlar],))
+        conn.commit()
+
+
+def _soguk_onbellek():
+    slot_motoru.onbellek = slot_motoru.IzgaraOnbellegi(
+        slot_motoru.onbellek.kapasite, slot_motoru.onbellek.sure
+    )
+
+
+def naif(idler, baslangic, bitis, adet):
+    bulunan = []
+    for doktor_id in idler:
+        tarih = baslangic
+        while tarih <= bitis:
+            izgara = gun_izgarasi(doktor_id, tarih)
+            bos = list(izgara.bos_saatler())
+            if bos:
+                bulunan.extend((tarih, dakika, doktor_id) for dakika in bos)
+                break
+            tarih += timedelta(days=1)
+    return heapq.nsmallest(adet, bulunan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--doktor', type=int, default=3000)
+    parser.add_argument('--dolu-gun', type=int, default=3)
+    parser.add_argument('--doluluk', type=float, default=0.97)
+    parser.add_argument('--gun', type=int, default=14)
+    parser.add_argument('--adet', type=int, default=10)
+    args = parser.parse_args()
+
+    baslangic = date.today() + timedelta(days=1)
+    bitis = baslangic + timedelta(days=args.gun - 1)
+    idler = veri_ekle(args.doktor, args.dolu_gun, args.doluluk, baslangic)
+    rapor = {"doktor": args.doktor, "dolu_gun": args.dolu_gun, "doluluk": args.doluluk, "adet": args.adet}
+    try:
+        _soguk_onbellek()
+        bas = time.perf_counter()
+        tembel, okunan_gun = en_erken_bos_slotlar(idler, baslangic, bitis, args.adet)
+        rapor["tembel"] = {
+            "sure_ms": round((time.perf_counter() - bas) * 1000, 1),
+            "sorgu": okunan_gun,
+        }
+
+        _soguk_onbellek()
+        bas = time.perf_counter()
+        naif_sonuc = naif(idler, baslangic, bitis, args.adet)
+        rapor["naif"] = {
+            "sure_ms": round((time.perf_counter() - bas) * 1000, 1),
+            "sorgu": slot_motoru.onbellek.iskalama,
+        }
+
+        rapor["ayni_sonuc"] = tembel == naif_sonuc
+        rapor["ilk_slot"] = f"{tembel[0][0]} {slot_motoru.dakika_str(tembel[0][1])}" if tembel else None
+    finally:
+        temizle()
+
+    print(json.dumps(rapor, indent=2, ensure_ascii=False))
+    if not rapor["ayni_sonuc"]:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
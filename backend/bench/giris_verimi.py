@@ -0,0 +1,127 @@
+"""Giriş verimi: bcrypt süreç havuzu boyutuna göre giriş/sn.
+
+backend dizininden, benchmark veritabanında (bkz. bench/ortam.py) çalıştırılır:
+
+    BENCH_DB_NAME=dis_randevu_bench python -m bench.giris_verimi --thread 32 --istek 400 --havuz 0,1,2,4
+
+Geçici bir hasta oluşturur ve /patient_login uç noktasını Flask test
+istemcisiyle, eşzamanlı thread'lerden çağırır. Her havuz boyutu için
+giriş/sn, gecikme yüzdelikleri ve ölçüm sırasında kullanımdaki en fazla DB
+bağlantısı raporlanır. Havuz boyutu 0, hash'in istek thread'inde çalıştığı
+(eski) durumdur. Test verisi sonunda silinir.
+"""
+from bench import ortam  # noqa: F401  (db'den önce: DB_NAME'i ayarlar)
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import sifreleme
+from app import app
+from db import db_baglantisi, havuz
+
+
+def _yuzdelik(sirali, oran):
+    return sirali[min(len(sirali) - 1, int(len(sirali) * oran))]
+
+
+def _kos(tc, sifre, istek_sayisi, thread_sayisi):
+    sureler = []
+    hatalar = {}
+    kilit = threading.Lock()
+    yerel = threading.local()
+    max_kullanimda = 0
+    bitti = threading.Event()
+
+    def izle():
+        nonlocal max_kullanimda
+        while not bitti.wait(0.01):
+            max_kullanimda = max(max_kullanimda, havuz().istatistikler()["kullanimda"])
+
+    def tek(_):
+        if not hasattr(yerel, "istemci"):
+            yerel.istemci = app.test_client()
+        bas = time.perf_counter()
+        yanit = yerel.istemci.post('/patient_login', json={"tc_kimlik_no": tc, "sifre": sifre})
+        sure = time.perf_counter() - bas
+        with kilit:
+            if yanit.status_code == 200:
+                sureler.append(sure)
+            else:
+                hatalar[yanit.status_code] = hatalar.get(yanit.status_code, 0) + 1
+
+    izleyici = threading.Thread(target=izle, daemon=True)
+    izleyici.start()
+    baslangic = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=thread_sayisi) as havuz_:
+        list(havuz_.map(tek, range(istek_sayisi)))
+    toplam = time.perf_counter() - baslangic
+    bitti.set()
+    izleyici.join()
+
+    sureler.sort()
+    return {
+        "basarili": len(sureler),
+        "hatalar": hatalar,
+        "sure_sn": round(toplam, 3),
+        "giris_per_sn": round(len(sureler) / toplam, 1),
+        "p50_ms": round(_yuzdelik(sureler, 0.50) * 1000, 1) if sureler else None,
+        "p95_ms": round(_yuzdelik(sureler, 0.95) * 1000, 1) if sureler else None,
+        "max_db_kullanimda": max_kullanimda,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--thread', type=int, default=32)
+    parser.add_argument('--istek', type=int, default=400)
+    parser.add_argument('--havuz', default=f"0,1,2,{os.cpu_count() or 2}",
+                        help="Virgülle ayrılmış süreç havuzu boyutları")
+    parser.add_argument('--maliyet', type=int, default=10, help="bcrypt maliyeti")
+    args = parser.parse_args()
+
+    sifre = "bench-sifre"
+    sifreleme.config.SIFRE_BCRYPT_MALIYETI = args.maliyet
+    hash_ = sifreleme.SifreHavuzu(0, 1, 1).calistir(
+        sifreleme._hashle, sifre.encode('utf-8'), args.maliyet
+    ).decode('utf-8')
+
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO hastalar (ad, soyad, tc_kimlik_no, sifre)
+            VALUES ('Bench', 'Giris', 'bench_' || md5(random()::text), %s)
+            RETURNING hasta_id, tc_kimlik_no
+        """, (hash_,))
+        hasta_id, tc = cursor.fetchone()
+        conn.commit()
+
+    rapor = {
+        "thread": args.thread,
+        "istek": args.istek,
+        "maliyet": args.maliyet,
+        "cpu": os.cpu_count(),
+        "db_havuz_max": havuz().max_boyut,
+        "sonuclar": {},
+    }
+    try:
+        for boyut in (int(x) for x in args.havuz.split(',')):
+            sifre_havuzu = sifreleme.SifreHavuzu(boyut, args.thread, 60)
+            sifreleme._havuz = sifre_havuzu
+            # Süreç başlatma maliyeti ölçüme karışmasın
+            for _ in range(max(boyut, 1)):
+                sifre_havuzu.calistir(sifreleme._dogrula, b"x", hash_.encode('utf-8'))
+            rapor["sonuclar"][str(boyut)] = _kos(tc, sifre, args.istek, args.thread)
+            sifre_havuzu.kapat()
+    finally:
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            cursor.execute("DELETE FROM hastalar WHERE hasta_id = %s", (hasta_id,))
+            conn.commit()
+
+    print(json.dumps(rapor, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+"""Benchmark veritabanı seçimi.
+
+Uç nokta benchmark'ı ve tohumlama, uygulamanın asıl veritabanına değil
+``BENCH_DB_NAME`` (varsayılan ``dis_randevu_bench``) veritabanına bağlanır.
+Bu modül config/db içe aktarılmadan önce içe aktarılmalıdır; DB_NAME'i
+buna göre ayarlar. Bağlantının diğer ayarları (DB_HOST, DB_USER, ...)
+olduğu gibi kullanılır.
+
+Canlı slot akışları (SSE) ilk durum olayından sonra hemen kapanır
+(``SSE_MAX_SURE=0``, ayrıca verilmemişse); böylece akış uç noktası da diğerleri
+gibi tek bir istek olarak ölçülür. Yüklenen belgeler ölçüm sırasında arka
+planda işlenmez (``BELGE_ISLEME_ACIK=0``); iş kuyrukta bekler. Analitik
+mutabakatı da ölçümün ortasında çalışmasın diye kapalıdır; yazmaların
+eklediği gün işaretleri ölçüme dahildir, işaretler birikir.
+"""
+import os
+
+VERITABANI = os.environ.get('BENCH_DB_NAME', 'dis_randevu_bench')
+os.environ['DB_NAME'] = VERITABANI
+os.environ.setdefault('SSE_MAX_SURE', '0')
+os.environ.setdefault('BELGE_ISLEME_ACIK', '0')
+os.environ.setdefault('ANALITIK_MUTABAKAT_ACIK', '0')
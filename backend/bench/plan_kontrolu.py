@@ -0,0 +1,252 @@
+"""Route sorgularının planlarında sıralı tarama (Seq Scan) kontrolü.
+
+backend dizininden, benchmark veritabanında (bkz. bench/ortam.py),
+migration'lar uygulandıktan sonra çalıştırılır:
+
+    BENCH_DB_NAME=dis_randevu_bench python -m bench.plan_kontrolu --doktor 2000 --hasta 20000 --gun 30
+
+Tek bir işlem içinde sentetik veri ekler, ANALYZE çalıştırır, sık kullanılan
+route sorgularını EXPLAIN ile planlatır ve büyük tablolardan birini sıralı
+tarayan sorguları raporlar: WHERE koşulunu satır satır süzen (Filter) bir
+tarama, indeks bulunamadığı anlamına gelir. Koşulsuz tam tarama, küçük bir
+tabloyu hash join için okumak planlayıcının meşru bir seçimi olabileceğinden
+yalnızca tahmini satır sayısı eşiği aşınca raporlanır.
+
+İşlem sonunda geri alınır; veritabanında hiçbir şey kalmaz. Sıralı tarama
+bulunursa çıkış kodu 1'dir.
+
+Sorgular route'ların kullandığı sabitlerden içe aktarılır (route_sorgulari,
+slot_motoru, kapali_araliklar, randevu_gecmisi, analitik); burada kopya
+tutulmaz. Doktor listesi ve en erken slot aramasındaki doktor seçimi bellekteki
+dizinden (doktor_dizini) yapıldığından veritabanı sorgusu yoktur.
+"""
+from bench import ortam  # noqa: F401  (db'den önce: DB_NAME'i ayarlar)
+
+import argparse
+import json
+import sys
+from datetime import date, time, timedelta
+
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+
+from calisma_programi import sablon_dakikalari
+from db import db_baglantisi
+import analitik
+import randevu_gecmisi
+from kapali_araliklar import TEK_SLOT_SIL_SORGUSU
+from route_sorgulari import (
+    DOKTOR_GIRIS_SORGUSU, GUNLUK_RANDEVULAR_SORGUSU, HASTA_GIRIS_SORGUSU,
+    RANDEVU_OLUSTUR_SORGUSU, RANDEVU_SIL_SORGUSU, SIRADAKI_RANDEVU_SORGUSU,
+)
+from slot_motoru import IZGARA_SORGUSU, TOPLU_IZGARA_SORGUSU, takvim_sorgusu
+
+# Sıralı taranması kabul edilmeyen tablolar (doktor_ayarlar gibi küçük
+# tablolar bilerek dışarıda)
+IZLENEN_TABLOLAR = {
+    'randevular', 'kapali_araliklar', 'slot_sablonlari', 'doktorlar', 'hastalar', 'adres',
+    'analitik_ozet', 'analitik_saatlik', 'analitik_kirli_gunler',
+}
+
+SORGULAR = [
+    ("slot_izgarasi", IZGARA_SORGUSU),
+    ("toplu_izgara", TOPLU_IZGARA_SORGUSU),
+    ("takvim", takvim_sorgusu()),
+    ("takvim_izgarali", takvim_sorgusu(izgaralar=True)),
+    ("doktor_panosu_takvim", takvim_sorgusu(randevular=True)),
+    ("doktor_panosu_siradaki", SIRADAKI_RANDEVU_SORGUSU),
+    ("randevu_olustur", RANDEVU_OLUSTUR_SORGUSU),
+    ("randevu_sil", RANDEVU_SIL_SORGUSU),
+    ("doktor_girisi", DOKTOR_GIRIS_SORGUSU),
+    ("hasta_girisi", HASTA_GIRIS_SORGUSU),
+    ("doktor_gunluk_randevulari", GUNLUK_RANDEVULAR_SORGUSU),
+    ("kapali_slot_ac", TEK_SLOT_SIL_SORGUSU),
+    ("randevu_gecmisi", randevu_gecmisi.sorgu('tum')),
+    ("randevu_gecmisi_sayfa", randevu_gecmisi.sorgu('gecmis', imlecli=True)),
+    ("gelecek_randevular", randevu_gecmisi.sorgu('gelecek', imlecli=True)),
+    ("analitik_donem_isaretleri", analitik.DONEM_ISARETLERI_SORGUSU),
+    ("analitik_donem_gunleri", analitik.DONEM_GUN_SAYISI_SORGUSU),
+    ("analitik_ozet", analitik.OZET_SORGUSU),
+    ("analitik_saatlik", analitik.SAATLIK_SORGUSU),
+]
+
+_ISARET = 'PlanKontrolu'
+
+
+def veri_ekle(cursor, doktor_sayisi, hasta_sayisi, gun_sayisi, baslangic):
+    cursor.execute("""
+        WITH a AS (
+            INSERT INTO adres (il, ilce, tamadres)
+            SELECT 'Il' || (g %% 81), 'Ilce' || (g %% 973), %(isaret)s
+            FROM generate_series(1, %(doktor)s) AS g
+            RETURNING adres_id
+        )
+        INSERT INTO doktorlar (ad, soyad, kullanici_adi, tc_kimlik_no, brans, adres_id)
+        SELECT 'Plan', %(isaret)s, 'plan_dr_' || adres_id, 'plan_dr_' || adres_id, 'Genel', adres_id
+        FROM a
+    """, {"doktor": doktor_sayisi, "isaret": _ISARET})
+
+    cursor.execute("""
+        INSERT INTO doktor_ayarlar
+            (doktor_id, baslangic_saat, baslangic_dakika, bitis_saat, bitis_dakika, randevu_aralik)
+        SELECT doktor_id, 9, 0, 17, 0, 30 FROM doktorlar WHERE soyad = %(isaret)s
+    """, {"isaret": _ISARET})
+
+    cursor.execute("""
+        INSERT INTO slot_sablonlari (doktor_id, haftanin_gunu, versiyon, dakikalar)
+        SELECT doktor_id, g, 1, %(dakikalar)s
+        FROM doktorlar, generate_series(1, 7) AS g
+        WHERE soyad = %(isaret)s
+    """, {"isaret": _ISARET, "dakikalar": list(sablon_dakikalari(9 * 60, 17 * 60, 30))})
+
+    cursor.execute("""
+        INSERT INTO hastalar (ad, soyad, tc_kimlik_no, kullanici_adi)
+        SELECT 'Plan', %(isaret)s, 'plan_' || g, 'plan_' || g
+        FROM generate_series(1, %(hasta)s) AS g
+    """, {"hasta": hasta_sayisi, "isaret": _ISARET})
+
+    # Her doktora her gün dört randevu ve bir kapalı saat
+    cursor.execute("""
+        INSERT INTO randevular (doktor_id, hasta_id, tarih, saat)
+        SELECT d.doktor_id,
+               h.idler[1 + (d.doktor_id * 7919 + g * 31 + k) %% h.n],
+               %(baslangic)s::date + g,
+               time '09:00' + k * interval '30 minutes'
+        FROM (SELECT doktor_id FROM doktorlar WHERE soyad = %(isaret)s) d,
+             (SELECT array_agg(hasta_id) AS idler, count(*) AS n FROM hastalar WHERE soyad = %(isaret)s) h,
+             generate_series(0, %(gun)s - 1) AS g,
+             generate_series(0, 3) AS k
+    """, {"isaret": _ISARET, "gun": gun_sayisi, "baslangic": baslangic})
+
+    cursor.execute("""
+        INSERT INTO kapali_araliklar (doktor_id, baslangic_tarih, bitis_tarih, baslangic_dk, bitis_dk)
+        SELECT doktor_id, %(baslangic)s::date + g, %(baslangic)s::date + g, 960, 961
+        FROM doktorlar, generate_series(0, %(gun)s - 1) AS g
+        WHERE soyad = %(isaret)s
+    """, {"isaret": _ISARET, "gun": gun_sayisi, "baslangic": baslangic})
+
+    # Analitik özetleri: her doktora her gün ve hafta için bir satır, dolu
+    # saatler için saat dilimi satırları
+    cursor.execute("""
+        INSERT INTO analitik_ozet (doktor_id, donem, baslangic, gun_sayisi, bos, dolu)
+        SELECT doktor_id, 'gun', %(baslangic)s::date + g, 1, 12, 4
+        FROM doktorlar, generate_series(0, %(gun)s - 1) AS g
+        WHERE soyad = %(isaret)s
+        UNION ALL
+        SELECT DISTINCT doktor_id, 'hafta', date_trunc('week', %(baslangic)s::date + g)::date, 7, 84, 28
+        FROM doktorlar, generate_series(0, %(gun)s - 1) AS g
+        WHERE soyad = %(isaret)s
+    """, {"isaret": _ISARET, "gun": gun_sayisi, "baslangic": baslangic})
+    cursor.execute("""
+        INSERT INTO analitik_saatlik (doktor_id, donem, baslangic, saat, randevu)
+        SELECT o.doktor_id, o.donem, o.baslangic, s, 1
+        FROM analitik_ozet o
+        JOIN doktorlar d ON d.doktor_id = o.doktor_id AND d.soyad = %(isaret)s,
+             generate_series(9, 10) AS s
+    """, {"isaret": _ISARET})
+
+    # Mutabakat işi çalışmıyormuş gibi birikmiş gün işaretleri
+    cursor.execute("""
+        INSERT INTO analitik_kirli_gunler (doktor_id, tarih)
+        SELECT doktor_id, %(baslangic)s::date + g
+        FROM doktorlar, generate_series(0, %(gun)s - 1) AS g
+        WHERE soyad = %(isaret)s
+    """, {"isaret": _ISARET, "gun": gun_sayisi, "baslangic": baslangic})
+
+    for tablo in ('adres', 'doktorlar', 'doktor_ayarlar', 'slot_sablonlari', 'hastalar', 'randevular',
+                  'kapali_araliklar', 'analitik_ozet', 'analitik_saatlik', 'analitik_kirli_gunler'):
+        cursor.execute(f"ANALYZE {tablo}")
+
+
+def _parametreler(cursor, baslangic):
+    # En erken slot araması bir ilçedeki doktorları toplu okur
+    cursor.execute("""
+        SELECT doktor_id, kullanici_adi
+        FROM doktorlar
+        WHERE soyad = %s
+        ORDER BY doktor_id
+        LIMIT 50
+    """, (_ISARET,))
+    doktorlar = cursor.fetchall()
+    doktor = doktorlar[0]
+    cursor.execute("""
+        SELECT r.randevu_id, r.hasta_id, h.tc_kimlik_no
+        FROM randevular r JOIN hastalar h ON h.hasta_id = r.hasta_id
+        WHERE r.doktor_id = %s
+        LIMIT 1
+    """, (doktor['doktor_id'],))
+    randevu = cursor.fetchone()
+    return {
+        "doktor_id": doktor['doktor_id'],
+        "idler": [d['doktor_id'] for d in doktorlar],
+        "kullanici_adi": doktor['kullanici_adi'],
+        "hasta_id": randevu['hasta_id'],
+        "tc": randevu['tc_kimlik_no'],
+        "randevu_id": randevu['randevu_id'],
+        "tarih": baslangic,
+        "saat": time(10, 0),
+        "baslangic": baslangic,
+        "bitis": baslangic + timedelta(days=30),
+        "bugun": baslangic,
+        "su_an": time(12, 0),
+        "i_tarih": baslangic + timedelta(days=3),
+        "i_saat": time(10, 0),
+        "i_id": randevu['randevu_id'],
+        "limit": 101,
+        "dakika": 600,
+        "donem": 'gun',
+    }
+
+
+def _sirali_taramalar(plan, esik):
+    bulunan = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in IZLENEN_TABLOLAR:
+        if 'Filter' in plan or plan.get('Plan Rows', 0) >= esik:
+            bulunan.append(plan['Relation Name'])
+    for alt in plan.get('Plans', ()):
+        bulunan.extend(_sirali_taramalar(alt, esik))
+    return bulunan
+
+
+def kontrol_et(doktor_sayisi, hasta_sayisi, gun_sayisi, tam_tarama_esigi=10000):
+    baslangic = date.today()
+    sonuc = {}
+    with db_baglantisi() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        try:
+            veri_ekle(cursor, doktor_sayisi, hasta_sayisi, gun_sayisi, baslangic)
+            parametreler = _parametreler(cursor, baslangic)
+
+            for ad, sorgu in SORGULAR:
+                if not isinstance(sorgu, sql.Composable):
+                    sorgu = sql.SQL(sorgu)
+                cursor.execute(sql.SQL("EXPLAIN (FORMAT JSON) ") + sorgu, parametreler)
+                plan = cursor.fetchone()['QUERY PLAN'][0]['Plan']
+                sonuc[ad] = {
+                    "sirali_tarama": sorted(set(_sirali_taramalar(plan, tam_tarama_esigi))),
+                    "maliyet": plan['Total Cost'],
+                }
+        finally:
+            conn.rollback()
+    return sonuc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--doktor', type=int, default=2000)
+    parser.add_argument('--hasta', type=int, default=20000)
+    parser.add_argument('--gun', type=int, default=30)
+    parser.add_argument('--tam-tarama-esigi', type=int, default=10000,
+                        help="Koşulsuz tam taramanın raporlanacağı tahmini satır sayısı")
+    args = parser.parse_args()
+
+    sonuc = kontrol_et(args.doktor, args.hasta, args.gun, args.tam_tarama_esigi)
+    print(json.dumps(sonuc, indent=2, ensure_ascii=False))
+
+    sorunlu = [ad for ad, s in sonuc.items() if s["sirali_tarama"]]
+    if sorunlu:
+        print("Sıralı tarama yapan sorgular: " + ", ".join(sorunlu), file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Randevu oluşturma için eşzamanlılık stres testi ve verim karşılaştırması.
+
+backend dizininden, benchmark veritabanında (bkz. bench/ortam.py) çalıştırılır:
+
+    BENCH_DB_NAME=dis_randevu_bench python -m bench.randevu_stres --thread 32 --istek 2000
+
+Geçici bir doktor ve hasta oluşturur, iki senaryoyu hem eski (SELECT, SELECT,
+INSERT) akışla hem de tek ifadelik RANDEVU_OLUSTUR_SORGUSU ile koşturur ve
+sonuçları JSON olarak yazar:
+
+* ayni_slot: tüm thread'ler aynı slotu almaya çalışır; tam olarak bir
+  rezervasyon başarılı olmalıdır.
+* farkli_slotlar: her istek farklı bir slot alır; verim (rezervasyon/sn)
+  ölçülür.
+
+Yerel bir veritabanında round trip neredeyse bedavadır; gerçek ağ gecikmesinin
+etkisini görmek için --rtt-ms ile her round trip'e (execute ve commit) yapay
+gecikme eklenebilir.
+
+Eski akış, benzersiz indeks yüzünden çift kayıt yazamaz; indeks ihlaline
+düşen her deneme "cift_rezervasyon_denemesi" olarak sayılır (indeks olmasaydı
+bunlar çift rezervasyon olurdu). Test verisi sonunda silinir.
+"""
+from bench import ortam  # noqa: F401  (db'den önce: DB_NAME'i ayarlar)
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import psycopg2
+
+from db import db_baglantisi, havuz
+from route_sorgulari import RANDEVU_OLUSTUR_SORGUSU
+
+RTT_SN = 0.0
+
+
+def _round_trip():
+    if RTT_SN:
+        time.sleep(RTT_SN)
+
+
+def eski_rezervasyon(doktor_id, hasta_id, tarih, saat):
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        _round_trip()
+        cursor.execute("""
+            SELECT 1 FROM randevular
+            WHERE doktor_id = %s AND tarih = %s AND saat = %s
+        """, (doktor_id, tarih, saat))
+        if cursor.fetchone():
+            return "dolu"
+        _round_trip()
+        cursor.execute("SELECT kapali_mi(%s, %s, %s)", (doktor_id, tarih, saat))
+        if cursor.fetchone()[0]:
+            return "kapali"
+        try:
+            _round_trip()
+            cursor.execute("""
+                INSERT INTO randevular (doktor_id, hasta_id, tarih, saat)
+                VALUES (%s, %s, %s, %s)
+            """, (doktor_id, hasta_id, tarih, saat))
+            _round_trip()
+            conn.commit()
+        except psycopg2.IntegrityError:
+            conn.rollback()
+            return "cift_rezervasyon_denemesi"
+        return "basarili"
+
+
+def yeni_rezervasyon(doktor_id, hasta_id, tarih, saat):
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        _round_trip()
+        cursor.execute(RANDEVU_OLUSTUR_SORGUSU, {
+            "doktor_id": doktor_id, "hasta_id": hasta_id, "tarih": tarih, "saat": saat
+        })
+        randevu_id, dolu, kapali = cursor.fetchone()
+        _round_trip()
+        conn.commit()
+    if randevu_id is not None:
+        return "basarili"
+    return "kapali" if kapali and not dolu else "dolu"
+
+
+def _slot(i):
+    # Her gün 24 * 60 farklı dakika; istek sayısı büyükse sonraki günlere taşar
+    gun, dakika = divmod(i, 24 * 60)
+    return date(2100, 1, 1) + timedelta(days=gun), f"{dakika // 60:02d}:{dakika % 60:02d}"
+
+
+def _kos(fonksiyon, istekler, thread_sayisi):
+    sayac = {}
+    kilit = threading.Lock()
+
+    def tek(arg):
+        sonuc = fonksiyon(*arg)
+        with kilit:
+            sayac[sonuc] = sayac.get(sonuc, 0) + 1
+
+    baslangic = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=thread_sayisi) as havuz_:
+        list(havuz_.map(tek, istekler))
+    sure = time.perf_counter() - baslangic
+    return {
+        "sonuclar": sayac,
+        "sure_sn": round(sure, 3),
+        "istek_per_sn": round(len(istekler) / sure, 1),
+    }
+
+
+def _slottaki_kayit(doktor_id, tarih, saat):
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT count(*) FROM randevular
+            WHERE doktor_id = %s AND tarih = %s AND saat = %s
+        """, (doktor_id, tarih, saat))
+        return cursor.fetchone()[0]
+
+
+def _temizle(doktor_id):
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM randevular WHERE doktor_id = %s", (doktor_id,))
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--thread', type=int, default=32)
+    parser.add_argument('--istek', type=int, default=2000)
+    parser.add_argument('--rtt-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    global RTT_SN
+    RTT_SN = args.rtt_ms / 1000.0
+
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO doktorlar (ad, soyad, kullanici_adi)
+            VALUES ('Stres', 'Test', 'stres_' || md5(random()::text))
+            RETURNING doktor_id
+        """)
+        doktor_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO hastalar (ad, soyad, tc_kimlik_no)
+            VALUES ('Stres', 'Test', 'stres_' || md5(random()::text))
+            RETURNING hasta_id
+        """)
+        hasta_id = cursor.fetchone()[0]
+        conn.commit()
+
+    rapor = {
+        "thread": args.thread,
+        "istek": args.istek,
+        "rtt_ms": args.rtt_ms,
+        "havuz_max": havuz().max_boyut
+    }
+    try:
+        for ad, fonksiyon in (("yeni", yeni_rezervasyon), ("eski", eski_rezervasyon)):
+            tarih, saat = _slot(0)
+            ayni = _kos(fonksiyon, [(doktor_id, hasta_id, tarih, saat)] * args.istek, args.thread)
+            ayni["slottaki_kayit"] = _slottaki_kayit(doktor_id, tarih, saat)
+            _temizle(doktor_id)
+
+            farkli = _kos(
+                fonksiyon,
+                [(doktor_id, hasta_id) + _slot(i) for i in range(args.istek)],
+                args.thread
+            )
+            _temizle(doktor_id)
+
+            rapor[ad] = {"ayni_slot": ayni, "farkli_slotlar": farkli}
+
+        rapor["verim_orani"] = round(
+            rapor["yeni"]["farkli_slotlar"]["istek_per_sn"] / rapor["eski"]["farkli_slotlar"]["istek_per_sn"], 2
+        )
+        rapor["cift_rezervasyon_yok"] = rapor["yeni"]["ayni_slot"]["slottaki_kayit"] == 1 \
+            and rapor["yeni"]["ayni_slot"]["sonuclar"].get("basarili") == 1
+    finally:
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            cursor.execute("DELETE FROM randevular WHERE doktor_id = %s", (doktor_id,))
+            cursor.execute("DELETE FROM doktorlar WHERE doktor_id = %s", (doktor_id,))
+            cursor.execute("DELETE FROM hastalar WHERE hasta_id = %s", (hasta_id,))
+            conn.commit()
+
+    print(json.dumps(rapor, indent=2, ensure_ascii=False))
+    if not rapor["cift_rezervasyon_yok"]:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""Benchmark veritabanını gerçekçi hacimde veriyle doldurur.
+
+backend dizininden:
+
+    BENCH_DB_NAME=dis_randevu_bench python -m bench.tohum --sifirla
+
+Veritabanı yoksa oluşturulur ve migration'lar uygulanır. Varsayılan hacim
+5 bin doktor, 500 bin hasta ve yaklaşık 5 milyon randevudur; --doktor,
+--hasta ve --randevu ile küçültülebilir. Dolu bir veritabanına yalnızca
+--sifirla ile (tablolar boşaltılarak) yazılır.
+
+Doktorlar üç çalışma programından birini alır (hafta sonu kapalı, öğle
+molalı vb.); şablonlar calisma_programi ile üretilir. Randevular, bugünden
+--gun-geri gün öncesi ile --gun-ileri gün sonrası arasındaki gerçek slotlara
+rastgele ama tekrarlanabilir (setseed) dağıtılır. Her doktora bir tatil
+haftası ve birkaç kapalı slot eklenir; bazılarına haftalık kapalı blok.
+
+Bütün kullanıcıların şifresi SIFRE'dir (bench.uc_noktalar giriş
+senaryolarında kullanır).
+"""
+from bench import ortam  # noqa: F401  (db'den önce: DB_NAME'i ayarlar)
+
+import argparse
+import json
+import sys
+import time
+from datetime import date, timedelta
+
+import psycopg2
+
+import config
+import migrate
+from calisma_programi import gun_sablonlari
+from db import db_baglantisi
+from sifreleme import sifre_hashle
+
+SIFRE = 'bench123'
+
+TABLOLAR = (
+    'adres', 'doktorlar', 'hastalar', 'doktor_ayarlar', 'doktor_programi', 'doktor_molalari',
+    'slot_sablonlari', 'randevular', 'kapali_araliklar', 'surumler', 'belge_bloblari',
+)
+
+# (il, ilçeler, ağırlık): büyük şehirlerde daha çok doktor olur
+ILLER = [
+    ('İstanbul', ['Kadıköy', 'Beşiktaş', 'Üsküdar', 'Şişli', 'Bakırköy', 'Ataşehir',
+                  'Maltepe', 'Kartal', 'Pendik', 'Sarıyer', 'Esenyurt', 'Fatih'], 12),
+    ('Ankara', ['Çankaya', 'Keçiören', 'Yenimahalle', 'Mamak', 'Etimesgut', 'Sincan'], 5),
+    ('İzmir', ['Konak', 'Karşıyaka', 'Bornova', 'Buca', 'Çiğli', 'Bayraklı'], 4),
+    ('Bursa', ['Osmangazi', 'Nilüfer', 'Yıldırım'], 2),
+    ('Antalya', ['Muratpaşa', 'Konyaaltı', 'Kepez'], 2),
+    ('Adana', ['Seyhan', 'Çukurova', 'Yüreğir'], 1),
+    ('Konya', ['Selçuklu', 'Meram', 'Karatay'], 1),
+    ('Eskişehir', ['Tepebaşı', 'Odunpazarı'], 1),
+]
+
+ADLAR = ['Ahmet', 'Mehmet', 'Ayşe', 'Fatma', 'Emre', 'Zeynep', 'Elif', 'Can', 'Deniz', 'Burak',
+         'Selin', 'Mert', 'Ece', 'Kerem', 'Derya', 'Onur', 'Gizem', 'Hakan', 'Merve', 'Oğuz']
+SOYADLAR = ['Yılmaz', 'Kaya', 'Demir', 'Şahin', 'Çelik', 'Yıldız', 'Yıldırım', 'Öztürk',
+            'Aydın', 'Özdemir', 'Arslan', 'Doğan', 'Kılıç', 'Aslan', 'Çetin', 'Kara']
+BRANSLAR = ['Genel Diş Hekimliği', 'Ortodonti', 'Pedodonti', 'Periodontoloji', 'Endodonti',
+            'Protetik Diş Tedavisi', 'Restoratif Diş Tedavisi', 'Ağız, Diş ve Çene Cerrahisi']
+
+# Çalışma programları: (varsayılan, haftanın günü istisnaları, molalar);
+# doktor_id % len(PROGRAMLAR) ile seçilir
+PROGRAMLAR = [
+    ((9 * 60, 17 * 60, 30), {6: None, 7: None}, [(0b0011111, 12 * 60, 13 * 60)]),
+    ((8 * 60 + 30, 16 * 60 + 30, 20), {7: None}, []),
+    ((10 * 60, 18 * 60, 15), {6: (10 * 60, 14 * 60, 15), 7: None}, [(None, 13 * 60, 13 * 60 + 30)]),
+]
+
+
+def _log(mesaj):
+    print(f"[{time.strftime('%H:%M:%S')}] {mesaj}", file=sys.stderr, flush=True)
+
+
+def veritabani_olustur():
+    ayarlar = dict(config.DB_AYARLARI, dbname='postgres')
+    conn = psycopg2.connect(**ayarlar)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (ortam.VERITABANI,))
+            if cursor.fetchone() is None:
+                cursor.execute(f'CREATE DATABASE "{ortam.VERITABANI}"')
+                _log(f"{ortam.VERITABANI} oluşturuldu")
+    finally:
+        conn.close()
+
+
+def bosalt(cursor, sifirla):
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM doktorlar) OR EXISTS (SELECT 1 FROM hastalar)")
+    if cursor.fetchone()[0]:
+        if not sifirla:
+            raise SystemExit(f"{ortam.VERITABANI} boş değil; yeniden doldurmak için --sifirla")
+        cursor.execute(f"TRUNCATE {', '.join(TABLOLAR)} RESTART IDENTITY CASCADE")
+
+
+def doktorlari_ekle(cursor, doktor_sayisi, sifre_hash):
+    ciftler = [(il, ilce) for il, ilceler, agirlik in ILLER for ilce in ilceler for _ in range(agirlik)]
+    cursor.execute("""
+        INSERT INTO adres (il, ilce, tamadres)
+        SELECT (%(iller)s::text[])[1 + (g * 7919) %% %(n)s], (%(ilceler)s::text[])[1 + (g * 7919) %% %(n)s],
+               'Bench Sok. No:' || g
+        FROM generate_series(1, %(doktor)s) AS g
+    """, {"iller": [c[0] for c in ciftler], "ilceler": [c[1] for c in ciftler],
+          "n": len(ciftler), "doktor": doktor_sayisi})
+    cursor.execute("""
+        INSERT INTO doktorlar (ad, soyad, tc_kimlik_no, brans, dogum_tarihi, cinsiyet,
+                               kullanici_adi, sifre, adres_id)
+        SELECT (%(adlar)s::text[])[1 + g %% array_length(%(adlar)s, 1)],
+               (%(soyadlar)s::text[])[1 + (g / 7) %% array_length(%(soyadlar)s, 1)],
+               lpad((20000000000 + g)::text, 11, '0'),
+               (%(branslar)s::text[])[1 + (g / 3) %% array_length(%(branslar)s, 1)],
+               date '1960-01-01' + (g * 37) %% 12000,
+               CASE WHEN g %% 2 = 0 THEN 'Kadın' ELSE 'Erkek' END,
+               'dr' || g, %(sifre)s, g
+        FROM generate_series(1, %(doktor)s) AS g
+    """, {"adlar": ADLAR, "soyadlar": SOYADLAR, "branslar": BRANSLAR,
+          "sifre": sifre_hash, "doktor": doktor_sayisi})
+
+
+def programlari_ekle(cursor):
+    program_sayisi = len(PROGRAMLAR)
+    for i, (varsayilan, gunler, molalar) in enumerate(PROGRAMLAR):
+        baslangic, bitis, aralik = varsayilan
+        parametre = {"n": program_sayisi, "i": i}
+        cursor.execute("""
+            INSERT INTO doktor_ayarlar
+                (doktor_id, baslangic_saat, baslangic_dakika, bitis_saat, bitis_dakika, randevu_aralik)
+            SELECT doktor_id, %s, %s, %s, %s, %s FROM doktorlar WHERE doktor_id %% %s = %s
+        """, (baslangic // 60, baslangic % 60, bitis // 60, bitis % 60, aralik, program_sayisi, i))
+        for gun, saatler in gunler.items():
+            cursor.execute("""
+                INSERT INTO doktor_programi (doktor_id, haftanin_gunu, calisir, baslangic_dk, bitis_dk, randevu_aralik)
+                SELECT doktor_id, %(gun)s, %(calisir)s, %(bas)s, %(bit)s, %(aralik)s
+                FROM doktorlar WHERE doktor_id %% %(n)s = %(i)s
+            """, dict(parametre, gun=gun, calisir=saatler is not None, **dict(zip(
+                ("bas", "bit", "aralik"), saatler or (0, 0, 0)))))
+        for maske, bas, bit in molalar:
+            cursor.execute("""
+                INSERT INTO doktor_molalari (doktor_id, haftanin_gunleri, baslangic_dk, bitis_dk)
+                SELECT doktor_id, %(maske)s, %(bas)s, %(bit)s FROM doktorlar WHERE doktor_id %% %(n)s = %(i)s
+            """, dict(parametre, maske=maske, bas=bas, bit=bit))
+        for gun, dakikalar in gun_sablonlari(varsayilan, gunler, molalar).items():
+            cursor.execute("""
+                INSERT INTO slot_sablonlari (doktor_id, haftanin_gunu, versiyon, dakikalar)
+                SELECT doktor_id, %(gun)s, 1, %(dakikalar)s FROM doktorlar WHERE doktor_id %% %(n)s = %(i)s
+            """, dict(parametre, gun=gun, dakikalar=list(dakikalar)))
+
+
+def hastalari_ekle(cursor, hasta_sayisi, sifre_hash):
+    cursor.execute("""
+        INSERT INTO hastalar (ad, soyad, tc_kimlik_no, dogum_tarihi, cinsiyet, kullanici_adi, sifre, adres)
+        SELECT (%(adlar)s::text[])[1 + (g / 3) %% array_length(%(adlar)s, 1)],
+               (%(soyadlar)s::text[])[1 + (g / 11) %% array_length(%(soyadlar)s, 1)],
+               lpad((10000000000 + g)::text, 11, '0'),
+               date '1940-01-01' + (g * 53) %% 29000,
+               CASE WHEN g %% 2 = 0 THEN 'Kadın' ELSE 'Erkek' END,
+               'hasta' || g, %(sifre)s, 'Bench Mah. No:' || g
+        FROM generate_series(1, %(hasta)s) AS g
+    """, {"adlar": ADLAR, "soyadlar": SOYADLAR, "sifre": sifre_hash, "hasta": hasta_sayisi})
+
+
+_ADAY_SLOTLAR = """
+    FROM slot_sablonlari s
+    CROSS JOIN generate_series(%(baslangic)s::date, %(bitis)s::date, interval '1 day') AS g
+    CROSS JOIN LATERAL unnest(s.dakikalar) AS dk
+    WHERE s.haftanin_gunu = EXTRACT(ISODOW FROM g)
+"""
+
+
+def randevulari_ekle(cursor, randevu_sayisi, baslangic, bitis):
+    parametre = {"baslangic": baslangic, "bitis": bitis}
+    cursor.execute("SELECT count(*) " + _ADAY_SLOTLAR, parametre)
+    aday = cursor.fetchone()[0]
+    oran = min(1.0, randevu_sayisi / aday) if aday else 0.0
+    _log(f"{aday} aday slot, doluluk oranı {oran:.3f}")
+
+    cursor.execute("SELECT setseed(0.42)")
+    cursor.execute("SELECT min(hasta_id), max(hasta_id) FROM hastalar")
+    ilk_hasta, son_hasta = cursor.fetchone()
+    cursor.execute("""
+        INSERT INTO randevular (doktor_id, hasta_id, tarih, saat)
+        SELECT s.doktor_id,
+               %(ilk)s + floor(random() * (%(son)s - %(ilk)s + 1))::int,
+               g::date,
+               make_time(dk / 60, dk %% 60, 0)
+    """ + _ADAY_SLOTLAR + """
+          AND random() < %(oran)s
+    """, dict(parametre, ilk=ilk_hasta, son=son_hasta, oran=oran))
+
+
+def kapali_araliklari_ekle(cursor, bugun):
+    # Tatil haftası (gelecek 90 gün içinde), üç tek slotluk kapatma ve
+    # doktorların onda birinde haftalık kapalı blok
+    cursor.execute("""
+        INSERT INTO kapali_araliklar (doktor_id, baslangic_tarih, bitis_tarih)
+        SELECT doktor_id, %(bugun)s::date + (doktor_id * 13) %% 90, %(bugun)s::date + (doktor_id * 13) %% 90 + 6
+        FROM doktorlar
+    """, {"bugun": bugun})
+    cursor.execute("""
+        INSERT INTO kapali_araliklar (doktor_id, baslangic_tarih, bitis_tarih, baslangic_dk, bitis_dk)
+        SELECT doktor_id, %(bugun)s::date + (doktor_id * k) %% 30, %(bugun)s::date + (doktor_id * k) %% 30,
+               600 + 60 * k, 601 + 60 * k
+        FROM doktorlar, generate_series(1, 3) AS k
+    """, {"bugun": bugun})
+    cursor.execute("""
+        INSERT INTO kapali_araliklar (doktor_id, baslangic_tarih, bitis_tarih, baslangic_dk, bitis_dk, haftanin_gunleri)
+        SELECT doktor_id, %(bugun)s::date, NULL, 15 * 60, 17 * 60, 1 << (doktor_id %% 5)
+        FROM doktorlar WHERE doktor_id %% 10 = 0
+    """, {"bugun": bugun})
+
+
+def tohumla(doktor_sayisi, hasta_sayisi, randevu_sayisi, gun_geri, gun_ileri, sifirla):
+    veritabani_olustur()
+    migrate.uygula()
+
+    bugun = date.today()
+    sifre_hash = sifre_hashle(SIFRE)
+    adimlar = [
+        ("doktorlar", lambda c: doktorlari_ekle(c, doktor_sayisi, sifre_hash)),
+        ("çalışma programları", programlari_ekle),
+        ("hastalar", lambda c: hastalari_ekle(c, hasta_sayisi, sifre_hash)),
+        ("randevular", lambda c: randevulari_ekle(
+            c, randevu_sayisi, bugun - timedelta(days=gun_geri), bugun + timedelta(days=gun_ileri))),
+        ("kapalı aralıklar", lambda c: kapali_araliklari_ekle(c, bugun)),
+    ]
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        bosalt(cursor, sifirla)
+        conn.commit()
+        for ad, adim in adimlar:
+            bas = time.perf_counter()
+            adim(cursor)
+            conn.commit()
+            _log(f"{ad}: {time.perf_counter() - bas:.1f} sn")
+
+    # ANALYZE işlem dışında çalışmalıdır
+    with db_baglantisi() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        finally:
+            conn.autocommit = False
+    return tablo_boyutlari()
+
+
+def tablo_boyutlari():
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        boyutlar = {}
+        for tablo in TABLOLAR:
+            cursor.execute(f"SELECT count(*) FROM {tablo}")
+            boyutlar[tablo] = cursor.fetchone()[0]
+    return boyutlar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--doktor', type=int, default=5000)
+    parser.add_argument('--hasta', type=int, default=500000)
+    parser.add_argument('--randevu', type=int, default=5000000)
+    parser.add_argument('--gun-geri', type=int, default=365)
+    parser.add_argument('--gun-ileri', type=int, default=90)
+    parser.add_argument('--sifirla', action='store_true', help="Dolu veritabanını boşaltıp yeniden doldur")
+    args = parser.parse_args()
+
+    boyutlar = tohumla(args.doktor, args.hasta, args.randevu, args.gun_geri, args.gun_ileri, args.sifirla)
+    print(json.dumps({"veritabani": ortam.VERITABANI, "tablolar": boyutlar}, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
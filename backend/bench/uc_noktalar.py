@@ -0,0 +1,722 @@
+"""Uç nokta benchmark'ı: app.py'deki her route, tohumlanmış veritabanında.
+
+backend dizininden, önce bench.tohum ile veritabanı doldurulduktan sonra:
+
+    BENCH_DB_NAME=dis_randevu_bench python -m bench.uc_noktalar --cikti sonuc.json
+    BENCH_DB_NAME=dis_randevu_bench python -m bench.uc_noktalar --karsilastir onceki.json
+
+İki aşama koşturulur:
+
+* test_istemcisi: her uç nokta Flask test istemcisiyle sırayla --istek kez
+  çağrılır. Gecikme yüzdelikleri ve istek başına SQL sorgusu sayısı (her
+  cursor.execute) ölçülür.
+* http: her uç nokta --sure saniye boyunca --thread eşzamanlı istemciyle
+  gerçek HTTP üzerinden çağrılır (varsayılan olarak süreç içinde başlatılan
+  çok thread'li werkzeug sunucusu; --url ile dışarıdaki bir sunucu, ör.
+  gunicorn). Gecikme yüzdelikleri ve verim (istek/sn) ölçülür.
+
+Her uç noktanın senaryosu SENARYOLAR'dadır; "#304" ile biten senaryolar aynı
+isteği If-None-Match ile gönderir. Yazma senaryoları yalnızca okuma
+senaryolarının kullanmadığı doktor/hastalara yazar. Senaryo gerektiriyorsa
+isteğin hazırlığı (ör. silinecek randevu, yükleme oturumu) ölçülmez.
+Senaryosu olmayan route'lar "kapsanmayan" altında raporlanır.
+
+Çıktı JSON'u commit'ler arasında karşılaştırılabilir; --karsilastir, p95'i
+--esik katından fazla kötüleşen ya da istek başına daha çok sorgu çalıştıran
+uç noktaları listeler ve çıkış kodu 1 ile biter.
+"""
+from bench import ortam  # noqa: F401  (db'den önce: DB_NAME'i ayarlar)
+
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import db
+
+BACKEND_DIZINI = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# --- İstek başına sorgu sayısı ------------------------------------------------
+
+_sayac = threading.local()
+
+
+def _sorgu_sayisi():
+    return getattr(_sayac, "n", 0)
+
+
+def _sorgu_say(cursor, sorgu, parametreler, sure):
+    _sayac.n = _sorgu_sayisi() + 1
+
+
+# Havuz ilk bağlantıyı açmadan önce; sorgular çağıran thread'in sayacında sayılır
+db.sorgu_izleyicisi_ekle(_sorgu_say)
+
+# --- Örnek veri ---------------------------------------------------------------
+
+BELGE = b'%PDF-1.4\n' + bytes(random.Random(7).getrandbits(8) for _ in range(64 * 1024))
+
+
+class Ornek:
+    """Senaryoların kullandığı, veritabanından seçilmiş id'ler ve tarihler."""
+
+    def __init__(self, db_baglantisi, tohum=42):
+        self._db_baglantisi = db_baglantisi
+        self._bos_slotlar = deque()
+        rnd = random.Random(tohum)
+        self.bugun = date.today()
+        self.gunler = [self.bugun + timedelta(days=i) for i in range(1, 15)]
+        self.gecmis_gunler = [self.bugun - timedelta(days=i) for i in range(1, 31)]
+        self._slot_gunu = self.bugun + timedelta(days=1)
+        self.sifre = os.environ.get('BENCH_SIFRE', 'bench123')
+        self._etaglar = {}
+        self._sayac = iter(range(10 ** 9))
+        self._kilit = threading.Lock()
+
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            # Yalnızca tohumlanmış (programı olan) doktorlar; kayıt senaryosunun
+            # eklediği doktorlar seçilmez
+            cursor.execute("""
+                SELECT doktor_id, kullanici_adi FROM doktorlar JOIN doktor_ayarlar USING (doktor_id)
+                ORDER BY doktor_id
+            """)
+            doktorlar = cursor.fetchall()
+            if len(doktorlar) < 4:
+                raise SystemExit("Veritabanında yeterli doktor yok; önce: python -m bench.tohum")
+            rnd.shuffle(doktorlar)
+            yarim = min(50, len(doktorlar) // 2)
+            self.doktorlar = [d for d, _ in doktorlar[:yarim]]
+            self.doktor_kullanicilari = [k for _, k in doktorlar[:yarim]]
+            self.yazma_doktorlari = [d for d, _ in doktorlar[yarim:2 * yarim]][:20]
+
+            cursor.execute("""
+                SELECT DISTINCT hasta_id FROM randevular
+                WHERE tarih >= current_date AND doktor_id = ANY(%s)
+            """, (self.doktorlar,))
+            hastalar = sorted(h for h, in cursor.fetchall())
+            rnd.shuffle(hastalar)
+            self.hastalar = hastalar[:50]
+            cursor.execute("""
+                SELECT hasta_id, tc_kimlik_no FROM hastalar
+                WHERE hasta_id <> ALL(%s) ORDER BY hasta_id LIMIT 20
+            """, (self.hastalar,))
+            satirlar = cursor.fetchall()
+            self.yazma_hastalari = [h for h, _ in satirlar]
+            self.hasta_tcleri = [tc for _, tc in satirlar]
+            if not self.hastalar or not self.yazma_hastalari:
+                raise SystemExit("Veritabanında randevusu olan hasta yok; önce: python -m bench.tohum")
+
+            cursor.execute("""
+                SELECT a.il, a.ilce FROM doktorlar d JOIN adres a USING (adres_id)
+                GROUP BY a.il, a.ilce ORDER BY count(*) DESC, a.il, a.ilce LIMIT 10
+            """)
+            self.konumlar = cursor.fetchall()
+
+
+    def sec(self, liste, i):
+        return liste[i % len(liste)]
+
+    def benzersiz(self):
+        with self._kilit:
+            return f"{os.getpid()}{int(time.time())}{next(self._sayac)}"
+
+    def bos_slot(self):
+        """Yazma doktorlarının daha önce verilmemiş boş bir slotu (oluşturma
+        ve silme senaryoları için). Slotlar yarından başlayarak haftalık
+        dilimler halinde okunur."""
+        with self._kilit:
+            while not self._bos_slotlar:
+                self._bos_slotlari_doldur()
+            return self._bos_slotlar.popleft()
+
+    def _bos_slotlari_doldur(self):
+        baslangic = self._slot_gunu
+        self._slot_gunu += timedelta(days=7)
+        if (baslangic - self.bugun).days > 3650:
+            raise RuntimeError("Yazma doktorlarının boş slotu kalmadı; veritabanı yeniden tohumlanmalı")
+        with self._db_baglantisi() as conn, conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT s.doktor_id, g::date, make_time(dk / 60, dk %% 60, 0)
+                FROM slot_sablonlari s
+                CROSS JOIN generate_series(%s::date, %s::date, interval '1 day') AS g
+                CROSS JOIN LATERAL unnest(s.dakikalar) AS dk
+                WHERE s.doktor_id = ANY(%s)
+                  AND s.haftanin_gunu = EXTRACT(ISODOW FROM g)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM randevular r
+                      WHERE r.doktor_id = s.doktor_id AND r.tarih = g::date
+                        AND r.saat = make_time(dk / 60, dk %% 60, 0))
+                  AND NOT kapali_mi(s.doktor_id, g::date, make_time(dk / 60, dk %% 60, 0))
+                ORDER BY g, dk, s.doktor_id
+            """, (baslangic, self._slot_gunu - timedelta(days=1), self.yazma_doktorlari))
+            self._bos_slotlar.extend(cursor.fetchall())
+
+    def etag(self, gonder, istek):
+        """İsteğin güncel ETag'i (ilk seferde isteği bir kez göndererek)."""
+        anahtar = (istek['yol'], json.dumps(istek.get('basliklar'), sort_keys=True))
+        if anahtar not in self._etaglar:
+            _, basliklar, _ = gonder(istek)
+            self._etaglar[anahtar] = basliklar.get('ETag')
+        return self._etaglar[anahtar]
+
+
+# --- Senaryolar -----------------------------------------------------------------
+
+SENARYOLAR = {}
+
+
+def senaryo(ad, agir=False):
+    """``fonksiyon(ornek, gonder, i)`` i'nci isteği {yontem, yol, json, govde,
+    basliklar} olarak döner. ``agir`` senaryolar (bcrypt) istek sayısının
+    onda biriyle koşar."""
+    def kaydet(fonksiyon):
+        SENARYOLAR[ad] = (fonksiyon, agir)
+        return fonksiyon
+    return kaydet
+
+
+def _get(yol):
+    return {"yontem": "GET", "yol": yol}
+
+
+def _kosullu(fonksiyon):
+    def ic(ornek, gonder, i):
+        istek = fonksiyon(ornek, gonder, i)
+        etag = ornek.etag(gonder, istek)
+        return dict(istek, basliklar={"If-None-Match": etag} if etag else {})
+    return ic
+
+
+def _gun(ornek, i):
+    return ornek.sec(ornek.gunler, i).isoformat()
+
+
+def _yeni_doktor(ornek):
+    n = ornek.benzersiz()
+    il, ilce = ornek.konumlar[0]
+    return {
+        "il": il, "ilce": ilce, "tamadres": "Bench Cad. No:1", "ad": "Bench", "soyad": "Doktor",
+        "tc_kimlik_no": f"d{n}", "brans": "Ortodonti", "dogum_tarihi": "1980-01-01",
+        "cinsiyet": "Kadın", "kullanici_adi": f"bench_dr_{n}", "sifre": ornek.sifre,
+    }
+
+
+@senaryo('doctor_register', agir=True)
+def _(ornek, gonder, i):
+    return {"yontem": "POST", "yol": "/doctor_register", "json": _yeni_doktor(ornek)}
+
+
+@senaryo('doctor_login', agir=True)
+def _(ornek, gonder, i):
+    return {"yontem": "POST", "yol": "/doctor_login", "json": {
+        "kullanici_adi": ornek.sec(ornek.doktor_kullanicilari, i), "sifre": ornek.sifre}}
+
+
+def _profil(ornek, gonder, i):
+    return _get(f"/doctor_profile/{ornek.sec(ornek.doktorlar, i)}")
+
+
+senaryo('get_doctor_profile')(_profil)
+senaryo('get_doctor_profile#304')(_kosullu(_profil))
+
+
+@senaryo('get_appointments')
+def _(ornek, gonder, i):
+    tarih = ornek.sec(ornek.gecmis_gunler, i).isoformat()
+    return _get(f"/appointments?doktor_id={ornek.sec(ornek.doktorlar, i)}&tarih={tarih}")
+
+
+@senaryo('update_doctor_profile')
+def _(ornek, gonder, i):
+    return {"yontem": "PUT", "yol": f"/doctor_update/{ornek.sec(ornek.yazma_doktorlari, i)}",
+            "json": {"soyad": f"Bench{i}", "adres": {"tamadres": f"Bench Cad. No:{i}"}}}
+
+
+def _ayarlar(ornek, gonder, i):
+    return _get(f"/api/doctor/settings/{ornek.sec(ornek.doktorlar, i)}")
+
+
+senaryo('doktor_ayarlarini_getir')(_ayarlar)
+senaryo('doktor_ayarlarini_getir#304')(_kosullu(_ayarlar))
+
+
+@senaryo('doktor_ayarlarini_kaydet')
+def _(ornek, gonder, i):
+    return {"yontem": "POST", "yol": "/api/doctor/settings", "json": {
+        "doctor_id": ornek.sec(ornek.yazma_doktorlari, i),
+        "start_hour": 9, "start_minute": 0, "end_hour": 17, "end_minute": 0,
+        "interval_minutes": 30,
+        "weekdays": {"6": {"start_hour": 10, "start_minute": 0, "end_hour": 14,
+                           "end_minute": 0, "interval_minutes": 30}, "7": None},
+        "breaks": [{"start": "12:00", "end": "13:00", "weekdays": [1, 2, 3, 4, 5]}],
+    }}
+
+
+@senaryo('kapali_saatleri_getir')
+def _(ornek, gonder, i):
+    return _get(f"/api/doctor/closed_slots/{ornek.sec(ornek.doktorlar, i)}?date={_gun(ornek, i)}")
+
+
+@senaryo('randevu_saati_guncelle')
+def _(ornek, gonder, i):
+    return {"yontem": "POST", "yol": "/api/doctor/closed_slot", "json": {
+        "doctor_id": ornek.sec(ornek.yazma_doktorlari, i), "date": _gun(ornek, i),
+        "time": "08:00", "closed": i % 2 == 0}}
+
+
+@senaryo('kapali_araliklari_guncelle')
+def _(ornek, gonder, i):
+    # Eklenen kural bir sonraki çağrıda silinir; kural sayısı büyümez
+    doktor_id = ornek.sec(ornek.yazma_doktorlari, i)
+    _, _, govde = gonder(_get(f"/api/doctor/closures/{doktor_id}"))
+    eskiler = [k["id"] for k in json.loads(govde) if k.get("start_time") == "07:00"]
+    tarih = _gun(ornek, i)
+    return {"yontem": "POST", "yol": "/api/doctor/closures", "json": {
+        "doctor_id": doktor_id, "remove": eskiler,
+        "add": [{"start_date": tarih, "end_date": tarih, "start_time": "07:00", "end_time": "08:00"}]}}
+
+
+@senaryo('kapali_araliklari_getir')
+def _(ornek, gonder, i):
+    bas = ornek.gunler[0]
+    return _get(f"/api/doctor/closures/{ornek.sec(ornek.doktorlar, i)}"
+                f"?start={bas.isoformat()}&end={(bas + timedelta(days=30)).isoformat()}")
+
+
+@senaryo('get_available_slots')
+def _(ornek, gonder, i):
+    return _get(f"/available_slots/{ornek.sec(ornek.doktorlar, i)}/{_gun(ornek, i)}")
+
+
+@senaryo('alinmis_randevu_saatleri')
+def _(ornek, gonder, i):
+    return _get(f"/api/doctor/booked_slots/{ornek.sec(ornek.doktorlar, i)}?date={_gun(ornek, i)}")
+
+
+def _takvim(slotlar):
+    def ic(ornek, gonder, i):
+        bas = ornek.bugun.replace(day=1)
+        bit = (bas + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return _get(f"/api/doctor/calendar/{ornek.sec(ornek.doktorlar, i)}"
+                    f"?start={bas.isoformat()}&end={bit.isoformat()}" + ("&slots=1" if slotlar else ""))
+    return ic
+
+
+senaryo('doktor_takvimi')(_takvim(False))
+senaryo('doktor_takvimi#slots')(_takvim(True))
+
+
+@senaryo('doktor_panosu')
+def _(ornek, gonder, i):
+    return _get(f"/api/doctor/dashboard/{ornek.sec(ornek.doktorlar, i)}?start={ornek.bugun.isoformat()}")
+
+
+def _analitik(donem):
+    def ic(ornek, gonder, i):
+        if not hasattr(ornek, "analitik_doktorlari"):
+            # Özetler türetilmiş veridir; tohumlanan veritabanında okunacak
+            # doktorlar için bir kez hesaplanır (ölçülmez)
+            import analitik
+            ornek.analitik_doktorlari = ornek.doktorlar[:10]
+            for doktor_id in ornek.analitik_doktorlari:
+                analitik.doktoru_yenile(doktor_id)
+        return _get(f"/api/analytics/occupancy/{ornek.sec(ornek.analitik_doktorlari, i)}"
+                    f"?period={donem}&date={ornek.bugun.isoformat()}")
+    return ic
+
+
+senaryo('doluluk_analitigi')(_analitik('week'))
+senaryo('doluluk_analitigi#month')(_analitik('month'))
+
+
+def _belge(ornek, gonder, i):
+    if not hasattr(ornek, "belge_doktoru"):
+        doktor_id = ornek.yazma_doktorlari[0]
+        _, _, govde = gonder({"yontem": "POST", "yol": "/api/uploads", "govde": BELGE})
+        ref = json.loads(govde)["belge_ref"]
+        gonder({"yontem": "PUT", "yol": f"/doctor_update/{doktor_id}", "json": {"diploma_belgesi_ref": ref}})
+        ornek.belge_doktoru = doktor_id
+    return _get(f"/api/documents/doctor/{ornek.belge_doktoru}/diploma_belgesi")
+
+
+senaryo('belge_indir')(_belge)
+senaryo('belge_indir#304')(_kosullu(_belge))
+
+
+@senaryo('dosya_yukle')
+def _(ornek, gonder, i):
+    return {"yontem": "POST", "yol": "/api/uploads", "govde": BELGE}
+
+
+def _oturum(ornek, gonder, parca=False):
+    _, _, govde = gonder({"yontem": "POST", "yol": "/api/uploads/sessions"})
+    oturum_id = json.loads(govde)["oturum_id"]
+    if parca:
+        gonder({"yontem": "PATCH", "yol": f"/api/uploads/sessions/{oturum_id}",
+                "govde": BELGE, "basliklar": {"Upload-Offset": "0"}})
+    return oturum_id
+
+
+@senaryo('yukleme_oturumu_ac')
+def _(ornek, gonder, i):
+    return {"yontem": "POST", "yol": "/api/uploads/sessions"}
+
+
+@senaryo('yukleme_oturumu_durumu')
+def _(ornek, gonder, i):
+    return _get(f"/api/uploads/sessions/{_oturum(ornek, gonder, parca=True)}")
+
+
+@senaryo('yukleme_parcasi_ekle')
+def _(ornek, gonder, i):
+    return {"yontem": "PATCH", "yol": f"/api/uploads/sessions/{_oturum(ornek, gonder)}",
+            "govde": BELGE, "basliklar": {"Upload-Offset": "0"}}
+
+
+@senaryo('yukleme_oturumu_tamamla')
+def _(ornek, gonder, i):
+    return {"yontem": "POST", "yol": f"/api/uploads/sessions/{_oturum(ornek, gonder, parca=True)}/complete"}
+
+
+senaryo('db_havuzu_durumu')(lambda ornek, gonder, i: _get("/api/admin/db_pool"))
+senaryo('sifre_havuzu_durumu')(lambda ornek, gonder, i: _get("/api/admin/sifre_havuzu"))
+senaryo('analitik_durumu')(lambda ornek, gonder, i: _get("/api/admin/analitik"))
+senaryo('belge_isleme_durumu')(lambda ornek, gonder, i: _get("/api/admin/belge_isleme"))
+senaryo('slot_yayini_durumu')(lambda ornek, gonder, i: _get("/api/admin/slot_stream"))
+senaryo('etag_istatistikleri')(lambda ornek, gonder, i: _get("/api/admin/etag"))
+senaryo('metrikleri_getir')(lambda ornek, gonder, i: _get("/metrics"))
+senaryo('yavas_sorgulari_getir')(lambda ornek, gonder, i: _get("/api/admin/slow_queries?limit=50"))
+
+
+@senaryo('patient_register', agir=True)
+def _(ornek, gonder, i):
+    n = ornek.benzersiz()
+    return {"yontem": "POST", "yol": "/patient_register", "json": {
+        "ad": "Bench", "soyad": "Hasta", "tc_kimlik_no": f"h{n}", "dogum_tarihi": "1990-01-01",
+        "cinsiyet": "Erkek", "kullanici_adi": f"bench_hasta_{n}", "sifre": ornek.sifre,
+        "adres": "Bench Mah."}}
+
+
+@senaryo('patient_login', agir=True)
+def _(ornek, gonder, i):
+    return {"yontem": "POST", "yol": "/patient_login", "json": {
+        "tc_kimlik_no": ornek.sec(ornek.hasta_tcleri, i), "sifre": ornek.sifre}}
+
+
+senaryo('get_patient')(lambda ornek, gonder, i: _get(f"/get_patient/{ornek.sec(ornek.hastalar, i)}"))
+senaryo('get_patient_profile')(lambda ornek, gonder, i: _get(f"/patient_profile/{ornek.sec(ornek.hastalar, i)}"))
+
+
+@senaryo('update_patient_profile')
+def _(ornek, gonder, i):
+    return {"yontem": "POST", "yol": "/update_patient_profile", "json": {
+        "hasta_id": ornek.sec(ornek.yazma_hastalari, i), "soyad": f"Bench{i}"}}
+
+
+def _dizin(ornek, gonder, i):
+    il, ilce = ornek.sec(ornek.konumlar, i)
+    return _get("/api/doctors?" + urllib.parse.urlencode({"city": il, "district": ilce}))
+
+
+senaryo('get_doctors_by_city_district')(_dizin)
+senaryo('get_doctors_by_city_district#304')(_kosullu(_dizin))
+
+
+def _musait(ornek, gonder, i):
+    return _get(f"/api/doctor/available_slots/{ornek.sec(ornek.doktorlar, i)}?date={_gun(ornek, i)}")
+
+
+senaryo('doktor_musait_saatler')(_musait)
+senaryo('doktor_musait_saatler#304')(_kosullu(_musait))
+senaryo('doktor_musait_saat_akisi')(
+    lambda ornek, gonder, i: _get(f"/api/doctor/available_slots/{ornek.sec(ornek.doktorlar, i)}/stream"
+                                  f"?date={_gun(ornek, i)}"))
+
+
+def _toplu(ornek, gonder, i):
+    idler = ",".join(str(ornek.sec(ornek.doktorlar, i + k)) for k in range(20))
+    return _get(f"/api/doctor/available_slots?date={_gun(ornek, i)}&ids={idler}")
+
+
+senaryo('toplu_musait_saatler')(_toplu)
+senaryo('toplu_musait_saatler#304')(_kosullu(_toplu))
+
+
+@senaryo('uygun_randevu_saatleri')
+def _(ornek, gonder, i):
+    return _get(f"/api/appointments/available/{ornek.sec(ornek.doktorlar, i)}?tarih={_gun(ornek, i)}")
+
+
+@senaryo('en_erken_randevular')
+def _(ornek, gonder, i):
+    il, ilce = ornek.sec(ornek.konumlar, i)
+    return _get("/api/appointments/earliest?" + urllib.parse.urlencode({"city": il, "district": ilce, "n": 10}))
+
+
+@senaryo('randevu_olustur')
+def _(ornek, gonder, i):
+    doktor_id, tarih, saat = ornek.bos_slot()
+    return {"yontem": "POST", "yol": "/api/appointments/create", "json": {
+        "doktor_id": doktor_id, "hasta_id": ornek.sec(ornek.yazma_hastalari, i),
+        "tarih": tarih.isoformat(), "saat": saat.strftime("%H:%M")}}
+
+
+@senaryo('randevu_sil')
+def _(ornek, gonder, i):
+    doktor_id, tarih, saat = ornek.bos_slot()
+    _, _, govde = gonder({"yontem": "POST", "yol": "/api/appointments/create", "json": {
+        "doktor_id": doktor_id, "hasta_id": ornek.sec(ornek.yazma_hastalari, i),
+        "tarih": tarih.isoformat(), "saat": saat.strftime("%H:%M")}})
+    return {"yontem": "DELETE", "yol": f"/api/appointments/delete/{json.loads(govde)['randevu_id']}"}
+
+
+senaryo('next_appointment')(lambda ornek, gonder, i: _get(f"/next_appointment/{ornek.sec(ornek.hastalar, i)}"))
+
+
+@senaryo('hasta_randevulari')
+def _(ornek, gonder, i):
+    return _get(f"/api/appointments/hasta?hasta_id={ornek.sec(ornek.hastalar, i)}&limit=50")
+
+
+senaryo('get_all_future_appointments')(
+    lambda ornek, gonder, i: _get(f"/api/appointments/future/{ornek.sec(ornek.hastalar, i)}"))
+
+
+# --- İstemciler ---------------------------------------------------------------
+
+def test_istemcisi_gonder(istemci):
+    def gonder(istek):
+        yanit = istemci.open(
+            istek["yol"], method=istek["yontem"], json=istek.get("json"),
+            data=istek.get("govde"), headers=istek.get("basliklar") or {},
+        )
+        return yanit.status_code, yanit.headers, yanit.get_data()
+    return gonder
+
+
+def http_gonder(taban_url):
+    def gonder(istek):
+        basliklar = dict(istek.get("basliklar") or {})
+        govde = istek.get("govde")
+        if istek.get("json") is not None:
+            govde = json.dumps(istek["json"]).encode()
+            basliklar["Content-Type"] = "application/json"
+        elif govde is not None:
+            basliklar["Content-Type"] = "application/octet-stream"
+        http_istegi = urllib.request.Request(
+            taban_url + istek["yol"], data=govde, headers=basliklar, method=istek["yontem"])
+        try:
+            with urllib.request.urlopen(http_istegi, timeout=60) as yanit:
+                return yanit.status, yanit.headers, yanit.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+    return gonder
+
+
+# --- Ölçüm ----------------------------------------------------------------------
+
+def _yuzdelik(sirali, oran):
+    return sirali[min(len(sirali) - 1, int(len(sirali) * oran))]
+
+
+def _ozet(sureler, durumlar, sorgular=None, toplam_sure=None):
+    sureler = sorted(sureler)
+    sonuc = {
+        "istek": len(sureler),
+        "hata": sum(n for kod, n in durumlar.items() if kod >= 500),
+        "durumlar": {str(kod): n for kod, n in sorted(durumlar.items())},
+    }
+    if sureler:
+        sonuc.update({
+            "p50_ms": round(_yuzdelik(sureler, 0.50) * 1000, 2),
+            "p95_ms": round(_yuzdelik(sureler, 0.95) * 1000, 2),
+            "p99_ms": round(_yuzdelik(sureler, 0.99) * 1000, 2),
+            "ort_ms": round(sum(sureler) / len(sureler) * 1000, 2),
+        })
+    if sorgular:
+        sonuc["sorgu_per_istek"] = round(sum(sorgular) / len(sorgular), 2)
+    if toplam_sure:
+        sonuc["verim_rps"] = round(len(sureler) / toplam_sure, 1)
+    return sonuc
+
+
+def test_istemcisi_asamasi(app, ornek, adlar, istek_sayisi):
+    gonder = test_istemcisi_gonder(app.test_client())
+    sonuclar = {}
+    for ad in adlar:
+        fonksiyon, agir = SENARYOLAR[ad]
+        n = max(5, istek_sayisi // 10) if agir else istek_sayisi
+        sureler, sorgular, durumlar = [], [], {}
+        for i in range(n):
+            istek = fonksiyon(ornek, gonder, i)
+            _sayac.n = 0
+            bas = time.perf_counter()
+            durum, _, _ = gonder(istek)
+            sureler.append(time.perf_counter() - bas)
+            sorgular.append(_sorgu_sayisi())
+            durumlar[durum] = durumlar.get(durum, 0) + 1
+        sonuclar[ad] = _ozet(sureler, durumlar, sorgular)
+        print(f"  {ad:<40} p95 {sonuclar[ad].get('p95_ms')} ms, "
+              f"{sonuclar[ad].get('sorgu_per_istek')} sorgu/istek", file=sys.stderr, flush=True)
+    return sonuclar
+
+
+def http_asamasi(taban_url, ornek, adlar, thread_sayisi, sure):
+    gonder = http_gonder(taban_url)
+    sonuclar = {}
+    for ad in adlar:
+        fonksiyon, _ = SENARYOLAR[ad]
+        sureler, durumlar = [], {}
+        kilit = threading.Lock()
+        sayac = iter(range(10 ** 9))
+        bitis = time.perf_counter() + sure
+
+        def isci(_):
+            while time.perf_counter() < bitis:
+                with kilit:
+                    i = next(sayac)
+                istek = fonksiyon(ornek, gonder, i)
+                bas = time.perf_counter()
+                durum, _, _ = gonder(istek)
+                gecen = time.perf_counter() - bas
+                with kilit:
+                    sureler.append(gecen)
+                    durumlar[durum] = durumlar.get(durum, 0) + 1
+
+        with ThreadPoolExecutor(max_workers=thread_sayisi) as havuz_:
+            list(havuz_.map(isci, range(thread_sayisi)))
+        # Verim, hazırlık süresi hariç: thread başına ölçülen toplam süre
+        # (Little yasası: eşzamanlılık / ortalama gecikme)
+        sonuclar[ad] = _ozet(sureler, durumlar, toplam_sure=sum(sureler) / thread_sayisi)
+        print(f"  {ad:<40} {sonuclar[ad].get('verim_rps')} istek/sn, "
+              f"p95 {sonuclar[ad].get('p95_ms')} ms", file=sys.stderr, flush=True)
+    return sonuclar
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIZINI,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def karsilastir(onceki, simdiki, esik, min_fark_ms):
+    """p95'i ``esik`` katından (ve en az ``min_fark_ms``) fazla artan ya da
+    daha çok sorgu çalıştıran uç noktalar."""
+    gerilemeler = []
+    for asama, uc_noktalar in simdiki["asamalar"].items():
+        eski_asama = onceki.get("asamalar", {}).get(asama, {})
+        for ad, sonuc in uc_noktalar.items():
+            eski = eski_asama.get(ad)
+            if not eski:
+                continue
+            if (eski.get("p95_ms") and sonuc.get("p95_ms")
+                    and sonuc["p95_ms"] > max(eski["p95_ms"] * esik, eski["p95_ms"] + min_fark_ms)):
+                gerilemeler.append({"asama": asama, "uc_nokta": ad, "olcu": "p95_ms",
+                                    "onceki": eski["p95_ms"], "simdiki": sonuc["p95_ms"]})
+            if sonuc.get("sorgu_per_istek", 0) > eski.get("sorgu_per_istek", float("inf")):
+                gerilemeler.append({"asama": asama, "uc_nokta": ad, "olcu": "sorgu_per_istek",
+                                    "onceki": eski["sorgu_per_istek"], "simdiki": sonuc["sorgu_per_istek"]})
+    return gerilemeler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--istek', type=int, default=200, help="Test istemcisi aşamasında uç nokta başına istek")
+    parser.add_argument('--thread', type=int, default=16, help="HTTP aşamasında eşzamanlı istemci")
+    parser.add_argument('--sure', type=float, default=2.0, help="HTTP aşamasında uç nokta başına saniye")
+    parser.add_argument('--url', help="Dışarıdaki sunucu (ör. http://127.0.0.1:8000); verilmezse süreç içinde")
+    parser.add_argument('--asama', choices=['hepsi', 'test_istemcisi', 'http'], default='hepsi')
+    parser.add_argument('--sadece', help="Virgülle ayrılmış senaryo adları")
+    parser.add_argument('--cikti', help="Sonuç JSON'unun yazılacağı dosya")
+    parser.add_argument('--karsilastir', help="Önceki bir çalıştırmanın JSON'u")
+    parser.add_argument('--esik', type=float, default=1.2, help="p95 gerileme eşiği (kat)")
+    parser.add_argument('--min-fark-ms', type=float, default=1.0,
+                        help="Bundan küçük p95 artışları gerileme sayılmaz (ölçüm gürültüsü)")
+    args = parser.parse_args()
+
+    # Yüklenen belgeler geçici bir dizine gider (app, yükleme dizinini
+    # içe aktarılırken çalışma dizinine göre belirler)
+    cikti_yolu = args.cikti and os.path.abspath(args.cikti)
+    onceki_yolu = args.karsilastir and os.path.abspath(args.karsilastir)
+    gecici = tempfile.TemporaryDirectory(prefix="bench_uc_noktalar_")
+    sys.path.insert(0, BACKEND_DIZINI)
+    os.chdir(gecici.name)
+    from app import app
+    from bench.tohum import tablo_boyutlari
+
+    adlar = args.sadece.split(',') if args.sadece else list(SENARYOLAR)
+    bilinmeyen = [ad for ad in adlar if ad not in SENARYOLAR]
+    if bilinmeyen:
+        parser.error(f"Bilinmeyen senaryo: {', '.join(bilinmeyen)}")
+    route_lar = {kural.endpoint for kural in app.url_map.iter_rules() if kural.endpoint != 'static'}
+    kapsanmayan = sorted(route_lar - {ad.split('#')[0] for ad in SENARYOLAR})
+
+    ornek = Ornek(db.db_baglantisi)
+    rapor = {
+        "meta": {
+            "commit": _git_commit(),
+            "zaman": datetime.now().isoformat(timespec="seconds"),
+            "veritabani": ortam.VERITABANI,
+            "tablolar": tablo_boyutlari(),
+            "argumanlar": vars(args),
+            "kapsanmayan": kapsanmayan,
+        },
+        "asamalar": {},
+    }
+    if kapsanmayan:
+        print(f"Senaryosu olmayan route'lar: {', '.join(kapsanmayan)}", file=sys.stderr)
+
+    if args.asama in ('hepsi', 'test_istemcisi'):
+        print("test istemcisi:", file=sys.stderr)
+        rapor["asamalar"]["test_istemcisi"] = test_istemcisi_asamasi(app, ornek, adlar, args.istek)
+
+    if args.asama in ('hepsi', 'http'):
+        sunucu = None
+        taban_url = args.url
+        if not taban_url:
+            from werkzeug.serving import make_server
+            logging.getLogger('werkzeug').setLevel(logging.WARNING)
+            sunucu = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=sunucu.serve_forever, daemon=True).start()
+            taban_url = f"http://127.0.0.1:{sunucu.server_port}"
+        print(f"http ({taban_url}, {args.thread} thread):", file=sys.stderr)
+        try:
+            rapor["asamalar"]["http"] = http_asamasi(taban_url, ornek, adlar, args.thread, args.sure)
+        finally:
+            if sunucu is not None:
+                sunucu.shutdown()
+
+    cikti = json.dumps(rapor, indent=2, ensure_ascii=False)
+    if cikti_yolu:
+        with open(cikti_yolu, 'w') as f:
+            f.write(cikti + "\n")
+    print(cikti)
+
+    if onceki_yolu:
+        with open(onceki_yolu) as f:
+            gerilemeler = karsilastir(json.load(f), rapor, args.esik, args.min_fark_ms)
+        for g in gerilemeler:
+            print(f"GERİLEME {g['asama']} {g['uc_nokta']} {g['olcu']}: {g['onceki']} -> {g['simdiki']}",
+                  file=sys.stderr)
+        if gerilemeler:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""İçerik adresli belge deposu.
+
+Belgeler içeriklerinin SHA-256 özetiyle adlandırılır ve özetin ilk baytlarına
+göre alt dizinlere dağıtılır (``diplomalar/ab/cd/abcd...``). Aynı içerik
+ikinci kez yüklendiğinde yeni dosya yazılmaz, var olan yol döner. Yazmalar
+geçici dosya + rename ile atomiktir.
+
+Kaç satırın bir dosyayı gösterdiği ``belge_bloblari`` tablosunda sayılır
+(migrations/002_belge_bloblari.sql); route'lar belge kolonlarına yol yazarken
+``referans_ekle``, eski yolu bırakırken ``referans_birak`` çağırır. Hiçbir
+satırın göstermediği dosyalar belge_temizligi.py ile toplanır.
+
+Eski düz dizinlerdeki dosyaları depoya taşımak için backend dizininden:
+
+    python blob_deposu.py tasi [--kuru]
+"""
+import base64
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
+import config
+
+_OZET = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _hedef(kok_dizin, ozet):
+    return os.path.join(kok_dizin, ozet[:2], ozet[2:4], ozet)
+
+
+def blob_mu(yol):
+    """Yol bu deponun adlandırma düzenine uyuyor mu?"""
+    ozet = os.path.basename(yol)
+    if not _OZET.match(ozet):
+        return False
+    ust = os.path.dirname(yol)
+    return os.path.basename(ust) == ozet[2:4] and os.path.basename(os.path.dirname(ust)) == ozet[:2]
+
+
+def _yeniden_kullan(hedef):
+    # Var olan dosya yeniden kullanılıyor: zamanı yenilenir ki yetim belge
+    # temizliği (bekleme süresi) yeni referansı commit edilmeden silmesin
+    try:
+        os.utime(hedef)
+    except OSError:
+        pass
+    return hedef
+
+
+def _yerlestir(gecici_yol, kok_dizin, ozet):
+    hedef = _hedef(kok_dizin, ozet)
+    if os.path.exists(hedef):
+        # Aynı içerik zaten var: tekrar yazma
+        os.remove(gecici_yol)
+        _yeniden_kullan(hedef)
+    else:
+        os.makedirs(os.path.dirname(hedef), exist_ok=True)
+        os.replace(gecici_yol, hedef)
+    return hedef
+
+
+def _gecici_dosya(kok_dizin):
+    os.makedirs(kok_dizin, exist_ok=True)
+    fd, yol = tempfile.mkstemp(dir=kok_dizin, prefix='.yukleniyor-')
+    return os.fdopen(fd, 'wb'), yol
+
+
+def bytes_kaydet(veri, kok_dizin):
+    ozet = hashlib.sha256(veri).hexdigest()
+    hedef = _hedef(kok_dizin, ozet)
+    if os.path.exists(hedef):
+        return _yeniden_kullan(hedef)
+
+    f, gecici_yol = _gecici_dosya(kok_dizin)
+    try:
+        with f:
+            f.write(veri)
+    except BaseException:
+        os.remove(gecici_yol)
+        raise
+    return _yerlestir(gecici_yol, kok_dizin, ozet)
+
+
+def base64_kaydet(base64_str, kok_dizin):
+    return bytes_kaydet(base64.b64decode(base64_str), kok_dizin)
+
+
+def akis_kaydet(akis, kok_dizin, max_boyut, hata_sinifi=ValueError):
+    """Akışı parça parça geçici dosyaya yazarken özetini hesaplar."""
+    ozet = hashlib.sha256()
+    f, gecici_yol = _gecici_dosya(kok_dizin)
+    try:
+        with f:
+            yazilan = 0
+            while True:
+                parca = akis.read(config.YUKLEME_PARCA_BOYUTU)
+                if not parca:
+                    break
+                yazilan += len(parca)
+                if yazilan > max_boyut:
+                    raise hata_sinifi("Dosya boyutu sınırı aşıldı")
+                ozet.update(parca)
+                f.write(parca)
+    except BaseException:
+        os.remove(gecici_yol)
+        raise
+    return _yerlestir(gecici_yol, kok_dizin, ozet.hexdigest())
+
+
+def dosya_ozeti(yol):
+    ozet = hashlib.sha256()
+    with open(yol, 'rb') as f:
+        for parca in iter(lambda: f.read(config.YUKLEME_PARCA_BOYUTU), b''):
+            ozet.update(parca)
+    return ozet.hexdigest()
+
+
+def dosya_tasi(kaynak_yol, kok_dizin, kaynagi_koru=False):
+    """Diskteki bir dosyayı depoya alır.
+
+    Aynı dosya sistemindeki dosya (ör. tamamlanmış yükleme) yeniden
+    yazılmadan rename edilir. ``kaynagi_koru`` ile kaynak yerinde bırakılır
+    ve kopyalanır.
+    """
+    ozet = dosya_ozeti(kaynak_yol)
+    hedef = _hedef(kok_dizin, ozet)
+    if os.path.exists(hedef):
+        if not kaynagi_koru:
+            os.remove(kaynak_yol)
+        return _yeniden_kullan(hedef)
+
+    if kaynagi_koru:
+        f, gecici_yol = _gecici_dosya(kok_dizin)
+        try:
+            with f, open(kaynak_yol, 'rb') as kaynak:
+                shutil.copyfileobj(kaynak, f, config.YUKLEME_PARCA_BOYUTU)
+        except BaseException:
+            os.remove(gecici_yol)
+            raise
+        return _yerlestir(gecici_yol, kok_dizin, ozet)
+
+    os.makedirs(os.path.dirname(hedef), exist_ok=True)
+    os.replace(kaynak_yol, hedef)
+    return hedef
+
+
+def referans_ekle(cursor, yol):
+    if not yol or not blob_mu(yol):
+        return
+    cursor.execute("""
+        INSERT INTO belge_bloblari (yol, sha256, boyut, ref_sayisi)
+        VALUES (%s, %s, %s, 1)
+        ON CONFLICT (yol) DO UPDATE SET ref_sayisi = belge_bloblari.ref_sayisi + 1
+    """, (yol, os.path.basename(yol), os.path.getsize(yol)))
+
+
+def referans_birak(cursor, yol):
+    if not yol or not blob_mu(yol):
+        return
+    cursor.execute("""
+        UPDATE belge_bloblari SET ref_sayisi = GREATEST(ref_sayisi - 1, 0)
+        WHERE yol = %s
+    """, (yol,))
+
+
+def mevcutlari_tasi(kuru=False):
+    """Düz dizinlerdeki eski belgeleri depoya taşır, DB yollarını günceller.
+
+    Her satır ayrı işlemde güncellenir; eski dosya ancak commit'ten sonra
+    silinir, böylece yarıda kesilen bir taşıma hiçbir satırı boşa çıkarmaz.
+    """
+    from psycopg2 import sql
+    from belgeler import BELGE_ALANLARI
+    from db import db_baglantisi
+
+    rapor = {"tasinan": 0, "tekrar_eden": 0, "kazanilan_bayt": 0, "eksik": 0}
+    gorulen = set()
+    for tablo, anahtar, alanlar in BELGE_ALANLARI.values():
+        for alan in alanlar:
+            with db_baglantisi() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    sql.SQL("SELECT {}, {} FROM {} WHERE {} IS NOT NULL").format(
+                        sql.Identifier(anahtar), sql.Identifier(alan),
+                        sql.Identifier(tablo), sql.Identifier(alan)
+                    )
+                )
+                satirlar = cursor.fetchall()
+
+                for satir_id, yol in satirlar:
+                    if blob_mu(yol):
+                        continue
+                    if not os.path.isfile(yol):
+                        rapor["eksik"] += 1
+                        continue
+
+                    boyut = os.path.getsize(yol)
+                    hedef = _hedef(os.path.dirname(yol), dosya_ozeti(yol))
+                    if hedef in gorulen or os.path.exists(hedef):
+                        rapor["tekrar_eden"] += 1
+                        rapor["kazanilan_bayt"] += boyut
+                    gorulen.add(hedef)
+                    rapor["tasinan"] += 1
+                    if kuru:
+                        continue
+
+                    hedef = dosya_tasi(yol, os.path.dirname(yol), kaynagi_koru=True)
+                    cursor.execute(
+                        sql.SQL("UPDATE {} SET {} = %s WHERE {} = %s").format(
+                            sql.Identifier(tablo), sql.Identifier(alan), sql.Identifier(anahtar)
+                        ),
+                        (hedef, satir_id)
+                    )
+                    referans_ekle(cursor, hedef)
+                    conn.commit()
+                    os.remove(yol)
+    return rapor
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="İçerik adresli belge deposu araçları")
+    parser.add_argument('komut', choices=['tasi'])
+    parser.add_argument('--kuru', action='store_true', help="Değişiklik yapmadan rapor ver")
+    args = parser.parse_args()
+
+    print(json.dumps(mevcutlari_tasi(kuru=args.kuru), indent=2, ensure_ascii=False))
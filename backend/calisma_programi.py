@@ -0,0 +1,261 @@
+"""Doktorun haftalık çalışma programı ve slot şablonları.
+
+Program; varsayılan çalışma saatleri (doktor_ayarlar), haftanın günlerine
+göre istisnalar (doktor_programi) ve molalardan (doktor_molalari) oluşur.
+Kaydedildiğinde doktor_ayarlar.versiyon artar ve haftanın her günü için slot
+başlangıçları slot_sablonlari tablosuna yazılır. Izgara ve takvim sorguları
+şablonu hazır okur; slot listesi hiçbir istekte yeniden hesaplanmaz.
+
+Slot kuralı tek yerde, ``sablon_dakikalari``ndadır.
+"""
+from psycopg2.extras import execute_values
+
+GUN_DAKIKASI = 24 * 60
+HAFTA_GUNLERI = range(1, 8)  # ISO: Pazartesi = 1 ... Pazar = 7
+
+
+class ProgramHatasi(ValueError):
+    pass
+
+
+def sablon_dakikalari(baslangic_dk, bitis_dk, aralik, molalar=()):
+    """Bir günün slot başlangıçları (gün içindeki dakika), sıralı.
+
+    Bitiş saati dahildir: son randevu bitiş saatinde başlayabilir (ör.
+    09:00-17:00, 30 dakika: 09:00 ... 17:00). Başlangıcı bir molanın
+    [baslangic, bitis) aralığına düşen slot verilmez.
+    """
+    if aralik <= 0:
+        return ()
+    return tuple(
+        dakika for dakika in range(baslangic_dk, bitis_dk + 1, aralik)
+        if not any(m_bas <= dakika < m_bit for m_bas, m_bit in molalar)
+    )
+
+
+def _gun_maskesi(gunler):
+    return sum(1 << (g - 1) for g in set(gunler))
+
+
+def _gunler(maske):
+    return [g for g in HAFTA_GUNLERI if maske & (1 << (g - 1))]
+
+
+def _tam_sayi(deger, alan):
+    # bool, int'in alt sınıfıdır; true/false ve kesirli sayılar kabul edilmez
+    if isinstance(deger, bool) or (isinstance(deger, float) and not deger.is_integer()):
+        raise ProgramHatasi(f"{alan} tam sayı olmalıdır")
+    try:
+        return int(deger)
+    except (TypeError, ValueError):
+        raise ProgramHatasi(f"{alan} sayı olmalıdır")
+
+
+def _saat_dakika(saat, dakika, alan):
+    saat, dakika = _tam_sayi(saat, alan), _tam_sayi(dakika, alan)
+    if not (0 <= saat < 24 and 0 <= dakika < 60):
+        raise ProgramHatasi(f"{alan} geçerli bir saat değil")
+    return saat * 60 + dakika
+
+
+def calisma_saatleri_ayristir(veri, alan="settings"):
+    """start_hour/start_minute/end_hour/end_minute/interval_minutes alanlarını
+    (baslangic_dk, bitis_dk, aralik) üçlüsüne çevirir. Bitiş başlangıçtan
+    sonra, aralık pozitif olmalıdır."""
+    if not isinstance(veri, dict):
+        raise ProgramHatasi(f"{alan} bir nesne olmalıdır")
+    baslangic = _saat_dakika(veri.get("start_hour"), veri.get("start_minute"), f"{alan} başlangıç")
+    bitis = _saat_dakika(veri.get("end_hour"), veri.get("end_minute"), f"{alan} bitiş")
+    if baslangic >= bitis:
+        raise ProgramHatasi(f"{alan} bitişi başlangıcından sonra olmalıdır")
+    aralik = _tam_sayi(veri.get("interval_minutes"), f"{alan} interval_minutes")
+    if aralik <= 0:
+        raise ProgramHatasi(f"{alan} interval_minutes 0'dan büyük olmalıdır")
+    return baslangic, bitis, aralik
+
+
+def _hhmm(deger, alan):
+    try:
+        saat, dakika = deger.split(":")
+        if (saat, dakika) == ("24", "00"):
+            return GUN_DAKIKASI
+        return _saat_dakika(saat, dakika, alan)
+    except (AttributeError, ValueError):
+        raise ProgramHatasi(f"{alan} SS:DD biçiminde olmalıdır")
+
+
+def program_ayristir(veri):
+    """Ayar isteğini (varsayılan, günler, molalar) olarak ayrıştırır.
+
+    ``weekdays`` ({"1": {...} veya null, ...}) ve ``breaks`` ([{"start",
+    "end", "weekdays"}]) isteğe bağlıdır; verilmezlerse None döner ve
+    kayıtlı olanlar korunur.
+    """
+    varsayilan = calisma_saatleri_ayristir(veri)
+
+    gunler = None
+    if veri.get("weekdays") is not None:
+        if not isinstance(veri["weekdays"], dict):
+            raise ProgramHatasi("weekdays bir nesne olmalıdır")
+        gunler = {}
+        for anahtar, gun in veri["weekdays"].items():
+            try:
+                haftanin_gunu = int(anahtar)
+            except ValueError:
+                haftanin_gunu = None
+            if haftanin_gunu not in HAFTA_GUNLERI:
+                raise ProgramHatasi("weekdays anahtarları 1 (Pazartesi) ile 7 (Pazar) arasında olmalıdır")
+            gunler[haftanin_gunu] = None if gun is None else calisma_saatleri_ayristir(gun, f"weekdays[{anahtar}]")
+
+    molalar = None
+    if veri.get("breaks") is not None:
+        if not isinstance(veri["breaks"], list):
+            raise ProgramHatasi("breaks bir liste olmalıdır")
+        molalar = []
+        for mola in veri["breaks"]:
+            if not isinstance(mola, dict):
+                raise ProgramHatasi("breaks elemanları nesne olmalıdır")
+            baslangic = _hhmm(mola.get("start"), "breaks start")
+            bitis = _hhmm(mola.get("end"), "breaks end")
+            if baslangic >= bitis:
+                raise ProgramHatasi("Mola bitişi başlangıcından sonra olmalıdır")
+            # weekdays verilmez ya da boşsa mola her gün geçerlidir
+            mola_gunleri = mola.get("weekdays")
+            if mola_gunleri is not None and not isinstance(mola_gunleri, list):
+                raise ProgramHatasi("breaks weekdays bir liste olmalıdır")
+            maske = None
+            if mola_gunleri:
+                if any(not isinstance(g, int) or isinstance(g, bool) or g not in HAFTA_GUNLERI
+                       for g in mola_gunleri):
+                    raise ProgramHatasi("breaks weekdays 1 ile 7 arasındaki günlerden oluşmalıdır")
+                maske = _gun_maskesi(mola_gunleri)
+            molalar.append((maske, baslangic, bitis))
+
+    return varsayilan, gunler, molalar
+
+
+def gun_sablonlari(varsayilan, gunler, molalar):
+    """{haftanin_gunu: slot dakikaları} — yedi günün tamamı."""
+    sablonlar = {}
+    for haftanin_gunu in HAFTA_GUNLERI:
+        saatler = gunler.get(haftanin_gunu, varsayilan)
+        if saatler is None:
+            sablonlar[haftanin_gunu] = ()
+            continue
+        gunun_molalari = [
+            (bas, bit) for maske, bas, bit in molalar
+            if maske is None or maske & (1 << (haftanin_gunu - 1))
+        ]
+        sablonlar[haftanin_gunu] = sablon_dakikalari(*saatler, gunun_molalari)
+    return sablonlar
+
+
+def kaydet(cursor, doktor_id, varsayilan, gunler=None, molalar=None):
+    """Programı yazar, versiyonu artırır ve yedi günün şablonunu yeniden
+    yazar. Yeni versiyonu döner. ``gunler``/``molalar`` None ise kayıtlı
+    olanlar değişmez."""
+    baslangic, bitis, aralik = varsayilan
+    # Upsert satırı kilitler; aynı doktorun eşzamanlı iki kaydı sırayla işlenir
+    cursor.execute("""
+        INSERT INTO doktor_ayarlar
+            (doktor_id, baslangic_saat, baslangic_dakika, bitis_saat, bitis_dakika, randevu_aralik)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (doktor_id) DO UPDATE SET
+            baslangic_saat = EXCLUDED.baslangic_saat,
+            baslangic_dakika = EXCLUDED.baslangic_dakika,
+            bitis_saat = EXCLUDED.bitis_saat,
+            bitis_dakika = EXCLUDED.bitis_dakika,
+            randevu_aralik = EXCLUDED.randevu_aralik,
+            versiyon = doktor_ayarlar.versiyon + 1
+        RETURNING versiyon
+    """, (doktor_id, baslangic // 60, baslangic % 60, bitis // 60, bitis % 60, aralik))
+    versiyon = cursor.fetchone()[0]
+
+    if gunler is not None:
+        cursor.execute("DELETE FROM doktor_programi WHERE doktor_id = %s", (doktor_id,))
+        execute_values(cursor, """
+            INSERT INTO doktor_programi (doktor_id, haftanin_gunu, calisir, baslangic_dk, bitis_dk, randevu_aralik)
+            VALUES %s
+        """, [
+            (doktor_id, gun, saatler is not None, *(saatler or (0, 0, 0)))
+            for gun, saatler in sorted(gunler.items())
+        ])
+    if molalar is not None:
+        cursor.execute("DELETE FROM doktor_molalari WHERE doktor_id = %s", (doktor_id,))
+        execute_values(cursor, """
+            INSERT INTO doktor_molalari (doktor_id, haftanin_gunleri, baslangic_dk, bitis_dk)
+            VALUES %s
+        """, [(doktor_id, *mola) for mola in molalar])
+
+    _, gunler, molalar = _oku(cursor, doktor_id)
+    sablonlar = gun_sablonlari(varsayilan, gunler, molalar)
+    execute_values(cursor, """
+        INSERT INTO slot_sablonlari (doktor_id, haftanin_gunu, versiyon, dakikalar)
+        VALUES %s
+        ON CONFLICT (doktor_id, haftanin_gunu) DO UPDATE SET
+            versiyon = EXCLUDED.versiyon,
+            dakikalar = EXCLUDED.dakikalar
+    """, [(doktor_id, gun, versiyon, list(dakikalar)) for gun, dakikalar in sablonlar.items()])
+    return versiyon
+
+
+def _oku(cursor, doktor_id):
+    cursor.execute("""
+        SELECT haftanin_gunu, calisir, baslangic_dk, bitis_dk, randevu_aralik
+        FROM doktor_programi WHERE doktor_id = %s
+    """, (doktor_id,))
+    gunler = {
+        gun: (bas, bit, aralik) if calisir else None
+        for gun, calisir, bas, bit, aralik in cursor.fetchall()
+    }
+    cursor.execute("""
+        SELECT haftanin_gunleri, baslangic_dk, bitis_dk
+        FROM doktor_molalari WHERE doktor_id = %s ORDER BY id
+    """, (doktor_id,))
+    molalar = cursor.fetchall()
+
+    cursor.execute("""
+        SELECT baslangic_saat, baslangic_dakika, bitis_saat, bitis_dakika, randevu_aralik, versiyon
+        FROM doktor_ayarlar WHERE doktor_id = %s
+    """, (doktor_id,))
+    return cursor.fetchone(), gunler, molalar
+
+
+def _saatler_json(saatler):
+    baslangic, bitis, aralik = saatler
+    return {
+        "start_hour": baslangic // 60,
+        "start_minute": baslangic % 60,
+        "end_hour": bitis // 60,
+        "end_minute": bitis % 60,
+        "interval_minutes": aralik,
+    }
+
+
+def _hhmm_str(dakika):
+    return f"{dakika // 60:02d}:{dakika % 60:02d}"
+
+
+def getir(cursor, doktor_id):
+    """Ayar uç noktasının yanıtı; ayar yoksa None."""
+    ayar, gunler, molalar = _oku(cursor, doktor_id)
+    if ayar is None:
+        return None
+    bas_saat, bas_dk, bit_saat, bit_dk, aralik, versiyon = ayar
+    return {
+        "start_hour": bas_saat,
+        "start_minute": bas_dk,
+        "end_hour": bit_saat,
+        "end_minute": bit_dk,
+        "interval_minutes": aralik,
+        "weekdays": {
+            str(gun): _saatler_json(saatler) if saatler else None
+            for gun, saatler in sorted(gunler.items())
+        },
+        "breaks": [{
+            "start": _hhmm_str(bas),
+            "end": _hhmm_str(bit),
+            "weekdays": _gunler(maske) if maske else None,
+        } for maske, bas, bit in molalar],
+        "version": versiyon,
+    }
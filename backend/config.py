@@ -1,9 +1,151 @@
-import psycopg2
-
-def get_db_connection():
-    return psycopg2.connect(
-        host="localhost",
-        database="dis_randevu_sistemi",
-        user="postgres",
-        password="123456"
-    )
+import os
+
+# Veritabanı bağlantı ayarları (ortam değişkenleriyle ezilebilir)
+DB_AYARLARI = {
+    'host': os.environ.get('DB_HOST', 'localhost'),
+    'port': os.environ.get('DB_PORT', '5432'),
+    'dbname': os.environ.get('DB_NAME', 'dis_randevu_sistemi'),
+    'user': os.environ.get('DB_USER', 'postgres'),
+    'password': os.environ.get('DB_PASSWORD', '123456'),
+}
+
+# Bağlantı havuzu ayarları
+DB_HAVUZ_MIN = int(os.environ.get('DB_HAVUZ_MIN', '2'))
+DB_HAVUZ_MAX = int(os.environ.get('DB_HAVUZ_MAX', '20'))
+# Havuzda bağlantı beklemek için en fazla süre (saniye)
+DB_HAVUZ_BEKLEME_SURESI = float(os.environ.get('DB_HAVUZ_BEKLEME_SURESI', '10'))
+# Bu kadar saniye boşta kalan bağlantı verilmeden önce "SELECT 1" ile sınanır
+DB_SAGLIK_KONTROL_ARALIGI = float(os.environ.get('DB_SAGLIK_KONTROL_ARALIGI', '30'))
+
+# Slot ızgarası önbelleği: en fazla kaç (doktor, gün) tutulacağı ve bir girdinin
+# kaç saniye geçerli kalacağı. Yazma yapan worker kendi önbelleğini anında
+# temizler; süre, diğer worker süreçlerindeki eski kopyalar için üst sınırdır.
+SLOT_ONBELLEK_BOYUTU = int(os.environ.get('SLOT_ONBELLEK_BOYUTU', '10000'))
+SLOT_ONBELLEK_SURESI = float(os.environ.get('SLOT_ONBELLEK_SURESI', '10'))
+
+# Doktor dizininin (il/ilçe araması) veritabanından tamamen yeniden yüklenme
+# aralığı (saniye). Aynı worker'daki değişiklikler anında yansır.
+DIZIN_YENILEME_SURESI = float(os.environ.get('DIZIN_YENILEME_SURESI', '300'))
+# /api/doctors için sayfa boyutu üst sınırı
+DIZIN_MAX_SAYFA = int(os.environ.get('DIZIN_MAX_SAYFA', '100'))
+
+# /api/doctor/closures: tek istekte eklenip silinebilecek en fazla kural
+KAPALI_ARALIK_MAX_KURAL = int(os.environ.get('KAPALI_ARALIK_MAX_KURAL', '200'))
+
+# Koşullu GET: yanıt biçimi değiştiğinde artırılır, eski ETag'ler geçersiz olur
+ETAG_SURUMU = os.environ.get('ETAG_SURUMU', '1')
+# Her süreçte son sürümü hatırlanan en fazla anahtar (doktor/gün) sayısı
+ETAG_IZLEME_BOYUTU = int(os.environ.get('ETAG_IZLEME_BOYUTU', '50000'))
+
+# Hasta randevu listeleri: yalnızca cursor verildiğinde kullanılan varsayılan
+# ve en büyük sayfa boyutu (limit de cursor da yoksa liste sayfalanmaz)
+GECMIS_SAYFA_BOYUTU = int(os.environ.get('GECMIS_SAYFA_BOYUTU', '100'))
+GECMIS_MAX_SAYFA = int(os.environ.get('GECMIS_MAX_SAYFA', '500'))
+
+# Takvim uç noktasında tek istekte sorgulanabilecek en fazla gün sayısı
+TAKVIM_MAX_GUN = int(os.environ.get('TAKVIM_MAX_GUN', '92'))
+# Doktor panosunun aralık verilmediğinde gösterdiği gün sayısı (bugün dahil)
+PANO_VARSAYILAN_GUN = int(os.environ.get('PANO_VARSAYILAN_GUN', '7'))
+
+# Toplu müsaitlik uç noktasında tek istekte sorgulanabilecek en fazla doktor
+TOPLU_MUSAITLIK_MAX_DOKTOR = int(os.environ.get('TOPLU_MUSAITLIK_MAX_DOKTOR', '200'))
+
+# En erken boş slot araması: varsayılan gün aralığı ve tek istekte en fazla sonuç
+ERKEN_SLOT_GUN = int(os.environ.get('ERKEN_SLOT_GUN', '14'))
+ERKEN_SLOT_MAX_ADET = int(os.environ.get('ERKEN_SLOT_MAX_ADET', '50'))
+
+# Dosya yükleme: diske yazarken kullanılan parça boyutu, dosya başına üst sınır
+# ve parça parça yükleme oturumlarının son yazmadan sonra silinmeden önce
+# bekleneceği süre (sn; belge_temizligi.py siler)
+YUKLEME_PARCA_BOYUTU = int(os.environ.get('YUKLEME_PARCA_BOYUTU', str(64 * 1024)))
+YUKLEME_MAX_BOYUT = int(os.environ.get('YUKLEME_MAX_BOYUT', str(20 * 1024 * 1024)))
+YUKLEME_OTURUM_SURESI = float(os.environ.get('YUKLEME_OTURUM_SURESI', str(24 * 3600)))
+
+# Şifre hashleme: bcrypt maliyeti (log2 tur sayısı), ayrı süreç havuzundaki işçi
+# sayısı (0: istek thread'inde çalıştır), havuzda aynı anda bekleyebilecek iş
+# sayısı ve yer açılması için en fazla bekleme süresi (saniye). Maliyet
+# değiştirildiğinde eski hash'ler kullanıcı bir sonraki girişinde yenilenir.
+# Süreç havuzlarının başlatma yöntemi (multiprocessing): uygulama süreci
+# thread'li olduğundan "fork" kullanılmaz; işçiler, thread'lerin tuttuğu
+# kilitleri kopyalayıp takılabilirdi.
+SIFRE_BCRYPT_MALIYETI = int(os.environ.get('SIFRE_BCRYPT_MALIYETI', '12'))
+SIFRE_HAVUZ_BOYUTU = int(os.environ.get('SIFRE_HAVUZ_BOYUTU', str(os.cpu_count() or 2)))
+SIFRE_KUYRUK_SINIRI = int(os.environ.get('SIFRE_KUYRUK_SINIRI', '64'))
+SIFRE_BEKLEME_SURESI = float(os.environ.get('SIFRE_BEKLEME_SURESI', '5'))
+SUREC_BASLATMA_YONTEMI = os.environ.get('SUREC_BASLATMA_YONTEMI', 'forkserver')
+
+# İstek/sorgu metrikleri (/metrics, bkz. metrikler.py). Kapalıyken bağlantılar
+# sarılmaz ve isteklere ek iş eklenmez. Server-Timing başlığı ayrıca
+# kapatılabilir (ör. süre dökümünün istemcilere gitmemesi için).
+METRIKLER_ACIK = os.environ.get('METRIKLER_ACIK', '1') == '1'
+SERVER_TIMING_ACIK = os.environ.get('SERVER_TIMING_ACIK', '1') == '1'
+
+# Yavaş sorgu günlüğü (bkz. yavas_sorgular.py): eşik (ms; 0 kapatır), eşiği
+# aşan salt okunur sorgular için EXPLAIN (ANALYZE, BUFFERS) alınma oranı,
+# günlük dosyası (boş: yalnızca bellek), dosya başına boyut ve saklanan eski
+# dosya sayısı, /api/admin/slow_queries için bellekte tutulan kayıt sayısı.
+YAVAS_SORGU_ESIGI_MS = float(os.environ.get('YAVAS_SORGU_ESIGI_MS', '200'))
+YAVAS_SORGU_EXPLAIN_ORANI = float(os.environ.get('YAVAS_SORGU_EXPLAIN_ORANI', '0.05'))
+YAVAS_SORGU_DOSYASI = os.environ.get('YAVAS_SORGU_DOSYASI', os.path.join('logs', 'yavas_sorgular.log'))
+YAVAS_SORGU_DOSYA_BOYUTU = int(os.environ.get('YAVAS_SORGU_DOSYA_BOYUTU', str(10 * 1024 * 1024)))
+YAVAS_SORGU_DOSYA_SAYISI = int(os.environ.get('YAVAS_SORGU_DOSYA_SAYISI', '5'))
+YAVAS_SORGU_TAMPON = int(os.environ.get('YAVAS_SORGU_TAMPON', '200'))
+
+# WSGI sunucusu (bkz. gunicorn.conf.py): worker süreci sayısı ve worker başına
+# istek thread'i. Bağlantı havuzu da worker başınadır; DB_HAVUZ_MAX'tan fazla
+# thread aynı anda sorgu yaparsa fazlası bağlantı bekler.
+WSGI_ISCI = int(os.environ.get('WSGI_ISCI', '4'))
+WSGI_THREAD = int(os.environ.get('WSGI_THREAD', '32'))
+
+# Canlı slot akışı (Server-Sent Events, bkz. slot_yayini.py): worker başına
+# aynı anda açık akış sınırı, nabız yorumlarının aralığı ve bir akışın en
+# uzun açık kalma süresi (saniye), yavaş istemci başına bekletilen olay
+# sayısı ve istemcinin kopunca yeniden bağlanmadan önce bekleyeceği süre (ms,
+# SSE "retry" alanı). Her akış bir istek thread'ini açık kaldığı sürece
+# tuttuğundan sınır worker'ın thread sayısının altında kalmalıdır; varsayılan
+# olarak thread'lerin yarısı diğer isteklere ayrılır.
+SSE_MAX_AKIS = int(os.environ.get('SSE_MAX_AKIS', str(max(1, WSGI_THREAD // 2))))
+SSE_NABIZ_ARALIGI = float(os.environ.get('SSE_NABIZ_ARALIGI', '15'))
+SSE_MAX_SURE = float(os.environ.get('SSE_MAX_SURE', '300'))
+SSE_KUYRUK_BOYUTU = int(os.environ.get('SSE_KUYRUK_BOYUTU', '100'))
+SSE_YENIDEN_BAGLANMA_MS = int(os.environ.get('SSE_YENIDEN_BAGLANMA_MS', '3000'))
+
+# Belge işleme (bkz. belge_isleme.py): uygulama içinde kuyruğu işleyen thread
+# (kapatılırsa "python belge_isleme.py calistir" ayrıca çalıştırılmalı),
+# dönüştürmeleri yapan süreç sayısı (0: thread'in kendisinde), boş kuyrukta
+# bekleme aralığı (sn; hatalı işlerin geri çekilmesinin de tabanı), bir işin
+# deneme hakkı ve "isleniyor"da kalan bir işin yeniden alınma süresi (sn).
+# Küçük resimler en uzun kenarı KUCUK_RESIM_BOYUTU piksel olan JPEG'lerdir;
+# kayıpsız sıkıştırılmış PNG en az SIKISTIRMA_MIN_KAZANC oranında küçülmezse
+# saklanmaz.
+BELGE_ISLEME_ACIK = os.environ.get('BELGE_ISLEME_ACIK', '1') == '1'
+BELGE_ISLEME_ISCI = int(os.environ.get('BELGE_ISLEME_ISCI', '1'))
+BELGE_ISLEME_ARALIGI = float(os.environ.get('BELGE_ISLEME_ARALIGI', '2'))
+BELGE_ISLEME_MAX_DENEME = int(os.environ.get('BELGE_ISLEME_MAX_DENEME', '5'))
+BELGE_ISLEME_ZAMAN_ASIMI = float(os.environ.get('BELGE_ISLEME_ZAMAN_ASIMI', '300'))
+KUCUK_RESIM_BOYUTU = int(os.environ.get('KUCUK_RESIM_BOYUTU', '320'))
+KUCUK_RESIM_KALITESI = int(os.environ.get('KUCUK_RESIM_KALITESI', '80'))
+SIKISTIRMA_MIN_KAZANC = float(os.environ.get('SIKISTIRMA_MIN_KAZANC', '0.05'))
+
+# Yetim belge temizliği (bkz. belge_temizligi.py): bundan yeni (saniye)
+# dosyalara dokunulmaz, --sil verilmezse yetimlerin taşındığı dizin, veritabanı
+# ve dosya işlemlerinin parti boyutu.
+YETIM_BELGE_BEKLEME_SURESI = float(os.environ.get('YETIM_BELGE_BEKLEME_SURESI', str(24 * 3600)))
+YETIM_BELGE_KARANTINA_DIZINI = os.environ.get('YETIM_BELGE_KARANTINA_DIZINI', 'uploads_karantina')
+YETIM_BELGE_PARTI = int(os.environ.get('YETIM_BELGE_PARTI', '1000'))
+
+# Doluluk analitiği (bkz. analitik.py): uygulama içinde mutabakat thread'i
+# (kapatılırsa "python analitik.py calistir" ayrıca çalıştırılabilir; özet
+# okumaları bekleyen işaretleri kendileri de işlediğinden doğruluk buna bağlı
+# değildir), işaretli gün ve doktorlara bakma aralığı (sn), bir turda alınan
+# gün işareti sayısı, bütün doktorların penceresinin yenilenme aralığı (sn)
+# ve pencerenin bugünden geriye/ileriye gün sayısı. Saat dilimlerinin iptal
+# oranı sıralamasına en az ANALITIK_MIN_ORNEK randevu ya da iptali olan
+# dilimler girer.
+ANALITIK_MUTABAKAT_ACIK = os.environ.get('ANALITIK_MUTABAKAT_ACIK', '1') == '1'
+ANALITIK_KIRLI_ARALIGI = float(os.environ.get('ANALITIK_KIRLI_ARALIGI', '5'))
+ANALITIK_KIRLI_PARTI = int(os.environ.get('ANALITIK_KIRLI_PARTI', '500'))
+ANALITIK_MUTABAKAT_ARALIGI = float(os.environ.get('ANALITIK_MUTABAKAT_ARALIGI', '3600'))
+ANALITIK_GERIYE_GUN = int(os.environ.get('ANALITIK_GERIYE_GUN', '31'))
+ANALITIK_ILERIYE_GUN = int(os.environ.get('ANALITIK_ILERIYE_GUN', '62'))
+ANALITIK_MIN_ORNEK = int(os.environ.get('ANALITIK_MIN_ORNEK', '5'))
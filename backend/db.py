@@ -0,0 +1,269 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+import config
+import metrikler
+
+
+class BaglantiHavuzu:
+    """Thread-safe PostgreSQL bağlantı havuzu.
+
+    Havuz doluysa bağlantı isteyen thread, bir bağlantı geri bırakılana kadar
+    (en fazla ``bekleme_suresi`` saniye) bekler. Uzun süre boşta kalmış
+    bağlantılar verilmeden önce ``SELECT 1`` ile sınanır, kopmuş olanlar
+    yenisiyle değiştirilir.
+    """
+
+    def __init__(self, min_boyut, max_boyut, bekleme_suresi, saglik_araligi, **baglanti_ayarlari):
+        if min_boyut < 0 or max_boyut < 1 or min_boyut > max_boyut:
+            raise ValueError("Geçersiz havuz boyutu")
+
+        self.min_boyut = min_boyut
+        self.max_boyut = max_boyut
+        self.bekleme_suresi = bekleme_suresi
+        self.saglik_araligi = saglik_araligi
+        self._baglanti_ayarlari = baglanti_ayarlari
+
+        self._kosul = threading.Condition()
+        self._bos = deque()  # (bağlantı, son bırakılma zamanı)
+        self._toplam = 0
+        self._kullanimda = 0
+        self._bekleyen = 0
+
+        # İstatistikler
+        self._alim_sayisi = 0
+        self._toplam_alim_suresi = 0.0
+        self._max_alim_suresi = 0.0
+        self._olusturulan = 0
+        self._saglik_hatasi = 0
+        self._zaman_asimi = 0
+
+        for _ in range(min_boyut):
+            conn = self._yeni_baglanti()
+            self._bos.append((conn, time.monotonic()))
+            self._toplam += 1
+
+    def _yeni_baglanti(self):
+        conn = psycopg2.connect(**self._baglanti_ayarlari)
+        with self._kosul:
+            self._olusturulan += 1
+        return conn
+
+    def _saglikli_mi(self, conn, son_kullanim):
+        if conn.closed:
+            return False
+        if time.monotonic() - son_kullanim < self.saglik_araligi:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def al(self):
+        baslangic = time.monotonic()
+        son_an = baslangic + self.bekleme_suresi
+
+        with self._kosul:
+            self._bekleyen += 1
+            try:
+                while True:
+                    if self._bos:
+                        # LIFO: en son kullanılan (sıcak) bağlantı önce verilir
+                        conn, son_kullanim = self._bos.pop()
+                        break
+                    if self._toplam < self.max_boyut:
+                        self._toplam += 1
+                        conn, son_kullanim = None, None
+                        break
+                    kalan = son_an - time.monotonic()
+                    if kalan <= 0:
+                        self._zaman_asimi += 1
+                        raise PoolError("Veritabanı bağlantı havuzu dolu")
+                    self._kosul.wait(kalan)
+            finally:
+                self._bekleyen -= 1
+            self._kullanimda += 1
+
+        # Bağlantı kurma ve sağlık kontrolü kilit dışında yapılır
+        try:
+            if conn is not None and not self._saglikli_mi(conn, son_kullanim):
+                with self._kosul:
+                    self._saglik_hatasi += 1
+                self._kapat(conn)
+                conn = None
+            if conn is None:
+                conn = self._yeni_baglanti()
+        except Exception:
+            with self._kosul:
+                self._toplam -= 1
+                self._kullanimda -= 1
+                self._kosul.notify()
+            raise
+
+        sure = time.monotonic() - baslangic
+        with self._kosul:
+            self._alim_sayisi += 1
+            self._toplam_alim_suresi += sure
+            if sure > self._max_alim_suresi:
+                self._max_alim_suresi = sure
+        return conn
+
+    def birak(self, conn, kapat=False):
+        if not kapat and not conn.closed:
+            # Yarım kalan işlem havuza taşınmasın
+            if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    kapat = True
+
+        with self._kosul:
+            self._kullanimda -= 1
+            if kapat or conn.closed:
+                self._toplam -= 1
+            else:
+                self._bos.append((conn, time.monotonic()))
+            self._kosul.notify()
+
+        if kapat:
+            self._kapat(conn)
+
+    @staticmethod
+    def _kapat(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def kapat(self):
+        with self._kosul:
+            bos = list(self._bos)
+            self._bos.clear()
+            self._toplam -= len(bos)
+        for conn, _ in bos:
+            self._kapat(conn)
+
+    def istatistikler(self):
+        with self._kosul:
+            ort = self._toplam_alim_suresi / self._alim_sayisi if self._alim_sayisi else 0.0
+            return {
+                "min": self.min_boyut,
+                "max": self.max_boyut,
+                "toplam": self._toplam,
+                "bos": len(self._bos),
+                "kullanimda": self._kullanimda,
+                "bekleyen": self._bekleyen,
+                "alim_sayisi": self._alim_sayisi,
+                "ort_alim_ms": round(ort * 1000, 3),
+                "max_alim_ms": round(self._max_alim_suresi * 1000, 3),
+                "olusturulan_baglanti": self._olusturulan,
+                "saglik_hatasi": self._saglik_hatasi,
+                "zaman_asimi": self._zaman_asimi,
+            }
+
+
+# Her execute/executemany'den sonra izleyici(cursor, sorgu, parametreler,
+# süre_sn) çağrılır (metrikler, benchmark'lar). İzleyiciler havuz ilk
+# bağlantıyı açmadan önce eklenmelidir; hiç izleyici yoksa bağlantılar
+# sarılmaz.
+_sorgu_izleyicileri = [metrikler.sorgu_bitti] if config.METRIKLER_ACIK else []
+
+
+def sorgu_izleyicisi_ekle(izleyici):
+    if _havuz is not None:
+        raise RuntimeError("Sorgu izleyicisi havuz oluşturulmadan önce eklenmelidir")
+    _sorgu_izleyicileri.append(izleyici)
+
+
+def _bildir(cursor, sorgu, parametreler, baslangic):
+    sure = time.perf_counter() - baslangic
+    for izleyici in _sorgu_izleyicileri:
+        izleyici(cursor, sorgu, parametreler, sure)
+
+
+@lru_cache(maxsize=None)
+def _izlenen_imlec(fabrika):
+    class IzlenenImlec(fabrika):
+        def execute(self, sorgu, parametreler=None):
+            baslangic = time.perf_counter()
+            try:
+                return super().execute(sorgu, parametreler)
+            finally:
+                _bildir(self, sorgu, parametreler, baslangic)
+
+        def executemany(self, sorgu, parametre_listesi):
+            baslangic = time.perf_counter()
+            try:
+                return super().executemany(sorgu, parametre_listesi)
+            finally:
+                _bildir(self, sorgu, parametre_listesi, baslangic)
+
+    return IzlenenImlec
+
+
+class IzlenenBaglanti(extensions.connection):
+    """Açtığı her cursor'ı (RealDictCursor dahil) sorgu izleyicilerine
+    bildiren bağlantı."""
+
+    def cursor(self, *args, **kwargs):
+        fabrika = kwargs.get('cursor_factory') or self.cursor_factory or extensions.cursor
+        kwargs['cursor_factory'] = _izlenen_imlec(fabrika)
+        return super().cursor(*args, **kwargs)
+
+
+_havuz = None
+_havuz_kilidi = threading.Lock()
+
+
+def havuz():
+    global _havuz
+    if _havuz is None:
+        with _havuz_kilidi:
+            if _havuz is None:
+                baglanti_ayarlari = dict(config.DB_AYARLARI)
+                if _sorgu_izleyicileri:
+                    baglanti_ayarlari.setdefault('connection_factory', IzlenenBaglanti)
+                _havuz = BaglantiHavuzu(
+                    config.DB_HAVUZ_MIN,
+                    config.DB_HAVUZ_MAX,
+                    config.DB_HAVUZ_BEKLEME_SURESI,
+                    config.DB_SAGLIK_KONTROL_ARALIGI,
+                    **baglanti_ayarlari
+                )
+    return _havuz
+
+
+@contextmanager
+def db_baglantisi():
+    """Havuzdan bir bağlantı alır ve blok bitince (hata olsa da) geri bırakır.
+
+    Commit edilmemiş işlemler bırakılırken geri alınır; kopmuş bağlantılar
+    havuza geri konmaz.
+    """
+    h = havuz()
+    with metrikler.olc('db_baglanti'):
+        conn = h.al()
+    kapat = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        kapat = True
+        raise
+    finally:
+        h.birak(conn, kapat=kapat)
+
+
+def havuz_istatistikleri():
+    if _havuz is None:
+        return {"min": config.DB_HAVUZ_MIN, "max": config.DB_HAVUZ_MAX, "toplam": 0}
+    return _havuz.istatistikler()
@@ -0,0 +1,276 @@
+"""İl/ilçeye göre doktor dizini.
+
+Doktorlar bellekte normalize edilmiş (il, ilce) anahtarına göre gruplanır;
+her grup doktor_id'ye göre sıralıdır, sayfalama bu sıra üzerinde keyset
+(son doktor_id'den sonrası) ile yapılır. Arama veritabanına gitmez.
+
+Dizin ilk kullanımda tek sorguyla yüklenir. Doktor kaydı veya profil
+güncellemesi commit edildikten sonra ``doktor_guncelle`` yalnızca o doktoru
+yeniden okur. Başka worker süreçlerindeki değişiklikler, o doktorun
+``dizin:<id>`` sayacı bu süreçte görüldüğünde (bkz. surumler.py; doktor
+profili okunurken) yalnızca o doktor için, aksi halde dizin
+``DIZIN_YENILEME_SURESI`` saniyede bir tamamen yeniden yüklendiğinde görünür.
+
+/api/doctors'un ETag'i ``grup_surumu``dür: il/ilçe grubundaki kayıtların
+özeti. Bellekten hesaplanır; aynı içeriği tutan worker'lar aynı sürümü verir.
+
+SQL sonucuyla karşılaştırma için backend dizininden:
+
+    python doktor_dizini.py dogrula
+"""
+import bisect
+import hashlib
+import threading
+import time
+
+import config
+from db import db_baglantisi
+
+DIZIN_SORGUSU = """
+    SELECT d.doktor_id, d.ad, d.soyad, d.brans, a.il, a.ilce
+    FROM doktorlar d
+    JOIN adres a ON a.adres_id = d.adres_id
+"""
+
+
+def normalize(metin):
+    """Türkçe büyük/küçük harf katlaması ve boşluk sadeleştirme.
+
+    "I"/"İ" ve "ı"/"i" aynı sayılır: yer adı büyük harfle ya da noktasız
+    "ı" yerine "i" ile yazıldığında ("ISTANBUL", "Sarıyer"/"Sariyer") da
+    eşleşir.
+    """
+    if metin is None:
+        return ''
+    metin = metin.replace('İ', 'i').lower().replace('ı', 'i')
+    return ' '.join(metin.split())
+
+
+class DoktorDizini:
+
+    def __init__(self, sure):
+        self.sure = sure
+        self._kilit = threading.Lock()
+        self._yukleme_kilidi = threading.Lock()
+        self._gruplar = None    # (il, ilce) -> sıralı doktor_id listesi
+        self._kayitlar = {}     # doktor_id -> (anahtar, kayit)
+        self._grup_surumleri = {}  # (il, ilce) -> içerik özeti; grup değişince silinir
+        self._yukleme_zamani = 0.0
+        # Tam yükleme sürerken tek tek güncellenen doktorlar; yükleme eski
+        # veriyi okumuş olabileceğinden bunlar sonradan yeniden okunur.
+        self._yukleme_sirasinda = None
+        self.isabet = 0
+        self.yukleme_sayisi = 0
+
+    @staticmethod
+    def _ayristir(satir):
+        doktor_id, ad, soyad, brans, il, ilce = satir
+        anahtar = (normalize(il), normalize(ilce))
+        kayit = {"doktor_id": doktor_id, "ad": ad, "soyad": soyad, "brans": brans}
+        return doktor_id, anahtar, kayit
+
+    def _yukle(self):
+        with self._kilit:
+            self._yukleme_sirasinda = set()
+
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            cursor.execute(DIZIN_SORGUSU)
+            satirlar = cursor.fetchall()
+
+        for doktor_id in self.kur(satirlar):
+            self.doktor_guncelle(doktor_id)
+
+    def kur(self, satirlar):
+        """Dizini ``DIZIN_SORGUSU`` satırlarından kurar (veritabanına gitmez).
+
+        Kurulum sürerken ``doktor_guncelle`` ile değişen doktorların
+        id'lerini döner; bunlar yeniden okunmalıdır.
+        """
+        gruplar = {}
+        kayitlar = {}
+        for satir in satirlar:
+            doktor_id, anahtar, kayit = self._ayristir(satir)
+            kayitlar[doktor_id] = (anahtar, kayit)
+            gruplar.setdefault(anahtar, []).append(doktor_id)
+        for idler in gruplar.values():
+            idler.sort()
+
+        with self._kilit:
+            self._gruplar = gruplar
+            self._kayitlar = kayitlar
+            self._grup_surumleri = {}
+            self._yukleme_zamani = time.monotonic()
+            self.yukleme_sayisi += 1
+            tekrar = self._yukleme_sirasinda or set()
+            self._yukleme_sirasinda = None
+        return tekrar
+
+    def _guncel_mi(self):
+        with self._kilit:
+            return self._gruplar is not None and time.monotonic() - self._yukleme_zamani < self.sure
+
+    def _hazirla(self):
+        if self._guncel_mi():
+            return
+        with self._kilit:
+            ilk_yukleme = self._gruplar is None
+        # Aynı anda yalnızca bir thread yükler. İlk yüklemede diğerleri onu
+        # bekler; süresi dolmuş bir dizin ise yenilenirken sunulmaya devam eder.
+        if not self._yukleme_kilidi.acquire(blocking=ilk_yukleme):
+            return
+        try:
+            if not self._guncel_mi():
+                self._yukle()
+        finally:
+            self._yukleme_kilidi.release()
+
+    def yenile(self):
+        """Dizini hemen, beklenerek yeniden yükler (başka bir süreçte
+        değiştiği bilindiğinde)."""
+        with self._yukleme_kilidi:
+            self._yukle()
+
+    def _cikar(self, doktor_id):
+        eski = self._kayitlar.pop(doktor_id, None)
+        if eski is None:
+            return
+        self._grup_surumleri.pop(eski[0], None)
+        idler = self._gruplar.get(eski[0], [])
+        i = bisect.bisect_left(idler, doktor_id)
+        if i < len(idler) and idler[i] == doktor_id:
+            del idler[i]
+        if not idler:
+            self._gruplar.pop(eski[0], None)
+
+    def doktor_guncelle(self, doktor_id):
+        """Bir doktorun kaydını veritabanından yeniden okur.
+
+        Commit'ten sonra çağrılmalıdır. Doktor silinmiş ya da adresi yoksa
+        dizinden çıkarılır.
+        """
+        with self._kilit:
+            if self._yukleme_sirasinda is not None:
+                self._yukleme_sirasinda.add(doktor_id)
+            if self._gruplar is None:
+                return
+
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            cursor.execute(DIZIN_SORGUSU + " WHERE d.doktor_id = %s", (doktor_id,))
+            satir = cursor.fetchone()
+        self.satir_uygula(doktor_id, satir)
+
+    def satir_uygula(self, doktor_id, satir):
+        """Bir doktorun ``DIZIN_SORGUSU`` satırını dizine yazar; satır None
+        ise doktoru çıkarır."""
+        with self._kilit:
+            if self._gruplar is None:
+                return
+            self._cikar(doktor_id)
+            if satir is not None:
+                doktor_id, anahtar, kayit = self._ayristir(satir)
+                self._kayitlar[doktor_id] = (anahtar, kayit)
+                bisect.insort(self._gruplar.setdefault(anahtar, []), doktor_id)
+                self._grup_surumleri.pop(anahtar, None)
+
+    def ara(self, il, ilce, brans=None, sonra=None, limit=None):
+        """(kayıtlar, sonraki_imlec) döner.
+
+        ``sonra`` bir önceki sayfanın son doktor_id'sidir; daha fazla sonuç
+        yoksa sonraki_imlec None olur.
+        """
+        self._hazirla()
+        brans = normalize(brans) if brans else None
+
+        with self._kilit:
+            self.isabet += 1
+            idler = self._gruplar.get((normalize(il), normalize(ilce)), ())
+            i = bisect.bisect_right(idler, sonra) if sonra is not None else 0
+
+            sonuc = []
+            for doktor_id in idler[i:]:
+                kayit = self._kayitlar[doktor_id][1]
+                if brans and normalize(kayit["brans"]) != brans:
+                    continue
+                if limit is not None and len(sonuc) == limit:
+                    return sonuc, sonuc[-1]["doktor_id"]
+                sonuc.append(dict(kayit))
+        return sonuc, None
+
+    def grup_surumu(self, il, ilce):
+        """(il, ilce) grubundaki kayıtların özeti; grup değişmedikçe aynıdır."""
+        self._hazirla()
+        anahtar = (normalize(il), normalize(ilce))
+        with self._kilit:
+            surum = self._grup_surumleri.get(anahtar)
+            if surum is None:
+                ozet = hashlib.sha1()
+                for doktor_id in self._gruplar.get(anahtar, ()):
+                    kayit = self._kayitlar[doktor_id][1]
+                    ozet.update(repr((doktor_id, kayit["ad"], kayit["soyad"], kayit["brans"])).encode())
+                surum = self._grup_surumleri[anahtar] = ozet.hexdigest()[:16]
+        return surum
+
+    def istatistikler(self):
+        with self._kilit:
+            return {
+                "doktor": len(self._kayitlar),
+                "grup": len(self._gruplar or ()),
+                "arama": self.isabet,
+                "yukleme": self.yukleme_sayisi,
+            }
+
+
+dizin = DoktorDizini(config.DIZIN_YENILEME_SURESI)
+
+
+def dogrula():
+    """Dizini, her (il, ilce) çifti için SQL'in tam eşleşme sonucuyla
+    karşılaştırır; farkları liste olarak döner (boş liste: tutarlı)."""
+    farklar = []
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT DISTINCT a.il, a.ilce FROM adres a
+            JOIN doktorlar d ON d.adres_id = a.adres_id
+        """)
+        ciftler = cursor.fetchall()
+
+        beklenen = {}
+        for il, ilce in ciftler:
+            cursor.execute("""
+                SELECT doktorlar.doktor_id
+                FROM doktorlar
+                JOIN adres  ON doktorlar.adres_id = adres.adres_id
+                WHERE adres.il = %s AND adres.ilce = %s
+            """, (il, ilce))
+            anahtar = (normalize(il), normalize(ilce))
+            beklenen.setdefault(anahtar, set()).update(r[0] for r in cursor.fetchall())
+
+    for (il, ilce), idler in sorted(beklenen.items()):
+        # Sayfalı okuma, sayfalamanın da eksiksiz olduğunu doğrular
+        bulunan, imlec = [], None
+        while True:
+            sayfa, imlec = dizin.ara(il, ilce, sonra=imlec, limit=50)
+            bulunan.extend(k["doktor_id"] for k in sayfa)
+            if imlec is None:
+                break
+        if bulunan != sorted(idler):
+            farklar.append({
+                "il": il, "ilce": ilce,
+                "eksik": sorted(idler - set(bulunan)),
+                "fazla": sorted(set(bulunan) - idler),
+            })
+    return farklar
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Doktor dizini araçları")
+    parser.add_argument('komut', choices=['dogrula'])
+    args = parser.parse_args()
+
+    farklar = dogrula()
+    print(json.dumps({"istatistik": dizin.istatistikler(), "farklar": farklar}, indent=2, ensure_ascii=False))
+    if farklar:
+        raise SystemExit(1)
@@ -1,5 +1,5 @@
 # from flask import Blueprint, request, jsonify
-# from config import get_db_connection
+# from db import db_baglantisi
 
 # doktor_bp = Blueprint('doktor_bp', __name__)
 
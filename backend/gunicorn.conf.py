@@ -0,0 +1,33 @@
+"""gunicorn ayarları; backend dizininden çalıştırılan ``gunicorn wsgi:app``
+bu dosyayı kendiliğinden okur.
+
+SSE akışları (slot_yayini.py) bir istek thread'ini ``SSE_MAX_SURE`` saniyeye
+kadar tutar. Worker başına tek thread'li sync worker'larla birkaç açık takvim
+ekranı bütün API'yi durdururdu; bu yüzden thread'li worker kullanılır ve
+worker başına açık akış sınırı (``SSE_MAX_AKIS``) thread sayısının altında
+tutulur ki diğer isteklere her zaman thread kalsın.
+"""
+# Buradaki modül düzeyi adları gunicorn ayar olarak okur ("config" da bir
+# ayardır); config modülü bu yüzden adlarıyla alınır.
+from config import SSE_MAX_AKIS, WSGI_ISCI, WSGI_THREAD
+
+worker_class = 'gthread'
+workers = WSGI_ISCI
+threads = WSGI_THREAD
+
+# Arka plan thread'leri her worker'da wsgi.py içinde başlar; --preload ile
+# fork'tan önce ana süreçte başlarlardı.
+preload_app = False
+
+
+def on_starting(server):
+    # Komut satırındaki --worker-class / --threads bu dosyadakileri ezer;
+    # kontrol geçerli ayarlarla yapılır.
+    isci_turu = server.cfg.worker_class_str
+    if isci_turu == 'sync':
+        raise RuntimeError("SSE akışları için thread'li worker gerekir (--worker-class gthread)")
+    if isci_turu == 'gthread' and SSE_MAX_AKIS >= server.cfg.threads:
+        raise RuntimeError(
+            f"SSE_MAX_AKIS ({SSE_MAX_AKIS}) worker başına thread sayısından "
+            f"({server.cfg.threads}) küçük olmalı"
+        )
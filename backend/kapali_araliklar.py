@@ -0,0 +1,205 @@
+"""Doktorun kapalı zaman aralıkları (kapali_araliklar tablosu).
+
+Her kural bir tarih aralığında, isteğe bağlı olarak yalnızca haftanın belirli
+günlerinde, gün içindeki [baslangic_dk, bitis_dk) dakika aralığını kapatır
+ya da (``acik``) açar. Tek slot, tam gün, tarih aralığı ve haftalık tekrar
+eden bloklar aynı satır biçimiyle ifade edilir.
+
+Bir slotu kapsayan kurallardan en son oluşturulanı (en büyük id) geçerlidir:
+tatil için kapatılan bir haftanın içindeki tek bir saat sonradan açılabilir,
+açılmış bir saatin üzerine yeni bir kapatma da yine kapatır. Veritabanında
+aynı kural kapali_mi() fonksiyonuyla uygulanır (bkz.
+migrations/005_kapali_araliklar.sql).
+"""
+from datetime import datetime
+
+from psycopg2.extras import execute_values
+
+GUN_DAKIKASI = 24 * 60
+
+_HAFTA_GUNLERI = range(1, 8)  # ISO: Pazartesi = 1 ... Pazar = 7
+
+
+class KuralHatasi(ValueError):
+    pass
+
+
+def aralik_maskesi(baslangic_dk, bitis_dk):
+    """[baslangic_dk, bitis_dk) dakikalarının bit maskesi."""
+    return (1 << bitis_dk) - (1 << baslangic_dk)
+
+
+def gun_maskesi(kurallar):
+    """Bir günün kurallarından kapalı dakikaların bit maskesi.
+
+    ``kurallar`` id sırasında (baslangic_dk, bitis_dk, acik) üçlüleridir;
+    her kural öncekilerin üzerine yazılır.
+    """
+    maske = 0
+    for baslangic_dk, bitis_dk, acik in kurallar or ():
+        aralik = aralik_maskesi(baslangic_dk, bitis_dk)
+        if acik:
+            maske &= ~aralik
+        else:
+            maske |= aralik
+    return maske
+
+
+def _dakika(saat):
+    return saat.hour * 60 + saat.minute
+
+
+def _saat_ayristir(deger, alan):
+    if deger == "24:00":
+        return GUN_DAKIKASI
+    try:
+        return _dakika(datetime.strptime(deger, "%H:%M").time())
+    except (TypeError, ValueError):
+        raise KuralHatasi(f"{alan} SS:DD biçiminde olmalıdır")
+
+
+def _tarih_ayristir(deger, alan):
+    try:
+        return datetime.strptime(deger, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise KuralHatasi(f"{alan} YYYY-AA-GG biçiminde olmalıdır")
+
+
+def kural_ayristir(veri):
+    """İstekteki bir kuralı tablo kolonlarına çevirir.
+
+    Alanlar: start_date (zorunlu), end_date, start_time, end_time, weekdays
+    (ISO gün numaraları), open. Saat verilmezse tüm gün; yalnızca start_time
+    verilirse o tek slot kapanır. end_time hariçtir ("12:00"-"13:00" 13:00
+    slotunu kapatmaz). end_date verilmezse kural tek günlüktür; weekdays
+    verilmiş ve end_date açıkça null ise süresiz tekrar eder.
+    """
+    if not isinstance(veri, dict):
+        raise KuralHatasi("Kural bir nesne olmalıdır")
+
+    baslangic_tarih = _tarih_ayristir(veri.get("start_date"), "start_date")
+    gunler = veri.get("weekdays")
+    if "end_date" in veri and veri["end_date"] is None:
+        if not gunler:
+            raise KuralHatasi("Süresiz kural yalnızca weekdays ile verilebilir")
+        bitis_tarih = None
+    elif "end_date" in veri:
+        bitis_tarih = _tarih_ayristir(veri["end_date"], "end_date")
+        if bitis_tarih < baslangic_tarih:
+            raise KuralHatasi("end_date start_date'ten önce olamaz")
+    else:
+        bitis_tarih = baslangic_tarih
+
+    if veri.get("start_time") is None:
+        if veri.get("end_time") is not None:
+            raise KuralHatasi("end_time yalnızca start_time ile verilebilir")
+        baslangic_dk, bitis_dk = 0, GUN_DAKIKASI
+    else:
+        baslangic_dk = _saat_ayristir(veri["start_time"], "start_time")
+        if veri.get("end_time") is None:
+            bitis_dk = baslangic_dk + 1
+        else:
+            bitis_dk = _saat_ayristir(veri["end_time"], "end_time")
+        if not 0 <= baslangic_dk < bitis_dk <= GUN_DAKIKASI:
+            raise KuralHatasi("end_time start_time'dan sonra olmalıdır")
+
+    haftanin_gunleri = None
+    if gunler:
+        if not isinstance(gunler, list) or any(g not in _HAFTA_GUNLERI for g in gunler):
+            raise KuralHatasi("weekdays 1 (Pazartesi) ile 7 (Pazar) arasındaki günlerin listesi olmalıdır")
+        haftanin_gunleri = sum(1 << (g - 1) for g in set(gunler))
+
+    return {
+        "baslangic_tarih": baslangic_tarih,
+        "bitis_tarih": bitis_tarih,
+        "baslangic_dk": baslangic_dk,
+        "bitis_dk": bitis_dk,
+        "haftanin_gunleri": haftanin_gunleri,
+        "acik": bool(veri.get("open", False)),
+    }
+
+
+def kural_json(satir):
+    kural_id, baslangic_tarih, bitis_tarih, baslangic_dk, bitis_dk, haftanin_gunleri, acik = satir
+    return {
+        "id": kural_id,
+        "start_date": baslangic_tarih.isoformat(),
+        "end_date": bitis_tarih.isoformat() if bitis_tarih else None,
+        "start_time": f"{baslangic_dk // 60:02d}:{baslangic_dk % 60:02d}",
+        "end_time": f"{bitis_dk // 60:02d}:{bitis_dk % 60:02d}",
+        "weekdays": [g for g in _HAFTA_GUNLERI if haftanin_gunleri & (1 << (g - 1))] if haftanin_gunleri else None,
+        "open": acik,
+    }
+
+
+_KOLONLAR = "id, baslangic_tarih, bitis_tarih, baslangic_dk, bitis_dk, haftanin_gunleri, acik"
+
+
+def kurallari_ekle(cursor, doktor_id, kurallar):
+    """Ayrıştırılmış kuralları tek INSERT ile ekler; id'leri sırayla döner."""
+    if not kurallar:
+        return []
+    satirlar = execute_values(cursor, """
+        INSERT INTO kapali_araliklar
+            (doktor_id, baslangic_tarih, bitis_tarih, baslangic_dk, bitis_dk, haftanin_gunleri, acik)
+        VALUES %s
+        RETURNING id
+    """, [
+        (doktor_id, k["baslangic_tarih"], k["bitis_tarih"], k["baslangic_dk"], k["bitis_dk"],
+         k["haftanin_gunleri"], k["acik"])
+        for k in kurallar
+    ], fetch=True)
+    return [r[0] for r in satirlar]
+
+
+def kurallari_sil(cursor, doktor_id, idler):
+    """Doktora ait kuralları siler; silinen id'leri döner."""
+    if not idler:
+        return []
+    cursor.execute("""
+        DELETE FROM kapali_araliklar
+        WHERE doktor_id = %s AND id = ANY(%s)
+        RETURNING id
+    """, (doktor_id, list(idler)))
+    return sorted(r[0] for r in cursor.fetchall())
+
+
+def kurallari_getir(cursor, doktor_id, baslangic=None, bitis=None):
+    """[baslangic, bitis] ile kesişen kurallar, oluşturulma sırasında."""
+    cursor.execute(f"""
+        SELECT {_KOLONLAR}
+        FROM kapali_araliklar
+        WHERE doktor_id = %(doktor_id)s
+          AND (%(baslangic)s::date IS NULL OR COALESCE(bitis_tarih, 'infinity'::date) >= %(baslangic)s)
+          AND (%(bitis)s::date IS NULL OR baslangic_tarih <= %(bitis)s)
+        ORDER BY id
+    """, {"doktor_id": doktor_id, "baslangic": baslangic, "bitis": bitis})
+    return [kural_json(r) for r in cursor.fetchall()]
+
+
+# Slota ait tek slotluk kurallar (slot_ayarla)
+TEK_SLOT_SIL_SORGUSU = """
+    DELETE FROM kapali_araliklar
+    WHERE doktor_id = %(doktor_id)s
+      AND baslangic_tarih = %(tarih)s AND bitis_tarih = %(tarih)s
+      AND baslangic_dk = %(dakika)s AND bitis_dk = %(dakika)s + 1
+      AND haftanin_gunleri IS NULL
+"""
+
+
+def slot_ayarla(cursor, doktor_id, tarih, saat, kapali):
+    """Tek bir slotu kapatır ya da açar (eski /api/doctor/closed_slot).
+
+    Slota ait önceki tek slotluk kurallar silinir; slotun durumu hâlâ
+    istenenden farklıysa (ör. bir tatil aralığının içindeyse) yeni bir tek
+    slotluk kural eklenir. Böylece aynı saat tekrar tekrar açılıp
+    kapatıldığında kural birikmez.
+    """
+    dakika = _dakika(saat)
+    cursor.execute(TEK_SLOT_SIL_SORGUSU, {"doktor_id": doktor_id, "tarih": tarih, "dakika": dakika})
+    cursor.execute("SELECT kapali_mi(%s, %s, %s)", (doktor_id, tarih, saat))
+    if cursor.fetchone()[0] != bool(kapali):
+        cursor.execute("""
+            INSERT INTO kapali_araliklar (doktor_id, baslangic_tarih, bitis_tarih, baslangic_dk, bitis_dk, acik)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (doktor_id, tarih, tarih, dakika, dakika + 1, not kapali))
@@ -0,0 +1,68 @@
+from psycopg2 import sql
+
+
+# Profil güncelleme route'larının yazabileceği tablo/kolonlar (beyaz liste).
+# tablo -> (anahtar kolon, güncellenebilir kolonlar)
+GUNCELLENEBILIR_ALANLAR = {
+    'doktorlar': ('doktor_id', ('soyad', 'brans', 'kullanici_adi', 'sifre', 'diploma_belgesi', 'isyeri_belgesi')),
+    'hastalar': ('hasta_id', ('soyad', 'kullanici_adi', 'sifre', 'ameliyat_raporu', 'rontgen')),
+    'adres': ('adres_id', ('il', 'ilce', 'tamadres')),
+}
+
+
+def degisiklikler(data, alanlar):
+    """İstek verisinden boş olmayan alanları seçer (eski davranış: boş değer
+    alanı değiştirmez)."""
+    return {alan: data[alan] for alan in alanlar if data.get(alan)}
+
+
+def kismi_guncelle(cursor, tablo, anahtar_degeri, degerler, getir=()):
+    """``degerler``deki kolonları tek bir UPDATE ile yazar.
+
+    Satır FOR UPDATE ile kilitlenir ve eski değerler aynı ifadede okunur.
+    Satır yoksa None, varsa eski değerleri içeren bir sözlük döner; sözlük
+    güncellenen kolonları ve ``getir`` ile istenen ek kolonları içerir.
+    Yazılacak kolon yoksa yalnızca ``getir`` kolonları okunur; hiçbir kolon
+    istenmese de satırın varlığı denetlenir.
+    """
+    anahtar, izinli = GUNCELLENEBILIR_ALANLAR[tablo]
+    for alan in degerler:
+        if alan not in izinli:
+            raise ValueError(f"{tablo}.{alan} güncellenemez")
+
+    kolonlar = list(degerler)
+    okunacak = kolonlar + [k for k in getir if k not in degerler]
+    # Anahtar her zaman ilk kolon olarak okunur; satır yoksa sorgu boş döner
+    donen = [anahtar] + okunacak
+
+    if kolonlar:
+        sorgu = sql.SQL("""
+            UPDATE {tablo} AS t SET {atamalar}
+            FROM (SELECT {eski_kolonlar} FROM {tablo} WHERE {anahtar} = %s FOR UPDATE) AS eski
+            WHERE t.{anahtar} = eski.{anahtar}
+            RETURNING {donen}
+        """).format(
+            tablo=sql.Identifier(tablo),
+            anahtar=sql.Identifier(anahtar),
+            atamalar=sql.SQL(', ').join(sql.SQL("{} = %s").format(sql.Identifier(k)) for k in kolonlar),
+            eski_kolonlar=sql.SQL(', ').join(sql.Identifier(k) for k in donen),
+            donen=sql.SQL(', ').join(sql.SQL("eski.{}").format(sql.Identifier(k)) for k in donen),
+        )
+        parametreler = [degerler[k] for k in kolonlar] + [anahtar_degeri]
+    else:
+        sorgu = sql.SQL("SELECT {} FROM {} WHERE {} = %s").format(
+            sql.SQL(', ').join(sql.Identifier(k) for k in donen),
+            sql.Identifier(tablo), sql.Identifier(anahtar)
+        )
+        parametreler = [anahtar_degeri]
+
+    cursor.execute(sorgu, parametreler)
+    satir = cursor.fetchone()
+    if satir is None:
+        return None
+    return dict(zip(okunacak, satir[1:]))
+
+
+def degisen_alanlar(eski, degerler):
+    """Değeri gerçekten değişen alan adları, istek sırasıyla."""
+    return [alan for alan, deger in degerler.items() if eski.get(alan) != deger]
@@ -0,0 +1,188 @@
+"""İstek, sorgu ve bölüm süreleri: /metrics ve Server-Timing.
+
+Her istek için route bazında gecikme, çalışan SQL sorgularının sayısı ve
+süresi (db.py'deki sarılmış cursor'lar üzerinden) ile ``olc`` ile
+işaretlenmiş bölümlerin (bcrypt, base64 dosya G/Ç, JSON kodlama, havuzdan
+bağlantı alma) süreleri toplanır. Toplamlar ``metin()`` ile Prometheus metin
+biçiminde verilir; tek isteğin dökümü ``Server-Timing`` başlığına yazılır.
+
+Metrikler süreç içidir: birden çok worker çalışıyorsa her worker kendi
+sayaçlarını verir. ``config.METRIKLER_ACIK`` kapalıyken hook'lar kurulmaz,
+bağlantılar sarılmaz ve ``olc`` boş bir context manager döner.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+from flask import g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+import config
+
+SURE_KOVALARI = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SAYI_KOVALARI = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _etiket(deger):
+    return str(deger).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sayi(deger):
+    return repr(float(deger)) if isinstance(deger, float) else str(deger)
+
+
+class Histogram:
+    """Etiketli, thread-safe Prometheus histogramı."""
+
+    def __init__(self, ad, aciklama, etiketler, kovalar=SURE_KOVALARI):
+        self.ad = ad
+        self.aciklama = aciklama
+        self.etiketler = etiketler
+        self.kovalar = kovalar
+        self._kilit = threading.Lock()
+        self._seriler = {}  # etiket değerleri -> [kova sayıları..., +Inf, toplam]
+
+    def gozlemle(self, deger, *etiket_degerleri):
+        kova = bisect_left(self.kovalar, deger)
+        with self._kilit:
+            seri = self._seriler.get(etiket_degerleri)
+            if seri is None:
+                seri = self._seriler[etiket_degerleri] = [0] * (len(self.kovalar) + 1) + [0.0]
+            seri[kova] += 1
+            seri[-1] += deger
+
+    def satirlar(self):
+        with self._kilit:
+            seriler = {e: list(s) for e, s in self._seriler.items()}
+        yield f"# HELP {self.ad} {self.aciklama}"
+        yield f"# TYPE {self.ad} histogram"
+        for etiket_degerleri, seri in sorted(seriler.items()):
+            etiketler = ",".join(f'{a}="{_etiket(d)}"' for a, d in zip(self.etiketler, etiket_degerleri))
+            on_ek = etiketler + "," if etiketler else ""
+            birikimli = 0
+            for sinir, adet in zip(self.kovalar + ("+Inf",), seri):
+                birikimli += adet
+                yield f'{self.ad}_bucket{{{on_ek}le="{sinir}"}} {birikimli}'
+            yield f"{self.ad}_sum{{{etiketler}}} {_sayi(seri[-1])}"
+            yield f"{self.ad}_count{{{etiketler}}} {birikimli}"
+
+
+ISTEK_SURESI = Histogram(
+    "randevu_http_istek_suresi_saniye", "Route bazında istek süresi",
+    ("endpoint", "method", "status"))
+ISTEK_SORGU_SAYISI = Histogram(
+    "randevu_http_istek_sorgu_sayisi", "Route bazında istek başına SQL sorgusu",
+    ("endpoint",), SAYI_KOVALARI)
+SORGU_SURESI = Histogram(
+    "randevu_db_sorgu_suresi_saniye", "Route bazında tek SQL sorgusunun süresi",
+    ("endpoint",))
+BOLUM_SURESI = Histogram(
+    "randevu_bolum_suresi_saniye", "İşaretli bölümlerin süresi (bcrypt, base64_dosya, json, db_baglanti)",
+    ("bolum",))
+
+_HISTOGRAMLAR = (ISTEK_SURESI, ISTEK_SORGU_SAYISI, SORGU_SURESI, BOLUM_SURESI)
+_gostergeler = []
+
+
+def gosterge_ekle(ad, aciklama, etiket, fonksiyon):
+    """/metrics okunurken ``fonksiyon()`` çağrılır; {etiket değeri: sayı}
+    döner (ör. bağlantı havuzu durumu)."""
+    _gostergeler.append((ad, aciklama, etiket, fonksiyon))
+
+
+def metin():
+    satirlar = []
+    for histogram in _HISTOGRAMLAR:
+        satirlar.extend(histogram.satirlar())
+    for ad, aciklama, etiket, fonksiyon in _gostergeler:
+        satirlar.append(f"# HELP {ad} {aciklama}")
+        satirlar.append(f"# TYPE {ad} gauge")
+        for deger, sayi in sorted(fonksiyon().items()):
+            satirlar.append(f'{ad}{{{etiket}="{_etiket(deger)}"}} {_sayi(sayi)}')
+    return "\n".join(satirlar) + "\n"
+
+
+class _IstekOlcumu:
+    __slots__ = ("baslangic", "sorgu", "db_suresi", "bolumler")
+
+    def __init__(self):
+        self.baslangic = time.perf_counter()
+        self.sorgu = 0
+        self.db_suresi = 0.0
+        self.bolumler = {}
+
+
+def _olcum():
+    return g.get("_metrik") if has_request_context() else None
+
+
+@contextmanager
+def _olc(bolum):
+    baslangic = time.perf_counter()
+    try:
+        yield
+    finally:
+        sure = time.perf_counter() - baslangic
+        BOLUM_SURESI.gozlemle(sure, bolum)
+        olcum = _olcum()
+        if olcum is not None:
+            olcum.bolumler[bolum] = olcum.bolumler.get(bolum, 0.0) + sure
+
+
+_BOS = nullcontext()
+
+
+def olc(bolum):
+    """``with olc("bcrypt"): ...`` bloğun süresini bölüm metriğine ve
+    (istek içindeyse) Server-Timing başlığına ekler."""
+    if not config.METRIKLER_ACIK:
+        return _BOS
+    return _olc(bolum)
+
+
+def sorgu_bitti(cursor, sorgu, parametreler, sure):
+    """db.py sorgu izleyicisi."""
+    olcum = _olcum()
+    if olcum is not None:
+        olcum.sorgu += 1
+        olcum.db_suresi += sure
+        SORGU_SURESI.gozlemle(sure, request.endpoint or "-")
+    else:
+        SORGU_SURESI.gozlemle(sure, "-")
+
+
+class OlcenJSONSaglayici(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with olc("json"):
+            return super().dumps(obj, **kwargs)
+
+
+def _istek_basladi():
+    g._metrik = _IstekOlcumu()
+
+
+def _istek_bitti(yanit):
+    olcum = g.pop("_metrik", None)
+    if olcum is None:
+        return yanit
+    toplam = time.perf_counter() - olcum.baslangic
+    endpoint = request.endpoint or "-"
+    ISTEK_SURESI.gozlemle(toplam, endpoint, request.method, str(yanit.status_code))
+    ISTEK_SORGU_SAYISI.gozlemle(olcum.sorgu, endpoint)
+
+    if config.SERVER_TIMING_ACIK:
+        zamanlar = [f'db;dur={olcum.db_suresi * 1000:.2f};desc="{olcum.sorgu} sorgu"']
+        zamanlar += [f"{bolum};dur={sure * 1000:.2f}" for bolum, sure in olcum.bolumler.items()]
+        zamanlar.append(f"toplam;dur={toplam * 1000:.2f}")
+        yanit.headers.add("Server-Timing", ", ".join(zamanlar))
+    return yanit
+
+
+def kur(app):
+    """İstek hook'larını ve ölçen JSON sağlayıcısını kurar (metrikler açıksa)."""
+    if not config.METRIKLER_ACIK:
+        return
+    app.json = OlcenJSONSaglayici(app)
+    app.before_request(_istek_basladi)
+    app.after_request(_istek_bitti)
@@ -0,0 +1,135 @@
+"""Veritabanı migration'larını sırayla uygular.
+
+migrations/ dizinindeki ``NNN_ad.sql`` dosyaları dosya adı sırasıyla, her biri
+kendi işleminde çalışır ve uygulananlar ``schema_migrations`` tablosuna
+yazılır. Aynı anda iki çalıştırma birbirini advisory lock ile bekler.
+
+backend dizininden:
+
+    python migrate.py durum      # uygulanmış / bekleyen migration'lar
+    python migrate.py uygula     # bekleyenleri uygula
+
+Migration'lar IF NOT EXISTS ile yazıldığından, daha önce elle uygulanmış
+bir migration tekrar çalıştığında yalnızca kaydı eklenir.
+"""
+import hashlib
+import os
+import re
+
+from db import db_baglantisi
+
+MIGRATION_DIZINI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+_DOSYA_ADI = re.compile(r'^(\d+)_[\w-]+\.sql$')
+
+# pg_advisory_xact_lock anahtarı; rastgele seçilmiş sabit bir sayı
+_KILIT_ANAHTARI = 727001
+
+
+class MigrationHatasi(Exception):
+    pass
+
+
+def migrationlar(dizin=MIGRATION_DIZINI):
+    """[(versiyon, dosya_adi, sql, sha256), ...] dosya adı sırasıyla."""
+    sonuc = []
+    for dosya_adi in sorted(os.listdir(dizin)):
+        eslesme = _DOSYA_ADI.match(dosya_adi)
+        if not eslesme:
+            continue
+        with open(os.path.join(dizin, dosya_adi), encoding='utf-8') as f:
+            icerik = f.read()
+        sonuc.append((
+            eslesme.group(1), dosya_adi, icerik,
+            hashlib.sha256(icerik.encode('utf-8')).hexdigest()
+        ))
+
+    versiyonlar = [m[0] for m in sonuc]
+    if len(versiyonlar) != len(set(versiyonlar)):
+        raise MigrationHatasi("Aynı numaralı birden fazla migration var")
+    return sonuc
+
+
+def _tabloyu_hazirla(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            versiyon TEXT PRIMARY KEY,
+            dosya_adi TEXT NOT NULL,
+            sha256 CHAR(64) NOT NULL,
+            uygulama_zamani TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """)
+
+
+def _uygulananlar(cursor):
+    cursor.execute("SELECT versiyon, sha256 FROM schema_migrations")
+    return dict(cursor.fetchall())
+
+
+def durum():
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        _tabloyu_hazirla(cursor)
+        uygulanan = _uygulananlar(cursor)
+        conn.commit()
+
+    sonuc = []
+    for versiyon, dosya_adi, _, ozet in migrationlar():
+        if versiyon not in uygulanan:
+            hal = "bekliyor"
+        elif uygulanan[versiyon] != ozet:
+            # Uygulandıktan sonra dosya değiştirilmiş; değişiklik yeni bir
+            # migration olarak yazılmalıdır.
+            hal = "degismis"
+        else:
+            hal = "uygulandi"
+        sonuc.append({"versiyon": versiyon, "dosya": dosya_adi, "durum": hal})
+    return sonuc
+
+
+def uygula():
+    """Bekleyen migration'ları uygular; uygulananların dosya adlarını döner."""
+    uygulanan_dosyalar = []
+    for versiyon, dosya_adi, icerik, ozet in migrationlar():
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            _tabloyu_hazirla(cursor)
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (_KILIT_ANAHTARI,))
+            cursor.execute("SELECT 1 FROM schema_migrations WHERE versiyon = %s", (versiyon,))
+            if cursor.fetchone():
+                conn.rollback()
+                continue
+
+            try:
+                cursor.execute(icerik)
+            except Exception as e:
+                conn.rollback()
+                raise MigrationHatasi(f"{dosya_adi}: {e}") from e
+            cursor.execute("""
+                INSERT INTO schema_migrations (versiyon, dosya_adi, sha256)
+                VALUES (%s, %s, %s)
+            """, (versiyon, dosya_adi, ozet))
+            conn.commit()
+        uygulanan_dosyalar.append(dosya_adi)
+    return uygulanan_dosyalar
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Veritabanı migration'ları")
+    parser.add_argument('komut', choices=['durum', 'uygula'])
+    args = parser.parse_args()
+
+    if args.komut == 'durum':
+        for m in durum():
+            print(f"{m['durum']:<10} {m['dosya']}")
+    else:
+        try:
+            uygulananlar = uygula()
+        except MigrationHatasi as e:
+            print(f"HATA {e}", file=sys.stderr)
+            raise SystemExit(1)
+        for dosya_adi in uygulananlar:
+            print(f"uygulandi  {dosya_adi}")
+        if not uygulananlar:
+            print("Bekleyen migration yok")
@@ -0,0 +1,66 @@
+-- Backend'in kullandığı tabloların temel şeması. Mevcut veritabanlarında
+-- tablolar zaten var olduğundan tüm ifadeler IF NOT EXISTS'tir; boş bir
+-- veritabanında ise migrate.py ile sıfırdan kurulum sağlar.
+--
+-- İndeksler ve kısıtlar ayrı migration'lardadır (001, 003).
+
+CREATE TABLE IF NOT EXISTS adres (
+    adres_id SERIAL PRIMARY KEY,
+    il TEXT,
+    ilce TEXT,
+    tamadres TEXT
+);
+
+CREATE TABLE IF NOT EXISTS doktorlar (
+    doktor_id SERIAL PRIMARY KEY,
+    ad TEXT,
+    soyad TEXT,
+    tc_kimlik_no TEXT,
+    brans TEXT,
+    dogum_tarihi DATE,
+    cinsiyet TEXT,
+    kullanici_adi TEXT,
+    sifre TEXT,
+    adres_id INTEGER REFERENCES adres (adres_id),
+    diploma_belgesi TEXT,
+    isyeri_belgesi TEXT,
+    randevu_araligi INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS hastalar (
+    hasta_id SERIAL PRIMARY KEY,
+    ad TEXT,
+    soyad TEXT,
+    tc_kimlik_no TEXT,
+    dogum_tarihi DATE,
+    cinsiyet TEXT,
+    kullanici_adi TEXT,
+    sifre TEXT,
+    adres TEXT,
+    ameliyat_raporu TEXT,
+    rontgen TEXT
+);
+
+CREATE TABLE IF NOT EXISTS doktor_ayarlar (
+    doktor_id INTEGER PRIMARY KEY REFERENCES doktorlar (doktor_id) ON DELETE CASCADE,
+    baslangic_saat INTEGER NOT NULL,
+    baslangic_dakika INTEGER NOT NULL,
+    bitis_saat INTEGER NOT NULL,
+    bitis_dakika INTEGER NOT NULL,
+    randevu_aralik INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS randevular (
+    randevu_id SERIAL PRIMARY KEY,
+    doktor_id INTEGER NOT NULL REFERENCES doktorlar (doktor_id),
+    hasta_id INTEGER REFERENCES hastalar (hasta_id),
+    tarih DATE NOT NULL,
+    saat TIME NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS kapali_randevu_saatleri (
+    id SERIAL PRIMARY KEY,
+    doktor_id INTEGER NOT NULL REFERENCES doktorlar (doktor_id),
+    tarih DATE NOT NULL,
+    saat TIME NOT NULL
+);
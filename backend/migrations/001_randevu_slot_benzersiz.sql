@@ -0,0 +1,10 @@
+-- Aynı doktorun aynı gün ve saatine birden fazla randevu verilmesini engeller.
+-- randevu_olustur bu indeksi ON CONFLICT hedefi olarak kullanır.
+--
+-- Tabloda çift kayıt varsa indeks oluşturulamaz; önce şu sorguyla bulunup
+-- temizlenmelidir:
+--   SELECT doktor_id, tarih, saat, array_agg(randevu_id)
+--   FROM randevular GROUP BY doktor_id, tarih, saat HAVING count(*) > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS randevular_doktor_tarih_saat_key
+    ON randevular (doktor_id, tarih, saat);
@@ -0,0 +1,12 @@
+-- İçerik adresli belge deposu (blob_deposu.py) için referans sayaçları.
+-- Aynı içerik tek dosya olarak saklanır; ref_sayisi, o dosyayı gösteren
+-- doktorlar/hastalar kolonlarının sayısıdır. Sayacı sıfıra düşen dosyalar
+-- hemen silinmez, yetim dosya temizliğine bırakılır.
+
+CREATE TABLE IF NOT EXISTS belge_bloblari (
+    yol TEXT PRIMARY KEY,
+    sha256 CHAR(64) NOT NULL,
+    boyut BIGINT NOT NULL,
+    ref_sayisi INTEGER NOT NULL DEFAULT 0,
+    olusturma_zamani TIMESTAMP NOT NULL DEFAULT now()
+);
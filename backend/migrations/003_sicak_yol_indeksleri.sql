@@ -0,0 +1,35 @@
+-- Sık çalışan sorguların dayandığı indeksler. Her biri, ilgili sorgunun
+-- sıralı tarama (Seq Scan) yerine indeksle çalışmasını sağlar; kontrol için
+-- backend dizininden: python -m bench.plan_kontrolu
+--
+-- randevular (doktor_id, tarih, saat) benzersiz indeksi 001'dedir.
+
+-- Slot ızgarası, takvim ve randevu oluşturma: doktorun bir günü/aralığı.
+-- Kapalı saat bir bayraktır, aynı satırın tekrarı anlamsızdır; indeks
+-- benzersiz olsun diye varsa tekrarlar silinir. randevu_saati_guncelle'deki
+-- ON CONFLICT DO NOTHING bu indeksle çalışır.
+DELETE FROM kapali_randevu_saatleri a
+USING kapali_randevu_saatleri b
+WHERE a.doktor_id = b.doktor_id AND a.tarih = b.tarih AND a.saat = b.saat
+  AND a.ctid > b.ctid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS kapali_randevu_saatleri_doktor_tarih_saat_key
+    ON kapali_randevu_saatleri (doktor_id, tarih, saat);
+
+-- Hastanın randevu geçmişi, sıradaki ve gelecek randevuları
+CREATE INDEX IF NOT EXISTS randevular_hasta_tarih_idx
+    ON randevular (hasta_id, tarih);
+
+-- Giriş sorguları. Mevcut verilerde tekrar olabileceğinden benzersiz değildir.
+CREATE INDEX IF NOT EXISTS hastalar_tc_kimlik_no_idx
+    ON hastalar (tc_kimlik_no);
+
+CREATE INDEX IF NOT EXISTS doktorlar_kullanici_adi_idx
+    ON doktorlar (kullanici_adi);
+
+-- İl/ilçeye göre doktor listesi: adres süzülür, doktorlar adres_id ile bulunur
+CREATE INDEX IF NOT EXISTS adres_il_ilce_idx
+    ON adres (il, ilce);
+
+CREATE INDEX IF NOT EXISTS doktorlar_adres_id_idx
+    ON doktorlar (adres_id);
@@ -0,0 +1,7 @@
+-- Hasta randevu geçmişi (tarih, saat, randevu_id) sırasında keyset ile
+-- sayfalanır; bu indeks hem süzmeyi hem sıralamayı karşılar ve
+-- (hasta_id, tarih) indeksinin yerini alır.
+CREATE INDEX IF NOT EXISTS randevular_hasta_tarih_saat_idx
+    ON randevular (hasta_id, tarih, saat, randevu_id);
+
+DROP INDEX IF EXISTS randevular_hasta_tarih_idx;
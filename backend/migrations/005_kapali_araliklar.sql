@@ -0,0 +1,94 @@
+-- Kapalı saatler slot başına bir satır yerine aralık kuralları olarak
+-- saklanır (bkz. kapali_araliklar.py). Bir kural [baslangic_tarih,
+-- bitis_tarih] günlerinde, haftanin_gunleri verilmişse yalnızca o günlerde,
+-- gün içindeki [baslangic_dk, bitis_dk) dakikalarını kapatır; acik kurallar
+-- ise açar. Bir slotu kapsayan kurallardan id'si en büyük olan geçerlidir.
+
+CREATE TABLE IF NOT EXISTS kapali_araliklar (
+    id SERIAL PRIMARY KEY,
+    doktor_id INTEGER NOT NULL REFERENCES doktorlar (doktor_id),
+    baslangic_tarih DATE NOT NULL,
+    bitis_tarih DATE,                           -- dahil; NULL: süresiz
+    baslangic_dk INTEGER NOT NULL DEFAULT 0,
+    bitis_dk INTEGER NOT NULL DEFAULT 1440,     -- hariç
+    haftanin_gunleri INTEGER,                   -- bit maskesi, Pazartesi = 1 ... Pazar = 64; NULL: her gün
+    acik BOOLEAN NOT NULL DEFAULT false,
+    olusturma_zamani TIMESTAMP NOT NULL DEFAULT now(),
+    CHECK (0 <= baslangic_dk AND baslangic_dk < bitis_dk AND bitis_dk <= 1440),
+    CHECK (bitis_tarih IS NULL OR bitis_tarih >= baslangic_tarih),
+    CHECK (haftanin_gunleri IS NULL OR haftanin_gunleri BETWEEN 1 AND 127)
+);
+
+-- Sorgular hep bugün ve sonrasına bakar; bitmiş kurallar bu indeksle
+-- baştan elenir.
+CREATE INDEX IF NOT EXISTS kapali_araliklar_doktor_bitis_idx
+    ON kapali_araliklar (doktor_id, (COALESCE(bitis_tarih, 'infinity'::date)));
+
+-- Doktorun bir güne uygulanan kuralları. Tek SELECT'ten oluşan bir SQL
+-- fonksiyonu olduğu için planlayıcı onu çağıran sorgunun içine açar.
+CREATE OR REPLACE FUNCTION gunun_kapali_araliklari(p_doktor_id integer, p_tarih date)
+RETURNS TABLE (id integer, baslangic_dk integer, bitis_dk integer, acik boolean)
+LANGUAGE sql STABLE AS $$
+    SELECT k.id, k.baslangic_dk, k.bitis_dk, k.acik
+    FROM kapali_araliklar k
+    WHERE k.doktor_id = p_doktor_id
+      AND COALESCE(k.bitis_tarih, 'infinity'::date) >= p_tarih
+      AND k.baslangic_tarih <= p_tarih
+      AND (k.haftanin_gunleri IS NULL
+           OR k.haftanin_gunleri & (1 << (EXTRACT(ISODOW FROM p_tarih)::int - 1)) <> 0)
+$$;
+
+-- Slot kapalı mı: onu kapsayan en son kural kapatan bir kural mı?
+CREATE OR REPLACE FUNCTION kapali_mi(p_doktor_id integer, p_tarih date, p_saat time)
+RETURNS boolean
+LANGUAGE sql STABLE AS $$
+    SELECT COALESCE((
+        SELECT NOT g.acik
+        FROM gunun_kapali_araliklari(p_doktor_id, p_tarih) g
+        WHERE (EXTRACT(HOUR FROM p_saat) * 60 + EXTRACT(MINUTE FROM p_saat))::int >= g.baslangic_dk
+          AND (EXTRACT(HOUR FROM p_saat) * 60 + EXTRACT(MINUTE FROM p_saat))::int < g.bitis_dk
+        ORDER BY g.id DESC
+        LIMIT 1
+    ), false)
+$$;
+
+-- Eski slot başına satırlar taşınır. Doktorun randevu aralığıyla ardışık
+-- olan kapalı slotlar (09:00, 09:30, 10:00 ...) tek bir aralıkta birleşir;
+-- aralık son slotun başlangıcından hemen sonra biter.
+--
+-- Eski tablo silinmez, kapali_randevu_saatleri_eski adıyla saklanır; taşıma
+-- yalnızca eski tablo henüz bu adı almamışsa yapılır, böylece migration
+-- tekrar çalıştığında kural çoğalmaz. Aralık kuralları canlıda doğrulanınca
+-- (aşağıdaki sorgu satır döndürmemeli) eski tablo ayrı bir migration'la
+-- silinir:
+--
+--     SELECT k.* FROM kapali_randevu_saatleri_eski k
+--     WHERE NOT kapali_mi(k.doktor_id, k.tarih, k.saat);
+DO $$
+BEGIN
+    IF to_regclass('kapali_randevu_saatleri') IS NULL
+       OR to_regclass('kapali_randevu_saatleri_eski') IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO kapali_araliklar (doktor_id, baslangic_tarih, bitis_tarih, baslangic_dk, bitis_dk)
+    SELECT doktor_id, tarih, tarih, min(dk), max(dk) + 1
+    FROM (
+        SELECT s.*,
+               CASE WHEN s.aralik > 0
+                    THEN s.dk - s.aralik * row_number() OVER (PARTITION BY s.doktor_id, s.tarih ORDER BY s.dk)
+                    ELSE s.dk
+               END AS grup
+        FROM (
+            SELECT DISTINCT k.doktor_id, k.tarih,
+                   (EXTRACT(HOUR FROM k.saat) * 60 + EXTRACT(MINUTE FROM k.saat))::int AS dk,
+                   COALESCE(a.randevu_aralik, 0) AS aralik
+            FROM kapali_randevu_saatleri k
+            LEFT JOIN doktor_ayarlar a ON a.doktor_id = k.doktor_id
+        ) s
+    ) g
+    GROUP BY doktor_id, tarih, grup;
+
+    ALTER TABLE kapali_randevu_saatleri RENAME TO kapali_randevu_saatleri_eski;
+END
+$$;
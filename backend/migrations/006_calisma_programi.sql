@@ -0,0 +1,53 @@
+-- Haftanın günlerine göre çalışma programı, molalar ve önceden hesaplanmış
+-- slot şablonları (bkz. calisma_programi.py).
+--
+-- doktor_ayarlar varsayılan programdır; doktor_programi'ndeki bir satır o
+-- haftanın gününü değiştirir (calisir = false: o gün çalışılmaz). Başlangıcı
+-- bir molaya düşen slotlar verilmez. Program her kaydedildiğinde
+-- doktor_ayarlar.versiyon artar ve yedi günün slot şablonu yeniden yazılır;
+-- istekler şablonu hesaplamaz, okur.
+
+ALTER TABLE doktor_ayarlar ADD COLUMN IF NOT EXISTS versiyon INTEGER NOT NULL DEFAULT 1;
+
+CREATE TABLE IF NOT EXISTS doktor_programi (
+    doktor_id INTEGER NOT NULL REFERENCES doktorlar (doktor_id) ON DELETE CASCADE,
+    haftanin_gunu SMALLINT NOT NULL CHECK (haftanin_gunu BETWEEN 1 AND 7),  -- ISO: Pazartesi = 1
+    calisir BOOLEAN NOT NULL DEFAULT true,
+    baslangic_dk INTEGER NOT NULL DEFAULT 0,
+    bitis_dk INTEGER NOT NULL DEFAULT 0,
+    randevu_aralik INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (doktor_id, haftanin_gunu)
+);
+
+CREATE TABLE IF NOT EXISTS doktor_molalari (
+    id SERIAL PRIMARY KEY,
+    doktor_id INTEGER NOT NULL REFERENCES doktorlar (doktor_id) ON DELETE CASCADE,
+    haftanin_gunleri INTEGER CHECK (haftanin_gunleri BETWEEN 1 AND 127),  -- bit maskesi; NULL: her gün
+    baslangic_dk INTEGER NOT NULL,
+    bitis_dk INTEGER NOT NULL,  -- hariç
+    CHECK (0 <= baslangic_dk AND baslangic_dk < bitis_dk AND bitis_dk <= 1440)
+);
+
+CREATE INDEX IF NOT EXISTS doktor_molalari_doktor_idx ON doktor_molalari (doktor_id);
+
+-- Haftanın her günü için slot başlangıç dakikaları; boş dizi: o gün slot yok
+CREATE TABLE IF NOT EXISTS slot_sablonlari (
+    doktor_id INTEGER NOT NULL REFERENCES doktorlar (doktor_id) ON DELETE CASCADE,
+    haftanin_gunu SMALLINT NOT NULL CHECK (haftanin_gunu BETWEEN 1 AND 7),
+    versiyon INTEGER NOT NULL,
+    dakikalar INTEGER[] NOT NULL,
+    PRIMARY KEY (doktor_id, haftanin_gunu)
+);
+
+-- Mevcut ayarların şablonları. Kural bugüne kadarki davranıştır (bitiş
+-- saati dahil) ve calisma_programi.sablon_dakikalari ile aynıdır; bundan
+-- sonra şablonları yalnızca o fonksiyon üretir.
+INSERT INTO slot_sablonlari (doktor_id, haftanin_gunu, versiyon, dakikalar)
+SELECT a.doktor_id, g, a.versiyon,
+       CASE WHEN a.randevu_aralik > 0 THEN
+           ARRAY(SELECT generate_series(a.baslangic_saat * 60 + a.baslangic_dakika,
+                                        a.bitis_saat * 60 + a.bitis_dakika,
+                                        a.randevu_aralik))
+       ELSE '{}'::int[] END
+FROM doktor_ayarlar a, generate_series(1, 7) AS g
+ON CONFLICT (doktor_id, haftanin_gunu) DO NOTHING;
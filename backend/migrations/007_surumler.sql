@@ -0,0 +1,7 @@
+-- Koşullu GET için kaynak başına sürüm sayaçları (bkz. surumler.py). Yazma
+-- route'ları sayacı kendi işlemlerinde artırır; satırı olmayan anahtarın
+-- sürümü 0 sayılır.
+CREATE TABLE IF NOT EXISTS surumler (
+    anahtar TEXT PRIMARY KEY,
+    surum BIGINT NOT NULL DEFAULT 0
+);
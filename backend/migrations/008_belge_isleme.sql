@@ -0,0 +1,40 @@
+-- Yüklenen belgelerin arka planda işlenmesi (bkz. belge_isleme.py).
+--
+-- belge_isleri kalıcı iş kuyruğudur: yüklenen her blob için bir satır
+-- (içerik adresli olduğundan aynı içerik bir kez işlenir). İşçiler işleri
+-- FOR UPDATE SKIP LOCKED ile alır; süresi aşan "isleniyor" işler yeniden
+-- alınabilir.
+CREATE TABLE IF NOT EXISTS belge_isleri (
+    is_id BIGSERIAL PRIMARY KEY,
+    yol TEXT NOT NULL UNIQUE,
+    durum TEXT NOT NULL DEFAULT 'bekliyor'
+        CHECK (durum IN ('bekliyor', 'isleniyor', 'tamam', 'hata')),
+    deneme INTEGER NOT NULL DEFAULT 0,
+    sonraki_deneme TIMESTAMP NOT NULL DEFAULT now(),
+    hata TEXT,
+    olusturma_zamani TIMESTAMP NOT NULL DEFAULT now(),
+    guncelleme_zamani TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS belge_isleri_bekleyen_idx
+    ON belge_isleri (sonraki_deneme)
+    WHERE durum IN ('bekliyor', 'isleniyor');
+
+-- Blob içeriğinden anlaşılan gerçek tür (eski kayıtlar uzantıdan bağımsız
+-- olarak ".pdf" adıyla saklanmıştı)
+ALTER TABLE belge_bloblari ADD COLUMN IF NOT EXISTS mime TEXT;
+
+-- Bir blobdan türetilen dosyalar: küçük resim (PDF'in ilk sayfası ya da
+-- resmin küçültülmüşü) ve kayıpsız yeniden sıkıştırılmış resim. Varyantlar
+-- da içerik adreslidir, kaynağın deposundaki "varyantlar" dizininde durur.
+CREATE TABLE IF NOT EXISTS belge_varyantlari (
+    kaynak_yol TEXT NOT NULL,
+    tur TEXT NOT NULL CHECK (tur IN ('kucuk_resim', 'sikistirilmis')),
+    yol TEXT NOT NULL,
+    mime TEXT NOT NULL,
+    boyut BIGINT NOT NULL,
+    genislik INTEGER,
+    yukseklik INTEGER,
+    olusturma_zamani TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (kaynak_yol, tur)
+);
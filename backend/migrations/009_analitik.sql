@@ -0,0 +1,59 @@
+-- Doluluk analitiği (bkz. analitik.py).
+--
+-- Randevunun alındığı an, öne alma süresi (randevu saati ile alındığı an
+-- arasındaki fark) için. Kolon varsayılansız eklenir ki eski randevular
+-- migration anını değil NULL'u (bilinmiyor) alsın.
+ALTER TABLE randevular ADD COLUMN IF NOT EXISTS olusturma_zamani TIMESTAMP;
+ALTER TABLE randevular ALTER COLUMN olusturma_zamani SET DEFAULT now();
+
+-- Silinen (iptal edilen) randevular. Gelmeyen hasta kaydı tutulmadığından
+-- iptaller onun yerine sayılır; özetlerin sıfırdan yeniden hesaplanabilmesi
+-- için de kaynak tablodur.
+CREATE TABLE IF NOT EXISTS randevu_iptalleri (
+    randevu_id INTEGER PRIMARY KEY,
+    doktor_id INTEGER NOT NULL,
+    hasta_id INTEGER,
+    tarih DATE NOT NULL,
+    saat TIME NOT NULL,
+    olusturma_zamani TIMESTAMP,
+    iptal_zamani TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS randevu_iptalleri_doktor_tarih_idx
+    ON randevu_iptalleri (doktor_id, tarih);
+
+-- Doktor başına gün/hafta/ay özetleri. Hafta pazartesi, ay ayın ilk günü
+-- ile anahtarlanır; hafta ve ay satırları, gün satırlarındaki değişikliklerin
+-- farkı eklenerek güncellenir. gun_sayisi, dönemde özeti olan gün sayısıdır.
+CREATE TABLE IF NOT EXISTS analitik_ozet (
+    doktor_id INTEGER NOT NULL,
+    donem TEXT NOT NULL CHECK (donem IN ('gun', 'hafta', 'ay')),
+    baslangic DATE NOT NULL,
+    gun_sayisi INTEGER NOT NULL DEFAULT 0,
+    bos INTEGER NOT NULL DEFAULT 0,
+    dolu INTEGER NOT NULL DEFAULT 0,
+    kapali INTEGER NOT NULL DEFAULT 0,
+    iptal INTEGER NOT NULL DEFAULT 0,
+    bekleme_toplam_dk BIGINT NOT NULL DEFAULT 0,
+    bekleme_adet INTEGER NOT NULL DEFAULT 0,
+    guncelleme_zamani TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (doktor_id, donem, baslangic)
+);
+
+-- Aynı dönemler için saat dilimi (0-23) başına randevu ve iptal sayıları
+CREATE TABLE IF NOT EXISTS analitik_saatlik (
+    doktor_id INTEGER NOT NULL,
+    donem TEXT NOT NULL CHECK (donem IN ('gun', 'hafta', 'ay')),
+    baslangic DATE NOT NULL,
+    saat SMALLINT NOT NULL CHECK (saat BETWEEN 0 AND 23),
+    randevu INTEGER NOT NULL DEFAULT 0,
+    iptal INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (doktor_id, donem, baslangic, saat)
+);
+
+-- Bütün günlerini etkileyen bir değişiklik (çalışma programı, kapalı aralık
+-- kuralları) yapılmış, özetleri mutabakat işiyle yeniden hesaplanacak doktorlar
+CREATE TABLE IF NOT EXISTS analitik_kirli (
+    doktor_id INTEGER PRIMARY KEY,
+    isaret_zamani TIMESTAMP NOT NULL DEFAULT now()
+);
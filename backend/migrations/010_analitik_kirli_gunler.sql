@@ -0,0 +1,11 @@
+-- Tek günü etkileyen yazmaların (randevu, iptal, tek slot kapatma) analitik
+-- işareti (bkz. analitik.gun_kirlet). Yazma işlemi yalnızca bir satır ekler;
+-- tekil bir (doktor, gün) anahtarı olmadığından aynı güne eşzamanlı yazan
+-- işlemler birbirini beklemez. Mutabakat işi işaretleri toplu alıp
+-- tekilleştirir ve o günleri yeniden hesaplar.
+CREATE TABLE IF NOT EXISTS analitik_kirli_gunler (
+    id BIGSERIAL PRIMARY KEY,
+    doktor_id INTEGER NOT NULL,
+    tarih DATE NOT NULL,
+    isaret_zamani TIMESTAMP NOT NULL DEFAULT now()
+);
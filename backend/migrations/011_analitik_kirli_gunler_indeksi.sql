@@ -0,0 +1,5 @@
+-- Özet okunurken dönemin bekleyen gün işaretleri doktor ve tarihle aranır
+-- (bkz. analitik.donemi_guncelle). Mutabakat işi çalışmıyorsa işaretler
+-- birikir; arama tablo boyundan bağımsız kalsın diye indekslenir.
+CREATE INDEX IF NOT EXISTS analitik_kirli_gunler_doktor_tarih_idx
+    ON analitik_kirli_gunler (doktor_id, tarih);
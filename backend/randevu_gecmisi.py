@@ -0,0 +1,104 @@
+"""Hastanın randevu listesi: keyset sayfalama ve SQL'de hesaplanan durum.
+
+Sıralama (tarih, saat, randevu_id) üzerindedir; sayfalar OFFSET ile değil,
+bir önceki sayfanın son satırından sonrası (imleç) ile alınır. Bu yüzden
+sayfalar arasında eklenen ya da silinen randevular var olan satırların
+atlanmasına veya tekrarlanmasına yol açmaz.
+
+Kapsam:
+* ``tum``: bütün randevular, en yeniden eskiye
+* ``gecmis``: başlangıcı ``simdi``den önce olanlar, en yeniden eskiye
+* ``gelecek``: ``simdi`` veya sonrası, en yakından uzağa
+"""
+import base64
+import binascii
+from datetime import date, time
+
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+
+from db import db_baglantisi
+
+KAPSAMLAR = ('tum', 'gecmis', 'gelecek')
+
+_SORGU = sql.SQL("""
+    SELECT r.randevu_id, r.tarih, r.saat, r.doktor_id, d.ad, d.soyad,
+           CASE WHEN (r.tarih, r.saat) < (%(bugun)s, %(su_an)s) THEN 'geçmiş' ELSE 'gelecek' END AS durum
+    FROM randevular r
+    JOIN doktorlar d ON d.doktor_id = r.doktor_id
+    WHERE r.hasta_id = %(hasta_id)s
+      {kapsam}
+      {imlec}
+    ORDER BY r.tarih {yon}, r.saat {yon}, r.randevu_id {yon}
+    LIMIT %(limit)s
+""")
+
+_KAPSAM_KOSULU = {
+    'tum': sql.SQL(""),
+    'gecmis': sql.SQL("AND (r.tarih, r.saat) < (%(bugun)s, %(su_an)s)"),
+    'gelecek': sql.SQL("AND (r.tarih, r.saat) >= (%(bugun)s, %(su_an)s)"),
+}
+
+
+class GecersizImlec(ValueError):
+    pass
+
+
+def imlec_olustur(satir):
+    ham = f"{satir['tarih'].isoformat()}|{satir['saat'].isoformat()}|{satir['randevu_id']}"
+    return base64.urlsafe_b64encode(ham.encode()).decode().rstrip('=')
+
+
+def imlec_coz(imlec):
+    try:
+        ham = base64.urlsafe_b64decode(imlec + '=' * (-len(imlec) % 4)).decode()
+        tarih, saat, randevu_id = ham.split('|')
+        return date.fromisoformat(tarih), time.fromisoformat(saat), int(randevu_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise GecersizImlec("Geçersiz imleç")
+
+
+def sorgu(kapsam, imlecli=False):
+    """Kapsam ve imleç koşuluyla tamamlanmış sorgu (plan kontrolü de kullanır)."""
+    artan = kapsam == 'gelecek'
+    imlec_kosulu = sql.SQL("")
+    if imlecli:
+        imlec_kosulu = sql.SQL(
+            "AND (r.tarih, r.saat, r.randevu_id) {} (%(i_tarih)s, %(i_saat)s, %(i_id)s)"
+        ).format(sql.SQL('>' if artan else '<'))
+    return _SORGU.format(
+        kapsam=_KAPSAM_KOSULU[kapsam],
+        imlec=imlec_kosulu,
+        yon=sql.SQL('ASC' if artan else 'DESC'),
+    )
+
+
+def randevular(hasta_id, simdi, kapsam='tum', imlec=None, limit=None):
+    """(satırlar, sonraki_imlec) döner; son sayfada sonraki_imlec None'dır.
+    ``limit`` None ise (imleçten sonraki) bütün satırlar tek sayfada döner.
+
+    Satırlar randevu_id, tarih, saat, doktor_id, ad, soyad (doktor) ve
+    durum ('geçmiş'/'gelecek') içerir.
+    """
+    if kapsam not in KAPSAMLAR:
+        raise ValueError(f"Geçersiz kapsam: {kapsam}")
+
+    artan = kapsam == 'gelecek'
+    parametreler = {
+        "hasta_id": hasta_id,
+        "bugun": simdi.date(),
+        "su_an": simdi.time().replace(microsecond=0),
+        "limit": None if limit is None else limit + 1,  # LIMIT NULL: sınırsız
+    }
+    if imlec:
+        parametreler["i_tarih"], parametreler["i_saat"], parametreler["i_id"] = imlec_coz(imlec)
+
+    with db_baglantisi() as conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(sorgu(kapsam, imlecli=bool(imlec)), parametreler)
+        satirlar = cursor.fetchall()
+
+    sonraki = None
+    if limit is not None and len(satirlar) > limit:
+        satirlar = satirlar[:limit]
+        sonraki = imlec_olustur(satirlar[-1])
+    return satirlar, sonraki
@@ -0,0 +1,73 @@
+"""Route'ların ayrı sabit olarak tutulan sorguları.
+
+app.py'yi içe aktarmadan kullanılabilsinler diye buradadır (benchmark ve
+plan kontrolü betikleri aynı metni çalıştırır). Diğer modüllere ait route
+sorguları orada tanımlıdır (slot_motoru, kapali_araliklar, randevu_gecmisi,
+analitik).
+"""
+
+DOKTOR_GIRIS_SORGUSU = "SELECT * FROM doktorlar WHERE kullanici_adi = %(kullanici_adi)s"
+
+HASTA_GIRIS_SORGUSU = """
+    SELECT hasta_id, ad, soyad, sifre
+    FROM hastalar
+    WHERE tc_kimlik_no = %(tc)s
+"""
+
+# /appointments: doktorun bir günkü randevuları
+GUNLUK_RANDEVULAR_SORGUSU = """
+    SELECT r.hasta_id, hastalar.ad AS hasta_adi, hastalar.soyad AS hasta_soyadi, hastalar.cinsiyet, r.saat
+    FROM randevular r
+    JOIN hastalar ON hastalar.hasta_id = r.hasta_id
+    WHERE r.doktor_id = %(doktor_id)s AND r.tarih = %(tarih)s
+    ORDER BY r.saat
+"""
+
+# Randevu tek ifadede ve yarış durumu olmadan oluşturulur: kapalı saat kontrolü
+# ve ekleme aynı ifadededir, aynı slota eşzamanlı iki ekleme ise
+# (doktor_id, tarih, saat) benzersiz indeksi sayesinde ON CONFLICT ile elenir
+# (bkz. migrations/001_randevu_slot_benzersiz.sql).
+RANDEVU_OLUSTUR_SORGUSU = """
+    WITH kapali AS (
+        SELECT 1 WHERE kapali_mi(%(doktor_id)s, %(tarih)s, %(saat)s)
+    ),
+    dolu AS (
+        SELECT 1 FROM randevular
+        WHERE doktor_id = %(doktor_id)s AND tarih = %(tarih)s AND saat = %(saat)s
+    ),
+    eklenen AS (
+        INSERT INTO randevular (doktor_id, hasta_id, tarih, saat)
+        SELECT %(doktor_id)s, %(hasta_id)s, %(tarih)s, %(saat)s
+        WHERE NOT EXISTS (SELECT 1 FROM kapali)
+        ON CONFLICT (doktor_id, tarih, saat) DO NOTHING
+        RETURNING randevu_id
+    )
+    SELECT (SELECT randevu_id FROM eklenen),
+           EXISTS (SELECT 1 FROM dolu),
+           EXISTS (SELECT 1 FROM kapali)
+"""
+
+
+# Doktor panosundaki sıradaki hasta: (doktor_id, tarih, saat) indeksinden
+# sıralı okunan ilk satır
+SIRADAKI_RANDEVU_SORGUSU = """
+    SELECT r.randevu_id, r.hasta_id, h.ad AS hasta_adi, h.soyad AS hasta_soyadi,
+           to_char(r.tarih, 'YYYY-MM-DD') AS tarih, to_char(r.saat, 'HH24:MI') AS saat
+    FROM randevular r
+    LEFT JOIN hastalar h ON h.hasta_id = r.hasta_id
+    WHERE r.doktor_id = %(doktor_id)s AND (r.tarih, r.saat) > (%(bugun)s, %(su_an)s)
+    ORDER BY r.tarih, r.saat
+    LIMIT 1
+"""
+
+
+# Silinen randevu, iptal analitiği için randevu_iptalleri'ne taşınır
+RANDEVU_SIL_SORGUSU = """
+    WITH silinen AS (
+        DELETE FROM randevular WHERE randevu_id = %(randevu_id)s
+        RETURNING randevu_id, doktor_id, hasta_id, tarih, saat, olusturma_zamani
+    )
+    INSERT INTO randevu_iptalleri (randevu_id, doktor_id, hasta_id, tarih, saat, olusturma_zamani)
+    SELECT * FROM silinen
+    RETURNING doktor_id, tarih, saat
+"""
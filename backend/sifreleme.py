@@ -0,0 +1,145 @@
+"""Şifre hashleme ve doğrulama.
+
+bcrypt bilerek yavaştır (varsayılan maliyette işlem başına yüzlerce ms CPU).
+İşlemler istek thread'lerinde değil, ayrı ve sınırlı bir süreç havuzunda
+çalışır; böylece GIL tutulmaz ve bir giriş yoğunluğunda diğer istekler
+beklemez. İşçi süreçler ``config.SUREC_BASLATMA_YONTEMI`` (varsayılan
+forkserver) ile başlatılır; thread'li uygulama sürecinden fork edilmez.
+Havuzda aynı anda bekleyebilecek iş sayısı sınırlıdır; sınır
+dolduğunda ``SifreHavuzuDolu`` (503) fırlatılır.
+
+Route'lar bu fonksiyonları veritabanı bağlantısını bıraktıktan sonra
+çağırmalıdır; hash beklenirken havuzdan bağlantı tutulmaz.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+import config
+import metrikler
+
+
+class SifreHavuzuDolu(Exception):
+    durum_kodu = 503
+
+    def __init__(self, mesaj="Sunucu şu an yoğun, lütfen tekrar deneyin"):
+        super().__init__(mesaj)
+
+
+def _hashle(sifre, maliyet):
+    return bcrypt.hashpw(sifre, bcrypt.gensalt(maliyet))
+
+
+def _dogrula(sifre, hash_):
+    return bcrypt.checkpw(sifre, hash_)
+
+
+class SifreHavuzu:
+    """Sınırlı süreç havuzu. ``isci_sayisi`` 0 ise işler çağıran thread'de
+    çalışır (geliştirme ve tek süreçli araçlar için)."""
+
+    def __init__(self, isci_sayisi, kuyruk_siniri, bekleme_suresi):
+        self.isci_sayisi = isci_sayisi
+        self.kuyruk_siniri = kuyruk_siniri
+        self.bekleme_suresi = bekleme_suresi
+        self._yer = threading.BoundedSemaphore(kuyruk_siniri)
+        self._kilit = threading.Lock()
+        self._executor = None
+        self.tamamlanan = 0
+        self.reddedilen = 0
+
+    def _havuz(self):
+        with self._kilit:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.isci_sayisi,
+                    mp_context=multiprocessing.get_context(config.SUREC_BASLATMA_YONTEMI),
+                )
+            return self._executor
+
+    def baslat(self):
+        """İşçi süreçleri ilk girişi beklemeden başlatır."""
+        if self.isci_sayisi <= 0:
+            return
+        havuz_ = self._havuz()
+        for gelecek in [havuz_.submit(abs, 0) for _ in range(self.isci_sayisi)]:
+            gelecek.result()
+
+    def calistir(self, fonksiyon, *args):
+        if not self._yer.acquire(timeout=self.bekleme_suresi):
+            with self._kilit:
+                self.reddedilen += 1
+            raise SifreHavuzuDolu()
+        try:
+            if self.isci_sayisi <= 0:
+                sonuc = fonksiyon(*args)
+            else:
+                sonuc = self._havuz().submit(fonksiyon, *args).result()
+        finally:
+            self._yer.release()
+        with self._kilit:
+            self.tamamlanan += 1
+        return sonuc
+
+    def kapat(self):
+        with self._kilit:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def istatistikler(self):
+        with self._kilit:
+            return {
+                "isci_sayisi": self.isci_sayisi,
+                "kuyruk_siniri": self.kuyruk_siniri,
+                "tamamlanan": self.tamamlanan,
+                "reddedilen": self.reddedilen,
+            }
+
+
+_havuz = None
+_havuz_kilidi = threading.Lock()
+
+
+def havuz():
+    global _havuz
+    with _havuz_kilidi:
+        if _havuz is None:
+            _havuz = SifreHavuzu(
+                config.SIFRE_HAVUZ_BOYUTU,
+                config.SIFRE_KUYRUK_SINIRI,
+                config.SIFRE_BEKLEME_SURESI,
+            )
+        return _havuz
+
+
+def sifre_hashle(sifre, maliyet=None):
+    with metrikler.olc('bcrypt'):
+        hash_ = havuz().calistir(_hashle, sifre.encode('utf-8'), maliyet or config.SIFRE_BCRYPT_MALIYETI)
+    return hash_.decode('utf-8')
+
+
+def sifre_dogrula(sifre, hash_):
+    if not sifre or not hash_:
+        return False
+    try:
+        with metrikler.olc('bcrypt'):
+            return havuz().calistir(_dogrula, sifre.encode('utf-8'), hash_.encode('utf-8'))
+    except ValueError:
+        # Veritabanındaki değer geçerli bir bcrypt hash'i değil
+        return False
+
+
+def hash_maliyeti(hash_):
+    # "$2b$12$<salt+hash>" -> 12
+    try:
+        return int(hash_.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def yeniden_hashlenmeli(hash_):
+    """Hash, ayarlanan maliyetten farklı bir maliyetle mi üretilmiş?"""
+    return hash_maliyeti(hash_) != config.SIFRE_BCRYPT_MALIYETI
@@ -0,0 +1,454 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from itertools import islice
+
+import config
+from db import db_baglantisi
+from kapali_araliklar import gun_maskesi
+
+
+# Günün slot şablonu (versiyon, dakikalar), dolu saatler ve kapalı aralık
+# kuralları tek sorguda (tek round trip) alınır. Saatler gün içindeki dakika
+# (0-1439) olarak, kurallar id sırasında [baslangic_dk, bitis_dk, acik] olarak
+# döner. Şablon calisma_programi.kaydet tarafından önceden yazılmıştır.
+IZGARA_SORGUSU = """
+    SELECT
+        s.versiyon,
+        s.dakikalar,
+        ARRAY(SELECT (EXTRACT(HOUR FROM saat) * 60 + EXTRACT(MINUTE FROM saat))::int
+              FROM randevular
+              WHERE doktor_id = %(doktor_id)s AND tarih = %(tarih)s),
+        ARRAY(SELECT ARRAY[baslangic_dk, bitis_dk, acik::int]
+              FROM gunun_kapali_araliklari(%(doktor_id)s, %(tarih)s)
+              ORDER BY id)
+    FROM (SELECT 1) AS x
+    LEFT JOIN slot_sablonlari s
+        ON s.doktor_id = %(doktor_id)s AND s.haftanin_gunu = EXTRACT(ISODOW FROM %(tarih)s::date)::int
+"""
+
+
+def dakika_str(dakika):
+    return f"{dakika // 60:02d}:{dakika % 60:02d}"
+
+
+def _maske(dakikalar):
+    maske = 0
+    for dakika in dakikalar:
+        maske |= 1 << dakika
+    return maske
+
+
+def _bitler(maske):
+    dakika = 0
+    while maske:
+        if maske & 1:
+            yield dakika
+        maske >>= 1
+        dakika += 1
+
+
+class SlotSablonu:
+    """Bir doktorun haftanın bir günü için değişmez slot listesi."""
+
+    __slots__ = ('versiyon', 'dakikalar', 'maske')
+
+    def __init__(self, versiyon, dakikalar):
+        self.versiyon = versiyon
+        self.dakikalar = tuple(dakikalar)
+        self.maske = _maske(self.dakikalar)
+
+
+class SablonOnbellegi:
+    """(doktor_id, haftanin_gunu) başına son görülen şablon.
+
+    Aynı versiyonu taşıyan bütün ızgaralar (ör. bir doktorun bütün
+    pazartesileri) aynı SlotSablonu nesnesini paylaşır. Program
+    kaydedildiğinde versiyon arttığından eski şablon ayrıca geçersiz
+    kılınmadan, yeni versiyon ilk görüldüğünde değiştirilir.
+    """
+
+    def __init__(self):
+        self._kilit = threading.Lock()
+        self._veri = {}
+        self.isabet = 0
+        self.olusturma = 0
+
+    def getir(self, doktor_id, haftanin_gunu, versiyon, dakikalar):
+        anahtar = (doktor_id, haftanin_gunu)
+        with self._kilit:
+            sablon = self._veri.get(anahtar)
+            if sablon is not None and sablon.versiyon == versiyon:
+                self.isabet += 1
+                return sablon
+        sablon = SlotSablonu(versiyon, dakikalar)
+        with self._kilit:
+            eski = self._veri.get(anahtar)
+            # Geç gelen eski bir okuma yeni versiyonun üzerine yazmaz
+            if eski is None or eski.versiyon < versiyon:
+                self._veri[anahtar] = sablon
+            self.olusturma += 1
+        return sablon
+
+    def istatistikler(self):
+        with self._kilit:
+            return {"boyut": len(self._veri), "isabet": self.isabet, "olusturma": self.olusturma}
+
+
+sablonlar = SablonOnbellegi()
+
+
+class GunIzgarasi:
+    """Bir doktorun bir günü için slot durumu.
+
+    Dolu ve kapalı saatler, gün içindeki dakika ofsetleri üzerinde birer bit
+    maskesi olarak tutulur; durum sorgusu tek bir bit testidir. Kapalı
+    aralık kuralları yüklenirken bu maskeye işlenir. Slot listesi günün
+    paylaşılan şablonundan gelir.
+    """
+
+    __slots__ = ('sablon', 'dolu', 'kapali')
+
+    def __init__(self, sablon, dolu, kapali):
+        self.sablon = sablon  # SlotSablonu; doktorun ayarı yoksa None
+        self.dolu = dolu
+        self.kapali = kapali
+
+    @classmethod
+    def satirdan(cls, doktor_id, tarih, versiyon, sablon_dakikalari, dolu_dakikalar, kapali_kurallar):
+        sablon = None
+        if versiyon is not None:
+            sablon = sablonlar.getir(doktor_id, tarih.isoweekday(), versiyon, sablon_dakikalari)
+        return cls(sablon, _maske(dolu_dakikalar or ()), gun_maskesi(kapali_kurallar))
+
+    def saatler(self):
+        return self.sablon.dakikalar if self.sablon else ()
+
+    def dolu_mu(self, dakika):
+        return (self.dolu >> dakika) & 1 == 1
+
+    def kapali_mi(self, dakika):
+        return (self.kapali >> dakika) & 1 == 1
+
+    def dolu_saatler(self):
+        return list(_bitler(self.dolu))
+
+    def mesgul_saatler(self):
+        # Kapalı maske tüm aralığı kapsar; yalnızca slot başlangıçları sayılır
+        slotlar = self.sablon.maske if self.sablon else 0
+        return list(_bitler(self.dolu | (self.kapali & slotlar)))
+
+    def bos_saatler(self):
+        mesgul = self.dolu | self.kapali
+        for dakika in self.saatler():
+            if not (mesgul >> dakika) & 1:
+                yield dakika
+
+
+class IzgaraOnbellegi:
+    """(doktor_id, tarih) anahtarlı, boyut ve süre sınırlı LRU önbellek."""
+
+    def __init__(self, kapasite, sure):
+        self.kapasite = kapasite
+        self.sure = sure
+        self._kilit = threading.Lock()
+        self._veri = OrderedDict()
+        # Her geçersiz kılmada artar; veritabanından okuma sürerken geçersiz
+        # kılınan bir ızgaranın eski hali önbelleğe yazılmaz.
+        self._nesil = 0
+        self.isabet = 0
+        self.iskalama = 0
+
+    def nesil(self):
+        with self._kilit:
+            return self._nesil
+
+    def getir(self, anahtar):
+        with self._kilit:
+            kayit = self._veri.get(anahtar)
+            if kayit is not None:
+                izgara, zaman = kayit
+                if time.monotonic() - zaman < self.sure:
+                    self._veri.move_to_end(anahtar)
+                    self.isabet += 1
+                    return izgara
+                del self._veri[anahtar]
+            self.iskalama += 1
+            return None
+
+    def koy(self, anahtar, izgara, nesil):
+        with self._kilit:
+            if nesil != self._nesil:
+                return
+            self._veri[anahtar] = (izgara, time.monotonic())
+            self._veri.move_to_end(anahtar)
+            while len(self._veri) > self.kapasite:
+                self._veri.popitem(last=False)
+
+    def gecersiz_kil(self, doktor_id, tarih=None):
+        with self._kilit:
+            self._nesil += 1
+            if tarih is not None:
+                self._veri.pop((doktor_id, tarih), None)
+            else:
+                for anahtar in [a for a in self._veri if a[0] == doktor_id]:
+                    del self._veri[anahtar]
+
+    def istatistikler(self):
+        with self._kilit:
+            return {
+                "boyut": len(self._veri),
+                "kapasite": self.kapasite,
+                "isabet": self.isabet,
+                "iskalama": self.iskalama,
+            }
+
+
+onbellek = IzgaraOnbellegi(config.SLOT_ONBELLEK_BOYUTU, config.SLOT_ONBELLEK_SURESI)
+
+
+def gun_izgarasi(doktor_id, tarih):
+    anahtar = (int(doktor_id), tarih)
+    izgara = onbellek.getir(anahtar)
+    if izgara is not None:
+        return izgara
+
+    nesil = onbellek.nesil()
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute(IZGARA_SORGUSU, {"doktor_id": doktor_id, "tarih": tarih})
+        versiyon, sablon, dolu, kapali = cursor.fetchone()
+
+    izgara = GunIzgarasi.satirdan(anahtar[0], tarih, versiyon, sablon, dolu, kapali)
+    onbellek.koy(anahtar, izgara, nesil)
+    return izgara
+
+
+def gecersiz_kil(doktor_id, tarih=None):
+    """Yazma işlemi commit edildikten sonra çağrılmalıdır.
+
+    ``tarih`` verilmezse doktorun tüm günleri (ör. ayar değişikliğinde)
+    önbellekten atılır.
+    """
+    onbellek.gecersiz_kil(int(doktor_id), tarih)
+
+
+# Birden çok doktorun aynı günkü ızgaraları tek sorguda (ANY) alınır
+TOPLU_IZGARA_SORGUSU = """
+    SELECT i.doktor_id,
+           s.versiyon,
+           s.dakikalar,
+           r.dakikalar,
+           k.kurallar
+    FROM unnest(%(idler)s::int[]) AS i(doktor_id)
+    LEFT JOIN (
+        SELECT doktor_id, versiyon, dakikalar
+        FROM slot_sablonlari
+        WHERE doktor_id = ANY(%(idler)s) AND haftanin_gunu = EXTRACT(ISODOW FROM %(tarih)s::date)::int
+    ) s ON s.doktor_id = i.doktor_id
+    LEFT JOIN (
+        SELECT doktor_id, array_agg((EXTRACT(HOUR FROM saat) * 60 + EXTRACT(MINUTE FROM saat))::int) AS dakikalar
+        FROM randevular
+        WHERE doktor_id = ANY(%(idler)s) AND tarih = %(tarih)s
+        GROUP BY doktor_id
+    ) r ON r.doktor_id = i.doktor_id
+    LEFT JOIN LATERAL (
+        SELECT array_agg(ARRAY[g.baslangic_dk, g.bitis_dk, g.acik::int] ORDER BY g.id) AS kurallar
+        FROM gunun_kapali_araliklari(i.doktor_id, %(tarih)s) g
+    ) k ON true
+"""
+
+
+def gun_izgaralari(doktor_idler, tarih):
+    """Birden çok doktorun bir günkü ızgaraları: {doktor_id: GunIzgarasi}.
+
+    Önbellekte olmayanlar, doktor sayısından bağımsız olarak tek sorguyla
+    yüklenir.
+    """
+    sonuc = {}
+    eksik = []
+    for doktor_id in doktor_idler:
+        doktor_id = int(doktor_id)
+        izgara = onbellek.getir((doktor_id, tarih))
+        if izgara is not None:
+            sonuc[doktor_id] = izgara
+        else:
+            eksik.append(doktor_id)
+
+    if eksik:
+        nesil = onbellek.nesil()
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            cursor.execute(TOPLU_IZGARA_SORGUSU, {"idler": eksik, "tarih": tarih})
+            satirlar = cursor.fetchall()
+        for doktor_id, versiyon, sablon, dolu, kapali in satirlar:
+            izgara = GunIzgarasi.satirdan(doktor_id, tarih, versiyon, sablon, dolu, kapali)
+            onbellek.koy((doktor_id, tarih), izgara, nesil)
+            sonuc[doktor_id] = izgara
+    return sonuc
+
+
+class _GunlukYukleyici:
+    """Arama boyunca her gün için tüm doktorların ızgarasını bir kez yükler.
+
+    Bir doktorun akışı yeni bir güne geçtiğinde o gün, aramadaki bütün
+    doktorlar için tek sorguyla okunur; böylece sorgu sayısı doktor sayısıyla
+    değil taranan gün sayısıyla sınırlıdır.
+    """
+
+    def __init__(self, doktor_idler):
+        self.doktor_idler = doktor_idler
+        self._gunler = {}
+
+    def getir(self, doktor_id, tarih):
+        izgaralar = self._gunler.get(tarih)
+        if izgaralar is None:
+            izgaralar = self._gunler[tarih] = gun_izgaralari(self.doktor_idler, tarih)
+        return izgaralar[doktor_id]
+
+    @property
+    def yuklenen_gun(self):
+        return len(self._gunler)
+
+
+def en_erken_bos_slotlar(doktor_idler, baslangic, bitis, adet, simdi=None):
+    """Doktorların [baslangic, bitis] aralığındaki en erken ``adet`` boş slotu.
+
+    ``([(tarih, dakika, doktor_id), ...], okunan_gun_sayisi)`` döner; slotlar
+    zaman sırasındadır (eşitlikte doktor_id). Slotlar günün şablonundan
+    gelir; dolu ve kapalı saatler hariçtir. ``simdi`` verilirse o andan
+    önceki slotlar atlanır.
+
+    Her doktor için günleri sırayla gezen tembel bir akış kurulur ve akışlar
+    heapq.merge ile birleştirilir; ``adet`` sonuç bulununca arama durur,
+    sonraki günler hiç okunmaz.
+    """
+    doktor_idler = sorted({int(d) for d in doktor_idler})
+    yukleyici = _GunlukYukleyici(doktor_idler)
+    gun_sayisi = (bitis - baslangic).days + 1
+
+    def akis(doktor_id):
+        for i in range(gun_sayisi):
+            tarih = baslangic + timedelta(days=i)
+            esik = -1
+            if simdi is not None:
+                if tarih < simdi.date():
+                    continue
+                if tarih == simdi.date():
+                    esik = simdi.hour * 60 + simdi.minute
+            izgara = yukleyici.getir(doktor_id, tarih)
+            if not izgara.sablon:
+                # Ayarı olmayan doktorun hiçbir gününde slot yoktur
+                return
+            for dakika in izgara.bos_saatler():
+                if dakika > esik:
+                    yield (tarih, dakika, doktor_id)
+
+    sonuc = list(islice(heapq.merge(*(akis(d) for d in doktor_idler)), adet))
+    return sonuc, yukleyici.yuklenen_gun
+
+
+# Bir tarih aralığındaki her gün için slot durumlarını küme tabanlı hesaplar.
+# Slotlar her günün şablonundan gelir; durum önceliği
+# /api/doctor/available_slots ile aynıdır: kapalı saat dolu saatten önce gelir.
+TAKVIM_SORGUSU = """
+    WITH sablon AS (
+        SELECT haftanin_gunu, dakikalar
+        FROM slot_sablonlari
+        WHERE doktor_id = %(doktor_id)s
+    ),
+    gunler AS (
+        SELECT g::date AS tarih
+        FROM generate_series(%(baslangic)s::date, %(bitis)s::date, interval '1 day') AS g
+    ),
+    slotlar AS (
+        SELECT g.tarih, make_time(s.dk / 60, s.dk %% 60, 0) AS saat, s.dk
+        FROM gunler g
+        JOIN sablon ON sablon.haftanin_gunu = EXTRACT(ISODOW FROM g.tarih)
+        CROSS JOIN LATERAL unnest(sablon.dakikalar) AS s(dk)
+    ),
+    dolu AS (
+        SELECT DISTINCT tarih, saat FROM randevular
+        WHERE doktor_id = %(doktor_id)s AND tarih BETWEEN %(baslangic)s AND %(bitis)s
+    ),
+    kurallar AS (
+        SELECT g.tarih, k.id, k.baslangic_dk, k.bitis_dk, k.acik
+        FROM gunler g
+        CROSS JOIN LATERAL gunun_kapali_araliklari(%(doktor_id)s, g.tarih) k
+    ),
+    durumlar AS (
+        SELECT s.tarih, s.saat,
+               CASE WHEN (SELECT NOT k.acik FROM kurallar k
+                          WHERE k.tarih = s.tarih AND s.dk >= k.baslangic_dk AND s.dk < k.bitis_dk
+                          ORDER BY k.id DESC LIMIT 1) THEN 'kapali'
+                    WHEN d.saat IS NOT NULL THEN 'dolu'
+                    ELSE 'bos' END AS durum
+        FROM slotlar s
+        LEFT JOIN dolu d ON d.tarih = s.tarih AND d.saat = s.saat
+    )
+    SELECT g.tarih,
+           COUNT(x.saat) FILTER (WHERE x.durum = 'bos') AS bos,
+           COUNT(x.saat) FILTER (WHERE x.durum = 'dolu') AS dolu,
+           COUNT(x.saat) FILTER (WHERE x.durum = 'kapali') AS kapali,
+           {ek_kolonlar}
+           EXISTS (SELECT 1 FROM sablon) AS ayar_var
+    FROM gunler g
+    LEFT JOIN durumlar x ON x.tarih = g.tarih
+    GROUP BY g.tarih
+    ORDER BY g.tarih
+"""
+
+_IZGARA_KOLONLARI = """
+           array_agg(to_char(x.saat, 'HH24:MI') ORDER BY x.saat) FILTER (WHERE x.saat IS NOT NULL) AS saatler,
+           array_agg(x.durum ORDER BY x.saat) FILTER (WHERE x.saat IS NOT NULL) AS durumlar,
+"""
+
+# Günün randevuları, /appointments satırlarıyla aynı alanlar ve randevu_id
+_RANDEVU_KOLONLARI = """
+           (SELECT json_agg(json_build_object(
+                       'randevu_id', r.randevu_id,
+                       'hasta_id', r.hasta_id,
+                       'hasta_adi', h.ad,
+                       'hasta_soyadi', h.soyad,
+                       'cinsiyet', h.cinsiyet,
+                       'saat', to_char(r.saat, 'HH24:MI')) ORDER BY r.saat)
+            FROM randevular r
+            LEFT JOIN hastalar h ON h.hasta_id = r.hasta_id
+            WHERE r.doktor_id = %(doktor_id)s AND r.tarih = g.tarih) AS randevular,
+"""
+
+
+def takvim_sorgusu(izgaralar=False, randevular=False):
+    return TAKVIM_SORGUSU.format(ek_kolonlar=(
+        (_IZGARA_KOLONLARI if izgaralar else "") + (_RANDEVU_KOLONLARI if randevular else "")
+    ))
+
+
+def takvim(doktor_id, baslangic, bitis, izgaralar=False, randevular=False):
+    """Aralıktaki her gün için bos/dolu/kapali sayıları (isteğe bağlı slotlar
+    ve randevu listesi); tek sorgu.
+
+    Doktorun ayarı yoksa None döner.
+    """
+    with db_baglantisi() as conn, conn.cursor() as cursor:
+        cursor.execute(takvim_sorgusu(izgaralar, randevular), {"doktor_id": doktor_id, "baslangic": baslangic, "bitis": bitis})
+        satirlar = cursor.fetchall()
+
+    if not satirlar or not satirlar[0][-1]:
+        return None
+
+    gunler = []
+    for satir in satirlar:
+        gun = {
+            "date": satir[0].isoformat(),
+            "free": satir[1],
+            "booked": satir[2],
+            "closed": satir[3],
+        }
+        if izgaralar:
+            saatler, durumlar = satir[4] or [], satir[5] or []
+            gun["slots"] = [{"time": s, "status": d} for s, d in zip(saatler, durumlar)]
+        if randevular:
+            gun["appointments"] = satir[-2] or []
+        gunler.append(gun)
+    return gunler
@@ -0,0 +1,258 @@
+"""Slot değişikliklerinin Server-Sent Events ile yayını.
+
+Yazma route'ları değişikliği, yazdıkları işlemin içinde ``yayinla`` (tek
+slot) ya da ``doktor_yayinla`` (doktorun bütün günleri: kapalı aralık
+kuralları, çalışma programı) ile ``pg_notify`` üzerinden bildirir. Bildirim
+yalnızca işlem commit edilirse ve commit sırasıyla iletilir; böylece hangi
+worker'ın yazdığından bağımsız olarak bütün worker'lar görür.
+
+Her worker'da tek bir thread, ayrı bir bağlantıda LISTEN yapar ve gelen
+bildirimleri o (doktor, gün) akışlarına dağıtır. Olay kimliği, ETag'lerin de
+dayandığı sürüm sayaçlarıdır (``<doktor sürümü>.<gün sürümü>``, bkz.
+surumler.py). Yeniden bağlanan istemcinin Last-Event-ID'si güncel sürümle
+aynıysa kaçırdığı bir şey yoktur; değilse ara olaylar yeniden oynatılmaz,
+günün tam durumu (``durum`` olayı) gönderilir. Kuyruğu taşan yavaş bir
+istemciye ve LISTEN bağlantısı koptuğunda bütün istemcilere de aynı şekilde
+tam durum gönderilir.
+
+Akışlar bir istek thread'ini açık kaldıkları sürece tutar; worker başına
+açık akış sayısı ``config.SSE_MAX_AKIS`` ile sınırlıdır ve her akış
+``SSE_MAX_SURE`` saniye sonra kapanır (istemci Last-Event-ID ile yeniden
+bağlanır).
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+import psycopg2
+
+import config
+import surumler
+
+KANAL = 'slot_degisiklikleri'
+_YENIDEN = object()  # abone tam durumu yeniden okumalı
+
+_gunluk = logging.getLogger(__name__)
+
+
+class AkisSiniri(Exception):
+    durum_kodu = 503
+
+    def __init__(self, mesaj="Açık akış sınırına ulaşıldı, lütfen tekrar deneyin"):
+        super().__init__(mesaj)
+
+
+def yayinla(cursor, doktor_id, tarih, saat):
+    """Bir slotun yeni durumunu bildirir; sürüm sayaçları artırıldıktan
+    sonra, aynı işlem içinde çağrılmalıdır. Durum önceliği
+    /api/doctor/available_slots ile aynıdır: kapalı, dolu, boş."""
+    cursor.execute("""
+        SELECT pg_notify(%(kanal)s, json_build_object(
+            'doktor_id', %(doktor_id)s,
+            'tarih', %(tarih)s::date,
+            'saat', to_char(%(saat)s::time, 'HH24:MI'),
+            'durum', CASE
+                WHEN kapali_mi(%(doktor_id)s, %(tarih)s, %(saat)s) THEN 'kapali'
+                WHEN EXISTS (
+                    SELECT 1 FROM randevular
+                    WHERE doktor_id = %(doktor_id)s AND tarih = %(tarih)s AND saat = %(saat)s
+                ) THEN 'dolu'
+                ELSE 'bos' END,
+            'surum', ARRAY[
+                (SELECT COALESCE(max(surum), 0) FROM surumler WHERE anahtar = %(doktor)s),
+                (SELECT COALESCE(max(surum), 0) FROM surumler WHERE anahtar = %(gun)s)]
+        )::text)
+    """, {
+        "kanal": KANAL, "doktor_id": doktor_id, "tarih": tarih, "saat": saat,
+        "doktor": surumler.doktor(doktor_id), "gun": surumler.gun(doktor_id, tarih),
+    })
+
+
+def doktor_yayinla(cursor, doktor_id):
+    """Doktorun bütün günleri değişti; o doktorun akışları tam durumu
+    yeniden gönderir."""
+    cursor.execute(
+        "SELECT pg_notify(%s, json_build_object('doktor_id', %s)::text)", (KANAL, doktor_id)
+    )
+
+
+def _surum(metin):
+    try:
+        doktor, gun = metin.split('.')
+        return int(doktor), int(gun)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _olay(tur, surum, veri):
+    return f"id: {surum[0]}.{surum[1]}\nevent: {tur}\ndata: {json.dumps(veri, ensure_ascii=False)}\n\n"
+
+
+class _Abone:
+    def __init__(self, doktor_id, tarih):
+        self.anahtar = (doktor_id, tarih.isoformat())
+        self.kuyruk = queue.Queue(config.SSE_KUYRUK_BOYUTU)
+
+    def gonder(self, mesaj):
+        try:
+            self.kuyruk.put_nowait(mesaj)
+        except queue.Full:
+            # Yavaş istemci: birikenler atılır, tam durum yeniden gönderilir
+            while True:
+                try:
+                    self.kuyruk.get_nowait()
+                except queue.Empty:
+                    break
+            self.kuyruk.put_nowait(_YENIDEN)
+
+
+class SlotYayini:
+    """Worker başına LISTEN thread'i ve açık akışlar."""
+
+    def __init__(self, max_akis):
+        self._kilit = threading.Lock()
+        self._aboneler = {}  # doktor_id -> {tarih: {abone, ...}}
+        self._yer = threading.BoundedSemaphore(max_akis)
+        self._max_akis = max_akis
+        self._dinleyici = None
+        self._hazir = threading.Event()
+
+    # --- LISTEN thread'i ---
+
+    def _baslat(self):
+        with self._kilit:
+            if self._dinleyici is None:
+                self._dinleyici = threading.Thread(target=self._dinle, name="slot-yayini", daemon=True)
+                self._dinleyici.start()
+        # İlk abone, LISTEN başlamadan yapılan bir değişikliği kaçırmasın
+        self._hazir.wait(timeout=5)
+
+    def _dinle(self):
+        bekleme = 1
+        ilk = True
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(**config.DB_AYARLARI)
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {KANAL}")
+                self._hazir.set()
+                bekleme = 1
+                if not ilk:
+                    # Bağlantı kopukken gelen bildirimler kayboldu
+                    self._dagit_hepsine()
+                ilk = False
+                while True:
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._dagit(json.loads(conn.notifies.pop(0).payload))
+            except Exception:
+                _gunluk.exception("Slot yayını LISTEN bağlantısı koptu, %s sn sonra yeniden denenecek", bekleme)
+                self._hazir.clear()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                time.sleep(bekleme)
+                bekleme = min(bekleme * 2, 30)
+
+    def _dagit(self, bildirim):
+        with self._kilit:
+            gunler = self._aboneler.get(bildirim["doktor_id"])
+            if not gunler:
+                return
+            if "tarih" in bildirim:
+                aboneler = list(gunler.get(bildirim["tarih"], ()))
+                mesaj = bildirim
+            else:
+                aboneler = [a for kume in gunler.values() for a in kume]
+                mesaj = _YENIDEN
+        for abone in aboneler:
+            abone.gonder(mesaj)
+
+    def _dagit_hepsine(self):
+        with self._kilit:
+            aboneler = [a for gunler in self._aboneler.values() for kume in gunler.values() for a in kume]
+        for abone in aboneler:
+            abone.gonder(_YENIDEN)
+
+    # --- Akışlar ---
+
+    def istatistikler(self):
+        with self._kilit:
+            acik = sum(len(kume) for gunler in self._aboneler.values() for kume in gunler.values())
+        return {"acik_akis": acik, "max_akis": self._max_akis, "dinliyor": self._hazir.is_set()}
+
+    def akis(self, doktor_id, tarih, son_olay_id, anlik_goruntu):
+        """(olay üreteci, kapat) döner; kapat yanıt kapanınca çağrılmalıdır.
+
+        ``anlik_goruntu()`` günün tam durumunu (sürüm, veri) olarak döner.
+        Açık akış sınırı doluysa AkisSiniri fırlatılır.
+        """
+        if not self._yer.acquire(blocking=False):
+            raise AkisSiniri()
+        abone = _Abone(doktor_id, tarih)
+        try:
+            self._baslat()
+            with self._kilit:
+                self._aboneler.setdefault(doktor_id, {}).setdefault(abone.anahtar[1], set()).add(abone)
+        except Exception:
+            self._yer.release()
+            raise
+
+        kapandi = threading.Lock()
+
+        def kapat():
+            if not kapandi.acquire(blocking=False):
+                return
+            with self._kilit:
+                gunler = self._aboneler.get(doktor_id, {})
+                kume = gunler.get(abone.anahtar[1], set())
+                kume.discard(abone)
+                if not kume:
+                    gunler.pop(abone.anahtar[1], None)
+                if not gunler:
+                    self._aboneler.pop(doktor_id, None)
+            self._yer.release()
+
+        return self._uret(abone, _surum(son_olay_id), anlik_goruntu), kapat
+
+    def _uret(self, abone, son_surum, anlik_goruntu):
+        yield f"retry: {config.SSE_YENIDEN_BAGLANMA_MS}\n\n"
+        # Abonelik anlık görüntüden önce yapıldı; aradaki değişiklikler
+        # kuyrukta bekler, görüntüde zaten olanlar sürümlerinden elenir.
+        surum, veri = anlik_goruntu()
+        if surum != son_surum:
+            yield _olay("durum", surum, veri)
+
+        bitis = time.monotonic() + config.SSE_MAX_SURE
+        while True:
+            kalan = bitis - time.monotonic()
+            if kalan <= 0:
+                return
+            try:
+                mesaj = abone.kuyruk.get(timeout=min(config.SSE_NABIZ_ARALIGI, kalan))
+            except queue.Empty:
+                if time.monotonic() < bitis:
+                    yield ": nabiz\n\n"
+                continue
+
+            if mesaj is _YENIDEN:
+                surum, veri = anlik_goruntu()
+                yield _olay("durum", surum, veri)
+                continue
+            yeni = tuple(mesaj["surum"])
+            if yeni[0] <= surum[0] and yeni[1] <= surum[1]:
+                continue
+            surum = (max(surum[0], yeni[0]), max(surum[1], yeni[1]))
+            yield _olay("slot", surum, {"date": mesaj["tarih"], "time": mesaj["saat"], "status": mesaj["durum"]})
+
+
+yayin = SlotYayini(config.SSE_MAX_AKIS)
@@ -0,0 +1,170 @@
+"""Sürüm sayaçları ve koşullu GET (ETag / 304).
+
+Yazma route'ları değiştirdikleri kaynağın sayacını, yazdıkları işlemin
+içinde ``artir`` ile artırır:
+
+* ``doktor:<id>``          ayarlar ve kapalı aralık kuralları (doktorun tüm günleri)
+* ``gun:<id>:<tarih>``     o günün randevuları ve tek slotluk kapatmalar
+* ``profil:<id>``          doktor profili
+* ``dizin:<id>``           doktorun il/ilçe dizinindeki alanları (DIZIN_ALANLARI)
+
+``kosullu_get`` ile sarılan bir GET, yanıtın dayandığı sayaçları tek
+sorguyla okur ve ETag'i bunlardan üretir. İstemcinin If-None-Match değeri
+eşleşirse route hiç çalışmadan 304 döner. Yanıtı tamamen bellekteki bir
+yapıdan gelen route'lar (ör. doktor dizini) sürümü ``yerel`` ile o yapıdan
+alır; bu durumda veritabanına hiç gidilmez.
+
+Sayaçlar veritabanında olduğundan bütün worker'lar aynı değeri görür. Bir
+worker bir sayacın değiştiğini ilk kez gördüğünde ``degisince`` ile kayıtlı
+fonksiyonlar çağrılır (ör. ızgara önbelleği, doktor dizini); böylece ETag
+hiçbir zaman bellekteki eski bir veriyi etiketlemez.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import make_response, request
+
+import config
+from db import db_baglantisi
+
+# Değişince dizin:<id> sayacının artırıldığı alanlar (bkz. doktor_dizini.py)
+DIZIN_ALANLARI = frozenset(('ad', 'soyad', 'brans', 'il', 'ilce'))
+
+
+def doktor(doktor_id):
+    return f"doktor:{int(doktor_id)}"
+
+
+def gun(doktor_id, tarih):
+    return f"gun:{int(doktor_id)}:{tarih.isoformat()}"
+
+
+def profil(doktor_id):
+    return f"profil:{int(doktor_id)}"
+
+
+def dizin(doktor_id):
+    return f"dizin:{int(doktor_id)}"
+
+
+def artir(cursor, *anahtarlar):
+    """Sayaçları çağıranın işlemi içinde artırır; commit çağırana aittir.
+
+    Anahtarlar sıralı kilitlenir, aynı anahtarları artıran eşzamanlı
+    işlemler birbirini kilitlemez (deadlock olmaz).
+    """
+    anahtarlar = sorted(set(anahtarlar))
+    if not anahtarlar:
+        return
+    cursor.execute("""
+        INSERT INTO surumler (anahtar, surum)
+        SELECT unnest(%s::text[]), 1
+        ON CONFLICT (anahtar) DO UPDATE SET surum = surumler.surum + 1
+    """, (anahtarlar,))
+
+
+class SurumIzleyici:
+    """Bu süreçte her anahtar için son görülen sürüm ve ETag istatistikleri."""
+
+    def __init__(self, kapasite):
+        self.kapasite = kapasite
+        self._kilit = threading.Lock()
+        self._gorulen = OrderedDict()
+        self._dinleyiciler = {}
+        self._istatistik = {}
+
+    def degisince(self, onek, fonksiyon):
+        """``onek:...`` anahtarlarının sürümü değişince (ya da bu süreçte ilk
+        kez görülünce) ``fonksiyon(*parcalar)`` çağrılır."""
+        self._dinleyiciler[onek] = fonksiyon
+
+    def oku(self, anahtarlar):
+        """{anahtar: sürüm}; hiç artırılmamış anahtarın sürümü 0'dır."""
+        anahtarlar = list(dict.fromkeys(anahtarlar))
+        with db_baglantisi() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT anahtar, surum FROM surumler WHERE anahtar = ANY(%s)", (anahtarlar,)
+            )
+            surumler = dict(cursor.fetchall())
+        surumler = {a: surumler.get(a, 0) for a in anahtarlar}
+
+        with self._kilit:
+            degisen = [a for a, s in surumler.items() if self._gorulen.get(a) != s]
+        # Yerel önbellekler, sürüm görüldü olarak işaretlenmeden önce
+        # temizlenir; işaretli bir sürümü gören istek temiz önbellekten okur.
+        for anahtar in degisen:
+            onek, *parcalar = anahtar.split(':')
+            dinleyici = self._dinleyiciler.get(onek)
+            if dinleyici is not None:
+                dinleyici(*parcalar)
+        if degisen:
+            with self._kilit:
+                for anahtar in degisen:
+                    self._gorulen[anahtar] = surumler[anahtar]
+                    self._gorulen.move_to_end(anahtar)
+                while len(self._gorulen) > self.kapasite:
+                    self._gorulen.popitem(last=False)
+        return surumler
+
+    def say(self, uc_nokta, kosullu, eslesti):
+        with self._kilit:
+            sayac = self._istatistik.setdefault(uc_nokta, {"istek": 0, "kosullu": 0, "304": 0})
+            sayac["istek"] += 1
+            sayac["kosullu"] += kosullu
+            sayac["304"] += eslesti
+
+    def istatistikler(self):
+        with self._kilit:
+            uc_noktalar = {
+                ad: dict(s, isabet_orani=round(s["304"] / s["istek"], 3) if s["istek"] else 0.0)
+                for ad, s in self._istatistik.items()
+            }
+            return {"izlenen_anahtar": len(self._gorulen), "uc_noktalar": uc_noktalar}
+
+
+izleyici = SurumIzleyici(config.ETAG_IZLEME_BOYUTU)
+degisince = izleyici.degisince
+
+
+def _etag(surumler):
+    ham = "|".join([config.ETAG_SURUMU, request.full_path] + [f"{a}={s}" for a, s in sorted(surumler.items())])
+    return hashlib.sha1(ham.encode()).hexdigest()[:20]
+
+
+def kosullu_get(anahtarlar=None, yerel=None):
+    """GET route'u için ETag / 304 dekoratörü.
+
+    ``anahtarlar`` route'un argümanlarını alıp yanıtın dayandığı sayaç
+    anahtarlarını döner; ``yerel`` ise bu süreçte bilinen sürümleri
+    ({ad: sürüm}) döner ve veritabanı okuması gerektirmez. Parametreler
+    geçersizse (ValueError/TypeError) route ETag'siz çalışır ve hatayı
+    kendisi döner.
+    """
+    def sarmala(fonksiyon):
+        @wraps(fonksiyon)
+        def ic(*args, **kwargs):
+            try:
+                istenen = anahtarlar(*args, **kwargs) if anahtarlar else []
+                yerel_surumler = yerel(*args, **kwargs) if yerel else {}
+            except (ValueError, TypeError):
+                return fonksiyon(*args, **kwargs)
+
+            surumler = izleyici.oku(istenen) if istenen else {}
+            surumler.update(yerel_surumler)
+            etag = _etag(surumler)
+            kosullu = bool(request.if_none_match)
+            eslesti = kosullu and request.if_none_match.contains_weak(etag)
+            izleyici.say(request.endpoint, kosullu, eslesti)
+            if eslesti:
+                yanit = make_response("", 304)
+            else:
+                yanit = make_response(fonksiyon(*args, **kwargs))
+                if yanit.status_code != 200:
+                    return yanit
+            yanit.set_etag(etag)
+            yanit.headers['Cache-Control'] = 'no-cache'
+            return yanit
+        return ic
+    return sarmala
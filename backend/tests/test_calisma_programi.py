@@ -0,0 +1,105 @@
+"""calisma_programi.program_ayristir: geçersiz ayar istekleri ProgramHatasi
+fırlatır ve /api/doctor/settings 400 döner. Veritabanı gerekmez (hatalı
+istek bağlantı alınmadan reddedilir); backend dizininden:
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import unittest
+
+from calisma_programi import ProgramHatasi, program_ayristir
+
+
+def _istek(**degisiklik):
+    veri = {
+        "doctor_id": 1,
+        "start_hour": 9, "start_minute": 0,
+        "end_hour": 17, "end_minute": 0,
+        "interval_minutes": 30,
+    }
+    veri.update(degisiklik)
+    return veri
+
+
+_MOLA = {"start": "12:00", "end": "13:00"}
+
+# (açıklama, istek)
+_GECERSIZ = [
+    ("aralık sıfır", _istek(interval_minutes=0)),
+    ("aralık negatif", _istek(interval_minutes=-15)),
+    ("aralık metin", _istek(interval_minutes="otuz")),
+    ("aralık kesirli", _istek(interval_minutes=7.5)),
+    ("aralık bool", _istek(interval_minutes=True)),
+    ("aralık yok", _istek(interval_minutes=None)),
+    ("başlangıç bitişe eşit", _istek(end_hour=9)),
+    ("başlangıç bitişten sonra", _istek(start_hour=18)),
+    ("saat aralık dışı", _istek(start_hour=25)),
+    ("saat metin", _istek(start_hour="dokuz")),
+    ("istek nesne değil", [1, 2]),
+    ("gün programı nesne değil", _istek(weekdays={"1": 5})),
+    ("gün anahtarı aralık dışı", _istek(weekdays={"8": None})),
+    ("gün programında aralık sıfır", _istek(weekdays={"1": _istek(interval_minutes=0)})),
+    ("gün programında başlangıç bitişten sonra", _istek(weekdays={"2": _istek(start_hour=17, end_hour=9)})),
+    ("weekdays liste", _istek(weekdays=[1, 2])),
+    ("breaks nesne", _istek(breaks={"start": "12:00"})),
+    ("mola nesne değil", _istek(breaks=["12:00-13:00"])),
+    ("mola saati bozuk", _istek(breaks=[{"start": "09:00x", "end": "10:00"}])),
+    ("mola saati sayı", _istek(breaks=[{"start": 900, "end": "10:00"}])),
+    ("mola saati eksik", _istek(breaks=[{"end": "10:00"}])),
+    ("mola bitişi başlangıçta", _istek(breaks=[{"start": "12:00", "end": "12:00"}])),
+    ("mola bitişi başlangıçtan önce", _istek(breaks=[{"start": "13:00", "end": "12:00"}])),
+    ("mola günleri sayı", _istek(breaks=[dict(_MOLA, weekdays=3)])),
+    ("mola günleri metin", _istek(breaks=[dict(_MOLA, weekdays="135")])),
+    ("mola günü aralık dışı", _istek(breaks=[dict(_MOLA, weekdays=[0, 1])])),
+    ("mola günü 8", _istek(breaks=[dict(_MOLA, weekdays=[8])])),
+    ("mola günü metin", _istek(breaks=[dict(_MOLA, weekdays=["1"])])),
+    ("mola günü kesirli", _istek(breaks=[dict(_MOLA, weekdays=[1.0])])),
+    ("mola günü bool", _istek(breaks=[dict(_MOLA, weekdays=[True])])),
+]
+
+
+class ProgramAyristirTesti(unittest.TestCase):
+
+    def test_gecerli_istek(self):
+        varsayilan, gunler, molalar = program_ayristir(_istek(
+            weekdays={"6": None, "7": _istek(start_hour=10, end_hour=14, interval_minutes=20)},
+            breaks=[_MOLA, dict(_MOLA, start="15:00", end="24:00", weekdays=[1, 3])],
+        ))
+        self.assertEqual(varsayilan, (540, 1020, 30))
+        self.assertEqual(gunler, {6: None, 7: (600, 840, 20)})
+        self.assertEqual(molalar, [(None, 720, 780), (0b101, 900, 1440)])
+
+    def test_istege_bagli_alanlar(self):
+        # Boş mola günleri "her gün" demektir; verilmeyen alanlar None döner
+        self.assertEqual(program_ayristir(_istek())[1:], (None, None))
+        self.assertEqual(program_ayristir(_istek(breaks=[dict(_MOLA, weekdays=[])]))[2], [(None, 720, 780)])
+        self.assertEqual(program_ayristir(_istek(interval_minutes="15"))[0], (540, 1020, 15))
+
+    def test_gecersiz_istekler(self):
+        for aciklama, veri in _GECERSIZ:
+            with self.subTest(aciklama):
+                with self.assertRaises(ProgramHatasi):
+                    program_ayristir(veri)
+
+
+class AyarRotasiTesti(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        import app
+        cls.istemci = app.app.test_client()
+
+    def test_gecersiz_istekler_400(self):
+        for aciklama, veri in _GECERSIZ:
+            with self.subTest(aciklama):
+                yanit = self.istemci.post('/api/doctor/settings', json=veri)
+                self.assertEqual(yanit.status_code, 400, yanit.get_data(as_text=True))
+                self.assertIn("error", yanit.get_json())
+
+    def test_json_olmayan_govde_400(self):
+        yanit = self.istemci.post('/api/doctor/settings', data="start_hour=9", content_type='text/plain')
+        self.assertEqual(yanit.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+"""doktor_dizini: bellekteki dizinin aramaları, satırlar üzerinde kaba kuvvet
+filtreyle karşılaştırılır. Veritabanı gerekmez; backend dizininden:
+
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+import random
+import unittest
+
+from doktor_dizini import DoktorDizini, normalize
+
+_IL = ['İstanbul', 'ISTANBUL', 'istanbul', 'Istanbul', 'ıstanbul', '  İstanbul ', 'Ankara', 'ANKARA', 'İzmir']
+_ILCE = ['Sarıyer', 'SARIYER', 'Sariyer', 'sarıyer', 'Kadıköy', 'KADIKÖY', 'Kadiköy', 'Çankaya', 'ÇANKAYA', 'Bornova']
+_BRANS = ['Ortodonti', 'ORTODONTİ', 'ortodonti', 'Pedodonti', 'Periodontoloji', None]
+
+
+def _katla(metin):
+    # normalize'dan bağımsız beklenen katlama: I, İ, ı -> i
+    if metin is None:
+        return ''
+    return ' '.join(metin.translate(str.maketrans({'İ': 'i', 'I': 'i', 'ı': 'i'})).lower().split())
+
+
+def _kaba_kuvvet(satirlar, il, ilce, brans=None):
+    return sorted(
+        doktor_id for doktor_id, _, _, b, i, ic in satirlar
+        if _katla(i) == _katla(il) and _katla(ic) == _katla(ilce)
+        and (not brans or _katla(b) == _katla(brans))
+    )
+
+
+def _satirlar(adet, tohum):
+    rastgele = random.Random(tohum)
+    idler = rastgele.sample(range(1, adet * 10), adet)
+    return [
+        (doktor_id, f"Ad{doktor_id}", f"Soyad{doktor_id}",
+         rastgele.choice(_BRANS), rastgele.choice(_IL), rastgele.choice(_ILCE))
+        for doktor_id in idler
+    ]
+
+
+def _dizin(satirlar):
+    dizin = DoktorDizini(float('inf'))
+    dizin.kur(satirlar)
+    return dizin
+
+
+def _sayfalar(dizin, il, ilce, brans=None, limit=None, sonra=None):
+    bulunan, sayfa_boyutlari = [], []
+    while True:
+        sayfa, sonraki = dizin.ara(il, ilce, brans=brans, sonra=sonra, limit=limit)
+        bulunan.extend(k["doktor_id"] for k in sayfa)
+        sayfa_boyutlari.append(len(sayfa))
+        if sonraki is None:
+            return bulunan, sayfa_boyutlari
+        # İmleç ilerlemezse sayfalama sonsuz döngüye girerdi
+        assert sonra is None or sonraki > sonra, (sonra, sonraki)
+        sonra = sonraki
+
+
+class NormalizeTesti(unittest.TestCase):
+
+    def test_turkce_katlama(self):
+        for metin, beklenen in [
+            ('İSTANBUL', 'istanbul'), ('ISTANBUL', 'istanbul'), ('ıstanbul', 'istanbul'),
+            ('Sarıyer', 'sariyer'), ('SARIYER', 'sariyer'), ('KADIKÖY', 'kadiköy'),
+            ('  Çankaya   Merkez ', 'çankaya merkez'), ('', ''), (None, ''),
+        ]:
+            self.assertEqual(normalize(metin), beklenen, metin)
+
+
+class DoktorDizinTesti(unittest.TestCase):
+
+    def setUp(self):
+        self.satirlar = _satirlar(400, tohum=11)
+        self.dizin = _dizin(self.satirlar)
+        self.aramalar = [
+            (il, ilce, brans)
+            for il in ('istanbul', 'İSTANBUL', 'Istanbul', 'ankara', 'İzmir', 'Bursa')
+            for ilce in ('sariyer', 'SARIYER', 'Kadıköy', 'çankaya', 'Bornova', 'Nilüfer')
+            for brans in (None, 'ortodonti', 'ORTODONTİ', 'Pedodonti', 'Endodonti')
+        ]
+
+    def test_tam_liste_kaba_kuvvetle_ayni(self):
+        for il, ilce, brans in self.aramalar:
+            sonuc, sonraki = self.dizin.ara(il, ilce, brans=brans)
+            self.assertIsNone(sonraki)
+            self.assertEqual([k["doktor_id"] for k in sonuc],
+                             _kaba_kuvvet(self.satirlar, il, ilce, brans), (il, ilce, brans))
+
+    def test_sayfalama_kaba_kuvvetle_ayni(self):
+        for il, ilce, brans in self.aramalar:
+            beklenen = _kaba_kuvvet(self.satirlar, il, ilce, brans)
+            for limit in (1, 2, 3, 7, len(beklenen) or 1, len(beklenen) + 1):
+                bulunan, boyutlar = _sayfalar(self.dizin, il, ilce, brans, limit=limit)
+                self.assertEqual(bulunan, beklenen, (il, ilce, brans, limit))
+                self.assertTrue(all(b == limit for b in boyutlar[:-1]), boyutlar)
+                self.assertLessEqual(boyutlar[-1], limit)
+
+    def test_sinirda_biten_sayfa_imlec_vermez(self):
+        # Sonuç sayısı limitin tam katıysa son dolu sayfadan sonra boş sayfa
+        # istenmemeli: son sayfanın imleci None olur.
+        beklenen = _kaba_kuvvet(self.satirlar, 'istanbul', 'sariyer')
+        self.assertGreater(len(beklenen), 2)
+        for limit in (1, len(beklenen)):
+            _, boyutlar = _sayfalar(self.dizin, 'istanbul', 'sariyer', limit=limit)
+            self.assertNotIn(0, boyutlar)
+
+    def test_keyset_sinirlari(self):
+        beklenen = _kaba_kuvvet(self.satirlar, 'İstanbul', 'Kadıköy')
+        self.assertGreater(len(beklenen), 3)
+        baska_grup = _kaba_kuvvet(self.satirlar, 'ankara', 'çankaya')
+        imlecler = [0, beklenen[0] - 1, beklenen[-1], beklenen[-1] + 1] + beklenen[1:3] \
+            + [beklenen[1] + 1 if beklenen[1] + 1 not in beklenen else beklenen[1]] + baska_grup[:2]
+        for sonra in imlecler:
+            for limit in (None, 1, 4):
+                bulunan, _ = _sayfalar(self.dizin, 'İstanbul', 'Kadıköy', limit=limit, sonra=sonra)
+                self.assertEqual(bulunan, [d for d in beklenen if d > sonra], (sonra, limit))
+
+    def test_olmayan_grup(self):
+        self.assertEqual(self.dizin.ara('Van', 'Tuşba'), ([], None))
+        self.assertEqual(self.dizin.ara('Van', 'Tuşba', limit=5), ([], None))
+
+    def test_kayit_alanlari(self):
+        satir = self.satirlar[0]
+        sonuc, _ = self.dizin.ara(satir[4], satir[5])
+        kayit = next(k for k in sonuc if k["doktor_id"] == satir[0])
+        self.assertEqual(kayit, {"doktor_id": satir[0], "ad": satir[1], "soyad": satir[2], "brans": satir[3]})
+
+    def test_satir_uygula_grup_degistirir_ve_cikarir(self):
+        tasinan = next(s for s in self.satirlar if _katla(s[4]) == 'ankara')
+        yeni = (tasinan[0], tasinan[1], tasinan[2], 'Ortodonti', 'IZMIR', 'bornova')
+        self.dizin.satir_uygula(tasinan[0], yeni)
+        satirlar = [yeni if s[0] == tasinan[0] else s for s in self.satirlar]
+        silinen = next(s for s in satirlar if _katla(s[4]) == 'istanbul')
+        self.dizin.satir_uygula(silinen[0], None)
+        satirlar = [s for s in satirlar if s[0] != silinen[0]]
+
+        for il, ilce in [(tasinan[4], tasinan[5]), ('İzmir', 'Bornova'), (silinen[4], silinen[5])]:
+            for limit in (None, 2):
+                bulunan, _ = _sayfalar(self.dizin, il, ilce, limit=limit)
+                self.assertEqual(bulunan, _kaba_kuvvet(satirlar, il, ilce), (il, ilce, limit))
+
+    def test_grup_surumu(self):
+        surum = self.dizin.grup_surumu('İstanbul', 'Kadıköy')
+        self.assertEqual(self.dizin.grup_surumu('ISTANBUL', 'kadiköy'), surum)
+        # Aynı satırlardan kurulan başka bir dizin (ör. başka bir worker) aynı sürümü verir
+        self.assertEqual(_dizin(list(reversed(self.satirlar))).grup_surumu('istanbul', 'kadıköy'), surum)
+
+        baska = self.dizin.grup_surumu('Ankara', 'Çankaya')
+        satir = next(s for s in self.satirlar if _katla(s[4]) == 'istanbul' and _katla(s[5]) == 'kadiköy')
+        self.dizin.satir_uygula(satir[0], satir[:3] + ('Endodonti',) + satir[4:])
+        degisen = self.dizin.grup_surumu('İstanbul', 'Kadıköy')
+        self.assertNotEqual(degisen, surum)
+        self.assertEqual(self.dizin.grup_surumu('Ankara', 'Çankaya'), baska)
+
+        self.dizin.satir_uygula(satir[0], satir[:4] + ('Ankara', 'Çankaya'))
+        self.assertNotIn(self.dizin.grup_surumu('İstanbul', 'Kadıköy'), (surum, degisen))
+        self.assertNotEqual(self.dizin.grup_surumu('Ankara', 'Çankaya'), baska)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,12 @@
+"""WSGI giriş noktası; arka plan işlerini de başlatır. backend dizininden:
+
+    gunicorn wsgi:app
+
+Worker türü, sayısı ve thread'ler gunicorn.conf.py'dedir (gthread; SSE
+akışları birer thread tutar). Her worker kendi arka plan thread'lerini
+başlatır; --preload ile kullanılmamalıdır (thread'ler fork'tan önce ana
+süreçte başlardı).
+"""
+from app import app, arka_plan_islerini_baslat  # noqa: F401
+
+arka_plan_islerini_baslat()
@@ -0,0 +1,186 @@
+"""Yavaş sorgu günlüğü.
+
+db.py'deki sorgu izleyicisi olarak çalışır: ``config.YAVAS_SORGU_ESIGI_MS``
+eşiğini aşan her ifade; SQL'i, parametreleri (şifre hash'leri ve belge
+yolları maskelenmiş), çağıran route ve süresiyle kaydedilir. Kayıtlar JSON
+satırları olarak dönen (rotating) bir günlük dosyasına ve
+/api/admin/slow_queries'den okunan bellek içi bir halka tampona yazılır.
+
+Salt okunur ifadelerin (SELECT / WITH ... SELECT) bir kısmı
+(``YAVAS_SORGU_EXPLAIN_ORANI``) için aynı bağlantıda ve aynı parametrelerle
+``EXPLAIN (ANALYZE, BUFFERS)`` çalıştırılıp plan da kaydedilir; planlardaki
+sıralı taramalar (Seq Scan) ayrıca listelenir. EXPLAIN ANALYZE sorguyu bir
+kez daha çalıştırır, yani örneklenen isteği yavaşlatır; bu yüzden oran
+küçük tutulmalıdır. Değişiklik yapan ifadeler hiçbir zaman yeniden
+çalıştırılmaz.
+"""
+import json
+import logging
+import os
+import random
+import re
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+import psycopg2
+from flask import has_request_context, request
+from psycopg2 import extensions, sql
+
+import blob_deposu
+import config
+import db
+from belgeler import BELGE_KOLONLARI
+
+MASKE = "***"
+_MAX_SQL = 4000
+_MAX_DEGER = 200
+
+_SALT_OKUNUR = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+_DEGISTIREN = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|COPY|CALL)\b|\bnextval\s*\(', re.IGNORECASE)
+_SIRALI_TARAMA = re.compile(r'Seq Scan on (\w+)')
+_BOSLUK = re.compile(r'\s+')
+
+_tampon = deque(maxlen=config.YAVAS_SORGU_TAMPON)
+_kilit = threading.Lock()
+_yerel = threading.local()
+_gunluk = logging.getLogger('yavas_sorgular')
+_istatistik = {"kayit": 0, "explain": 0, "explain_hatasi": 0}
+
+
+def _hassas_anahtar(anahtar):
+    anahtar = str(anahtar)
+    return 'sifre' in anahtar or anahtar in BELGE_KOLONLARI
+
+
+def _hassas_deger(deger):
+    if not isinstance(deger, str):
+        return False
+    if deger.startswith(('$2a$', '$2b$', '$2y$')):  # bcrypt hash'i
+        return True
+    return os.sep in deger and (blob_deposu.blob_mu(deger) or f"uploads{os.sep}" in deger)
+
+
+def maskele(deger):
+    """Parametreleri günlüğe yazılabilir hale getirir: şifre hash'leri ve
+    belge yolları maskelenir, uzun değerler kısaltılır."""
+    if isinstance(deger, dict):
+        return {a: MASKE if _hassas_anahtar(a) else maskele(d) for a, d in deger.items()}
+    if isinstance(deger, (list, tuple)):
+        return [maskele(d) for d in deger]
+    if _hassas_deger(deger):
+        return MASKE
+    if isinstance(deger, (int, float, bool)) or deger is None:
+        return deger
+    metin = str(deger)
+    return metin if len(metin) <= _MAX_DEGER else metin[:_MAX_DEGER] + "..."
+
+
+def _sql_metni(cursor, sorgu):
+    if isinstance(sorgu, sql.Composable):
+        sorgu = sorgu.as_string(cursor)
+    elif isinstance(sorgu, bytes):
+        sorgu = sorgu.decode('utf-8', 'replace')
+    return sorgu
+
+
+def salt_okunur_mu(sorgu):
+    return bool(_SALT_OKUNUR.match(sorgu)) and not _DEGISTIREN.search(sorgu)
+
+
+def _explain(cursor, sorgu, parametreler):
+    """Aynı bağlantıda EXPLAIN (ANALYZE, BUFFERS). Açık bir işlem varsa
+    savepoint içinde çalışır; hata çağıranın işlemini bozmaz."""
+    conn = cursor.connection
+    durum = conn.info.transaction_status
+    if durum not in (extensions.TRANSACTION_STATUS_IDLE, extensions.TRANSACTION_STATUS_INTRANS):
+        return None
+    islem_icinde = durum == extensions.TRANSACTION_STATUS_INTRANS and not conn.autocommit
+    with conn.cursor(cursor_factory=extensions.cursor) as c:
+        if islem_icinde:
+            c.execute("SAVEPOINT yavas_sorgu_explain")
+        try:
+            c.execute("EXPLAIN (ANALYZE, BUFFERS) " + sorgu, parametreler)
+            plan = "\n".join(satir[0] for satir in c.fetchall())
+        except psycopg2.Error:
+            if islem_icinde:
+                c.execute("ROLLBACK TO SAVEPOINT yavas_sorgu_explain")
+            raise
+        finally:
+            if islem_icinde and conn.info.transaction_status == extensions.TRANSACTION_STATUS_INTRANS:
+                c.execute("RELEASE SAVEPOINT yavas_sorgu_explain")
+    return plan
+
+
+def sorgu_bitti(cursor, sorgu, parametreler, sure):
+    """db.py sorgu izleyicisi."""
+    if sure * 1000 < config.YAVAS_SORGU_ESIGI_MS or getattr(_yerel, "aciklaniyor", False):
+        return
+
+    metin = _sql_metni(cursor, sorgu)
+    kayit = {
+        "zaman": datetime.now().isoformat(timespec="milliseconds"),
+        "sure_ms": round(sure * 1000, 2),
+        "route": (request.endpoint or "-") if has_request_context() else "-",
+        "sorgu": _BOSLUK.sub(" ", metin).strip()[:_MAX_SQL],
+        "parametreler": maskele(parametreler),
+    }
+
+    if (config.YAVAS_SORGU_EXPLAIN_ORANI > 0 and salt_okunur_mu(metin)
+            and random.random() < config.YAVAS_SORGU_EXPLAIN_ORANI):
+        _yerel.aciklaniyor = True
+        try:
+            plan = _explain(cursor, metin, parametreler)
+        except psycopg2.Error as e:
+            kayit["explain_hatasi"] = str(e).strip()
+        else:
+            if plan is not None:
+                kayit["plan"] = plan
+                kayit["sirali_tarama"] = sorted(set(_SIRALI_TARAMA.findall(plan)))
+        finally:
+            _yerel.aciklaniyor = False
+
+    with _kilit:
+        _tampon.append(kayit)
+        _istatistik["kayit"] += 1
+        if "plan" in kayit:
+            _istatistik["explain"] += 1
+        if "explain_hatasi" in kayit:
+            _istatistik["explain_hatasi"] += 1
+    _gunluk.info(json.dumps(kayit, ensure_ascii=False, default=str))
+
+
+def son_kayitlar(adet=None):
+    """Halka tampondaki kayıtlar, en yenisi önce."""
+    with _kilit:
+        kayitlar = list(_tampon)
+        istatistik = dict(_istatistik)
+    kayitlar.reverse()
+    return {
+        "esik_ms": config.YAVAS_SORGU_ESIGI_MS,
+        "explain_orani": config.YAVAS_SORGU_EXPLAIN_ORANI,
+        **istatistik,
+        "kayitlar": kayitlar[:adet] if adet else kayitlar,
+    }
+
+
+def kur():
+    """Günlük dosyasını açar ve izleyiciyi kaydeder (eşik 0'dan büyükse).
+    Havuz ilk bağlantıyı açmadan önce çağrılmalıdır."""
+    if config.YAVAS_SORGU_ESIGI_MS <= 0:
+        return
+    if config.YAVAS_SORGU_DOSYASI and not _gunluk.handlers:
+        dizin = os.path.dirname(os.path.abspath(config.YAVAS_SORGU_DOSYASI))
+        os.makedirs(dizin, exist_ok=True)
+        isleyici = RotatingFileHandler(
+            config.YAVAS_SORGU_DOSYASI,
+            maxBytes=config.YAVAS_SORGU_DOSYA_BOYUTU,
+            backupCount=config.YAVAS_SORGU_DOSYA_SAYISI,
+            encoding='utf-8',
+        )
+        isleyici.setFormatter(logging.Formatter('%(message)s'))
+        _gunluk.addHandler(isleyici)
+        _gunluk.setLevel(logging.INFO)
+        _gunluk.propagate = False
+    db.sorgu_izleyicisi_ekle(sorgu_bitti)
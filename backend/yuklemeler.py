@@ -0,0 +1,173 @@
+import os
+import re
+import time
+import uuid
+
+import blob_deposu
+import config
+
+
+class YuklemeHatasi(Exception):
+    def __init__(self, mesaj, durum_kodu=400):
+        super().__init__(mesaj)
+        self.durum_kodu = durum_kodu
+
+
+_OTURUM_ID = re.compile(r'^[0-9a-f]{32}$')
+_OTURUM_DOSYASI = re.compile(r'^([0-9a-f]{32})\.(part|hazir|lock)$')
+
+
+def akisi_yaz(akis, dosya, max_boyut, mevcut_boyut=0):
+    """Akışı sabit boyutlu parçalarla dosyaya yazar; yazılan bayt sayısını döner.
+
+    Toplam boyut ``max_boyut``u aşarsa yazma sırasında durur (413).
+    """
+    parca_boyutu = config.YUKLEME_PARCA_BOYUTU
+    yazilan = 0
+    while True:
+        parca = akis.read(parca_boyutu)
+        if not parca:
+            break
+        yazilan += len(parca)
+        if mevcut_boyut + yazilan > max_boyut:
+            raise YuklemeHatasi("Dosya boyutu sınırı aşıldı", 413)
+        dosya.write(parca)
+    return yazilan
+
+
+def _boyut_hatasi(mesaj):
+    return YuklemeHatasi(mesaj, 413)
+
+
+def dosya_kaydet(akis, hedef_dizin, max_boyut=None):
+    """Bir akışı (ör. multipart dosya parçası) doğrudan belge deposuna kaydeder."""
+    return blob_deposu.akis_kaydet(
+        akis, hedef_dizin, max_boyut or config.YUKLEME_MAX_BOYUT, hata_sinifi=_boyut_hatasi
+    )
+
+
+def _sil(yol):
+    try:
+        os.remove(yol)
+    except OSError:
+        pass
+
+
+class YuklemeOturumlari:
+    """Parça parça (devam ettirilebilir) yüklemeler.
+
+    Her oturum geçici dizinde ``<id>.part`` olarak büyür; tamamlanınca
+    ``<id>.hazir`` olur ve oturum id'si belge referansı olarak kullanılır.
+    Route'lar referansı ``referansi_al`` ile belge deposuna taşır.
+    Yarıda bırakılan ya da kullanılmayan oturumlar ``suresi_dolanlari_sil``
+    ile silinir (bkz. belge_temizligi.py).
+    """
+
+    def __init__(self, dizin):
+        self.dizin = dizin
+        os.makedirs(dizin, exist_ok=True)
+
+    def _yol(self, oturum_id, uzanti):
+        if not oturum_id or not _OTURUM_ID.match(oturum_id):
+            raise YuklemeHatasi("Geçersiz yükleme oturumu", 404)
+        return os.path.join(self.dizin, f"{oturum_id}.{uzanti}")
+
+    def olustur(self):
+        oturum_id = uuid.uuid4().hex
+        open(self._yol(oturum_id, 'part'), 'xb').close()
+        return oturum_id
+
+    def boyut(self, oturum_id):
+        try:
+            return os.path.getsize(self._yol(oturum_id, 'part'))
+        except OSError:
+            raise YuklemeHatasi("Yükleme oturumu bulunamadı", 404)
+
+    def ekle(self, oturum_id, offset, akis):
+        parca_yolu = self._yol(oturum_id, 'part')
+        kilit_yolu = self._yol(oturum_id, 'lock')
+
+        # Aynı oturuma eşzamanlı iki parça yazılmasını (süreçler arası da) engeller
+        try:
+            os.close(os.open(kilit_yolu, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            raise YuklemeHatasi("Bu oturuma şu an başka bir parça yükleniyor", 409)
+
+        try:
+            mevcut = self.boyut(oturum_id)
+            if offset != mevcut:
+                raise YuklemeHatasi(f"Beklenen offset {mevcut}", 409)
+            with open(parca_yolu, 'ab') as f:
+                try:
+                    akisi_yaz(akis, f, config.YUKLEME_MAX_BOYUT, mevcut_boyut=mevcut)
+                except YuklemeHatasi:
+                    f.truncate(mevcut)
+                    raise
+            return self.boyut(oturum_id)
+        finally:
+            _sil(kilit_yolu)
+
+    def tamamla(self, oturum_id):
+        try:
+            os.replace(self._yol(oturum_id, 'part'), self._yol(oturum_id, 'hazir'))
+        except FileNotFoundError:
+            raise YuklemeHatasi("Yükleme oturumu bulunamadı", 404)
+        return oturum_id
+
+    def tek_seferde(self, akis):
+        oturum_id = self.olustur()
+        try:
+            self.ekle(oturum_id, 0, akis)
+        except BaseException:
+            _sil(self._yol(oturum_id, 'part'))
+            raise
+        return self.tamamla(oturum_id)
+
+    def referansi_al(self, ref, hedef_dizin):
+        """Tamamlanmış yüklemeyi belge deposuna taşır ve kalıcı yolunu döner."""
+        kaynak = self._yol(ref, 'hazir')
+        try:
+            return blob_deposu.dosya_tasi(kaynak, hedef_dizin)
+        except FileNotFoundError:
+            raise YuklemeHatasi("Belge referansı bulunamadı veya kullanılmış", 400)
+
+    def suresi_dolanlari_sil(self, sure=None, kuru=False):
+        """Son yazmasından bu yana ``sure`` saniye geçmiş oturum dosyalarını
+        siler; o an parça yazılan (taze kilidi olan) oturumlara dokunmaz.
+        ``kuru`` ile yalnızca sayar. (dosya sayısı, bayt) döner."""
+        sure = config.YUKLEME_OTURUM_SURESI if sure is None else sure
+        sinir = time.time() - sure
+        try:
+            girdiler = list(os.scandir(self.dizin))
+        except FileNotFoundError:
+            return 0, 0
+        eslesen = [(girdi, _OTURUM_DOSYASI.match(girdi.name)) for girdi in girdiler]
+        yazilan = {
+            m.group(1) for girdi, m in eslesen
+            if m and m.group(2) == 'lock' and self._mtime(girdi) > sinir
+        }
+        adet = bayt = 0
+        for girdi, m in eslesen:
+            if not m or m.group(1) in yazilan:
+                continue
+            try:
+                durum = girdi.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if durum.st_mtime > sinir:
+                continue
+            if not kuru:
+                try:
+                    os.remove(girdi.path)
+                except OSError:
+                    continue
+            adet += 1
+            bayt += durum.st_size
+        return adet, bayt
+
+    @staticmethod
+    def _mtime(girdi):
+        try:
+            return girdi.stat(follow_symlinks=False).st_mtime
+        except OSError:
+            return 0
@@ -188,7 +188,7 @@ class _PatientDetailScreenState extends State<PatientDetailScreen> {
                             '/view_patient_file',
                             arguments: {
                               'title': 'Ameliyat Raporu',
-                              'file_base64': hastaVerisi?['ameliyat_raporu'],
+                              'belge': hastaVerisi?['ameliyat_raporu'],
                             },
                           );
                         },
@@ -214,7 +214,7 @@ class _PatientDetailScreenState extends State<PatientDetailScreen> {
                             '/view_patient_rontgen_file',
                             arguments: {
                               'title': 'Röntgen Görüntüsü',
-                              'file_base64': hastaVerisi?['rontgen'],
+                              'belge': hastaVerisi?['rontgen'],
                             },
                           );
                         },
@@ -176,7 +176,7 @@ class _DoctorProfileScreenState extends State<DoctorProfileScreen> {
                                 onPressed: () {
                                   Navigator.pushNamed(context, '/view_file', arguments: {
                                     'title': 'Diploma Belgesi',
-                                    'file_base64': doctorData!['diploma_belgesi'],
+                                    'belge': doctorData!['diploma_belgesi'],
                                     'doktor_id': widget.doktorId,
                                     'belge_turu': 'diploma_belgesi',
                                   });
@@ -194,7 +194,7 @@ class _DoctorProfileScreenState extends State<DoctorProfileScreen> {
                                 onPressed: () {
                                   Navigator.pushNamed(context, '/view_workplace_file', arguments: {
                                     'title': 'İş Yeri Belgesi',
-                                    'file_base64': doctorData!['isyeri_belgesi'],
+                                    'belge': doctorData!['isyeri_belgesi'],
                                     'doktor_id': widget.doktorId,
                                     'belge_turu': 'isyeri_belgesi',
                                   });
@@ -1,22 +1,25 @@
 import 'dart:convert';
 import 'dart:io';
+import 'dart:typed_data';
 import 'package:file_picker/file_picker.dart';
 import 'package:flutter/material.dart';
 import 'package:flutter_pdfview/flutter_pdfview.dart';
 import 'package:path_provider/path_provider.dart';
 import 'package:permission_handler/permission_handler.dart';
 import 'package:http/http.dart' as http;
+import 'package:randevu_sistemi/services/db_service.dart';
 
 class ViewFileScreen extends StatefulWidget {
   final String title;
-  final String fileBase64;
+  // Profil yanıtındaki belge meta verisi ({id, boyut, mime, url}); belge yoksa null
+  final Map<String, dynamic>? belge;
   final int doktorId;
   final String belgeTuru;
 
   const ViewFileScreen({
     super.key,
     required this.title,
-    required this.fileBase64,
+    this.belge,
     required this.doktorId,
     required this.belgeTuru,
   });
@@ -28,12 +31,20 @@ class ViewFileScreen extends StatefulWidget {
 class _ViewFileScreenState extends State<ViewFileScreen> {
   File? _secilenDosya;
   String? _tempPdfPath;
-  String? _base64FromServer;
+  Uint8List? _indirilenBelge;
 
-  @override
-  void initState() {
-    super.initState();
-    _base64FromServer = widget.fileBase64;
+  bool get _belgeYuklu => _secilenDosya != null || widget.belge != null;
+
+  // Belgenin içeriği profil yanıtında gelmez, belge adresinden bir kez indirilir
+  Future<Uint8List?> _belgeyiIndir() async {
+    if (_indirilenBelge != null) return _indirilenBelge;
+    final url = widget.belge?['url'] as String?;
+    if (url == null) return null;
+
+    final response = await http.get(Uri.parse('${DBService.baseUrl}$url'));
+    if (response.statusCode != 200) return null;
+    _indirilenBelge = response.bodyBytes;
+    return _indirilenBelge;
   }
 
   Future<void> requestPermissions() async {
@@ -69,7 +80,6 @@ class _ViewFileScreenState extends State<ViewFileScreen> {
     if (response.statusCode == 200) {
       setState(() {
         _secilenDosya = dosya;
-        _base64FromServer = base64String;
         _tempPdfPath = null;
       });
 
@@ -101,9 +111,8 @@ class _ViewFileScreenState extends State<ViewFileScreen> {
     return Text("Desteklenmeyen dosya türü: ${_secilenDosya!.path.split('/').last}");
   }
 
-  if (_base64FromServer != null && _base64FromServer!.isNotEmpty) {
-    final bytes = base64Decode(_base64FromServer!.replaceAll(RegExp(r'\s'), ''));
-
+  final bytes = await _belgeyiIndir();
+  if (bytes != null) {
     final isPdf = bytes.length >= 4 &&
         bytes[0] == 0x25 &&
         bytes[1] == 0x50 &&
@@ -131,7 +140,7 @@ class _ViewFileScreenState extends State<ViewFileScreen> {
 
   @override
   Widget build(BuildContext context) {
-    final bool belgeYuklu = _base64FromServer != null && _base64FromServer!.isNotEmpty;
+    final bool belgeYuklu = _belgeYuklu;
 
     return Scaffold(
       backgroundColor: Colors.blue[50],
@@ -91,7 +91,7 @@ class MyApp extends StatelessWidget {
           final args = ModalRoute.of(context)!.settings.arguments as Map<String, dynamic>;
           return ViewFileScreen(
             title: args['title'] as String,
-            fileBase64: args['file_base64'] as String? ?? '',
+            belge: args['belge'] as Map<String, dynamic>?,
             doktorId: args['doktor_id'] as int? ?? 0,
             belgeTuru: args['belge_turu'] as String? ?? 'diploma_belgesi',
           );
@@ -102,7 +102,7 @@ class MyApp extends StatelessWidget {
           final args = ModalRoute.of(context)!.settings.arguments as Map<String, dynamic>;
           return ViewFileScreen(
             title: args['title'] as String,
-            fileBase64: args['file_base64'] as String? ?? '',
+            belge: args['belge'] as Map<String, dynamic>?,
             doktorId: args['doktor_id'] as int? ?? 0,
             belgeTuru: args['belge_turu'] as String? ?? 'isyeri_belgesi',
           );
@@ -122,7 +122,7 @@ class MyApp extends StatelessWidget {
           final args = ModalRoute.of(context)!.settings.arguments as Map<String, dynamic>;
           return ViewPatientFileScreen(
             title: args['title'] as String,
-            fileBase64: args['file_base64'] as String? ?? '',
+            belge: args['belge'] as Map<String, dynamic>?,
             hastaId: args['hasta_id'] as int? ?? 0,
             belgeTuru: args['belge_turu'] as String? ?? 'ameliyat_raporu',
           );
@@ -132,7 +132,7 @@ class MyApp extends StatelessWidget {
           final args = ModalRoute.of(context)!.settings.arguments as Map<String, dynamic>;
           return ViewPatientFileScreen(
             title: args['title'] as String,
-            fileBase64: args['file_base64'] as String? ?? '',
+            belge: args['belge'] as Map<String, dynamic>?,
             hastaId: args['hasta_id'] as int? ?? 0,
             belgeTuru: args['belge_turu'] as String? ?? 'rontgen',
           );
@@ -190,7 +190,7 @@ class _PatientProfileScreenState extends State<PatientProfileScreen> {
                                       context, '/view_patient_file',
                                       arguments: {
                                         'title': 'Ameliyat Raporu',
-                                        'file_base64': patientData!['ameliyat_raporu'],
+                                        'belge': patientData!['ameliyat_raporu'],
                                       });
                                 },
                               ),
@@ -211,7 +211,7 @@ class _PatientProfileScreenState extends State<PatientProfileScreen> {
                                       context, '/view_patient_rontgen_file',
                                       arguments: {
                                         'title': 'Röntgen Görüntüsü',
-                                        'file_base64': patientData!['rontgen'],
+                                        'belge': patientData!['rontgen'],
                                       });
                                 },
                               ),
@@ -1,22 +1,25 @@
 import 'dart:convert';
 import 'dart:io';
+import 'dart:typed_data';
 import 'package:file_picker/file_picker.dart';
 import 'package:flutter/material.dart';
 import 'package:flutter_pdfview/flutter_pdfview.dart';
 import 'package:path_provider/path_provider.dart';
 import 'package:permission_handler/permission_handler.dart';
 import 'package:http/http.dart' as http;
+import 'package:randevu_sistemi/services/db_service.dart';
 
 class ViewPatientFileScreen extends StatefulWidget {
   final String title;
-  final String fileBase64;
+  // Profil yanıtındaki belge meta verisi ({id, boyut, mime, url}); belge yoksa null
+  final Map<String, dynamic>? belge;
   final int hastaId;
   final String belgeTuru;
 
   const ViewPatientFileScreen({
     super.key,
     required this.title,
-    required this.fileBase64,
+    this.belge,
     required this.hastaId,
     required this.belgeTuru,
   });
@@ -28,12 +31,20 @@ class ViewPatientFileScreen extends StatefulWidget {
 class _ViewPatientFileScreenState extends State<ViewPatientFileScreen> {
   File? _secilenDosya;
   String? _tempPdfPath;
-  String? _base64FromServer;
+  Uint8List? _indirilenBelge;
 
-  @override
-  void initState() {
-    super.initState();
-    _base64FromServer = widget.fileBase64;
+  bool get _belgeYuklu => _secilenDosya != null || widget.belge != null;
+
+  // Belgenin içeriği profil yanıtında gelmez, belge adresinden bir kez indirilir
+  Future<Uint8List?> _belgeyiIndir() async {
+    if (_indirilenBelge != null) return _indirilenBelge;
+    final url = widget.belge?['url'] as String?;
+    if (url == null) return null;
+
+    final response = await http.get(Uri.parse('${DBService.baseUrl}$url'));
+    if (response.statusCode != 200) return null;
+    _indirilenBelge = response.bodyBytes;
+    return _indirilenBelge;
   }
 
   Future<void> requestPermissions() async {
@@ -70,7 +81,6 @@ class _ViewPatientFileScreenState extends State<ViewPatientFileScreen> {
       setState(() {
         _secilenDosya = dosya;
         _tempPdfPath = null;
-        _base64FromServer = base64String;
       });
 
       ScaffoldMessenger.of(context).showSnackBar(
@@ -102,9 +112,8 @@ class _ViewPatientFileScreenState extends State<ViewPatientFileScreen> {
       return Text("Desteklenmeyen dosya türü: ${_secilenDosya!.path.split('/').last}");
     }
 
-    if (_base64FromServer != null && _base64FromServer!.isNotEmpty) {
-      final bytes = base64Decode(_base64FromServer!.replaceAll(RegExp(r'\s'), ''));
-
+    final bytes = await _belgeyiIndir();
+    if (bytes != null) {
       final isPdf = bytes.length >= 4 &&
           bytes[0] == 0x25 &&
           bytes[1] == 0x50 &&
@@ -132,9 +141,7 @@ class _ViewPatientFileScreenState extends State<ViewPatientFileScreen> {
 
   @override
   Widget build(BuildContext context) {
-    final belgeYukleMetni = _base64FromServer == null || _base64FromServer!.isEmpty
-        ? "Yeni Belge Ekle"
-        : "Belgeyi Güncelle";
+    final belgeYukleMetni = _belgeYuklu ? "Belgeyi Güncelle" : "Yeni Belge Ekle";
 
     return Scaffold(
       appBar: AppBar(